@@ -8,7 +8,7 @@ import json
 import logging
 import time
 import asyncio
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime
 
 from utils.gemini_client import GeminiClient
@@ -22,7 +22,9 @@ from agents.client_agent import ClientAgent
 from services.core.memory_service import MemoryService
 from services.data.token_manager import TokenManager
 from services.data.entity_store import EntityStore
+from services.data.summary_coordinator import SummaryCoordinator
 from services.processing.progress_tracker import ProgressTracker, ProgressEventType, emit_thinking, emit_searching, emit_processing, emit_generating, emit_error, emit_warning, emit_retry, emit_reasoning, emit_considering, emit_analyzing, StreamingReasoningEmitter
+from services.processing.query_filters import QueryFilters, extract_query_filters, prefer_mentions
 from services.core.trace_manager import trace_manager
 from models.schemas import ProcessedMessage
 
@@ -57,6 +59,7 @@ class OrchestratorAgent:
         self.memory_service = memory_service
         self.token_manager = TokenManager(model_name="gpt-4")
         self.entity_store = EntityStore(memory_service)
+        self.summary_coordinator = SummaryCoordinator(memory_service)
         self.progress_tracker = progress_tracker
         self.discovered_tools = []
         
@@ -210,6 +213,7 @@ class OrchestratorAgent:
             Query: "{context['query']}"
             User: {context['user_info']['first_name']} ({context['user_info']['title']})
             Channel: {context['channel']['name']}
+            Today: {datetime.now().date().isoformat()}
 
             Available tools:
             - vector_search: Internal Slack conversations and team discussions
@@ -224,7 +228,8 @@ class OrchestratorAgent:
                 "analysis": "Key insights about approach needed",
                 "tools_needed": ["list of tools to use"],
                 "execution_strategy": "sequential|parallel",
-                "vector_queries": ["search terms"] (if vector_search needed),
+                "vector_queries": ["search terms"] (if vector_search needed; topic only - #channels, @people and dates in the query are applied as filters),
+                "time_scope": {{"start": "YYYY-MM-DD", "end": "YYYY-MM-DD"}} (only if the query is about a specific period),
                 "perplexity_queries": ["web searches"] (if perplexity_search needed),
                 "atlassian_actions": [{{"task": "description"}}] (if atlassian_search needed),
                 "observation_plan": "What to assess in results",
@@ -689,6 +694,37 @@ class OrchestratorAgent:
             "requires_human_input": True
         }
 
+    def _plan_time_range(self, plan: Dict[str, Any]) -> Optional[Tuple[datetime, datetime]]:
+        """(start, end) from the plan's time_scope, or None if it has no usable one"""
+        scope = plan.get("time_scope")
+        if not isinstance(scope, dict) or not scope.get("start"):
+            return None
+        try:
+            start = datetime.fromisoformat(str(scope["start"])).replace(tzinfo=None)
+            end = datetime.fromisoformat(str(scope["end"])).replace(tzinfo=None) if scope.get("end") else datetime.now()
+        except ValueError:
+            logger.debug(f"Ignoring unparseable time_scope in plan: {scope}")
+            return None
+        return (start, end) if start <= end else (end, start)
+
+    async def _scoped_vector_search(
+        self,
+        query: str,
+        scope: QueryFilters,
+        time_range: Optional[Tuple[datetime, datetime]],
+        top_k: int = 5
+    ) -> List[Dict[str, Any]]:
+        """Vector search within the question's filters, unfiltered if they match nothing"""
+        # Over-fetch when Jira keys have to be ranked in, since they cannot be filtered on
+        fetch_k = top_k * 3 if scope.jira_keys else top_k
+        results = await self.vector_tool.search(
+            query=query, top_k=fetch_k, filters=scope.filters or None, time_range=time_range
+        )
+        if not results and scope.filters:
+            logger.info(f"No matches within filters {scope.filters}, searching unfiltered")
+            results = await self.vector_tool.search(query=query, top_k=fetch_k, time_range=time_range)
+        return prefer_mentions(results, scope.jira_keys, top_k)
+
     async def _execute_planned_tools_new(self, plan: Dict[str, Any], message: ProcessedMessage) -> List[Dict[str, Any]]:
         """NEW: Execute all planned tools with conversational progress and result previews"""
         from services.processing.progress_tracker import emit_search_with_results, emit_analysis_insight, emit_discovery, emit_narration
@@ -699,6 +735,11 @@ class OrchestratorAgent:
         # Execute vector search with rich progress
         if "vector_search" in tools_needed:
             vector_queries = plan.get("vector_queries", [])
+            # Channels, people and dates the question names become metadata filters
+            scope = extract_query_filters(message.text)
+            time_range = scope.time_range or self._plan_time_range(plan)
+            if scope:
+                logger.info(f"Vector search scope: filters={list(scope.filters)} jira_keys={scope.jira_keys}")
             for query in vector_queries:
                 self._update_execution_step_new(f"execute_vector_search", "in_progress")
                 
@@ -708,7 +749,7 @@ class OrchestratorAgent:
                         await emit_narration(self.progress_tracker, 
                                            f"Let me check what the team has been discussing about '{query}'...")
                     
-                    search_results = await self.vector_tool.search(query=query, top_k=5)
+                    search_results = await self._scoped_vector_search(query, scope, time_range)
                     
                     # Convert results for preview display
                     preview_results = []
@@ -1283,23 +1324,31 @@ class OrchestratorAgent:
             long_term_summary = await self.memory_service.get_conversation_context(summary_key) or {"summary": "", "message_count": 0}
 
             if recent_messages:
-                messages_to_keep, messages_to_summarize, token_stats = self.token_manager.build_token_managed_history(
-                    recent_messages, MAX_LIVE_TOKENS, PRESERVE_RECENT)
-
-                if messages_to_summarize and len(messages_to_summarize) >= 2:
-                    raw_messages_to_summarize = [msg.original_message for msg in messages_to_summarize]
-                    await self._queue_abstractive_summarization(conversation_key, summary_key, raw_messages_to_summarize, long_term_summary.get("summary", ""))
+                messages_to_keep, messages_to_summarize, token_stats = self.token_manager.build_incremental_history(
+                    conversation_key, recent_messages, MAX_LIVE_TOKENS, PRESERVE_RECENT)
+
+                # Messages already folded into the stored summary are neither re-queued nor re-appended
+                watermark = self.summary_coordinator.get_watermark(long_term_summary)
+                unsummarized_ids = {id(raw) for raw in self.summary_coordinator.filter_unsummarized(
+                    [msg.original_message for msg in messages_to_summarize], watermark)}
+                unsummarized = [msg for msg in messages_to_summarize if id(msg.original_message) in unsummarized_ids]
+
+                if len(unsummarized) >= 2:
+                    raw_messages_to_summarize = [msg.original_message for msg in unsummarized]
+                    await self._queue_abstractive_summarization(
+                        conversation_key, summary_key, raw_messages_to_summarize,
+                        long_term_summary.get("summary", ""), summary_watermark=watermark)
                     
-                    for msg in messages_to_summarize:
-                        if long_term_summary["summary"]:
-                            long_term_summary["summary"] += f"\n{msg.speaker}: {msg.text[:100]}..."
-                        else:
-                            long_term_summary["summary"] = f"{msg.speaker}: {msg.text[:100]}..."
-                    long_term_summary["message_count"] += len(messages_to_summarize)
+                for msg in unsummarized:
+                    if long_term_summary["summary"]:
+                        long_term_summary["summary"] += f"\n{msg.speaker}: {msg.text[:100]}..."
+                    else:
+                        long_term_summary["summary"] = f"{msg.speaker}: {msg.text[:100]}..."
+                long_term_summary["message_count"] += len(unsummarized)
 
                 live_history_text = self.token_manager.format_messages_for_context(messages_to_keep)
                 precise_token_count = token_stats["total_tokens"]
-                old_char_estimate = sum(len(f"{msg.speaker}: {msg.text}") // 4 for msg in messages_to_keep)
+                old_char_estimate = sum(len(msg.formatted_text) // 4 for msg in messages_to_keep)
                 efficiency_stats = self.token_manager.get_token_efficiency_stats(old_char_estimate, precise_token_count)
 
                 return {
@@ -1410,16 +1459,25 @@ class OrchestratorAgent:
         except Exception as e:
             logger.error(f"Failed to queue entity extraction: {e}")
 
-    async def _queue_abstractive_summarization(self, conversation_key: str, summary_key: str, messages_to_archive: List[Dict[str, Any]], existing_summary: str):
-        """Queue abstractive summarization task for background processing"""
+    async def _queue_abstractive_summarization(self, conversation_key: str, summary_key: str, messages_to_archive: List[Dict[str, Any]], existing_summary: str, summary_watermark: float = 0.0):
+        """Queue abstractive summarization, coalesced per conversation so each message is summarized once"""
+        job = None
         try:
+            job = await self.summary_coordinator.claim(conversation_key, messages_to_archive, summary_watermark)
+            if not job:
+                logger.debug(f"Summarization for {conversation_key} coalesced with a queued or recent task")
+                return
+
             from workers.conversation_summarizer import summarize_conversation_chunk
-            logger.info(f"Queuing abstractive summarization for {conversation_key} with {len(messages_to_archive)} messages")
+            logger.info(f"Queuing abstractive summarization for {conversation_key} with {len(job['messages'])} messages")
             summarization_result = summarize_conversation_chunk.delay(
-                conversation_key=conversation_key, messages_to_summarize=messages_to_archive, existing_summary=existing_summary)
+                conversation_key=conversation_key, messages_to_summarize=job["messages"], existing_summary=existing_summary,
+                summary_key=summary_key, watermark_ts=job["watermark_ts"])
             logger.info(f"Abstractive summarization task queued: {summarization_result.id}")
         except Exception as e:
             logger.error(f"Failed to queue abstractive summarization: {e}")
+            if job:
+                await self.summary_coordinator.release(conversation_key, job)
 
     # ============================================================================
     # LEGACY METHODS (preserved for safety/compatibility)
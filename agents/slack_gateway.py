@@ -10,6 +10,7 @@ from slack_sdk.errors import SlackApiError
 
 from config import settings
 from models.schemas import SlackEvent, ProcessedMessage
+from services.core.memory_service import MemoryService
 from services.core.trace_manager import trace_manager
 from services.external_apis.enhanced_slack_connector import EnhancedSlackConnector
 
@@ -28,6 +29,9 @@ class SlackGateway:
         self.client = self.slack_connector.client
         self.bot_user_id = settings.SLACK_BOT_USER_ID
         
+        # Thread participation index lives in Redis via the shared connection pool
+        self.memory_service = MemoryService()
+        
         # If bot user ID is not configured, try to get it from Slack API
         if not self.bot_user_id and settings.SLACK_BOT_TOKEN:
             try:
@@ -71,16 +75,17 @@ class SlackGateway:
             is_mention = f"<@{self.bot_user_id}>" in text if self.bot_user_id else False
             is_thread_reply = thread_ts is not None
             
-            # Enhanced thread participation logic
+            # Thread participation comes from the event-sourced index (Slack API only on cold miss)
             bot_participated_in_thread = False
             if is_thread_reply:
-                bot_participated_in_thread = await self._has_bot_participated_in_thread(channel_id, thread_ts)
+                bot_participated_in_thread = await self._has_bot_participated_in_thread(
+                    channel_id, thread_ts, parent_user_id=event.get("parent_user_id")
+                )
             
             # Process if it's a DM, mention, bot's thread, or thread where bot has participated
             should_respond = (
                 is_dm or 
                 is_mention or 
-                (is_thread_reply and await self._is_bot_thread(channel_id, thread_ts)) or
                 bot_participated_in_thread
             )
             
@@ -191,15 +196,8 @@ class SlackGateway:
             if response["ok"]:
                 logger.info(f"Successfully sent response to channel {channel_id}")
                 
-                # Track thread participation if this was a threaded message
-                if thread_ts and self.bot_user_id:
-                    try:
-                        from services.core.memory_service import MemoryService
-                        memory_service = MemoryService()
-                        await memory_service.track_thread_participation(channel_id, thread_ts, self.bot_user_id)
-                        logger.debug(f"Tracked bot participation in thread {thread_ts}")
-                    except Exception as e:
-                        logger.warning(f"Failed to track thread participation: {e}")
+                # Index the thread this post started or joined
+                await self._index_bot_post(channel_id, thread_ts, response.get("ts"))
                 
                 return True
             else:
@@ -355,6 +353,9 @@ class SlackGateway:
             message_ts = response["ts"]
             logger.info(f"⏱️  FIRST VISUAL TRACE: 'Starting up...' message successfully posted with timestamp {message_ts} in {channel_id}")
             
+            # Index the thread this post started or joined
+            await self._index_bot_post(channel_id, thread_ts, message_ts)
+            
             # Track subsequent progress updates
             update_count = 0
             
@@ -403,59 +404,64 @@ class SlackGateway:
         except Exception:
             return False
     
-    async def _is_bot_thread(self, channel_id: str, thread_ts: str) -> bool:
-        """Check if the thread was started by the bot"""
+    async def _index_bot_post(self, channel_id: str, thread_ts: Optional[str], message_ts: Optional[str]) -> None:
+        """Record a bot post in the thread participation index"""
+        if not self.bot_user_id:
+            return
         try:
-            response = self.client.conversations_replies(
-                channel=channel_id,
-                ts=thread_ts,
-                limit=1
-            )
-            
-            if response["ok"] and response["messages"]:
-                original_message = response["messages"][0]
-                return original_message.get("user") == self.bot_user_id
-            
-            return False
-            
+            if thread_ts:
+                # Replying inside an existing thread - the bot has joined it
+                await self.memory_service.track_thread_participation(channel_id, thread_ts, self.bot_user_id)
+            elif message_ts:
+                # Top-level post - replies to it form a thread the bot started
+                await self.memory_service.track_thread_participation(channel_id, message_ts, self.bot_user_id, started=True)
         except Exception as e:
-            logger.error(f"Error checking bot thread: {e}")
-            return False
+            logger.warning(f"Failed to track thread participation: {e}")
     
-    async def _has_bot_participated_in_thread(self, channel_id: str, thread_ts: str) -> bool:
-        """Check if the bot has participated in this thread"""
+    async def _has_bot_participated_in_thread(
+        self,
+        channel_id: str,
+        thread_ts: str,
+        parent_user_id: Optional[str] = None
+    ) -> bool:
+        """
+        Check if the bot started or has participated in this thread.
+        
+        Resolution order: the event's parent_user_id, the participation index
+        (single O(1) lookup), and only on a cold miss one conversations_replies call.
+        """
         try:
-            # First check memory service for cached thread participation
-            from services.core.memory_service import MemoryService
-            memory_service = MemoryService()
-            
-            thread_key = f"thread_participation:{channel_id}:{thread_ts}"
-            cached_participation = await memory_service.get_temp_data(thread_key)
+            # Thread reply events carry the root author - no lookup needed for bot threads
+            if parent_user_id and self.bot_user_id and parent_user_id == self.bot_user_id:
+                await self.memory_service.track_thread_participation(channel_id, thread_ts, self.bot_user_id, started=True)
+                return True
             
-            if cached_participation is not None:
-                return cached_participation.get("bot_participated", False)
+            indexed = await self.memory_service.has_thread_participation(channel_id, thread_ts)
+            if indexed is not None:
+                return indexed
             
-            # If not cached, check Slack API for bot messages in thread
+            # Cold miss: check Slack API once for the root author and any bot replies
+            logger.info(f"Thread participation cold miss for {channel_id}:{thread_ts}, checking Slack API")
             response = self.client.conversations_replies(
                 channel=channel_id,
                 ts=thread_ts,
                 limit=50  # Check last 50 messages in thread
             )
             
+            bot_started = False
             bot_participated = False
             if response["ok"] and response["messages"]:
-                # Check if bot has sent any messages in this thread
-                for message in response["messages"]:
-                    if message.get("user") == self.bot_user_id:
-                        bot_participated = True
-                        break
-            
-            # Cache the result for 1 hour to avoid repeated API calls
-            await memory_service.store_temp_data(
-                thread_key,
-                {"bot_participated": bot_participated, "checked_at": response["messages"][-1].get("ts", "") if response.get("messages") else ""},
-                ttl=3600
-            )
+                bot_started = response["messages"][0].get("user") == self.bot_user_id
+                bot_participated = bot_started or any(
+                    message.get("user") == self.bot_user_id for message in response["messages"]
+                )
+            
+            if bot_participated:
+                await self.memory_service.track_thread_participation(
+                    channel_id, thread_ts, self.bot_user_id, started=bot_started
+                )
+            else:
+                await self.memory_service.record_thread_non_participation(channel_id, thread_ts)
             
             return bot_participated
             
@@ -467,9 +473,9 @@ class SlackGateway:
         """Clean message text while preserving user mentions with actual names"""
         import re
         
-        # Find all user mentions and replace with actual names
-        async def replace_user_mention(match):
-            user_id = match.group(1)
+        # Replace user mentions with actual names (served from the in-memory workspace directory)
+        mention_ids = set(re.findall(r'<@([A-Z0-9]+)>', text))
+        for user_id in mention_ids:
             try:
                 user_info = await self.slack_connector._get_cached_user_info(user_id)
                 # Get display name or real name, fallback to first name or username
@@ -483,16 +489,11 @@ class SlackGateway:
                 if name and " " in name:
                     name = name.split()[0]
                 
-                return f"@{name}"
+                replacement = f"@{name}"
             except Exception as e:
                 logger.debug(f"Could not resolve user mention {user_id}: {e}")
-                return "@user"
-        
-        # Replace user mentions with actual names
-        mentions = re.finditer(r'<@([A-Z0-9]+)>', text)
-        for match in mentions:
-            replacement = await replace_user_mention(match)
-            text = text.replace(match.group(0), replacement)
+                replacement = "@user"
+            text = text.replace(f"<@{user_id}>", replacement)
         
         # Convert channel mentions to readable format: <#C123|channel-name> -> #channel-name
         text = re.sub(r'<#([A-Z0-9]+)\|([^>]+)>', r'#\2', text)
@@ -269,22 +269,16 @@ def health_check(self):
 def cleanup_old_data(self):
     """Clean up old temporary data and logs"""
     try:
-        import asyncio
         from services.core.memory_service import MemoryService
         from datetime import datetime, timedelta
         
         logger.info("Starting cleanup of old data...")
         
-        # Setup async context
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
+        from workers.worker_runtime import run_async
         
-        try:
-            result = loop.run_until_complete(_perform_cleanup())
-            logger.info(f"Cleanup completed: {result}")
-            return result
-        finally:
-            loop.close()
+        result = run_async(_perform_cleanup())
+        logger.info(f"Cleanup completed: {result}")
+        return result
             
     except Exception as e:
         logger.error(f"Error in cleanup task: {e}")
@@ -293,7 +287,8 @@ def cleanup_old_data(self):
 async def _perform_cleanup():
     """Perform the actual cleanup operations"""
     try:
-        memory_service = MemoryService()
+        from workers.worker_runtime import get_service
+        memory_service = get_service("memory_service")
         
         # This would implement actual cleanup logic
         # For now, return a placeholder result
@@ -317,6 +312,21 @@ def worker_ready(sender=None, **kwargs):
     """Signal handler for when worker is ready"""
     logger.info(f"Celery worker {sender} is ready")
 
+@signals.worker_process_init.connect
+def worker_process_init(**kwargs):
+    """Start the persistent event loop and shared services in each worker process"""
+    from workers.worker_runtime import worker_runtime
+    worker_runtime.start()
+    started = worker_runtime.initialize_services()
+    logger.info(f"Worker runtime initialized: {started}")
+
+@signals.worker_process_shutdown.connect
+def worker_process_shutdown(**kwargs):
+    """Close pooled connections and stop the worker event loop"""
+    from workers.worker_runtime import worker_runtime
+    logger.info(f"Worker runtime stats: {worker_runtime.get_stats()}")
+    worker_runtime.shutdown()
+
 @signals.worker_shutdown.connect
 def worker_shutdown(sender=None, **kwargs):
     """Signal handler for when worker shuts down"""
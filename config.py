@@ -19,6 +19,10 @@ class Settings(BaseSettings):
     # Channels to monitor for ingestion (comma-separated)
     SLACK_CHANNELS_TO_MONITOR: str = os.getenv("SLACK_CHANNELS_TO_MONITOR", "")
     
+    # Share Slack rate-limit budgets across worker processes via Redis
+    SLACK_RATE_LIMIT_SHARED: bool = os.getenv("SLACK_RATE_LIMIT_SHARED", "false").lower() == "true"
+    SLACK_THREAD_FETCH_CONCURRENCY: int = int(os.getenv("SLACK_THREAD_FETCH_CONCURRENCY", "4"))  # Threads fetched in parallel per channel
+    
     # Gemini Configuration
     GEMINI_API_KEY: str = os.getenv("GEMINI_API_KEY", "")
     GEMINI_PRO_MODEL: str = "gemini-2.5-flash"  # Flash for all orchestrator operations
@@ -28,6 +32,56 @@ class Settings(BaseSettings):
     PINECONE_API_KEY: str = os.getenv("PINECONE_API_KEY", "")
     PINECONE_ENVIRONMENT: str = os.getenv("PINECONE_ENVIRONMENT", "")
     PINECONE_INDEX_NAME: str = os.getenv("PINECONE_INDEX_NAME", "uipath-slack-chatter")
+
+    # Blue/green namespaces: reads follow an alias that reindex jobs flip atomically
+    PINECONE_NAMESPACE: str = os.getenv("PINECONE_NAMESPACE", "")  # Served until the first cutover ("" = default namespace)
+    VECTOR_NAMESPACE_ALIAS_FILE: str = os.getenv("VECTOR_NAMESPACE_ALIAS_FILE", "vector_namespace_alias.json")  # Used without Redis
+    VECTOR_NAMESPACE_ALIAS_TTL_SECONDS: float = float(os.getenv("VECTOR_NAMESPACE_ALIAS_TTL_SECONDS", "5"))  # Per-process alias cache
+    VECTOR_NAMESPACE_GC_DELAY_SECONDS: float = float(os.getenv("VECTOR_NAMESPACE_GC_DELAY_SECONDS", "120"))  # Grace before a retired namespace is deleted
+    VECTOR_REINDEX_VALIDATE_TIMEOUT_SECONDS: float = float(os.getenv("VECTOR_REINDEX_VALIDATE_TIMEOUT_SECONDS", "60"))  # Wait for shadow counts to settle
+
+    # Time-partitioned namespaces: <namespace>__<period> per month or quarter, searched by time scope
+    VECTOR_PARTITION_SCHEME: str = os.getenv("VECTOR_PARTITION_SCHEME", "none")  # none, month or quarter
+    VECTOR_PARTITION_DEFAULT_WINDOW_DAYS: int = int(os.getenv("VECTOR_PARTITION_DEFAULT_WINDOW_DAYS", "180"))  # Searched when a question has no time scope
+    VECTOR_PARTITION_RETENTION_MONTHS: int = int(os.getenv("VECTOR_PARTITION_RETENTION_MONTHS", "0"))  # Older partitions are dropped (0 = keep all)
+
+    # In-process mirror of recent vectors (NumPy), answers confident searches without Pinecone
+    LOCAL_VECTOR_INDEX_ENABLED: bool = os.getenv("LOCAL_VECTOR_INDEX_ENABLED", "false").lower() == "true"
+    LOCAL_VECTOR_INDEX_WINDOW_DAYS: int = int(os.getenv("LOCAL_VECTOR_INDEX_WINDOW_DAYS", "30"))  # Message age mirrored
+    LOCAL_VECTOR_INDEX_MAX_VECTORS: int = int(os.getenv("LOCAL_VECTOR_INDEX_MAX_VECTORS", "50000"))  # ~3KB each for 768-dim vectors
+    LOCAL_VECTOR_INDEX_MIN_SCORE: float = float(os.getenv("LOCAL_VECTOR_INDEX_MIN_SCORE", "0.75"))  # Weakest top-k score answered locally
+    LOCAL_VECTOR_INDEX_SEED: bool = os.getenv("LOCAL_VECTOR_INDEX_SEED", "true").lower() == "true"  # Load the window from Pinecone in the background
+    LOCAL_VECTOR_INDEX_SEED_MAX_VECTORS: int = int(os.getenv("LOCAL_VECTOR_INDEX_SEED_MAX_VECTORS", "200000"))  # Don't seed from namespaces (or window partitions) holding more; use a VECTOR_PARTITION_SCHEME instead
+    LOCAL_VECTOR_INDEX_REFRESH_SECONDS: int = int(os.getenv("LOCAL_VECTOR_INDEX_REFRESH_SECONDS", "600"))  # In-memory mirror resyncs with Pinecone this often to see worker writes (0 = single process, never)
+    LOCAL_VECTOR_SNAPSHOT_DIR: str = os.getenv("LOCAL_VECTOR_SNAPSHOT_DIR", "")  # Memory-mapped store shared by all processes, e.g. "vector_snapshot" ("" = in memory)
+    LOCAL_VECTOR_SNAPSHOT_DTYPE: str = os.getenv("LOCAL_VECTOR_SNAPSHOT_DTYPE", "int8")  # int8 (1/4 of float32, fastest to score) or float16 (more exact, slow to dequantise)
+
+    # Export/import of stored vectors between indexes and namespaces (no re-embedding)
+    VECTOR_EXPORT_DIR: str = os.getenv("VECTOR_EXPORT_DIR", "vector_exports")  # One directory per export
+    VECTOR_EXPORT_CHUNK_VECTORS: int = int(os.getenv("VECTOR_EXPORT_CHUNK_VECTORS", "1000"))  # Vectors per checksummed chunk file
+    VECTOR_IMPORT_WORKERS: int = int(os.getenv("VECTOR_IMPORT_WORKERS", "4"))  # Chunks upserted concurrently
+    
+    # Streaming ingestion pipeline (extract -> process -> embed -> upsert)
+    INGESTION_QUEUE_SIZE: int = int(os.getenv("INGESTION_QUEUE_SIZE", "2"))  # Batches buffered between pipeline stages
+    INGESTION_EMBED_BATCH_SIZE: int = int(os.getenv("INGESTION_EMBED_BATCH_SIZE", "20"))  # Messages per embedding batch
+    INGESTION_UPSERT_BATCH_SIZE: int = int(os.getenv("INGESTION_UPSERT_BATCH_SIZE", "100"))  # Vectors per Pinecone upsert
+    INGESTION_CHANNEL_CONCURRENCY: int = int(os.getenv("INGESTION_CHANNEL_CONCURRENCY", "3"))  # Channels ingested in parallel
+    INGESTION_GEMINI_REQUESTS_PER_MINUTE: int = int(os.getenv("INGESTION_GEMINI_REQUESTS_PER_MINUTE", "1500"))  # Embedding requests shared by all channels
+    INGESTION_PINECONE_UPSERTS_PER_SECOND: float = float(os.getenv("INGESTION_PINECONE_UPSERTS_PER_SECOND", "10"))  # Upsert calls shared by all channels
+    INGESTION_CHECKPOINT_DB: str = os.getenv("INGESTION_CHECKPOINT_DB", "ingestion_checkpoints.db")  # SQLite (WAL) checkpoint store
+    INGESTION_MAX_RESUME_ATTEMPTS: int = int(os.getenv("INGESTION_MAX_RESUME_ATTEMPTS", "5"))  # Resumes before an unfinished run is abandoned
+    
+    # Real-time indexing of monitored-channel message events (hourly poll fills gaps)
+    REALTIME_INDEXING_ENABLED: bool = os.getenv("REALTIME_INDEXING_ENABLED", "true").lower() == "true"
+    REALTIME_INDEX_BATCH_SIZE: int = int(os.getenv("REALTIME_INDEX_BATCH_SIZE", "20"))  # Messages per micro-batch
+    REALTIME_INDEX_FLUSH_SECONDS: float = float(os.getenv("REALTIME_INDEX_FLUSH_SECONDS", "2.0"))  # Max wait to fill a micro-batch
+    REALTIME_INDEX_MAX_PENDING: int = int(os.getenv("REALTIME_INDEX_MAX_PENDING", "1000"))  # Queued messages before events are dropped
+    REALTIME_INDEX_RETENTION_HOURS: int = int(os.getenv("REALTIME_INDEX_RETENTION_HOURS", "72"))  # How long indexed timestamps are remembered
+
+    # Content-addressed embedding cache (Redis, in-process LRU fallback)
+    EMBEDDING_CACHE_ENABLED: bool = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+    EMBEDDING_CACHE_MAX_ENTRIES: int = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "100000"))  # Redis entries, ~4KB each for 768-dim vectors
+    EMBEDDING_CACHE_LOCAL_MAX_BYTES: int = int(os.getenv("EMBEDDING_CACHE_LOCAL_MAX_BYTES", str(64 * 1024 * 1024)))  # Per-process fallback budget (~3KB per 768-dim vector)
     
     # Perplexity Configuration
     PERPLEXITY_API_KEY: str = os.getenv("PERPLEXITY_API_KEY", "")
@@ -53,7 +107,13 @@ class Settings(BaseSettings):
     # Redis Configuration (DISABLED for deployment - using memory-only fallbacks)
     REDIS_URL: str = os.getenv("REDIS_URL", "redis://localhost:6379/0")
     REDIS_PASSWORD: Optional[str] = None
-    
+    REDIS_MAX_CONNECTIONS: int = int(os.getenv("REDIS_MAX_CONNECTIONS", "50"))  # Per shared pool (one pool per event loop)
+    REDIS_POOL_TIMEOUT: float = float(os.getenv("REDIS_POOL_TIMEOUT", "5"))  # Seconds to wait for a free pooled connection
+
+    # Redis payload encoding: "orjson" (compact JSON), "msgpack", "json" or "legacy" (pre-codec pretty JSON)
+    REDIS_PAYLOAD_CODEC: str = os.getenv("REDIS_PAYLOAD_CODEC", "orjson")
+    REDIS_PAYLOAD_COMPRESSION_THRESHOLD: int = int(os.getenv("REDIS_PAYLOAD_COMPRESSION_THRESHOLD", "1024"))  # bytes
+
     # Celery Configuration (DISABLED for deployment - using memory transport)
     CELERY_BROKER_URL: str = ""  # Intentionally empty to force memory transport
     CELERY_RESULT_BACKEND: str = ""  # Intentionally empty to force memory backend
@@ -67,6 +127,14 @@ class Settings(BaseSettings):
     # Memory Configuration
     SHORT_TERM_MEMORY_TTL: int = int(os.getenv("SHORT_TERM_MEMORY_TTL", "3600"))  # 1 hour
     CONVERSATION_MEMORY_TTL: int = int(os.getenv("CONVERSATION_MEMORY_TTL", "86400"))  # 24 hours
+    MEMORY_FALLBACK_MAX_BYTES: int = int(os.getenv("MEMORY_FALLBACK_MAX_BYTES", str(64 * 1024 * 1024)))  # In-memory cache budget when Redis is down
+    SUMMARY_DEBOUNCE_SECONDS: int = int(os.getenv("SUMMARY_DEBOUNCE_SECONDS", "30"))  # Min gap between summarization tasks per conversation
+    ENTITY_EXTRACTION_BATCH_SIZE: int = int(os.getenv("ENTITY_EXTRACTION_BATCH_SIZE", "8"))  # Exchanges per Gemini extraction call
+    ENTITY_EXTRACTION_BATCH_WINDOW: float = float(os.getenv("ENTITY_EXTRACTION_BATCH_WINDOW", "2"))  # Seconds to accumulate exchanges
+    ENTITY_RETENTION_DAYS: int = int(os.getenv("ENTITY_RETENTION_DAYS", "30"))  # Evict entities not mentioned for this long
+    ENTITY_MAX_CONTEXTS: int = int(os.getenv("ENTITY_MAX_CONTEXTS", "20"))  # Mention contexts kept per entity
+    ENTITY_STORE_MAX_BYTES: int = int(os.getenv("ENTITY_STORE_MAX_BYTES", str(256 * 1024)))  # Entity hash budget per conversation
+    ENTITY_COMPACTION_BATCH: int = int(os.getenv("ENTITY_COMPACTION_BATCH", "500"))  # Entity stores visited per compaction run
     
     # Agent Configuration
     MAX_RETRIES: int = int(os.getenv("MAX_RETRIES", "3"))
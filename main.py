@@ -31,6 +31,16 @@ from services.core.webhook_cache import WebhookCache
 from services.performance.performance_optimizer import performance_optimizer
 from services.performance.lazy_loader import lazy_loader
 from services.performance.connection_pool import connection_pool
+from services.core.redis_pool import redis_pool_registry
+from services.external_apis.slack_directory import slack_directory
+from services.external_apis.slack_rate_limiter import slack_rate_limiter
+from services.data.embedding_cache import embedding_cache
+from services.data.vector_namespaces import vector_namespaces
+from services.data.vector_partitions import vector_partitions
+from services.data.local_vector_index import local_vector_index
+from services.data.vector_transfer import list_transfers
+from services.processing.ingestion_checkpoints import checkpoint_store
+from services.processing.realtime_indexer import realtime_indexer
 from services.core.production_logger import production_logger
 
 # Import Celery only if configured
@@ -196,6 +206,9 @@ async def slack_events(request: Request):
         if body.get("type") == "event_callback":
             event_data = SlackEvent(**body)
             
+            # Queue monitored-channel messages, edits and deletions for indexing (non-blocking)
+            realtime_indexer.submit(event_data.event)
+            
             # Start production trace
             trace_id = production_logger.start_slack_trace(event_data.event)
             
@@ -642,7 +655,15 @@ async def system_status():
             "redis": "healthy" if redis_status else "unhealthy",
             "celery": "healthy" if celery_status else "unhealthy",
             "agents": "healthy" if slack_gateway and orchestrator_agent else "unhealthy",
-            "services_initialized": services_initialized
+            "services_initialized": services_initialized,
+            "memory_fallback_cache": memory_service.get_fallback_cache_stats() if memory_service else None,
+            "slack_directory": slack_directory.get_stats(),
+            "slack_rate_limiter": slack_rate_limiter.get_stats(),
+            "embedding_cache": await embedding_cache.get_stats(),
+            "ingestion_checkpoints": checkpoint_store.get_stats(),
+            "realtime_indexing": realtime_indexer.get_stats(),
+            "local_vector_index": local_vector_index.get_stats(),
+            "summarization": await orchestrator_agent.summary_coordinator.get_stats() if orchestrator_agent else None
         }
     except Exception as e:
         logger.error(f"Error checking system status: {e}")
@@ -836,10 +857,162 @@ async def pinecone_status():
                 "index_fullness": stats.index_fullness if hasattr(stats, 'index_fullness') else 0.0
             },
             "sample_query_results": len(sample_results),
-            "has_data": len(sample_results) > 0
+            "has_data": len(sample_results) > 0,
+            "namespace_alias": await vector_namespaces.get_stats(),
+            "partitions": vector_partitions.get_stats(),
+            "vector_transfers": {
+                "running": sorted(key for key, task in vector_transfer_tasks.items() if not task.done()),
+                "exports": list_transfers()
+            }
+        }
+        
+    except Exception as e:
+        return {"status": "error", "error": str(e)}
+
+# Vector exports and imports run in the background; progress is kept on disk
+# next to each export and shown by /admin/pinecone-status
+vector_transfer_tasks = {}
+
+def _start_vector_transfer(key: str, run) -> bool:
+    """Start `run()` as a background task unless a transfer with this key is still running"""
+    running = vector_transfer_tasks.get(key)
+    if running is not None and not running.done():
+        return False
+    
+    def log_result(task):
+        if not task.cancelled() and task.exception():
+            logger.error(f"Vector transfer {key} failed: {task.exception()}")
+    
+    task = asyncio.create_task(run())
+    task.add_done_callback(log_result)
+    vector_transfer_tasks[key] = task
+    return True
+
+@app.post("/admin/export-vectors")
+async def export_vectors_endpoint(
+    name: Optional[str] = None,
+    namespace: Optional[str] = None,
+    index_name: Optional[str] = None
+):
+    """
+    Export stored vectors to a local snapshot without re-embedding anything.
+    
+    Runs in the background; calling it again with the same name resumes an
+    unfinished export. Progress is reported by /admin/pinecone-status.
+    
+    Args:
+        name: Export name (default: <index>-<namespace>)
+        namespace: Namespace to export (default: the active one)
+        index_name: Index to export from (default: the configured one)
+    """
+    try:
+        from services.data.embedding_service import EmbeddingService
+        from services.data.vector_transfer import export_vectors, snapshot_path
+        
+        embedding_service = EmbeddingService()
+        if not embedding_service.pinecone_available:
+            return {"status": "error", "error": "Pinecone not available"}
+        
+        index_name = index_name or settings.PINECONE_INDEX_NAME
+        if namespace is None:
+            namespace = await vector_namespaces.get_active()
+        index = embedding_service.index if index_name == settings.PINECONE_INDEX_NAME else embedding_service.pc.Index(index_name)
+        name = name or f"{index_name}-{namespace or 'default'}"
+        directory = snapshot_path(name)
+        
+        started = _start_vector_transfer(
+            f"export:{name}", lambda: export_vectors(index, directory, namespace, index_name)
+        )
+        return {
+            "status": "started" if started else "already_running",
+            "name": name,
+            "directory": directory,
+            "source": {"index": index_name, "namespace": namespace}
         }
         
     except Exception as e:
+        logger.error(f"Vector export failed to start: {e}")
+        return {"status": "error", "error": str(e)}
+
+@app.post("/admin/import-vectors")
+async def import_vectors_endpoint(
+    name: str,
+    index_name: Optional[str] = None,
+    namespace: Optional[str] = None,
+    cutover: bool = False,
+    workers: Optional[int] = None
+):
+    """
+    Bulk-upsert an exported snapshot into an index or namespace.
+    
+    Runs in the background with parallel workers; chunks are checksummed and
+    an interrupted import resumes where it stopped when called again.
+    
+    Args:
+        name: Export to import
+        index_name: Target index (default: the configured one)
+        namespace: Target namespace (default: the export's source namespace)
+        cutover: Import into a fresh shadow namespace of the configured index
+            and switch reads to it once it validates
+        workers: Chunks upserted concurrently (default: VECTOR_IMPORT_WORKERS)
+    """
+    try:
+        from services.data.embedding_service import EmbeddingService
+        from services.data.vector_namespaces import reindex_into_shadow
+        from services.data.vector_transfer import import_vectors, read_manifest, snapshot_path
+        
+        directory = snapshot_path(name)
+        manifest = read_manifest(directory)
+        if manifest is None or manifest["status"] != "complete":
+            return {"status": "error", "error": f"No complete export named '{name}'"}
+        
+        embedding_service = EmbeddingService()
+        if not embedding_service.pinecone_available:
+            return {"status": "error", "error": "Pinecone not available"}
+        
+        index_name = index_name or settings.PINECONE_INDEX_NAME
+        configured_index = index_name == settings.PINECONE_INDEX_NAME
+        if cutover and not configured_index:
+            return {"status": "error", "error": "cutover only applies to the configured index"}
+        index = embedding_service.index if configured_index else embedding_service.pc.Index(index_name)
+        
+        if cutover:
+            async def run():
+                async def build(shadow: str) -> int:
+                    state = await import_vectors(index, directory, shadow, index_name, workers)
+                    # A partial import must never go live: it would retire the complete namespace
+                    if state["status"] != "complete" or state["vectors_imported"] < manifest["vectors"]:
+                        raise RuntimeError(
+                            f"import {state['status']}: {state['vectors_imported']} of {manifest['vectors']} "
+                            f"vectors ({len(state['errors'])} chunk errors)"
+                        )
+                    return state["vectors_imported"]
+                return await reindex_into_shadow(
+                    embedding_service, build, label="import", min_vectors=max(1, manifest["vectors"])
+                )
+            key, target = f"import:{name}:{index_name}:shadow", "shadow namespace"
+        else:
+            if namespace is None:
+                namespace = manifest["source"]["namespace"]
+            
+            async def run():
+                state = await import_vectors(index, directory, namespace, index_name, workers)
+                # The local mirror did not see these writes; let it reload
+                if configured_index and namespace == await vector_namespaces.get_active():
+                    local_vector_index.clear()
+                return state
+            key, target = f"import:{name}:{index_name}:{namespace}", namespace
+        
+        started = _start_vector_transfer(key, run)
+        return {
+            "status": "started" if started else "already_running",
+            "name": name,
+            "vectors": manifest["vectors"],
+            "target": {"index": index_name, "namespace": target}
+        }
+        
+    except Exception as e:
+        logger.error(f"Vector import failed to start: {e}")
         return {"status": "error", "error": str(e)}
 
 @app.post("/admin/ingest-test-document")
@@ -1050,23 +1223,15 @@ async def get_hourly_embedding_status():
     Get the status of hourly embedding checks including last run times and channel states.
     """
     try:
-        import json
-        import os
         from datetime import datetime
         
-        state_file = "hourly_embedding_state.json"
-        
-        # Load current state
-        if os.path.exists(state_file):
-            with open(state_file, 'r') as f:
-                state = json.load(f)
-        else:
-            state = {}
+        # Load current state from the checkpoint store
+        checkpoints = {cp.channel_id: cp for cp in checkpoint_store.list_checkpoints("hourly")}
+        state = {channel_id: cp.to_dict() for channel_id, cp in checkpoints.items()}
         
-        # Get file modification time for last update
         last_updated = None
-        if os.path.exists(state_file):
-            last_updated = datetime.fromtimestamp(os.path.getmtime(state_file)).isoformat()
+        if checkpoints:
+            last_updated = datetime.fromtimestamp(max(cp.updated_at for cp in checkpoints.values())).isoformat()
         
         # Channel configurations
         channels = [
@@ -1077,20 +1242,23 @@ async def get_hourly_embedding_status():
         channel_status = []
         for channel in channels:
             channel_id = channel["id"]
-            channel_state = state.get(channel_id, {})
+            checkpoint = checkpoints.get(channel_id)
+            details = checkpoint.details if checkpoint else {}
             
             channel_status.append({
                 "channel_id": channel_id,
                 "channel_name": channel["name"],
-                "last_check_ts": channel_state.get("last_check_ts"),
-                "last_successful_check": channel_state.get("last_successful_check"),
-                "last_check_time": channel_state.get("last_check_time"),
-                "total_messages_embedded": channel_state.get("total_messages_embedded", 0)
+                "last_check_ts": checkpoint.last_embedded_ts if checkpoint else None,
+                "last_successful_check": details.get("last_successful_check"),
+                "last_check_time": details.get("last_check_time"),
+                "total_messages_embedded": checkpoint.total_messages if checkpoint else 0,
+                "resume_pending": bool(checkpoint and checkpoint.in_progress),
+                "pages_committed": checkpoint.page if checkpoint and checkpoint.in_progress else 0
             })
         
         return {
             "status": "success",
-            "state_file_exists": os.path.exists(state_file),
+            "checkpoint_db": checkpoint_store.path,
             "state_last_updated": last_updated,
             "channels": channel_status,
             "raw_state": state
@@ -1103,26 +1271,23 @@ async def get_hourly_embedding_status():
 @app.delete("/admin/reset-hourly-embedding-state")
 async def reset_hourly_embedding_state():
     """
-    Reset the hourly embedding state file.
+    Reset the hourly embedding checkpoints.
     This will cause the next hourly check to process recent messages as if running for the first time.
     """
     try:
-        import os
-        
-        state_file = "hourly_embedding_state.json"
+        removed = checkpoint_store.reset("hourly")
         
-        if os.path.exists(state_file):
-            os.remove(state_file)
+        if removed:
             return {
                 "status": "success",
-                "message": "Hourly embedding state file deleted. Next run will start fresh.",
-                "state_file": state_file
+                "message": f"Hourly embedding checkpoints for {removed} channels deleted. Next run will start fresh.",
+                "checkpoint_db": checkpoint_store.path
             }
         else:
             return {
                 "status": "success",
-                "message": "No state file existed to delete.",
-                "state_file": state_file
+                "message": "No hourly checkpoints existed to delete.",
+                "checkpoint_db": checkpoint_store.path
             }
         
     except Exception as e:
@@ -1248,9 +1413,10 @@ async def ingest_channel_conversations(
         processed_messages = await data_processor.process_messages(raw_messages)
         logger.info(f"Processed {len(processed_messages)} messages")
         
-        # Step 3: Generate embeddings and store
-        embedded_count = await embedding_service.embed_and_store_messages(processed_messages)
-        logger.info(f"Successfully embedded {embedded_count} messages")
+        # Step 3: Generate embeddings and store (unchanged content comes from the embedding cache)
+        cache_stats = {}
+        embedded_count = await embedding_service.embed_and_store_messages(processed_messages, cache_stats)
+        logger.info(f"Successfully embedded {embedded_count} messages ({cache_stats.get('cache_hits', 0)} cached)")
         
         # Step 4: Get final index stats
         final_stats = await embedding_service.get_index_stats()
@@ -1267,6 +1433,7 @@ async def ingest_channel_conversations(
                 "raw_messages_extracted": len(raw_messages),
                 "messages_processed": len(processed_messages),
                 "messages_embedded": embedded_count,
+                "embedding_cache_hits": cache_stats.get("cache_hits", 0),
                 "sample_size_limit": sample_size
             },
             "index_stats_after": final_stats
@@ -1286,9 +1453,12 @@ async def purge_and_reingest_channel(
     sample_size: int = 50
 ):
     """
-    Complete workflow: Purge vector index and re-embed with channel conversations
+    Complete workflow: Rebuild the vector index from channel conversations
     
-    This is the main endpoint you should use for the complete process.
+    This is the main endpoint you should use for the complete process. The
+    rebuild is written into a shadow namespace and only replaces the live
+    index once it validates, so search keeps answering from the old vectors
+    until then; the old namespace is deleted in the background.
     
     Args:
         channel_id: Slack channel ID (default: C087QKECFKQ)
@@ -1297,6 +1467,7 @@ async def purge_and_reingest_channel(
     """
     try:
         from services.data.embedding_service import EmbeddingService
+        from services.data.vector_namespaces import reindex_into_shadow
         from services.external_apis.enhanced_slack_connector import EnhancedSlackConnector
         from services.processing.data_processor import DataProcessor
         from datetime import datetime, timedelta
@@ -1328,25 +1499,8 @@ async def purge_and_reingest_channel(
         })
         logger.info(f"Initial index contains {initial_stats.get('total_vectors', 0)} vectors")
         
-        # STEP 2: Purge existing vectors
-        logger.info("Step 2: Purging all existing vectors...")
-        purge_result = await embedding_service.purge_all_vectors()
-        workflow_result["workflow_steps"].append({
-            "step": 2,
-            "name": "vector_purge",
-            "status": "completed" if purge_result["status"] == "success" else "failed",
-            "result": purge_result
-        })
-        
-        if purge_result["status"] != "success":
-            workflow_result["status"] = "partial_failure"
-            logger.error(f"Purge failed: {purge_result}")
-            return workflow_result
-        
-        logger.info(f"Purged {purge_result['vectors_purged']} vectors")
-        
-        # STEP 3: Extract channel messages
-        logger.info(f"Step 3: Extracting messages from channel {channel_id}...")
+        # STEP 2: Extract channel messages
+        logger.info(f"Step 2: Extracting messages from channel {channel_id}...")
         end_time = datetime.now()
         start_time = end_time - timedelta(days=days_back)
         
@@ -1368,21 +1522,22 @@ async def purge_and_reingest_channel(
         }
         
         workflow_result["workflow_steps"].append({
-            "step": 3,
+            "step": 2,
             "name": "message_extraction", 
             "status": "completed" if raw_messages else "no_data",
             "result": extraction_result
         })
         
         if not raw_messages:
+            # Nothing to rebuild from - the live index is left as it is
             workflow_result["status"] = "no_data"
             logger.warning("No messages found in specified channel and time range")
             return workflow_result
         
         logger.info(f"Extracted {len(raw_messages)} messages")
         
-        # STEP 4: Process messages
-        logger.info("Step 4: Processing and cleaning messages...")
+        # STEP 3: Process messages
+        logger.info("Step 3: Processing and cleaning messages...")
         processed_messages = await data_processor.process_messages(raw_messages)
         
         processing_result = {
@@ -1391,7 +1546,7 @@ async def purge_and_reingest_channel(
         }
         
         workflow_result["workflow_steps"].append({
-            "step": 4,
+            "step": 3,
             "name": "message_processing",
             "status": "completed",
             "result": processing_result
@@ -1399,43 +1554,61 @@ async def purge_and_reingest_channel(
         
         logger.info(f"Processed {len(processed_messages)} messages")
         
-        # STEP 5: Generate embeddings and store
-        logger.info("Step 5: Generating embeddings and storing in Pinecone...")
-        embedded_count = await embedding_service.embed_and_store_messages(processed_messages)
+        # STEP 4: Embed into a shadow namespace, validate, then switch reads over to it
+        logger.info("Step 4: Embedding into a shadow namespace and switching over...")
+        # Previously embedded content is served from the embedding cache
+        cache_stats = {}
+        
+        async def build(namespace: str) -> int:
+            return await embedding_service.embed_and_store_messages(processed_messages, cache_stats, namespace=namespace)
+        
+        reindex_result = await reindex_into_shadow(embedding_service, build)
+        embedded_count = reindex_result["vectors_stored"]
         
         embedding_result = {
+            **reindex_result,
             "messages_embedded": embedded_count,
+            "embedding_cache_hits": cache_stats.get("cache_hits", 0),
+            "embedding_cache_misses": cache_stats.get("cache_misses", 0),
             "embedding_success_rate": embedded_count / len(processed_messages) if processed_messages else 0
         }
         
         workflow_result["workflow_steps"].append({
-            "step": 5,
-            "name": "embedding_and_storage",
-            "status": "completed",
+            "step": 4,
+            "name": "shadow_build_and_cutover",
+            "status": "completed" if reindex_result["status"] == "cutover" else "failed",
             "result": embedding_result
         })
         
-        logger.info(f"Embedded and stored {embedded_count} messages")
+        if reindex_result["status"] != "cutover":
+            workflow_result["status"] = "partial_failure"
+            logger.error(f"Rebuild aborted, live index unchanged: {reindex_result.get('error')}")
+            return workflow_result
+        
+        logger.info(f"Embedded {embedded_count} messages into '{reindex_result['namespace']}' and switched over")
         
-        # STEP 6: Get final index status
-        logger.info("Step 6: Getting final index status...")
+        # STEP 5: Get final index status
+        logger.info("Step 5: Getting final index status...")
         final_stats = await embedding_service.get_index_stats()
         workflow_result["workflow_steps"].append({
-            "step": 6,
+            "step": 5,
             "name": "final_status",
             "status": "completed",
             "result": final_stats
         })
         
-        # Add summary
+        # Add summary (the retired namespace is still counted until it is garbage-collected)
         workflow_result["summary"] = {
             "vectors_before": initial_stats.get("total_vectors", 0),
-            "vectors_after": final_stats.get("total_vectors", 0),
-            "net_change": final_stats.get("total_vectors", 0) - initial_stats.get("total_vectors", 0),
+            "vectors_after": reindex_result["vectors_counted"],
+            "active_namespace": reindex_result["namespace"],
+            "retired_namespace": reindex_result["previous"],
             "messages_processed": len(processed_messages),
             "messages_embedded": embedded_count,
+            "embedding_cache_hits": cache_stats.get("cache_hits", 0),
             "processing_time_range": f"{start_time.isoformat()} to {end_time.isoformat()}"
         }
+        workflow_result["summary"]["net_change"] = workflow_result["summary"]["vectors_after"] - workflow_result["summary"]["vectors_before"]
         
         logger.info("=== VECTOR STORAGE REBUILD COMPLETED SUCCESSFULLY ===")
         logger.info(f"Summary: {workflow_result['summary']}")
@@ -3135,6 +3308,7 @@ async def connection_pool_status():
         return {
             "status": "success",
             "connection_pool": pool_stats,
+            "redis_pools": redis_pool_registry.get_stats(),
             "optimization_benefits": {
                 "persistent_connections": pool_stats["active_connections"] > 0,
                 "connection_reuse_ratio": round(
@@ -4420,7 +4594,8 @@ async def test_conversation_entity_extraction():
             user_query=user_query,
             bot_response=bot_response,
             user_name="test_user",
-            additional_context={"source": "admin_test"}
+            additional_context={"source": "admin_test"},
+            batch=False
         )
         
         return {
@@ -5467,10 +5642,9 @@ async def get_ingestion_status_summary():
         # Check hourly daemon state
         hourly_state = {}
         try:
-            with open("hourly_embedding_state.json", "r") as f:
-                hourly_state = json.load(f)
-        except:
-            hourly_state = {"status": "No state file found"}
+            hourly_state = {cp.channel_id: cp.to_dict() for cp in checkpoint_store.list_checkpoints("hourly")}
+        except Exception:
+            hourly_state = {"status": "Checkpoint store unavailable"}
         
         return {
             "status": "success",
@@ -13,9 +13,10 @@ import json
 from services.processing.ingestion_state_manager import IngestionStateManager
 from services.external_apis.enhanced_slack_connector import EnhancedSlackConnector
 from services.processing.enhanced_data_processor import EnhancedDataProcessor
+from services.processing.ingestion_checkpoints import checkpoint_store
+from services.processing.ingestion_pipeline import run_ingestion_pipeline
 from services.data.embedding_service import EmbeddingService
 from services.external_apis.notion_service import NotionService
-from slack_sdk.errors import SlackApiError
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -43,6 +44,7 @@ async def run_smart_hourly_embedding():
         logger.info(f"Strategy: {strategy['strategy']} - {strategy['reason']}")
         
         total_messages_embedded = 0
+        total_cache_hits = 0
         channels_processed = 0
         errors = []
         
@@ -55,72 +57,40 @@ async def run_smart_hourly_embedding():
                 try:
                     logger.info(f"\n--- First Gen Recovery: {channel['name']} ---")
                     
-                    # Extract with rate limit handling (conservative approach)
-                    messages = []
-                    retry_count = 0
-                    max_retries = 3  # Conservative for hourly runs
+                    # Pacing and Retry-After handling happen in the shared Slack rate limiter;
+                    # each history page is embedded while the next one is fetched, and the
+                    # backfill continues next hour from the last committed page
+                    result, checkpoint = await _stream_channel(
+                        connector,
+                        data_processor,
+                        embedding_service,
+                        channel,
+                        "first_generation",
+                        start_time=datetime.now() - timedelta(days=365),  # 1-year lookback
+                        max_messages=500  # Conservative limit for hourly
+                    )
+                    total_cache_hits += result.cache_hits
                     
-                    while retry_count < max_retries and not messages:
-                        try:
-                            messages = await connector.extract_channel_history_complete(
-                                channel_id=channel["id"],
-                                channel_name=channel["name"],
-                                max_messages=500,  # Conservative limit for hourly
-                                start_date=None,  # Use 1-year default
-                                max_age_days=365
-                            )
-                            
-                            if messages:
-                                logger.info(f"✓ Extracted {len(messages)} historical messages")
-                                break
-                                
-                        except SlackApiError as e:
-                            if e.response['error'] == 'ratelimited':
-                                retry_count += 1
-                                if retry_count >= max_retries:
-                                    logger.warning(f"Rate limited on {channel['name']}, will retry next hour")
-                                    break
-                                
-                                wait_time = 30 * retry_count  # 30s, 60s, 90s
-                                logger.info(f"Rate limited, waiting {wait_time} seconds...")
-                                await asyncio.sleep(wait_time)
-                                continue
-                            else:
-                                logger.error(f"Slack API error: {e}")
-                                break
-                        except Exception as e:
-                            logger.error(f"Error extracting {channel['name']}: {e}")
-                            retry_count += 1
-                            if retry_count >= max_retries:
-                                break
-                            await asyncio.sleep(10)
+                    if result.extracted:
+                        logger.info(f"✓ Extracted {result.extracted} historical messages")
                     
-                    if messages:
-                        # Process and embed
-                        processed_messages = await data_processor.process_slack_messages(messages)
+                    if result.processed:
+                        embedded_count = result.upserted
+                        total_messages_embedded += embedded_count
+                        
+                        # Update first generation state
+                        state_manager.update_first_generation_progress(
+                            channel["id"], 
+                            channel["name"],
+                            embedded_count,
+                            checkpoint.last_embedded_ts or checkpoint.run_newest_ts or "0",
+                            result.extracted,
+                            "completed" if result.checkpoint_completed else "in_progress"
+                        )
                         
-                        if processed_messages:
-                            embedded_count = await embedding_service.embed_and_store_messages(processed_messages)
-                            total_messages_embedded += embedded_count
-                            
-                            # Update first generation state
-                            latest_ts = max(msg["ts"] for msg in processed_messages) if processed_messages else "0"
-                            state_manager.update_first_generation_progress(
-                                channel["id"], 
-                                channel["name"],
-                                embedded_count,
-                                latest_ts,
-                                len(messages),
-                                "completed" if embedded_count == len(processed_messages) else "partial"
-                            )
-                            
-                            logger.info(f"✓ Embedded {embedded_count}/{len(processed_messages)} messages")
+                        logger.info(f"✓ Embedded {embedded_count}/{result.processed} messages")
                     
                     channels_processed += 1
-                    
-                    # Rate limiting between channels
-                    if channels_processed < len(strategy["channels"]):
-                        await asyncio.sleep(5)
                         
                 except Exception as e:
                     error_msg = f"Error processing {channel['name']}: {e}"
@@ -146,63 +116,42 @@ async def run_smart_hourly_embedding():
                     
                     # Get last timestamp for this channel
                     channel_state = hourly_state.get("channels", {}).get(channel["id"], {})
-                    last_ts = channel_state.get("latest_timestamp", "0")
+                    last_ts = channel_state.get("latest_timestamp") or "0"
                     
                     # Check for new messages
                     now = datetime.now()
-                    oldest_ts = str((now - timedelta(hours=2)).timestamp())  # 2-hour window
+                    oldest_ts = (now - timedelta(hours=2)).timestamp()  # 2-hour window
+                    start_ts = max(float(last_ts), oldest_ts)
                     
-                    try:
-                        response = connector.client.conversations_history(
-                            channel=channel["id"],
-                            oldest=max(last_ts, oldest_ts),
-                            limit=100,
-                            inclusive=False
-                        )
-                        
-                        messages = response.get("messages", [])
-                        human_messages = [
-                            msg for msg in messages 
-                            if not msg.get("bot_id") and msg.get("type") == "message" and msg.get("text")
-                        ]
+                    # Pages stream straight into embedding, so large bursts need no special casing;
+                    # an interrupted window is resumed before moving on
+                    result, checkpoint = await _stream_channel(
+                        connector,
+                        data_processor,
+                        embedding_service,
+                        channel,
+                        "hourly",
+                        start_time=datetime.fromtimestamp(start_ts),
+                        end_time=now
+                    )
+                    total_cache_hits += result.cache_hits
+                    
+                    if result.extracted:
+                        logger.info(f"Found {result.extracted} new messages")
                         
-                        if human_messages:
-                            logger.info(f"Found {len(human_messages)} new messages")
-                            
-                            # For large batches, use patient processing
-                            if len(human_messages) > 50:
-                                logger.info(f"Large batch detected ({len(human_messages)} messages), using patient processing")
-                                embedded_count = await _process_large_batch_with_patience(
-                                    human_messages, data_processor, embedding_service, channel["name"]
-                                )
-                            else:
-                                # Standard processing for small batches
-                                processed_messages = await data_processor.process_slack_messages(human_messages)
-                                if processed_messages:
-                                    embedded_count = await embedding_service.embed_and_store_messages(processed_messages)
-                                else:
-                                    embedded_count = 0
-                            
-                            total_messages_embedded += embedded_count
-                            
-                            # Update hourly state
-                            latest_ts = messages[0]["ts"] if messages else last_ts
-                            state_manager.update_hourly_state(channel["id"], latest_ts, embedded_count)
-                            
-                            logger.info(f"✓ Embedded {embedded_count} new messages")
-                        else:
-                            logger.info("No new messages found")
+                        embedded_count = result.upserted
+                        total_messages_embedded += embedded_count
                         
-                    except SlackApiError as e:
-                        if e.response["error"] == "ratelimited":
-                            # Patient retry for rate limits during incremental mode
-                            logger.info(f"Rate limited checking {channel['name']}, using patient retry...")
-                            embedded_count = await _patient_incremental_check(
-                                channel, last_ts, oldest_ts, data_processor, embedding_service, state_manager
-                            )
-                            total_messages_embedded += embedded_count
-                        else:
-                            logger.error(f"Slack API error for {channel['name']}: {e}")
+                        logger.info(f"✓ Embedded {embedded_count} new messages")
+                    else:
+                        logger.info("No new messages found")
+                    
+                    # Update hourly state once the window is fully embedded
+                    if result.checkpoint_completed:
+                        state_manager.update_hourly_state(channel["id"], checkpoint.window_latest_ts, embedded_count if result.extracted else 0)
+                    
+                    for error in result.errors:
+                        logger.warning(f"{channel['name']}: {error}")
                     
                     channels_processed += 1
                     
@@ -234,7 +183,7 @@ async def run_smart_hourly_embedding():
         logger.info(f"Strategy: {strategy['strategy']}")
         logger.info(f"Status: {status}")
         logger.info(f"Channels processed: {channels_processed}")
-        logger.info(f"Messages embedded: {total_messages_embedded}")
+        logger.info(f"Messages embedded: {total_messages_embedded} ({total_cache_hits} from embedding cache)")
         logger.info(f"Duration: {duration:.1f} seconds")
         logger.info(f"Errors: {len(errors)}")
         
@@ -256,6 +205,7 @@ async def run_smart_hourly_embedding():
             "status": status,
             "channels_processed": channels_processed,
             "messages_embedded": total_messages_embedded,
+            "embedding_cache_hits": total_cache_hits,
             "duration_seconds": duration,
             "first_gen_complete": state_manager.is_first_generation_complete(),
             "errors": errors
@@ -270,124 +220,39 @@ async def run_smart_hourly_embedding():
             "error": str(e)
         }
 
-async def _process_large_batch_with_patience(messages, data_processor, embedding_service, channel_name):
-    """
-    Process large batches of messages with patient rate limit handling.
-    Breaks into smaller chunks and waits for rate limits to clear.
+async def _stream_channel(connector, data_processor, embedding_service, channel, source, start_time, end_time=None, max_messages=None):
     """
-    logger.info(f"Processing {len(messages)} messages in patient batches for {channel_name}")
+    Run one channel through the streaming ingestion pipeline under a checkpoint.
     
-    total_embedded = 0
-    batch_size = 25  # Conservative batch size for hourly processing
-    max_retries = 10  # More patient than first generation
-    
-    for i in range(0, len(messages), batch_size):
-        batch = messages[i:i + batch_size]
-        batch_num = (i // batch_size) + 1
-        total_batches = (len(messages) + batch_size - 1) // batch_size
-        
-        logger.info(f"Processing batch {batch_num}/{total_batches} ({len(batch)} messages)")
-        
-        retry_count = 0
-        while retry_count < max_retries:
-            try:
-                processed_messages = await data_processor.process_slack_messages(batch)
-                if processed_messages:
-                    embedded_count = await embedding_service.embed_and_store_messages(processed_messages)
-                    total_embedded += embedded_count
-                    logger.info(f"✓ Batch {batch_num}: Embedded {embedded_count} messages")
-                    break
-                else:
-                    logger.warning(f"No processed messages from batch {batch_num}")
-                    break
-                    
-            except Exception as e:
-                if "ratelimited" in str(e).lower():
-                    retry_count += 1
-                    wait_time = min(60 * retry_count, 300)  # 1min → 5min max
-                    logger.info(f"Rate limited on batch {batch_num}, waiting {wait_time}s (attempt {retry_count}/{max_retries})")
-                    await asyncio.sleep(wait_time)
-                    continue
-                else:
-                    logger.error(f"Error processing batch {batch_num}: {e}")
-                    break
-        
-        # Small delay between successful batches
-        if batch_num < total_batches:
-            await asyncio.sleep(2)
+    An unfinished run for the same source and channel is resumed (with its
+    original window) instead of starting over.
     
-    logger.info(f"Large batch processing complete: {total_embedded}/{len(messages)} messages embedded")
-    return total_embedded
-
-async def _patient_incremental_check(channel, last_ts, oldest_ts, data_processor, embedding_service, state_manager):
+    Returns:
+        Tuple of (PipelineResult, ChannelCheckpoint)
     """
-    Patient retry logic for incremental message checking when rate limited.
-    """
-    logger.info(f"Starting patient incremental check for {channel['name']}")
-    
-    max_retries = 5
-    retry_count = 0
-    
-    while retry_count < max_retries:
-        try:
-            # Try to get messages with exponential backoff
-            wait_time = min(30 * (2 ** retry_count), 300)  # 30s → 300s max
-            if retry_count > 0:
-                logger.info(f"Patient retry {retry_count}/{max_retries}, waiting {wait_time}s")
-                await asyncio.sleep(wait_time)
-            
-            from services.external_apis.enhanced_slack_connector import EnhancedSlackConnector
-            connector = EnhancedSlackConnector()
-            
-            response = connector.client.conversations_history(
-                channel=channel["id"],
-                oldest=max(last_ts, oldest_ts),
-                limit=100,
-                inclusive=False
-            )
-            
-            messages = response.get("messages", [])
-            human_messages = [
-                msg for msg in messages 
-                if not msg.get("bot_id") and msg.get("type") == "message" and msg.get("text")
-            ]
-            
-            if human_messages:
-                logger.info(f"Patient check found {len(human_messages)} messages after {retry_count} retries")
-                
-                # Use large batch processing if needed
-                if len(human_messages) > 50:
-                    embedded_count = await _process_large_batch_with_patience(
-                        human_messages, data_processor, embedding_service, channel["name"]
-                    )
-                else:
-                    processed_messages = await data_processor.process_slack_messages(human_messages)
-                    if processed_messages:
-                        embedded_count = await embedding_service.embed_and_store_messages(processed_messages)
-                    else:
-                        embedded_count = 0
-                
-                # Update state
-                latest_ts = messages[0]["ts"] if messages else last_ts
-                state_manager.update_hourly_state(channel["id"], latest_ts, embedded_count)
-                
-                return embedded_count
-            else:
-                logger.info(f"No new messages found after patient retry {retry_count}")
-                return 0
-                
-        except Exception as e:
-            if "ratelimited" in str(e).lower():
-                retry_count += 1
-                if retry_count >= max_retries:
-                    logger.warning(f"Patient incremental check failed after {max_retries} retries, will try next hour")
-                    return 0
-                continue
-            else:
-                logger.error(f"Non-rate-limit error during patient check: {e}")
-                return 0
+    end_time = end_time or datetime.now()
+    checkpoint = checkpoint_store.begin(
+        source,
+        channel["id"],
+        oldest_ts=str(start_time.timestamp()),
+        latest_ts=str(end_time.timestamp()),
+        channel_name=channel["name"]
+    )
     
-    return 0
+    result = await run_ingestion_pipeline(
+        channel["name"],
+        connector.iter_channel_messages(
+            channel_id=channel["id"],
+            start_time=start_time,
+            end_time=end_time,
+            max_messages=max_messages,
+            checkpoint=checkpoint
+        ),
+        data_processor.process_slack_messages,
+        embedding_service,
+        checkpoint=checkpoint
+    )
+    return result, checkpoint
 
 if __name__ == "__main__":
     result = asyncio.run(run_smart_hourly_embedding())
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Benchmark pattern-based entity extraction on long bot responses.
+
+"legacy" reproduces the original extract_entities_from_text loop: raw pattern
+strings passed to re.finditer per call, relevance recomputed (a full-text
+re.findall) for every match, an Entity built for every match and deduplicated
+afterwards. "scanner" is EntityStore.extract_entities_from_text backed by the
+compiled EntityScanner. Both must return the same entities (mention
+timestamps aside).
+
+Usage:
+    python scripts/utilities/benchmark_entity_scanner.py [--words 200 1500 5000] [--runs 5]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import re
+import sys
+import time
+from dataclasses import asdict
+
+# Add repository root to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from services.core.memory_service import MemoryService
+from services.data.entity_store import EntityStore
+
+CONVERSATION_KEY = "conv:BENCH:1700000000.000100"
+
+PHRASES = [
+    "ticket AUTO-{n} is blocked", "see issue DEV-{n}", "the Phoenix Project status",
+    "Project Atlas-{n} rollout", "ROBOTICS initiative", "due on 2024-0{m}-1{m}",
+    "deadline: 2024-1{m}-0{m}", "Q{q} 2025", "Friday, March {d}th", "@jane.doe",
+    "Maria Garcia", "assigned to Sam Lee", "Release Readiness Report", "document: runbook-{n}",
+    "99.{m}% uptime", "{n} ms response", "$1,{n}00 budget", "https://example.com/docs/{n}",
+    "acme.atlassian.net/browse/AUTO-{n}", "the orchestrator queue", "please retry the robot",
+    "important update on progress", "selector timeout", "with the connector", "and then", "Über Café"
+]
+
+
+def make_response(words: int, seed: int) -> str:
+    """Generate a long bot-style response dense in entity-like phrases"""
+    rng = random.Random(seed)
+    parts = []
+    count = 0
+    while count < words:
+        phrase = rng.choice(PHRASES).format(
+            n=rng.randint(1, 400), m=rng.randint(1, 9), q=rng.randint(1, 4), d=rng.randint(1, 28))
+        parts.append(phrase + rng.choice([".", ",", "", " -", "!"]))
+        count += len(phrase.split())
+    return " ".join(parts)
+
+
+def legacy_extract(store: EntityStore, text: str, conversation_key: str, context: str = ""):
+    """The original per-pattern, per-match extraction loop"""
+    entities = []
+    for entity_type, patterns in store.entity_patterns.items():
+        for pattern_info in patterns:
+            for match in re.finditer(pattern_info["pattern"], text, re.IGNORECASE):
+                entity_value = (match.group(1) if match.groups() else match.group(0)).strip()
+                if not entity_value or len(entity_value) < 2:
+                    continue
+                entity_key = store._generate_entity_key(entity_type, entity_value)
+
+                base_score = 1.0
+                mentions = len(re.findall(re.escape(entity_value), text, re.IGNORECASE))
+                if mentions > 1:
+                    base_score *= (1 + (mentions - 1) * 0.2)
+                context_text = (text + " " + context).lower()
+                for keyword in ["important", "critical", "urgent", "deadline", "priority",
+                                "assigned", "responsible", "owner", "lead", "manager",
+                                "status", "update", "progress", "blocked", "issue"]:
+                    if keyword in context_text:
+                        base_score *= 1.1
+                relevance_score = min(base_score, 2.0)
+
+                start_idx = max(0, match.start() - 50)
+                end_idx = min(len(text), match.end() + 50)
+                entities.append(store.create_entity(
+                    key=entity_key,
+                    entity_type=entity_type,
+                    value=entity_value,
+                    context=text[start_idx:end_idx].strip(),
+                    conversation_key=conversation_key,
+                    relevance_score=relevance_score,
+                    aliases=store._generate_aliases(entity_type, entity_value),
+                    metadata={"pattern_used": pattern_info["description"]}
+                ))
+
+    entity_map = {}
+    for entity in entities:
+        if entity.key not in entity_map or entity.relevance_score > entity_map[entity.key].relevance_score:
+            entity_map[entity.key] = entity
+    return list(entity_map.values())
+
+
+def comparable(entities):
+    """Entity dicts without mention timestamps"""
+    rows = []
+    for entity in entities:
+        row = asdict(entity)
+        for field_name in ("first_mentioned_at", "last_mentioned_at", "mentioned_at"):
+            row.pop(field_name, None)
+        for context in row["contexts"]:
+            context.pop("mentioned_at", None)
+        rows.append(row)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--words", type=int, nargs="+", default=[200, 1500, 5000])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--seeds", type=int, default=10, help="Extra random texts checked for identical output")
+    args = parser.parse_args()
+
+    store = EntityStore(MemoryService())
+
+    for seed in range(args.seeds):
+        text = make_response(random.Random(seed).randint(20, 2000), seed)
+        expected = comparable(legacy_extract(store, text, CONVERSATION_KEY, "status check"))
+        actual = comparable(asyncio.run(store.extract_entities_from_text(text, CONVERSATION_KEY, "status check")))
+        if expected != actual:
+            raise AssertionError(f"Scanner output differs from legacy extraction (seed {seed})")
+    print(f"identical output on {args.seeds} random responses")
+
+    for words in args.words:
+        text = make_response(words, seed=words)
+
+        start = time.perf_counter()
+        for _ in range(args.runs):
+            expected = legacy_extract(store, text, CONVERSATION_KEY)
+        legacy_time = (time.perf_counter() - start) / args.runs
+
+        start = time.perf_counter()
+        for _ in range(args.runs):
+            actual = asyncio.run(store.extract_entities_from_text(text, CONVERSATION_KEY))
+        scanner_time = (time.perf_counter() - start) / args.runs
+
+        if comparable(expected) != comparable(actual):
+            raise AssertionError(f"Scanner output differs from legacy extraction ({words} words)")
+
+        print(
+            f"words={words:>5}  chars={len(text):>6}  entities={len(actual):>4}  "
+            f"legacy={legacy_time * 1000:8.1f}ms  scanner={scanner_time * 1000:7.1f}ms  "
+            f"speedup={legacy_time / scanner_time if scanner_time else float('inf'):5.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
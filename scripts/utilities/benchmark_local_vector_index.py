@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Benchmark the in-process vector mirror against a Pinecone round trip.
+
+Loads random unit vectors into a LocalVectorIndex (fully offline) and times
+unfiltered and filtered top-k searches. With PINECONE_API_KEY set, the same
+number of queries is also sent to the configured index for comparison.
+
+With --snapshot-dir the index is backed by a memory-mapped VectorSnapshot
+(float16 or int8); the time a second index takes to open it is reported too.
+
+Usage:
+    python scripts/utilities/benchmark_local_vector_index.py [--vectors 50000] [--dim 768] [--queries 200]
+        [--snapshot-dir /tmp/vector_snapshot] [--dtype float16|int8]
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+# Add repository root to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from config import settings
+from services.data.local_vector_index import LocalVectorIndex
+
+
+def measure(label: str, search, queries) -> None:
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        search(query)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    count = len(timings)
+    print(
+        f"{label:<16} queries={count}  mean={sum(timings) / count * 1000:7.3f}ms  "
+        f"p50={timings[count // 2] * 1000:7.3f}ms  p95={timings[int(count * 0.95)] * 1000:7.3f}ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=50000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--snapshot-dir", default="")
+    parser.add_argument("--dtype", default="int8", choices=["float16", "int8"])
+    args = parser.parse_args()
+
+    settings.LOCAL_VECTOR_SNAPSHOT_DTYPE = args.dtype
+    rng = np.random.default_rng(0)
+    index = LocalVectorIndex(max_vectors=args.vectors, enabled=True, seed=False, snapshot_dir=args.snapshot_dir)
+    now = datetime.now().isoformat()
+
+    start = time.perf_counter()
+    batch = 1000
+    for offset in range(0, args.vectors, batch):
+        values = rng.standard_normal((min(batch, args.vectors - offset), args.dim)).astype(np.float32)
+        index.add([
+            {"id": f"bench_{offset + i}", "values": row,
+             "metadata": {"timestamp": now, "channel_id": f"C{(offset + i) % 10}"}}
+            for i, row in enumerate(values)
+        ], namespace="")
+    stats = index.get_stats()
+    size_mb = stats["snapshot"]["disk_mb"] if stats["snapshot"] else stats["matrix_mb"]
+    print(f"loaded {stats['vectors']} vectors ({size_mb} MB) in {time.perf_counter() - start:.2f}s")
+
+    if args.snapshot_dir:
+        start = time.perf_counter()
+        index = LocalVectorIndex(max_vectors=args.vectors, enabled=True, seed=False, snapshot_dir=args.snapshot_dir)
+        index.search(rng.standard_normal(args.dim).astype(np.float32), args.top_k)
+        print(f"reopened snapshot and ran a first search in {(time.perf_counter() - start) * 1000:.1f}ms")
+
+    queries = [rng.standard_normal(args.dim).astype(np.float32) for _ in range(args.queries)]
+    measure("local", lambda q: index.search(q, args.top_k), queries)
+    measure("local filtered", lambda q: index.search(q, args.top_k, {"channel_id": {"$in": ["C1", "C2"]}}), queries)
+
+    if settings.PINECONE_API_KEY:
+        from pinecone import Pinecone
+        pinecone_index = Pinecone(api_key=settings.PINECONE_API_KEY).Index(settings.PINECONE_INDEX_NAME)
+        dimension = pinecone_index.describe_index_stats().dimension
+        remote_queries = [rng.standard_normal(dimension).astype(np.float32).tolist() for _ in range(min(args.queries, 50))]
+        measure("pinecone", lambda q: pinecone_index.query(vector=q, top_k=args.top_k, include_metadata=True), remote_queries)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Benchmark live-history construction for long threads.
+
+Replays a thread turn by turn the way _construct_hybrid_history does and
+compares the original builder (re-tokenizes the whole window every turn)
+with the incremental builder fed messages carrying stored token counts.
+Both builders must select exactly the same messages.
+
+Usage:
+    python scripts/utilities/benchmark_token_history.py [--turns 500] [--window 10 50 200]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+# Add repository root to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from services.data.token_manager import TokenManager, count_message_tokens
+
+WORDS = (
+    "autopilot agent workflow deployment ticket AUTO-1234 orchestrator release queue "
+    "robot selector exception retry timeout connector Slack Jira Confluence pipeline "
+    "the a to of and is for on with that it we should can will please thanks"
+).split()
+
+
+def make_thread(turns: int, seed: int = 7):
+    """Generate a synthetic thread alternating user and bot messages"""
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    thread = []
+    for i in range(turns):
+        is_bot = i % 2 == 1
+        length = rng.randint(40, 400) if is_bot else rng.randint(5, 80)
+        thread.append({
+            "user_name": "autopilot" if is_bot else f"user{rng.randint(1, 5)}",
+            "text": " ".join(rng.choice(WORDS) for _ in range(length)),
+            "message_ts": f"{1700000000 + i}.000100",
+            "stored_at": (start + timedelta(seconds=i)).isoformat()
+        })
+    return thread
+
+
+def run(turns: int, window: int, max_tokens: int, preserve_recent: int):
+    thread = make_thread(turns)
+    stored_thread = [{**msg, **count_message_tokens(msg)} for msg in thread]
+
+    baseline = TokenManager(model_name="gpt-4")
+    incremental = TokenManager(model_name="gpt-4")
+
+    baseline_time = 0.0
+    incremental_time = 0.0
+    for turn in range(1, turns + 1):
+        # get_recent_messages returns the newest `window` messages, newest first
+        raw_window = list(reversed(thread[max(0, turn - window):turn]))
+        stored_window = list(reversed(stored_thread[max(0, turn - window):turn]))
+
+        start = time.perf_counter()
+        expected = baseline.build_token_managed_history(raw_window, max_tokens, preserve_recent)
+        baseline_time += time.perf_counter() - start
+
+        start = time.perf_counter()
+        actual = incremental.build_incremental_history("conv:C1:1700000000.000100", stored_window, max_tokens, preserve_recent)
+        incremental_time += time.perf_counter() - start
+
+        expected_keep = [m.formatted_text for m in expected[0]]
+        actual_keep = [m.formatted_text for m in actual[0]]
+        expected_summarize = [m.formatted_text for m in expected[1]]
+        actual_summarize = [m.formatted_text for m in actual[1]]
+        if expected_keep != actual_keep or expected_summarize != actual_summarize or expected[2] != actual[2]:
+            raise AssertionError(f"Builders disagree at turn {turn} (window {window})")
+
+    stats = incremental.get_history_stats()
+    print(
+        f"window={window:>4}  turns={turns}  "
+        f"full={baseline_time * 1000:9.1f}ms ({baseline_time / turns * 1e6:8.1f}us/turn)  "
+        f"incremental={incremental_time * 1000:8.1f}ms ({incremental_time / turns * 1e6:7.1f}us/turn)  "
+        f"speedup={baseline_time / incremental_time if incremental_time else float('inf'):6.1f}x  "
+        f"tokenized={stats['messages_tokenized']}  reused={stats['reuse_percentage']}%"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=500)
+    parser.add_argument("--window", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--max-tokens", type=int, default=2000)
+    parser.add_argument("--preserve-recent", type=int, default=2)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    for _ in range(20):
+        TokenManager(model_name="gpt-4")
+    print(f"20x TokenManager() with shared encoding: {(time.perf_counter() - start) * 1000:.1f}ms")
+
+    for window in args.window:
+        run(args.turns, window, args.max_tokens, args.preserve_recent)
+
+
+if __name__ == "__main__":
+    main()
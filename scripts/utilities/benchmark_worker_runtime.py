@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Benchmark Celery task overhead before and after the worker runtime.
+
+"before" reproduces the old task shape: services constructed per invocation and
+every coroutine wrapped in its own asyncio.run() (fresh event loop, fresh Redis
+pool and connection). "after" uses the persistent worker loop and the shared
+per-process services. Each simulated task performs the same three Redis-backed
+calls extract_entities_from_conversation makes.
+
+Point REDIS_URL at a real Redis to include connection setup costs; with Redis
+disabled the in-memory fallback is used and only loop/service overhead shows.
+
+Usage:
+    python scripts/utilities/benchmark_worker_runtime.py [--tasks 200]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+# Add repository root to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from services.core.memory_service import MemoryService
+from services.data.entity_store import EntityStore
+from workers.worker_runtime import worker_runtime, run_async, get_service
+
+CONVERSATION_KEY = "conv:BENCH:1700000000.000100"
+
+
+def task_before():
+    memory_service = MemoryService()
+    entity_store = EntityStore(memory_service)
+    asyncio.run(memory_service.get_conversation_context(CONVERSATION_KEY))
+    asyncio.run(memory_service.get_recent_messages(CONVERSATION_KEY))
+    asyncio.run(entity_store.get_conversation_entity_summary(CONVERSATION_KEY))
+
+
+def task_after():
+    memory_service = get_service("memory_service")
+    entity_store = get_service("entity_store")
+    run_async(memory_service.get_conversation_context(CONVERSATION_KEY))
+    run_async(memory_service.get_recent_messages(CONVERSATION_KEY))
+    run_async(entity_store.get_conversation_entity_summary(CONVERSATION_KEY))
+
+
+def measure(label: str, task, count: int) -> float:
+    timings = []
+    for _ in range(count):
+        start = time.perf_counter()
+        task()
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    total = sum(timings)
+    print(
+        f"{label:<7} tasks={count}  total={total * 1000:9.1f}ms  "
+        f"mean={total / count * 1000:7.3f}ms  p50={timings[count // 2] * 1000:7.3f}ms  "
+        f"p99={timings[min(count - 1, int(count * 0.99))] * 1000:7.3f}ms"
+    )
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=200)
+    args = parser.parse_args()
+
+    # Warm imports and the runtime loop so both sides measure steady state
+    task_before()
+    worker_runtime.start()
+    task_after()
+
+    before = measure("before", task_before, args.tasks)
+    after = measure("after", task_after, args.tasks)
+    print(f"speedup={before / after if after else float('inf'):.1f}x")
+    print(f"runtime stats: {worker_runtime.get_stats()}")
+    worker_runtime.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Export a Pinecone namespace to a local snapshot, or import a snapshot into
+another index or namespace, without re-embedding. Both commands resume an
+interrupted run when repeated with the same arguments.
+
+Usage:
+    python scripts/utilities/transfer_vectors.py export NAME [--index INDEX] [--namespace NS]
+    python scripts/utilities/transfer_vectors.py import NAME [--index INDEX] [--namespace NS] [--workers 4]
+    python scripts/utilities/transfer_vectors.py status
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+
+# Add repository root to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from config import settings
+from services.data.vector_transfer import export_vectors, import_vectors, list_transfers, read_manifest, snapshot_path
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["export", "import", "status"])
+    parser.add_argument("name", nargs="?")
+    parser.add_argument("--index", default=settings.PINECONE_INDEX_NAME)
+    parser.add_argument("--namespace")
+    parser.add_argument("--workers", type=int)
+    args = parser.parse_args()
+
+    if args.command == "status":
+        print(json.dumps(list_transfers(), indent=2))
+        return
+    if not args.name:
+        parser.error(f"{args.command} needs an export name")
+
+    from pinecone import Pinecone
+    index = Pinecone(api_key=settings.PINECONE_API_KEY).Index(args.index)
+    directory = snapshot_path(args.name)
+
+    if args.command == "export":
+        manifest = await export_vectors(index, directory, args.namespace or "", args.index)
+        print(f"{manifest['status']}: {manifest['vectors']} vectors in {len(manifest['chunks'])} chunks at {directory}")
+    else:
+        manifest = read_manifest(directory) or {}
+        namespace = args.namespace if args.namespace is not None else manifest.get("source", {}).get("namespace", "")
+        state = await import_vectors(index, directory, namespace, args.index, args.workers)
+        print(f"{state['status']}: {state['vectors_imported']} vectors imported into {args.index}/'{namespace}'")
+        for error in state["errors"]:
+            print(f"  error: {error}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
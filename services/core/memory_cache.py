@@ -0,0 +1,300 @@
+"""
+Bounded In-Memory Cache
+
+Fallback store used by MemoryService when Redis is unavailable. Unlike a plain
+dict it enforces a byte budget with LRU eviction, expires entries proactively
+through a hashed timer wheel, and accounts memory usage by key prefix.
+Every write advances the wheel, so expired entries are reclaimed even when
+nothing reads them again, and an entry larger than the whole budget raises
+CacheEntryTooLarge instead of being dropped behind the caller's back.
+
+Entries keep the legacy shape {'data': ..., 'expiry': datetime | None} so that
+code reading `memory_service._memory_cache` directly keeps working. An entry
+may add 'pinned': True to be exempt from LRU eviction (it still expires and
+counts against the budget) - used for buffers that would otherwise lose work.
+"""
+
+import logging
+import sys
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from datetime import datetime
+from typing import Any, Dict, Iterator, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Known key shapes mapped to readable accounting buckets
+_SUFFIX_PREFIXES = (
+    (":entity_store", "entity_store"),
+    (":entity_index", "entity_index"),
+    (":long_term_summary", "long_term_summary"),
+    (":messages", "messages"),
+)
+
+
+class CacheEntryTooLarge(ValueError):
+    """Raised when a single entry exceeds the cache's byte budget"""
+
+
+def key_prefix(key: str) -> str:
+    """Classify a cache key into an accounting bucket"""
+    for suffix, name in _SUFFIX_PREFIXES:
+        if key.endswith(suffix):
+            return name
+    if key.startswith("webhook_cache_"):
+        return "webhook_cache"
+    return key.split(":", 1)[0] if ":" in key else key.split("_", 1)[0]
+
+
+def estimate_size(value: Any, _depth: int = 0) -> int:
+    """Cheap recursive size estimate of a cached value in bytes"""
+    if isinstance(value, (str, bytes)):
+        return sys.getsizeof(value)
+    if _depth > 4:
+        return sys.getsizeof(value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(
+            estimate_size(k, _depth + 1) + estimate_size(v, _depth + 1) for k, v in value.items()
+        )
+    if isinstance(value, (list, tuple, set)):
+        return sys.getsizeof(value) + sum(estimate_size(v, _depth + 1) for v in value)
+    return sys.getsizeof(value)
+
+
+class TimerWheel:
+    """
+    Hashed timer wheel for TTL sweeps.
+
+    Keys are hashed into slots by expiry second; advancing the wheel only visits
+    the slots that elapsed since the previous sweep, so a sweep costs O(expired)
+    amortized instead of scanning the whole cache.
+    """
+
+    def __init__(self, slots: int = 3600, resolution: float = 1.0):
+        self.slots = slots
+        self.resolution = resolution
+        self._wheel: list = [set() for _ in range(slots)]
+        self._key_slot: Dict[str, int] = {}
+        self._current_tick = self._tick(time.time())
+
+    def _tick(self, timestamp: float) -> int:
+        return int(timestamp / self.resolution)
+
+    def schedule(self, key: str, expires_at: float) -> None:
+        """Place a key in the slot for its expiry time"""
+        self.cancel(key)
+        slot = self._tick(expires_at) % self.slots
+        self._wheel[slot].add(key)
+        self._key_slot[key] = slot
+
+    def cancel(self, key: str) -> None:
+        """Remove a key from the wheel"""
+        slot = self._key_slot.pop(key, None)
+        if slot is not None:
+            self._wheel[slot].discard(key)
+
+    def advance(self, now: float) -> Set[str]:
+        """Return candidate keys from every slot passed since the last advance"""
+        target_tick = self._tick(now)
+        elapsed = target_tick - self._current_tick
+        if elapsed <= 0:
+            return set()
+
+        candidates: Set[str] = set()
+        for offset in range(1, min(elapsed, self.slots) + 1):
+            candidates.update(self._wheel[(self._current_tick + offset) % self.slots])
+        self._current_tick = target_tick
+        return candidates
+
+    def __len__(self) -> int:
+        return len(self._key_slot)
+
+
+class BoundedMemoryCache(MutableMapping):
+    """
+    Byte-bounded LRU cache with proactive TTL expiry and per-prefix accounting.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, sweep_interval: float = 1.0):
+        self.max_bytes = max_bytes
+        self.sweep_interval = sweep_interval
+
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._prefix_bytes: Dict[str, int] = {}
+        self._prefix_keys: Dict[str, int] = {}
+        self._total_bytes = 0
+        self._wheel = TimerWheel()
+        self._last_sweep = time.time()
+        self._lock = threading.RLock()
+
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "rejected": 0
+        }
+
+    # MutableMapping interface
+
+    def __getitem__(self, key: str) -> Dict[str, Any]:
+        with self._lock:
+            self._maybe_sweep()
+            entry = self._entries.get(key)
+            if entry is None or self._is_expired(entry):
+                if entry is not None:
+                    self._remove(key)
+                    self.stats["expirations"] += 1
+                self.stats["misses"] += 1
+                raise KeyError(key)
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return entry
+
+    def __setitem__(self, key: str, entry: Dict[str, Any]) -> None:
+        with self._lock:
+            size = estimate_size(key) + estimate_size(entry.get("data"))
+            if size > self.max_bytes:
+                self.stats["rejected"] += 1
+                # The previous value is stale either way; keeping it would look like a successful write
+                self._remove(key)
+                raise CacheEntryTooLarge(f"Memory cache entry {key} ({size} bytes) exceeds the {self.max_bytes} byte budget")
+
+            if key in self._entries:
+                self._account(key, -self._sizes[key])
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            self._sizes[key] = size
+            self._account(key, size)
+
+            expiry = entry.get("expiry")
+            if expiry:
+                self._wheel.schedule(key, expiry.timestamp())
+            else:
+                self._wheel.cancel(key)
+
+            # Advancing the wheel only visits elapsed slots, so sweeping on every write is cheap
+            self.sweep()
+            self._evict_to_budget()
+
+    def __delitem__(self, key: str) -> None:
+        with self._lock:
+            if key not in self._entries:
+                raise KeyError(key)
+            self._remove(key)
+
+    def __contains__(self, key: object) -> bool:
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and not self._is_expired(entry)
+
+    def __iter__(self) -> Iterator[str]:
+        with self._lock:
+            return iter(list(self._entries.keys()))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    # Internals
+
+    def _is_expired(self, entry: Dict[str, Any]) -> bool:
+        expiry = entry.get("expiry")
+        return bool(expiry) and datetime.now() > expiry
+
+    def _account(self, key: str, delta: int) -> None:
+        prefix = key_prefix(key)
+        self._total_bytes += delta
+        self._prefix_bytes[prefix] = self._prefix_bytes.get(prefix, 0) + delta
+        if delta > 0:
+            self._prefix_keys[prefix] = self._prefix_keys.get(prefix, 0) + 1
+        else:
+            self._prefix_keys[prefix] = self._prefix_keys.get(prefix, 1) - 1
+        if self._prefix_keys[prefix] <= 0:
+            self._prefix_keys.pop(prefix, None)
+            self._prefix_bytes.pop(prefix, None)
+
+    def _remove(self, key: str) -> None:
+        if key not in self._entries:
+            return
+        del self._entries[key]
+        self._account(key, -self._sizes.pop(key, 0))
+        self._wheel.cancel(key)
+
+    def _evict_to_budget(self) -> None:
+        if self._total_bytes <= self.max_bytes:
+            return
+        for key in list(self._entries):
+            if self._total_bytes <= self.max_bytes:
+                break
+            if self._entries[key].get("pinned"):
+                continue
+            self._remove(key)
+            self.stats["evictions"] += 1
+
+    def _maybe_sweep(self) -> None:
+        now = time.time()
+        if now - self._last_sweep >= self.sweep_interval:
+            self.sweep(now)
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        """
+        Expire entries whose TTL has passed.
+
+        Args:
+            now: Current epoch time (defaults to time.time())
+
+        Returns:
+            Number of entries removed
+        """
+        with self._lock:
+            now = now or time.time()
+            self._last_sweep = now
+            removed = 0
+            for key in self._wheel.advance(now):
+                entry = self._entries.get(key)
+                if entry is None:
+                    self._wheel.cancel(key)
+                    continue
+                expiry = entry.get("expiry")
+                if expiry and expiry.timestamp() <= now:
+                    self._remove(key)
+                    removed += 1
+                elif expiry:
+                    # Hashed into this slot from a later wheel revolution
+                    self._wheel.schedule(key, expiry.timestamp())
+            self.stats["expirations"] += removed
+            return removed
+
+    def resize(self, key: str) -> None:
+        """Recompute accounting for an entry whose data was mutated in place"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self[key] = entry
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache usage statistics"""
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["misses"]
+            return {
+                "entries": len(self._entries),
+                "bytes_used": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "utilization_percentage": round(self._total_bytes / self.max_bytes * 100, 1) if self.max_bytes else 0.0,
+                "hit_rate_percentage": round(self.stats["hits"] / lookups * 100, 1) if lookups else 0.0,
+                "scheduled_expiries": len(self._wheel),
+                "by_prefix": {
+                    prefix: {"keys": self._prefix_keys.get(prefix, 0), "bytes": size}
+                    for prefix, size in sorted(self._prefix_bytes.items(), key=lambda item: item[1], reverse=True)
+                },
+                **self.stats
+            }
@@ -3,13 +3,16 @@ Memory Service - Redis-based memory management for the multi-agent system.
 Handles short-term memory, conversation context, and graph data persistence.
 """
 
-import json
 import logging
 import time
 from typing import Dict, Any, List, Optional, Union
 from datetime import datetime, timedelta
 
 from config import settings
+from services.core.serialization import encode_payload, decode_payload, payload_codec
+from services.core.memory_cache import BoundedMemoryCache
+from services.core.redis_pool import redis_pool_registry
+from services.data.token_manager import count_message_tokens
 
 # Try to import Redis, but handle gracefully if not available
 try:
@@ -21,6 +24,14 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# Thread participation index (sorted sets of "channel:thread_ts" scored by last activity)
+THREAD_INDEX_KEY = "thread_participation:index"
+THREAD_NEGATIVE_KEY = "thread_participation:negative"
+# Hash per thread; a new prefix because older releases left string values at thread_participation:{member}
+THREAD_DETAIL_PREFIX = "thread_participation:detail:"
+THREAD_INDEX_RETENTION = 30 * 86400  # Threads the bot is part of
+THREAD_NEGATIVE_TTL = 3600  # Threads confirmed via Slack API to not involve the bot
+
 class MemoryService:
     """
     Service for managing Redis-based memory operations.
@@ -28,19 +39,31 @@ class MemoryService:
     """
     
     def __init__(self):
-        self.redis_client = None
         self.redis_available = False
-        self._memory_cache = {}  # Fallback in-memory cache
+        self._redis_url = None
+        self._memory_cache = BoundedMemoryCache(max_bytes=settings.MEMORY_FALLBACK_MAX_BYTES)  # Fallback in-memory cache
         self._initialize_redis()
+    
+    @property
+    def redis_client(self):
+        """Redis client backed by the process-wide pool for the current event loop"""
+        if not self.redis_available or not self._redis_url:
+            return None
+        return redis_pool_registry.get_client(self._redis_url)
+    
+    @redis_client.setter
+    def redis_client(self, client):
+        """Assigning None switches this instance to the in-memory fallback"""
+        if client is None:
+            self.redis_available = False
         
     def _initialize_redis(self):
-        """Initialize Redis connection with fallback to in-memory cache"""
+        """Resolve the Redis URL for the shared pool, with fallback to in-memory cache"""
         try:
             # Check if Redis module is available
             if not REDIS_AVAILABLE or redis is None:
                 logger.info("Redis module not available, using in-memory cache")
                 self.redis_available = False
-                self.redis_client = None
                 return
             
             # Check if Redis URL is configured
@@ -48,7 +71,6 @@ class MemoryService:
             if not redis_url or redis_url.strip() == "":
                 logger.info("No Redis URL configured, using in-memory cache")
                 self.redis_available = False
-                self.redis_client = None
                 return
             
             # Add password if provided
@@ -57,21 +79,14 @@ class MemoryService:
                     protocol, rest = redis_url.split("://", 1)
                     redis_url = f"{protocol}://:{settings.REDIS_PASSWORD}@{rest}"
             
-            self.redis_client = redis.from_url(
-                redis_url,
-                encoding="utf-8",
-                decode_responses=True,
-                socket_connect_timeout=5,
-                socket_timeout=5
-            )
-            
+            # Connections come from the shared registry pool - no sockets are opened here
+            self._redis_url = redis_url
             self.redis_available = True
-            logger.info("Redis connection initialized")
+            logger.debug("Redis connection pool attached")
             
         except Exception as e:
             logger.warning(f"Redis not available, using in-memory cache: {e}")
             self.redis_available = False
-            self.redis_client = None
     
     async def health_check(self) -> bool:
         """Check Redis connection health or return True for in-memory fallback"""
@@ -114,15 +129,16 @@ class MemoryService:
             # Get the key for raw messages
             messages_key = f"{conversation_key}:messages"
             
-            # Add timestamp to message data
+            # Add timestamp and token count (computed once here instead of on every read)
             message_with_timestamp = {
                 **message_data,
+                **count_message_tokens(message_data),
                 "stored_at": datetime.now().isoformat()
             }
             
             if self.redis_available and self.redis_client:
                 # Push to Redis list (left push for newest first)
-                await self.redis_client.lpush(messages_key, json.dumps(message_with_timestamp, default=str))
+                await self.redis_client.lpush(messages_key, encode_payload(message_with_timestamp))
                 # Trim to keep only the most recent max_messages
                 await self.redis_client.ltrim(messages_key, 0, max_messages - 1)
                 # Set TTL on the list
@@ -136,7 +152,7 @@ class MemoryService:
                     }
                 
                 # Add message to front of list
-                cached_messages = json.loads(self._memory_cache[messages_key]['data']) if isinstance(self._memory_cache[messages_key]['data'], str) else self._memory_cache[messages_key]['data']
+                cached_messages = decode_payload(self._memory_cache[messages_key]['data']) if isinstance(self._memory_cache[messages_key]['data'], str) else self._memory_cache[messages_key]['data']
                 if not isinstance(cached_messages, list):
                     cached_messages = []
                 
@@ -177,7 +193,7 @@ class MemoryService:
             if self.redis_available and self.redis_client:
                 # Get messages from Redis list
                 raw_messages = await self.redis_client.lrange(messages_key, 0, limit - 1)
-                messages = [json.loads(msg) for msg in raw_messages]
+                messages = [decode_payload(msg) for msg in raw_messages]
             else:
                 # Get from in-memory cache
                 cached_item = self._memory_cache.get(messages_key)
@@ -191,7 +207,7 @@ class MemoryService:
                 
                 cached_messages = cached_item['data']
                 if isinstance(cached_messages, str):
-                    cached_messages = json.loads(cached_messages)
+                    cached_messages = decode_payload(cached_messages)
                 
                 messages = cached_messages[:limit] if isinstance(cached_messages, list) else []
             
@@ -221,7 +237,7 @@ class MemoryService:
         """
         try:
             # Serialize context data
-            serialized_data = json.dumps(context_data, default=str)
+            serialized_data = encode_payload(context_data)
             
             if self.redis_available and self.redis_client:
                 # Store with optional TTL in Redis
@@ -270,7 +286,7 @@ class MemoryService:
                 # Get from Redis
                 serialized_data = await self.redis_client.get(conversation_key)
                 if serialized_data:
-                    return json.loads(serialized_data)
+                    return decode_payload(serialized_data)
             else:
                 # Get from in-memory cache
                 cached_item = self._memory_cache.get(conversation_key)
@@ -281,7 +297,7 @@ class MemoryService:
                         del self._memory_cache[conversation_key]
                         return None
                     
-                    return json.loads(cached_item['data'])
+                    return decode_payload(cached_item['data'])
             
             return None
             
@@ -310,7 +326,7 @@ class MemoryService:
             if not self.redis_client:
                 return False
             
-            serialized_data = json.dumps(data, default=str)
+            serialized_data = encode_payload(data)
             await self.redis_client.setex(key, ttl, serialized_data)
             
             logger.debug(f"Stored temp data: {key} (TTL: {ttl}s)")
@@ -337,7 +353,7 @@ class MemoryService:
             serialized_data = await self.redis_client.get(key)
             
             if serialized_data:
-                return json.loads(serialized_data)
+                return decode_payload(serialized_data)
                 
             return None
             
@@ -370,7 +386,37 @@ class MemoryService:
         except Exception as e:
             logger.error(f"Error deleting temp data: {e}")
             return False
-    
+
+    async def set_if_absent(self, key: str, data: Any, ttl: int) -> bool:
+        """
+        Store a value only if the key does not exist yet (SET NX EX).
+
+        Args:
+            key: Storage key
+            data: Data to store
+            ttl: Time to live in seconds
+
+        Returns:
+            True if the key was created, False if it already existed or on error
+        """
+        try:
+            serialized_data = encode_payload(data)
+
+            if self.redis_available and self.redis_client:
+                return bool(await self.redis_client.set(key, serialized_data, nx=True, ex=ttl))
+
+            if key in self._memory_cache:
+                return False
+            self._memory_cache[key] = {
+                'data': serialized_data,
+                'expiry': datetime.now() + timedelta(seconds=ttl)
+            }
+            return True
+
+        except Exception as e:
+            logger.error(f"Error in set_if_absent for {key}: {e}")
+            return False
+
     async def store_graph_data(self, graph_key: str, graph_data: Dict[str, Any]) -> bool:
         """
         Store graph data in Redis.
@@ -386,7 +432,7 @@ class MemoryService:
             if not self.redis_client:
                 return False
             
-            serialized_data = json.dumps(graph_data, default=str)
+            serialized_data = encode_payload(graph_data)
             await self.redis_client.set(f"graph:{graph_key}", serialized_data)
             
             logger.debug(f"Stored graph data: {graph_key}")
@@ -413,7 +459,7 @@ class MemoryService:
             serialized_data = await self.redis_client.get(f"graph:{graph_key}")
             
             if serialized_data:
-                return json.loads(serialized_data)
+                return decode_payload(serialized_data)
                 
             return None
             
@@ -436,7 +482,7 @@ class MemoryService:
             if not self.redis_client:
                 return False
             
-            serialized_item = json.dumps(item, default=str)
+            serialized_item = encode_payload(item)
             await self.redis_client.lpush(queue_key, serialized_item)
             
             logger.debug(f"Added item to queue: {queue_key}")
@@ -467,9 +513,9 @@ class MemoryService:
             items = []
             for serialized_item in serialized_items:
                 try:
-                    item = json.loads(serialized_item)
+                    item = decode_payload(serialized_item)
                     items.append(item)
-                except json.JSONDecodeError as e:
+                except ValueError as e:
                     logger.error(f"Error deserializing queue item: {e}")
                     continue
             
@@ -479,6 +525,82 @@ class MemoryService:
             logger.error(f"Error getting queue items: {e}")
             return []
     
+    async def enqueue_batch_item(self, queue_key: str, item: Dict[str, Any], ttl: int = 3600) -> int:
+        """
+        Append an item to a FIFO batch buffer (Redis list or in-memory fallback).
+
+        The fallback buffer is private to this process, so a consumer running in
+        another process (e.g. a different Celery child) will not see it.
+
+        Args:
+            queue_key: Buffer identifier
+            item: Item to append
+            ttl: Buffer TTL in seconds, refreshed on every append
+
+        Returns:
+            Buffer length after the append, or 0 on error
+        """
+        try:
+            serialized_item = encode_payload(item)
+
+            if self.redis_available and self.redis_client:
+                pipeline = self.redis_client.pipeline()
+                pipeline.rpush(queue_key, serialized_item)
+                pipeline.expire(queue_key, ttl)
+                length, _ = await pipeline.execute()
+                return length
+
+            cached_item = self._memory_cache.get(queue_key)
+            buffer = cached_item['data'] if cached_item else []
+            buffer.append(serialized_item)
+            self._memory_cache[queue_key] = {
+                'data': buffer,
+                'expiry': datetime.now() + timedelta(seconds=ttl),
+                'pinned': True  # Evicting a buffer would silently drop queued work
+            }
+            return len(buffer)
+
+        except Exception as e:
+            logger.error(f"Error appending to batch buffer {queue_key}: {e}")
+            return 0
+
+    async def dequeue_batch_items(self, queue_key: str, limit: int) -> List[Dict[str, Any]]:
+        """
+        Atomically remove and return up to `limit` of the oldest items from a batch buffer.
+
+        Args:
+            queue_key: Buffer identifier
+            limit: Maximum number of items to take
+
+        Returns:
+            List of items (oldest first)
+        """
+        try:
+            if self.redis_available and self.redis_client:
+                pipeline = self.redis_client.pipeline(transaction=True)
+                pipeline.lrange(queue_key, 0, limit - 1)
+                pipeline.ltrim(queue_key, limit, -1)
+                serialized_items, _ = await pipeline.execute()
+            else:
+                cached_item = self._memory_cache.get(queue_key)
+                if not cached_item:
+                    return []
+                serialized_items = cached_item['data'][:limit]
+                del cached_item['data'][:limit]
+                self._memory_cache.resize(queue_key)
+
+            items = []
+            for serialized_item in serialized_items:
+                try:
+                    items.append(decode_payload(serialized_item))
+                except ValueError as e:
+                    logger.error(f"Error deserializing batch item: {e}")
+            return items
+
+        except Exception as e:
+            logger.error(f"Error taking items from batch buffer {queue_key}: {e}")
+            return []
+
     async def clear_queue(self, queue_key: str) -> bool:
         """
         Clear all items from a queue.
@@ -523,7 +645,7 @@ class MemoryService:
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
             key = f"ingestion:{ingestion_type}:{timestamp}"
             
-            serialized_metadata = json.dumps(metadata, default=str)
+            serialized_metadata = encode_payload(metadata)
             
             # Store with 30-day TTL
             await self.redis_client.setex(key, 30 * 24 * 3600, serialized_metadata)
@@ -557,7 +679,7 @@ class MemoryService:
             serialized_metadata = await self.redis_client.get(latest_key)
             
             if serialized_metadata:
-                return json.loads(serialized_metadata)
+                return decode_payload(serialized_metadata)
                 
             return None
             
@@ -582,7 +704,7 @@ class MemoryService:
                 return False
             
             key = f"user:{user_id}"
-            serialized_data = json.dumps(user_info, default=str)
+            serialized_data = encode_payload(user_info)
             await self.redis_client.setex(key, ttl, serialized_data)
             
             return True
@@ -609,7 +731,7 @@ class MemoryService:
             serialized_data = await self.redis_client.get(key)
             
             if serialized_data:
-                return json.loads(serialized_data)
+                return decode_payload(serialized_data)
                 
             return None
             
@@ -654,7 +776,7 @@ class MemoryService:
         """
         try:
             if not self.redis_client:
-                return {}
+                return {"payload_codec": payload_codec.get_stats()}
             
             info = await self.redis_client.info("memory")
             
@@ -664,7 +786,8 @@ class MemoryService:
                 "used_memory_peak": info.get("used_memory_peak", 0),
                 "used_memory_peak_human": info.get("used_memory_peak_human", "0B"),
                 "total_system_memory": info.get("total_system_memory", 0),
-                "total_system_memory_human": info.get("total_system_memory_human", "0B")
+                "total_system_memory_human": info.get("total_system_memory_human", "0B"),
+                "payload_codec": payload_codec.get_stats()
             }
             
             return stats
@@ -673,39 +796,182 @@ class MemoryService:
             logger.error(f"Error getting memory stats: {e}")
             return {}
     
-    async def track_thread_participation(self, channel_id: str, thread_ts: str, bot_user_id: str) -> bool:
-        """Track that the bot has participated in a thread"""
+    def get_fallback_cache_stats(self) -> Dict[str, Any]:
+        """
+        Get usage statistics for the in-memory fallback cache.
+        
+        Returns:
+            Dictionary with entry counts, byte usage by key prefix and eviction counters
+        """
+        stats = self._memory_cache.get_stats()
+        stats["active"] = not self.redis_available
+        return stats
+    
+    async def track_thread_participation(
+        self,
+        channel_id: str,
+        thread_ts: str,
+        bot_user_id: str,
+        started: bool = False
+    ) -> bool:
+        """
+        Record that the bot started or joined a thread in the participation index.
+        
+        The index is a sorted set of "channel:thread_ts" members scored by last
+        activity, so the message filter can answer with a single ZSCORE.
+        
+        Args:
+            channel_id: Slack channel ID
+            thread_ts: Thread root timestamp
+            bot_user_id: Bot user ID (kept for the per-thread detail record)
+            started: True when the bot posted the thread's root message
+            
+        Returns:
+            True if successful, False otherwise
+        """
         try:
-            thread_key = f"thread_participation:{channel_id}:{thread_ts}"
-            participation_data = {
-                "bot_participated": True,
-                "bot_user_id": bot_user_id,
-                "last_participation": str(int(time.time())),
-                "channel_id": channel_id,
-                "thread_ts": thread_ts
-            }
+            member = f"{channel_id}:{thread_ts}"
+            now = time.time()
+            
+            if self.redis_available and self.redis_client:
+                pipeline = self.redis_client.pipeline()
+                pipeline.zadd(THREAD_INDEX_KEY, {member: now})
+                pipeline.zrem(THREAD_NEGATIVE_KEY, member)
+                pipeline.zremrangebyscore(THREAD_INDEX_KEY, 0, now - THREAD_INDEX_RETENTION)
+                pipeline.hset(f"{THREAD_DETAIL_PREFIX}{member}", mapping={
+                    "bot_participated": "1",
+                    "bot_started": "1" if started else "0",
+                    "bot_user_id": bot_user_id,
+                    "last_participation": str(int(now))
+                })
+                pipeline.expire(f"{THREAD_DETAIL_PREFIX}{member}", THREAD_INDEX_RETENTION)
+                await pipeline.execute()
+            else:
+                index = self._get_memory_thread_index(THREAD_INDEX_KEY)
+                index[member] = now
+                self._get_memory_thread_index(THREAD_NEGATIVE_KEY).pop(member, None)
+                self._store_memory_thread_index(THREAD_INDEX_KEY, index, THREAD_INDEX_RETENTION, now)
             
-            # Store for 24 hours
-            return await self.store_data(thread_key, participation_data, ttl=86400)
+            logger.debug(f"Indexed bot {'started' if started else 'joined'} thread {member}")
+            return True
             
         except Exception as e:
             logger.error(f"Error tracking thread participation: {e}")
             return False
     
+    async def record_thread_non_participation(self, channel_id: str, thread_ts: str) -> bool:
+        """
+        Remember that the bot is not part of a thread (negative cache for cold misses).
+        
+        Args:
+            channel_id: Slack channel ID
+            thread_ts: Thread root timestamp
+            
+        Returns:
+            True if successful, False otherwise
+        """
+        try:
+            member = f"{channel_id}:{thread_ts}"
+            now = time.time()
+            
+            if self.redis_available and self.redis_client:
+                pipeline = self.redis_client.pipeline()
+                pipeline.zadd(THREAD_NEGATIVE_KEY, {member: now})
+                pipeline.zremrangebyscore(THREAD_NEGATIVE_KEY, 0, now - THREAD_NEGATIVE_TTL)
+                await pipeline.execute()
+            else:
+                index = self._get_memory_thread_index(THREAD_NEGATIVE_KEY)
+                index[member] = now
+                self._store_memory_thread_index(THREAD_NEGATIVE_KEY, index, THREAD_NEGATIVE_TTL, now)
+            return True
+            
+        except Exception as e:
+            logger.error(f"Error recording thread non-participation: {e}")
+            return False
+    
+    async def has_thread_participation(self, channel_id: str, thread_ts: str) -> Optional[bool]:
+        """
+        Look up the bot's participation in a thread.
+        
+        Args:
+            channel_id: Slack channel ID
+            thread_ts: Thread root timestamp
+            
+        Returns:
+            True if the bot started or joined the thread, False if it is known not to
+            have, None when the thread is not in the index (cold miss)
+        """
+        try:
+            member = f"{channel_id}:{thread_ts}"
+            now = time.time()
+            
+            if self.redis_available and self.redis_client:
+                pipeline = self.redis_client.pipeline()
+                pipeline.zscore(THREAD_INDEX_KEY, member)
+                pipeline.zscore(THREAD_NEGATIVE_KEY, member)
+                positive_score, negative_score = await pipeline.execute()
+            else:
+                positive_score = self._get_memory_thread_index(THREAD_INDEX_KEY).get(member)
+                negative_score = self._get_memory_thread_index(THREAD_NEGATIVE_KEY).get(member)
+            
+            if positive_score is not None and now - float(positive_score) <= THREAD_INDEX_RETENTION:
+                return True
+            if negative_score is not None and now - float(negative_score) <= THREAD_NEGATIVE_TTL:
+                return False
+            return None
+            
+        except Exception as e:
+            logger.error(f"Error checking thread participation: {e}")
+            return None
+    
     async def get_thread_participation(self, channel_id: str, thread_ts: str) -> Optional[Dict[str, Any]]:
         """Get thread participation data"""
         try:
-            thread_key = f"thread_participation:{channel_id}:{thread_ts}"
-            return await self.get_data(thread_key)
+            member = f"{channel_id}:{thread_ts}"
+            if self.redis_available and self.redis_client:
+                details = await self.redis_client.hgetall(f"{THREAD_DETAIL_PREFIX}{member}")
+                if details:
+                    return {
+                        "bot_participated": details.get("bot_participated") == "1",
+                        "bot_started": details.get("bot_started") == "1",
+                        "bot_user_id": details.get("bot_user_id"),
+                        "last_participation": details.get("last_participation"),
+                        "channel_id": channel_id,
+                        "thread_ts": thread_ts
+                    }
+                return None
+            
+            last_participation = self._get_memory_thread_index(THREAD_INDEX_KEY).get(member)
+            if last_participation is None:
+                return None
+            return {
+                "bot_participated": True,
+                "last_participation": str(int(last_participation)),
+                "channel_id": channel_id,
+                "thread_ts": thread_ts
+            }
         except Exception as e:
             logger.error(f"Error getting thread participation: {e}")
             return None
     
+    def _get_memory_thread_index(self, index_key: str) -> Dict[str, float]:
+        """Get a thread index mapping from the in-memory fallback"""
+        cached_item = self._memory_cache.get(index_key)
+        return cached_item['data'] if cached_item else {}
+    
+    def _store_memory_thread_index(self, index_key: str, index: Dict[str, float], retention: int, now: float):
+        """Trim and store a thread index mapping in the in-memory fallback"""
+        cutoff = now - retention
+        trimmed = {member: score for member, score in index.items() if score >= cutoff}
+        self._memory_cache[index_key] = {
+            'data': trimmed,
+            'expiry': datetime.now() + timedelta(seconds=retention)
+        }
+    
     async def close(self):
-        """Close Redis connection"""
+        """Release this instance; the shared connection pool stays open for other users"""
         try:
-            if self.redis_client:
-                await self.redis_client.close()
-                logger.info("Redis connection closed")
+            self._redis_url = None
+            logger.debug("Memory service detached from shared Redis pool")
         except Exception as e:
             logger.error(f"Error closing Redis connection: {e}")
@@ -0,0 +1,256 @@
+"""
+Redis Connection Pool Registry
+
+Process-wide registry that hands every MemoryService the same Redis connection
+pool instead of letting each instance call `redis.from_url` (which builds a new
+pool, new sockets and new handshakes every time).
+
+redis.asyncio connections are bound to the event loop that opened them, so the
+registry keeps one pool per (event loop, URL). The FastAPI process therefore
+reuses a single warm pool, while Celery tasks that run their own loop get a
+pool of their own that is pruned, and its sockets closed, once that loop is
+closed.
+"""
+
+import asyncio
+import logging
+import socket
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from config import settings
+
+# Try to import Redis, but handle gracefully if not available
+try:
+    import redis.asyncio as redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+
+class PoolMetrics:
+    """Saturation and wait-time counters for one connection pool"""
+
+    def __init__(self, max_connections: int):
+        self.max_connections = max_connections
+        self.connections_created = 0
+        self.checkouts = 0
+        self.in_use = 0
+        self.peak_in_use = 0
+        self.total_wait_time = 0.0
+        self.max_wait_time = 0.0
+        self.slow_waits = 0  # Checkouts that waited for a free connection
+        self.timeouts = 0
+
+    def record_checkout(self, wait_time: float):
+        self.checkouts += 1
+        self.in_use += 1
+        self.peak_in_use = max(self.peak_in_use, self.in_use)
+        self.total_wait_time += wait_time
+        self.max_wait_time = max(self.max_wait_time, wait_time)
+        if wait_time > 0.01:
+            self.slow_waits += 1
+
+    def record_release(self):
+        self.in_use = max(0, self.in_use - 1)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "max_connections": self.max_connections,
+            "connections_created": self.connections_created,
+            "in_use": self.in_use,
+            "peak_in_use": self.peak_in_use,
+            "saturation_percentage": round(self.peak_in_use / self.max_connections * 100, 1) if self.max_connections else 0.0,
+            "checkouts": self.checkouts,
+            "avg_wait_ms": round(self.total_wait_time / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+            "max_wait_ms": round(self.max_wait_time * 1000, 3),
+            "slow_waits": self.slow_waits,
+            "timeouts": self.timeouts
+        }
+
+
+if REDIS_AVAILABLE:
+    class InstrumentedConnectionPool(redis.BlockingConnectionPool):
+        """BlockingConnectionPool that records checkout wait times and saturation"""
+
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.metrics = PoolMetrics(self.max_connections)
+
+        def make_connection(self):
+            self.metrics.connections_created += 1
+            return super().make_connection()
+
+        async def get_connection(self, *args, **kwargs):
+            start_time = time.perf_counter()
+            try:
+                connection = await super().get_connection(*args, **kwargs)
+            except Exception:
+                self.metrics.timeouts += 1
+                raise
+            self.metrics.record_checkout(time.perf_counter() - start_time)
+            return connection
+
+        async def release(self, connection):
+            self.metrics.record_release()
+            return await super().release(connection)
+else:
+    InstrumentedConnectionPool = None
+
+
+class RedisPoolRegistry:
+    """
+    Shares one instrumented Redis connection pool per event loop and URL.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 50,
+        pool_timeout: float = 5.0,
+        socket_timeout: float = 5.0,
+        health_check_interval: int = 30
+    ):
+        self.max_connections = max_connections
+        self.pool_timeout = pool_timeout
+        self.socket_timeout = socket_timeout
+        self.health_check_interval = health_check_interval
+
+        # loop -> {url: client}; pools of closed loops are pruned on the next lookup
+        self._loop_clients: Dict[asyncio.AbstractEventLoop, Dict[str, Any]] = {}
+        # Clients created outside a running loop (bound on first use)
+        self._unbound_clients: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self._clients_created = 0
+        self._clients_reused = 0
+        self._pools_pruned = 0
+        self._sockets_closed = 0
+
+    def _current_loop(self) -> Optional[asyncio.AbstractEventLoop]:
+        try:
+            return asyncio.get_running_loop()
+        except RuntimeError:
+            return None
+
+    def _prune_closed_loops(self):
+        """Drop pools whose event loop has been closed, closing their sockets"""
+        closed_loops = [loop for loop in self._loop_clients if loop.is_closed()]
+        for loop in closed_loops:
+            clients = self._loop_clients.pop(loop)
+            for client in clients.values():
+                self._close_orphaned_pool(client.connection_pool)
+            self._pools_pruned += len(clients)
+
+    def _close_orphaned_pool(self, pool):
+        """
+        Close the connections of a pool whose event loop is gone.
+
+        pool.disconnect() closes each connection through its asyncio transport,
+        which needs the loop the connection was opened on. Once that loop is
+        closed, the transport cannot be closed. Each socket is shut down directly
+        instead, so Redis sees the client leave right away. Dropping the stream
+        references releases the file descriptors with their transports.
+        """
+        connections = [*pool._available_connections, *pool._in_use_connections]
+        for connection in connections:
+            writer = getattr(connection, "_writer", None)
+            sock = writer.get_extra_info("socket") if writer is not None else None
+            if sock is not None:
+                try:
+                    sock.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass  # Already closed by the peer
+            connection._reader = connection._writer = None
+        pool._available_connections.clear()
+        pool._in_use_connections.clear()
+        self._sockets_closed += len(connections)
+
+    def _create_client(self, url: str):
+        pool = InstrumentedConnectionPool.from_url(
+            url,
+            max_connections=self.max_connections,
+            timeout=self.pool_timeout,
+            encoding="utf-8",
+            decode_responses=True,
+            socket_connect_timeout=5,
+            socket_timeout=self.socket_timeout,
+            socket_keepalive=True,
+            health_check_interval=self.health_check_interval
+        )
+        self._clients_created += 1
+        logger.info(f"Created shared Redis connection pool (max {self.max_connections} connections)")
+        return redis.Redis(connection_pool=pool)
+
+    def get_client(self, url: str):
+        """
+        Get a Redis client backed by the shared pool for the current event loop.
+
+        Args:
+            url: Redis URL (including credentials)
+
+        Returns:
+            redis.asyncio.Redis client, or None if the redis module is unavailable
+        """
+        if not REDIS_AVAILABLE:
+            return None
+
+        loop = self._current_loop()
+        with self._lock:
+            self._prune_closed_loops()
+            if loop is None:
+                clients = self._unbound_clients
+            else:
+                clients = self._loop_clients.get(loop)
+                if clients is None:
+                    clients = {}
+                    self._loop_clients[loop] = clients
+
+            client = clients.get(url)
+            if client is None:
+                client = self._create_client(url)
+                clients[url] = client
+            else:
+                self._clients_reused += 1
+            return client
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get registry and per-pool statistics"""
+        with self._lock:
+            self._prune_closed_loops()
+            pools = []
+            for loop, clients in list(self._loop_clients.items()):
+                for client in clients.values():
+                    pools.append({"bound_to_loop": True, "loop_running": loop.is_running(), **client.connection_pool.metrics.to_dict()})
+            for client in self._unbound_clients.values():
+                pools.append({"bound_to_loop": False, **client.connection_pool.metrics.to_dict()})
+
+            return {
+                "redis_available": REDIS_AVAILABLE,
+                "active_pools": len(pools),
+                "pools_created": self._clients_created,
+                "pool_reuses": self._clients_reused,
+                "pools_pruned": self._pools_pruned,
+                "pruned_sockets_closed": self._sockets_closed,
+                "pools": pools
+            }
+
+    async def close_current_loop(self):
+        """Disconnect the pools owned by the running event loop (worker shutdown)"""
+        loop = self._current_loop()
+        with self._lock:
+            clients = self._loop_clients.pop(loop, {}) if loop else {}
+        for client in clients.values():
+            try:
+                await client.connection_pool.disconnect()
+            except Exception as e:
+                logger.debug(f"Error disconnecting Redis pool: {e}")
+
+
+# Global registry instance
+redis_pool_registry = RedisPoolRegistry(
+    max_connections=settings.REDIS_MAX_CONNECTIONS,
+    pool_timeout=settings.REDIS_POOL_TIMEOUT
+)
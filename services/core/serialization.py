@@ -0,0 +1,283 @@
+"""
+Payload Serialization Service
+
+Pluggable codec layer for values written to Redis (and the in-memory fallback).
+Replaces ad-hoc `json.dumps(..., default=str)` calls with a compact, versioned
+encoding while staying able to read every legacy JSON value already stored.
+
+Wire format (all values are text because the Redis client uses decode_responses):
+
+    legacy:   plain JSON text, no header
+    v1:       "\x1f" + "1" + <format> + <compression> + <body>
+
+    format:       "j" = compact JSON (orjson when installed), "m" = msgpack
+    compression:  "-" = none, "z" = zstd, "d" = zlib
+    body:         JSON text when format is "j" and uncompressed, base85 otherwise
+"""
+
+import base64
+import json
+import logging
+import time
+import zlib
+from typing import Any, Dict, Optional, Union
+
+from config import settings
+
+# Optional fast serializers - fall back to stdlib json when missing
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+    orjson = None
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+    msgpack = None
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+PAYLOAD_MAGIC = "\x1f"
+PAYLOAD_VERSION = "1"
+
+FORMAT_JSON = "j"
+FORMAT_MSGPACK = "m"
+
+COMPRESSION_NONE = "-"
+COMPRESSION_ZSTD = "z"
+COMPRESSION_ZLIB = "d"
+
+HEADER_LENGTH = 4  # magic + version + format + compression
+
+
+def _default(value: Any) -> str:
+    """Fallback for types the serializers do not handle natively (matches default=str)"""
+    return str(value)
+
+
+class PayloadCodec:
+    """
+    Encodes and decodes stored payloads with an optional compression step
+    for large values such as long-term summaries and cached responses.
+    """
+
+    def __init__(
+        self,
+        codec: str = "orjson",
+        compression_threshold: int = 1024,
+        compression_level: int = 3
+    ):
+        self.codec = self._resolve_codec(codec)
+        self.compression_threshold = compression_threshold
+        self.compression_level = compression_level
+
+        self._zstd_compressor = None
+        self._zstd_decompressor = None
+        if ZSTD_AVAILABLE:
+            self._zstd_compressor = zstandard.ZstdCompressor(level=compression_level)
+            self._zstd_decompressor = zstandard.ZstdDecompressor()
+
+        self.stats = {
+            "encoded": 0,
+            "decoded": 0,
+            "legacy_decoded": 0,
+            "compressed": 0,
+            "bytes_raw": 0,
+            "bytes_stored": 0,
+            "encode_time": 0.0,
+            "decode_time": 0.0
+        }
+
+    def _resolve_codec(self, codec: str) -> str:
+        """Pick the configured codec, degrading to what is installed"""
+        codec = (codec or "").lower()
+        if codec == "msgpack" and not MSGPACK_AVAILABLE:
+            logger.warning("msgpack not installed, falling back to JSON payload codec")
+            codec = "orjson"
+        if codec == "orjson" and not ORJSON_AVAILABLE:
+            codec = "json"
+        if codec not in ("msgpack", "orjson", "json", "legacy"):
+            logger.warning(f"Unknown payload codec '{codec}', using compact JSON")
+            codec = "orjson" if ORJSON_AVAILABLE else "json"
+        return codec
+
+    def _dump_json(self, data: Any) -> bytes:
+        """Compact JSON bytes"""
+        if self.codec == "orjson":
+            return orjson.dumps(data, default=_default, option=orjson.OPT_NON_STR_KEYS)
+        return json.dumps(data, default=_default, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+    def _compress(self, body: bytes) -> tuple:
+        """Compress body when it is large enough to be worth it"""
+        if len(body) < self.compression_threshold:
+            return COMPRESSION_NONE, body
+
+        if self._zstd_compressor is not None:
+            compressed, method = self._zstd_compressor.compress(body), COMPRESSION_ZSTD
+        else:
+            compressed, method = zlib.compress(body, self.compression_level), COMPRESSION_ZLIB
+
+        # base85 adds 25%, so only keep compression when it still wins
+        if len(compressed) * 1.25 >= len(body):
+            return COMPRESSION_NONE, body
+        return method, compressed
+
+    def encode(self, data: Any) -> str:
+        """
+        Serialize data for storage.
+
+        Args:
+            data: JSON-compatible data (unknown types are stringified)
+
+        Returns:
+            Text payload with version header
+        """
+        start_time = time.perf_counter()
+
+        if self.codec == "legacy":
+            payload = json.dumps(data, default=str)
+            self._record_encode(len(payload), len(payload), False, start_time)
+            return payload
+
+        if self.codec == "msgpack":
+            fmt = FORMAT_MSGPACK
+            body = msgpack.packb(data, default=_default, use_bin_type=True)
+        else:
+            fmt = FORMAT_JSON
+            body = self._dump_json(data)
+
+        compression, stored = self._compress(body)
+
+        if fmt == FORMAT_JSON and compression == COMPRESSION_NONE:
+            text_body = stored.decode("utf-8")
+        else:
+            text_body = base64.b85encode(stored).decode("ascii")
+
+        payload = f"{PAYLOAD_MAGIC}{PAYLOAD_VERSION}{fmt}{compression}{text_body}"
+        self._record_encode(len(body), len(payload), compression != COMPRESSION_NONE, start_time)
+        return payload
+
+    def decode(self, payload: Union[str, bytes, None]) -> Any:
+        """
+        Deserialize a stored payload, accepting both versioned and legacy JSON values.
+
+        Args:
+            payload: Raw value read from storage
+
+        Returns:
+            Decoded data, or None for empty payloads
+        """
+        if payload is None:
+            return None
+
+        start_time = time.perf_counter()
+
+        if isinstance(payload, bytes):
+            payload = payload.decode("utf-8")
+
+        if not payload.startswith(PAYLOAD_MAGIC):
+            # Legacy value written by json.dumps before the codec layer existed
+            data = json.loads(payload)
+            self.stats["legacy_decoded"] += 1
+            self._record_decode(start_time)
+            return data
+
+        version = payload[1:2]
+        if version != PAYLOAD_VERSION:
+            raise ValueError(f"Unsupported payload version: {version!r}")
+
+        fmt = payload[2:3]
+        compression = payload[3:4]
+        text_body = payload[HEADER_LENGTH:]
+
+        if fmt == FORMAT_JSON and compression == COMPRESSION_NONE:
+            data = self._load_json(text_body)
+        else:
+            body = base64.b85decode(text_body)
+            if compression == COMPRESSION_ZSTD:
+                if self._zstd_decompressor is None:
+                    raise ValueError("zstd-compressed payload but zstandard is not installed")
+                body = self._zstd_decompressor.decompress(body)
+            elif compression == COMPRESSION_ZLIB:
+                body = zlib.decompress(body)
+
+            if fmt == FORMAT_MSGPACK:
+                if not MSGPACK_AVAILABLE:
+                    raise ValueError("msgpack payload but msgpack is not installed")
+                data = msgpack.unpackb(body, raw=False)
+            else:
+                data = self._load_json(body)
+
+        self._record_decode(start_time)
+        return data
+
+    def _load_json(self, body: Union[str, bytes]) -> Any:
+        """Parse JSON text or bytes"""
+        if ORJSON_AVAILABLE:
+            return orjson.loads(body)
+        return json.loads(body)
+
+    def _record_encode(self, raw_size: int, stored_size: int, compressed: bool, start_time: float):
+        """Track encode statistics"""
+        self.stats["encoded"] += 1
+        self.stats["bytes_raw"] += raw_size
+        self.stats["bytes_stored"] += stored_size
+        self.stats["encode_time"] += time.perf_counter() - start_time
+        if compressed:
+            self.stats["compressed"] += 1
+
+    def _record_decode(self, start_time: float):
+        """Track decode statistics"""
+        self.stats["decoded"] += 1
+        self.stats["decode_time"] += time.perf_counter() - start_time
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get codec statistics"""
+        encoded = self.stats["encoded"]
+        decoded = self.stats["decoded"]
+        return {
+            "codec": self.codec,
+            "compression": "zstd" if ZSTD_AVAILABLE else "zlib",
+            "compression_threshold": self.compression_threshold,
+            "encoded": encoded,
+            "decoded": decoded,
+            "legacy_decoded": self.stats["legacy_decoded"],
+            "compressed": self.stats["compressed"],
+            "bytes_raw": self.stats["bytes_raw"],
+            "bytes_stored": self.stats["bytes_stored"],
+            "avg_encode_us": round(self.stats["encode_time"] / encoded * 1e6, 2) if encoded else 0.0,
+            "avg_decode_us": round(self.stats["decode_time"] / decoded * 1e6, 2) if decoded else 0.0
+        }
+
+
+def _build_default_codec() -> PayloadCodec:
+    """Build the process-wide codec from settings"""
+    return PayloadCodec(
+        codec=getattr(settings, "REDIS_PAYLOAD_CODEC", "orjson"),
+        compression_threshold=getattr(settings, "REDIS_PAYLOAD_COMPRESSION_THRESHOLD", 1024)
+    )
+
+
+# Global codec instance
+payload_codec = _build_default_codec()
+
+
+def encode_payload(data: Any) -> str:
+    """Encode data with the global payload codec"""
+    return payload_codec.encode(data)
+
+
+def decode_payload(payload: Optional[Union[str, bytes]]) -> Any:
+    """Decode data with the global payload codec"""
+    return payload_codec.decode(payload)
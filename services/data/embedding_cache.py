@@ -0,0 +1,213 @@
+"""
+Embedding Cache - Content-addressed store of text embeddings.
+
+Purge-and-reingest, manual ingestion and first-generation recovery used to
+re-embed every message even when its text had been embedded before. Entries
+are keyed by embedding model and the SHA-256 of the embedded text, so the
+same content is embedded once per model, whichever message, channel or run
+it comes from.
+
+- Redis keeps `embedding_cache:{model}:{sha256}` -> packed float32 vector, plus
+  an LRU sorted set scored by last use; inserts beyond
+  EMBEDDING_CACHE_MAX_ENTRIES evict the least recently used entries
+- without Redis, a per-process LRU of packed vectors bounded by
+  EMBEDDING_CACHE_LOCAL_MAX_BYTES is used instead; it is not shared between
+  workers and starts empty after a restart
+"""
+
+import base64
+import hashlib
+import logging
+import struct
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+CACHE_KEY_PREFIX = "embedding_cache"
+LRU_KEY = f"{CACHE_KEY_PREFIX}:lru"
+
+
+def content_hash(text: str) -> str:
+    """SHA-256 of the text as embedded"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def pack_vector(values: Sequence[float]) -> str:
+    """Little-endian float32 vector as base64 (Redis clients here decode responses)"""
+    return base64.b64encode(struct.pack(f"<{len(values)}f", *values)).decode("ascii")
+
+
+def unpack_vector(payload: str) -> List[float]:
+    return unpack_raw_vector(base64.b64decode(payload))
+
+
+def unpack_raw_vector(raw: bytes) -> List[float]:
+    return list(struct.unpack(f"<{len(raw) // 4}f", raw))
+
+
+class EmbeddingCache:
+    """
+    Process-wide embedding cache shared by every EmbeddingService.
+    """
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        enabled: Optional[bool] = None,
+        local_max_bytes: Optional[int] = None
+    ):
+        self.max_entries = max_entries or settings.EMBEDDING_CACHE_MAX_ENTRIES
+        self.local_max_bytes = local_max_bytes or settings.EMBEDDING_CACHE_LOCAL_MAX_BYTES
+        self.enabled = settings.EMBEDDING_CACHE_ENABLED if enabled is None else enabled
+        # Fallback entries are raw float32 bytes; float lists would cost ~8x as much
+        self._local: "OrderedDict[str, bytes]" = OrderedDict()
+        self._local_bytes = 0
+        self._lock = threading.Lock()
+        self._memory_service = None
+
+        self.stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "errors": 0}
+
+    def _key(self, model: str, text: str) -> str:
+        return f"{CACHE_KEY_PREFIX}:{model}:{content_hash(text)}"
+
+    def _redis_client(self):
+        if self._memory_service is None:
+            from services.core.memory_service import MemoryService
+            self._memory_service = MemoryService()
+        if self._memory_service.redis_available:
+            return self._memory_service.redis_client
+        return None
+
+    async def get_many(self, model: str, texts: Sequence[str]) -> List[Optional[List[float]]]:
+        """
+        Look up cached embeddings.
+
+        Args:
+            model: Embedding model name
+            texts: Texts exactly as they would be embedded
+
+        Returns:
+            One vector or None per text, in order
+        """
+        if not self.enabled or not texts:
+            return [None] * len(texts)
+
+        keys = [self._key(model, text) for text in texts]
+        redis_client = self._redis_client()
+        if redis_client:
+            try:
+                payloads = await redis_client.mget(keys)
+                results = [unpack_vector(payload) if payload else None for payload in payloads]
+                hit_keys = {key for key, result in zip(keys, results) if result is not None}
+                if hit_keys:
+                    now = time.time()
+                    await redis_client.zadd(LRU_KEY, {key: now for key in hit_keys})
+                self._count(results)
+                return results
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.warning(f"Embedding cache lookup failed, embedding without cache: {e}")
+                return [None] * len(texts)
+
+        with self._lock:
+            results = []
+            for key in keys:
+                raw = self._local.get(key)
+                if raw is not None:
+                    self._local.move_to_end(key)
+                results.append(unpack_raw_vector(raw) if raw is not None else None)
+        self._count(results)
+        return results
+
+    async def set_many(self, model: str, entries: Sequence[Tuple[str, Sequence[float]]]) -> None:
+        """
+        Store embeddings, evicting least recently used entries beyond the bound.
+
+        Args:
+            model: Embedding model name
+            entries: (text, vector) pairs
+        """
+        if not self.enabled or not entries:
+            return
+
+        packed = {self._key(model, text): pack_vector(vector) for text, vector in entries}
+        redis_client = self._redis_client()
+        if redis_client:
+            try:
+                now = time.time()
+                pipeline = redis_client.pipeline()
+                pipeline.mset(packed)
+                pipeline.zadd(LRU_KEY, {key: now for key in packed})
+                pipeline.zcard(LRU_KEY)
+                size = (await pipeline.execute())[-1]
+                self.stats["stores"] += len(packed)
+
+                excess = size - self.max_entries
+                if excess > 0:
+                    evicted = await redis_client.zpopmin(LRU_KEY, excess)
+                    evicted_keys = [key for key, _ in evicted]
+                    if evicted_keys:
+                        await redis_client.delete(*evicted_keys)
+                        self.stats["evictions"] += len(evicted_keys)
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.warning(f"Failed to store {len(packed)} embeddings in cache: {e}")
+            return
+
+        with self._lock:
+            for key, payload in packed.items():
+                raw = base64.b64decode(payload)
+                previous = self._local.pop(key, None)
+                if previous is not None:
+                    self._local_bytes -= self._entry_bytes(key, previous)
+                self._local[key] = raw
+                self._local_bytes += self._entry_bytes(key, raw)
+            self.stats["stores"] += len(packed)
+            while self._local_bytes > self.local_max_bytes and self._local:
+                key, raw = self._local.popitem(last=False)
+                self._local_bytes -= self._entry_bytes(key, raw)
+                self.stats["evictions"] += 1
+
+    @staticmethod
+    def _entry_bytes(key: str, raw: bytes) -> int:
+        return sys.getsizeof(key) + sys.getsizeof(raw)
+
+    def _count(self, results: List[Optional[List[float]]]) -> None:
+        hits = sum(1 for result in results if result is not None)
+        self.stats["hits"] += hits
+        self.stats["misses"] += len(results) - hits
+
+    async def get_stats(self) -> Dict[str, Any]:
+        """Cache statistics (entry count from Redis when available)"""
+        entries = None
+        redis_client = self._redis_client() if self.enabled else None
+        if redis_client:
+            try:
+                entries = await redis_client.zcard(LRU_KEY)
+            except Exception:
+                pass
+        if entries is None:
+            entries = len(self._local)
+            stats_extra = {"bytes_used": self._local_bytes, "max_bytes": self.local_max_bytes}
+        else:
+            stats_extra = {}
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            "enabled": self.enabled,
+            "backend": "redis" if redis_client else "memory",
+            "entries": entries,
+            "max_entries": self.max_entries,
+            **stats_extra,
+            "hit_rate": round(self.stats["hits"] / lookups, 3) if lookups else 0.0,
+            **self.stats
+        }
+
+
+# Global cache shared by every EmbeddingService in the process
+embedding_cache = EmbeddingCache()
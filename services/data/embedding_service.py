@@ -10,6 +10,10 @@ from google import genai
 from pinecone import Pinecone
 
 from config import settings
+from services.data.embedding_cache import embedding_cache
+from services.data.local_vector_index import local_vector_index
+from services.data.vector_namespaces import vector_namespaces
+from services.data.vector_partitions import vector_partitions
 
 logger = logging.getLogger(__name__)
 
@@ -25,6 +29,7 @@ class EmbeddingService:
         self.pc = None
         self.index = None
         self.pinecone_available = False
+        self.embedding_cache = embedding_cache  # Process-wide, keyed by model + content hash
         self._initialize_services()
         
     def _initialize_services(self):
@@ -66,7 +71,9 @@ class EmbeddingService:
             # Generate embedding using Gemini client
             from google.genai import types
             
-            result = self.client.models.embed_content(
+            # The SDK call is blocking; keep it off the event loop
+            result = await asyncio.to_thread(
+                self.client.models.embed_content,
                 model=self.embedding_model,
                 contents=[types.Content(parts=[types.Part(text=text)])]
             )
@@ -87,12 +94,22 @@ class EmbeddingService:
             logger.error(f"Error generating embedding with Gemini: {e}")
             return None
     
-    async def embed_batch(self, texts: List[str]) -> List[Optional[List[float]]]:
+    async def embed_batch(
+        self,
+        texts: List[str],
+        cache_stats: Optional[Dict[str, int]] = None,
+        budget=None
+    ) -> List[Optional[List[float]]]:
         """
         Generate embeddings for a batch of texts using Gemini.
         
+        Texts already in the embedding cache (same model, same content) are not
+        sent to Gemini, and each distinct uncached text is embedded once.
+        
         Args:
             texts: List of texts to embed
+            cache_stats: Optional dict whose "cache_hits" / "cache_misses" counters are incremented
+            budget: Optional IngestionBudget charged one Gemini unit per text actually embedded
             
         Returns:
             List of embedding vectors
@@ -107,34 +124,44 @@ class EmbeddingService:
             if not valid_texts:
                 return [None] * len(texts)
             
-            logger.info(f"Generating embeddings for {len(valid_texts)} texts...")
+            cached = await self.embedding_cache.get_many(self.embedding_model, valid_texts)
+            vectors: Dict[str, Optional[List[float]]] = {
+                text: vector for text, vector in zip(valid_texts, cached) if vector is not None
+            }
+            missing = list(dict.fromkeys(text for text in valid_texts if text not in vectors))
+            
+            hits = sum(1 for vector in cached if vector is not None)
+            if cache_stats is not None:
+                cache_stats["cache_hits"] = cache_stats.get("cache_hits", 0) + hits
+                cache_stats["cache_misses"] = cache_stats.get("cache_misses", 0) + len(valid_texts) - hits
+            
+            logger.info(f"Generating embeddings for {len(missing)} texts ({hits}/{len(valid_texts)} cached)...")
+            
+            if missing and budget is not None:
+                await budget.acquire("gemini", len(missing))
             
             # Generate embeddings one by one (Gemini API limitation)
-            embeddings = []
-            for text in valid_texts:
+            new_entries = []
+            for text in missing:
                 try:
                     embedding = await self.embed_text(text)
-                    embeddings.append(embedding)
+                    vectors[text] = embedding
+                    if embedding is not None:
+                        new_entries.append((text, embedding))
                     
                     # Small delay to avoid rate limiting
                     await asyncio.sleep(0.1)
                     
                 except Exception as e:
                     logger.warning(f"Failed to embed text: {str(e)}")
-                    embeddings.append(None)
+                    vectors[text] = None
             
-            # Map back to original positions
-            result = []
-            valid_idx = 0
+            await self.embedding_cache.set_many(self.embedding_model, new_entries)
             
-            for text in texts:
-                if text and text.strip():
-                    result.append(embeddings[valid_idx])
-                    valid_idx += 1
-                else:
-                    result.append(None)
+            # Map back to original positions
+            result = [vectors.get(text) if text and text.strip() else None for text in texts]
             
-            successful_embeddings = len([e for e in embeddings if e is not None])
+            successful_embeddings = sum(1 for text in valid_texts if vectors.get(text) is not None)
             logger.info(f"Generated {successful_embeddings}/{len(valid_texts)} embeddings successfully")
             return result
             
@@ -142,12 +169,19 @@ class EmbeddingService:
             logger.error(f"Error generating batch embeddings: {e}")
             return [None] * len(texts)
     
-    async def embed_and_store_messages(self, messages: List[Dict[str, Any]]) -> int:
+    async def embed_and_store_messages(
+        self,
+        messages: List[Dict[str, Any]],
+        cache_stats: Optional[Dict[str, int]] = None,
+        namespace: Optional[str] = None
+    ) -> int:
         """
         Generate embeddings for messages and store them in Pinecone.
         
         Args:
             messages: List of processed messages
+            cache_stats: Optional dict receiving embedding cache hit/miss counts
+            namespace: Namespace to write (defaults to the live write namespaces)
             
         Returns:
             Number of messages successfully embedded and stored
@@ -158,55 +192,107 @@ class EmbeddingService:
             
             logger.info(f"Embedding and storing {len(messages)} messages...")
             
-            # Extract texts for embedding
-            texts = [msg.get("text", msg.get("content", "")) for msg in messages]
-            
-            # Generate embeddings in batches
-            embeddings = await self.embed_batch(texts)
+            vectors_to_upsert = await self.embed_messages(messages, cache_stats)
+            stored_count = await self.upsert_vectors(vectors_to_upsert, namespace=namespace)
             
-            # Prepare vectors for Pinecone
-            vectors_to_upsert = []
-            successful_embeddings = 0
-            
-            for i, (message, embedding) in enumerate(zip(messages, embeddings)):
-                if embedding is None:
-                    logger.warning(f"No embedding generated for message {message.get('id', i)}")
-                    continue
-                
-                vector = {
-                    "id": message.get("message_id", message.get("id", f"msg_{i}")),
-                    "values": embedding,
-                    "metadata": self._prepare_metadata_for_pinecone(message)
-                }
-                
-                vectors_to_upsert.append(vector)
-                successful_embeddings += 1
-            
-            # Store vectors in Pinecone in batches
-            if vectors_to_upsert:
-                batch_size = 100  # Pinecone batch limit
-                
-                for i in range(0, len(vectors_to_upsert), batch_size):
-                    batch = vectors_to_upsert[i:i + batch_size]
-                    
-                    try:
-                        self.index.upsert(vectors=batch)
-                        logger.info(f"Upserted batch {i//batch_size + 1}/{(len(vectors_to_upsert)-1)//batch_size + 1}")
-                        
-                        # Small delay to avoid rate limiting
-                        await asyncio.sleep(0.1)
-                        
-                    except Exception as e:
-                        logger.error(f"Error upserting batch {i//batch_size + 1}: {e}")
-                        continue
-            
-            logger.info(f"Successfully embedded and stored {successful_embeddings} messages")
-            return successful_embeddings
+            logger.info(f"Successfully embedded and stored {stored_count} messages")
+            return stored_count
             
         except Exception as e:
             logger.error(f"Error in embed_and_store_messages: {e}")
             return 0
     
+    async def embed_messages(
+        self,
+        messages: List[Dict[str, Any]],
+        cache_stats: Optional[Dict[str, int]] = None,
+        budget=None
+    ) -> List[Dict[str, Any]]:
+        """
+        Generate embeddings for processed messages without storing them.
+        
+        Args:
+            messages: List of processed messages
+            cache_stats: Optional dict receiving embedding cache hit/miss counts
+            budget: Optional IngestionBudget charged for texts actually sent to Gemini
+            
+        Returns:
+            Pinecone vectors (id, values, metadata) for messages that embedded successfully
+        """
+        if not messages:
+            return []
+        
+        # Extract texts for embedding
+        texts = [msg.get("text", msg.get("content", "")) for msg in messages]
+        
+        embeddings = await self.embed_batch(texts, cache_stats, budget)
+        
+        vectors = []
+        for i, (message, embedding) in enumerate(zip(messages, embeddings)):
+            if embedding is None:
+                logger.warning(f"No embedding generated for message {message.get('id', i)}")
+                continue
+            
+            vectors.append({
+                "id": message.get("message_id", message.get("id", f"msg_{i}")),
+                "values": embedding,
+                "metadata": self._prepare_metadata_for_pinecone(message)
+            })
+        
+        return vectors
+    
+    async def _target_namespaces(self, namespace: Optional[str]) -> List[str]:
+        """An explicit namespace, or the active one plus any shadow namespace being built"""
+        if namespace is not None:
+            return [namespace]
+        return await vector_namespaces.get_write_namespaces()
+    
+    async def upsert_vectors(
+        self,
+        vectors: List[Dict[str, Any]],
+        batch_size: int = 100,
+        namespace: Optional[str] = None,
+        budget=None
+    ) -> int:
+        """
+        Store vectors in Pinecone in batches.
+        
+        Args:
+            vectors: Vectors as returned by embed_messages
+            batch_size: Vectors per upsert call (Pinecone batch limit is 100)
+            namespace: Namespace to write (defaults to the live write namespaces)
+            budget: Optional IngestionBudget charged one Pinecone unit per upsert call
+            
+        Returns:
+            Number of vectors stored; failed batches are logged and skipped
+        """
+        stored_count = 0
+        namespaces = await self._target_namespaces(namespace)
+        active = await vector_namespaces.get_active()
+        
+        for i in range(0, len(vectors), batch_size):
+            batch = vectors[i:i + batch_size]
+            
+            try:
+                for target in namespaces:
+                    for partition, partition_vectors in vector_partitions.route(batch, target).items():
+                        if budget is not None:
+                            await budget.acquire("pinecone")
+                        await asyncio.to_thread(self.index.upsert, vectors=partition_vectors, namespace=partition)
+                stored_count += len(batch)
+                if active in namespaces:
+                    local_vector_index.add(batch, active)
+                logger.info(f"Upserted batch {i//batch_size + 1}/{(len(vectors)-1)//batch_size + 1}")
+                
+                # Small delay to avoid rate limiting
+                await asyncio.sleep(0.1)
+                
+            except Exception as e:
+                logger.error(f"Error upserting batch {i//batch_size + 1}: {e}")
+                continue
+        
+        return stored_count
+    
     def _prepare_metadata_for_pinecone(self, message: Dict[str, Any]) -> Dict[str, Any]:
         """
         Prepare message metadata for Pinecone storage.
@@ -244,12 +330,13 @@ class EmbeddingService:
             logger.error(f"Error preparing metadata for Pinecone: {e}")
             return {"content": message.get("content", "")[:1000]}
     
-    async def delete_vectors_by_filter(self, filter_dict: Dict[str, Any]) -> bool:
+    async def delete_vectors_by_filter(self, filter_dict: Dict[str, Any], namespace: Optional[str] = None) -> bool:
         """
         Delete vectors from Pinecone based on metadata filter.
         
         Args:
             filter_dict: Filter criteria for deletion
+            namespace: Namespace to delete from (defaults to the live write namespaces)
             
         Returns:
             True if successful, False otherwise
@@ -257,7 +344,11 @@ class EmbeddingService:
         try:
             logger.info(f"Deleting vectors with filter: {filter_dict}")
             
-            self.index.delete(filter=filter_dict)
+            for target in await self._target_namespaces(namespace):
+                for partition in await vector_partitions.partitions(self.index, target):
+                    await asyncio.to_thread(self.index.delete, filter=filter_dict, namespace=partition)
+            # The local mirror cannot apply filter deletes; it reloads instead
+            local_vector_index.clear()
             
             logger.info("Successfully deleted vectors")
             return True
@@ -265,7 +356,75 @@ class EmbeddingService:
         except Exception as e:
             logger.error(f"Error deleting vectors: {e}")
             return False
-    
+
+    async def delete_vectors(
+        self,
+        ids: List[str],
+        batch_size: int = 1000,
+        namespace: Optional[str] = None,
+        budget=None
+    ) -> bool:
+        """
+        Delete vectors from Pinecone by id. Ids that do not exist are ignored.
+
+        Args:
+            ids: Vector ids to delete
+            batch_size: Ids per delete call (Pinecone limit is 1000)
+            namespace: Namespace to delete from (defaults to the live write namespaces)
+            budget: Optional IngestionBudget charged one Pinecone unit per delete call,
+                i.e. per id batch in every namespace and time partition
+
+        Returns:
+            True if every batch was deleted, False otherwise
+        """
+        try:
+            for target in await self._target_namespaces(namespace):
+                for partition in await vector_partitions.partitions(self.index, target):
+                    for i in range(0, len(ids), batch_size):
+                        if budget is not None:
+                            await budget.acquire("pinecone")
+                        await asyncio.to_thread(self.index.delete, ids=ids[i:i + batch_size], namespace=partition)
+            local_vector_index.delete(ids)
+
+            logger.info(f"Deleted up to {len(ids)} vectors by id")
+            return True
+
+        except Exception as e:
+            logger.error(f"Error deleting vectors by id: {e}")
+            return False
+
+    async def delete_namespace(self, namespace: str) -> bool:
+        """
+        Delete every vector in one namespace, including all its time partitions.
+
+        Args:
+            namespace: Namespace to drop
+
+        Returns:
+            True if successful, False otherwise
+        """
+        try:
+            for partition in await vector_partitions.partitions(self.index, namespace, refresh=True):
+                await asyncio.to_thread(self.index.delete, delete_all=True, namespace=partition)
+            vector_partitions.forget(namespace)
+            if local_vector_index.namespace == namespace:
+                local_vector_index.clear()
+            logger.info(f"Deleted namespace '{namespace}'")
+            return True
+        except Exception as e:
+            logger.error(f"Error deleting namespace '{namespace}': {e}")
+            return False
+
+    async def get_namespace_vector_count(self, namespace: str) -> int:
+        """Vectors currently counted in a namespace and its time partitions (0 if it does not exist)"""
+        try:
+            stats = self.index.describe_index_stats()
+            return sum(summary.vector_count for name, summary in (stats.namespaces or {}).items()
+                       if name == namespace or vector_partitions.period_from_name(namespace, name))
+        except Exception as e:
+            logger.error(f"Error counting vectors in namespace '{namespace}': {e}")
+            return 0
+
     async def get_index_stats(self) -> Dict[str, Any]:
         """Get Pinecone index statistics"""
         try:
@@ -294,7 +453,10 @@ class EmbeddingService:
     
     async def purge_all_vectors(self) -> Dict[str, Any]:
         """
-        Completely purge all vectors from the Pinecone index.
+        Completely purge all vectors from the namespace that serves queries.
+        
+        Rebuilds should use reindex_into_shadow instead, which keeps the
+        current vectors searchable until the new ones are in place.
         
         Returns:
             Dictionary with purge results and statistics
@@ -303,13 +465,15 @@ class EmbeddingService:
             logger.info("Starting complete vector index purge...")
             
             # Get stats before purge
+            namespace = await vector_namespaces.get_active()
             stats_before = await self.get_index_stats()
             vectors_before = stats_before.get("total_vectors", 0)
             
-            logger.info(f"Index contains {vectors_before} vectors before purge")
+            logger.info(f"Index contains {vectors_before} vectors before purge of namespace '{namespace}'")
             
-            # Delete all vectors (no filter = delete everything)
-            self.index.delete(delete_all=True)
+            # Delete all vectors of the active namespace (every time partition of it)
+            await self.delete_namespace(namespace)
+            local_vector_index.clear()
             
             logger.info("Purge command executed, waiting for completion...")
             
@@ -326,6 +490,7 @@ class EmbeddingService:
                 "vectors_before": vectors_before,
                 "vectors_after": vectors_after,
                 "vectors_purged": vectors_before - vectors_after,
+                "namespace": namespace,
                 "index_stats_before": stats_before,
                 "index_stats_after": stats_after
             }
@@ -0,0 +1,215 @@
+"""
+Entity Scanner - Compiled multi-pattern scanner for entity extraction.
+
+The entity pattern table is compiled once per process instead of handing raw
+pattern strings to `re.finditer` on every call. Per-text work that used to be
+repeated for every match is done once per text:
+
+- the important-keyword boost depends only on the text and its context
+- mention counts are computed once per distinct entity value
+- matches are deduplicated by entity key before any Entity is built
+
+Patterns still run as separate compiled scans: several of them overlap (a
+"ticket ABC-1" phrase is reported by two JIRA patterns, capitalised word pairs
+are both names and project/document titles), and a single leftmost alternation
+would drop those overlapping matches and change extraction results.
+"""
+
+import logging
+import re
+import threading
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+IMPORTANT_KEYWORDS = (
+    "important", "critical", "urgent", "deadline", "priority",
+    "assigned", "responsible", "owner", "lead", "manager",
+    "status", "update", "progress", "blocked", "issue"
+)
+
+CONTEXT_WINDOW = 50  # Characters kept on each side of a match
+
+
+@dataclass
+class ScannedEntity:
+    """Best-scoring match for one entity key within a text"""
+    key: str
+    entity_type: str
+    value: str
+    context: str
+    relevance_score: float
+    pattern_description: str
+
+
+class EntityScanner:
+    """
+    Runs a compiled entity pattern table over text and scores the matches.
+    """
+
+    def __init__(self, entity_patterns: Dict[str, List[Dict[str, str]]]):
+        self.rules: List[Tuple[str, str, re.Pattern, int]] = []
+        for entity_type, patterns in entity_patterns.items():
+            for pattern_info in patterns:
+                compiled = re.compile(pattern_info["pattern"], re.IGNORECASE)
+                group = 1 if compiled.groups else 0
+                self.rules.append((entity_type, pattern_info["description"], compiled, group))
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[str, str, str, int, int]]:
+        """
+        Yield (entity_type, description, value, start, end) in pattern table order.
+
+        Values are stripped; values shorter than two characters are skipped.
+        """
+        for entity_type, description, compiled, group in self.rules:
+            for match in compiled.finditer(text):
+                value = match.group(group).strip()
+                if len(value) < 2:
+                    continue
+                yield entity_type, description, value, match.start(), match.end()
+
+    def scan(self, text: str, context: str, generate_key) -> List[ScannedEntity]:
+        """
+        Extract the highest-relevance match per entity key.
+
+        Args:
+            text: Text to analyze
+            context: Additional context about the text (only affects scoring)
+            generate_key: Callable(entity_type, value) -> entity key
+
+        Returns:
+            One ScannedEntity per key, in order of first appearance
+        """
+        keyword_hits = self.count_keyword_hits(text, context)
+        scorer = _MentionScorer(text, keyword_hits)
+        keys: Dict[Tuple[str, str], str] = {}
+        best: Dict[str, ScannedEntity] = {}
+
+        for entity_type, description, value, start, end in self.iter_matches(text):
+            key = keys.get((entity_type, value))
+            if key is None:
+                key = generate_key(entity_type, value)
+                keys[(entity_type, value)] = key
+
+            relevance_score = scorer.score(value)
+            current = best.get(key)
+            if current is not None and relevance_score <= current.relevance_score:
+                continue
+
+            surrounding_context = text[max(0, start - CONTEXT_WINDOW):min(len(text), end + CONTEXT_WINDOW)].strip()
+            best[key] = ScannedEntity(
+                key=key,
+                entity_type=entity_type,
+                value=value,
+                context=surrounding_context,
+                relevance_score=relevance_score,
+                pattern_description=description
+            )
+
+        return list(best.values())
+
+    @staticmethod
+    def count_keyword_hits(text: str, context: str) -> int:
+        """Number of important keywords present in the text and its context"""
+        context_text = (text + " " + context).lower()
+        return sum(1 for keyword in IMPORTANT_KEYWORDS if keyword in context_text)
+
+
+def calculate_relevance(mentions: int, keyword_hits: int) -> float:
+    """
+    Relevance score for an entity value.
+
+    Args:
+        mentions: Case-insensitive occurrences of the value in the text
+        keyword_hits: Important keywords present in the text and its context
+
+    Returns:
+        Score capped at 2.0
+    """
+    base_score = 1.0
+
+    # Boost score for entities mentioned multiple times
+    if mentions > 1:
+        base_score *= (1 + (mentions - 1) * 0.2)
+
+    # Boost score for important context keywords (one factor per keyword)
+    for _ in range(keyword_hits):
+        base_score *= 1.1
+
+    return min(base_score, 2.0)  # Cap at 2.0
+
+
+def count_mentions(value: str, text: str, text_lower: Optional[str] = None) -> int:
+    """
+    Case-insensitive, non-overlapping occurrences of value in text.
+
+    text_lower must come from ascii_folded_text(text); with it, ASCII values are
+    counted with a plain substring count instead of a regex scan.
+    """
+    if text_lower is not None and value.isascii():
+        return text_lower.count(value.lower())
+    return len(re.findall(re.escape(value), text, re.IGNORECASE))
+
+
+def ascii_folded_text(text: str) -> Optional[str]:
+    """
+    Lower-cased text if ASCII values can be matched in it by substring count.
+
+    That holds when no non-ASCII character case-maps to ASCII (e.g. the Kelvin
+    sign or long s, which IGNORECASE matches against 'k' and 's'); otherwise None.
+    """
+    if not text.isascii():
+        for char in set(text):
+            if char.isascii():
+                continue
+            if any(c.isascii() for variant in (char.lower(), char.upper(), char.casefold()) for c in variant):
+                return None
+    return text.lower()
+
+
+class _MentionScorer:
+    """Per-text relevance scoring with mention counts memoized by value"""
+
+    def __init__(self, text: str, keyword_hits: int):
+        self.text = text
+        self.text_lower = ascii_folded_text(text)
+        self.keyword_hits = keyword_hits
+        self._scores: Dict[str, float] = {}
+
+    def score(self, value: str) -> float:
+        score = self._scores.get(value)
+        if score is None:
+            score = calculate_relevance(count_mentions(value, self.text, self.text_lower), self.keyword_hits)
+            self._scores[value] = score
+        return score
+
+
+_scanners: Dict[Tuple, EntityScanner] = {}
+_scanners_lock = threading.Lock()
+
+
+def get_entity_scanner(entity_patterns: Dict[str, List[Dict[str, str]]]) -> EntityScanner:
+    """
+    Get the process-wide scanner for a pattern table, compiling it on first use.
+
+    Args:
+        entity_patterns: Pattern table as returned by EntityStore._load_entity_patterns
+
+    Returns:
+        Shared EntityScanner
+    """
+    signature = tuple(
+        (entity_type, pattern_info["pattern"], pattern_info["description"])
+        for entity_type, patterns in entity_patterns.items()
+        for pattern_info in patterns
+    )
+    scanner = _scanners.get(signature)
+    if scanner is None:
+        with _scanners_lock:
+            scanner = _scanners.get(signature)
+            if scanner is None:
+                scanner = EntityScanner(entity_patterns)
+                _scanners[signature] = scanner
+                logger.debug(f"Compiled entity scanner with {len(scanner.rules)} patterns")
+    return scanner
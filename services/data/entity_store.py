@@ -4,8 +4,8 @@ Stores and retrieves specific facts, entities, and relationships from conversati
 """
 
 import logging
-import json
 import re
+import time
 from typing import Dict, Any, List, Optional, Tuple, Set
 from datetime import datetime, timedelta
 from dataclasses import dataclass, asdict, field
@@ -13,9 +13,22 @@ from copy import deepcopy
 
 from config import settings
 from services.core.memory_service import MemoryService
+from services.core.serialization import encode_payload, decode_payload
+from services.data.entity_scanner import EntityScanner, calculate_relevance, count_mentions, get_entity_scanner
+
+try:
+    from redis.exceptions import WatchError
+except ImportError:
+    class WatchError(Exception):
+        """Placeholder so the Redis merge path can be declared without redis installed"""
 
 logger = logging.getLogger(__name__)
 
+ENTITY_STORE_TTL = 86400 * 7  # 7 days, refreshed on every write
+ENTITY_MERGE_MAX_ATTEMPTS = 5
+COMPACTION_CURSOR_KEY = "entity_compaction:cursor"
+COMPACTION_SCAN_COUNT = 100  # SCAN hint per round trip
+
 @dataclass
 class EntityContext:
     """Represents a single context where an entity was mentioned"""
@@ -44,6 +57,12 @@ class Entity:
     mentioned_at: Optional[str] = None  # Deprecated - use first_mentioned_at/last_mentioned_at
     
     def __post_init__(self):
+        # Contexts decoded from storage arrive as plain dicts
+        self.contexts = [
+            EntityContext(**ctx) if isinstance(ctx, dict) else ctx
+            for ctx in self.contexts
+        ]
+
         # Handle legacy single context format
         if self.context and not self.contexts:
             legacy_context = EntityContext(
@@ -66,7 +85,8 @@ class Entity:
     def add_context(self, context: EntityContext) -> None:
         """Add a new context mention to this entity"""
         self.contexts.append(context)
-        self.mention_count = len(self.contexts)
+        # Compaction trims old contexts, so the count can exceed len(contexts)
+        self.mention_count = max(self.mention_count + 1, len(self.contexts))
         
         # Update timestamps
         if not self.first_mentioned_at or context.mentioned_at < self.first_mentioned_at:
@@ -117,6 +137,7 @@ class EntityStore:
     def __init__(self, memory_service: MemoryService = None):
         self.memory_service = memory_service or MemoryService()
         self.entity_patterns = self._load_entity_patterns()
+        self.entity_scanner = get_entity_scanner(self.entity_patterns)
         
     def _load_entity_patterns(self) -> Dict[str, List[Dict[str, str]]]:
         """Load entity extraction patterns for different entity types"""
@@ -174,53 +195,20 @@ class EntityStore:
         Returns:
             List of extracted entities
         """
-        entities = []
-        
         try:
-            for entity_type, patterns in self.entity_patterns.items():
-                for pattern_info in patterns:
-                    pattern = pattern_info["pattern"]
-                    matches = re.finditer(pattern, text, re.IGNORECASE)
-                    
-                    for match in matches:
-                        # Extract the entity value
-                        entity_value = match.group(1) if match.groups() else match.group(0)
-                        entity_value = entity_value.strip()
-                        
-                        if not entity_value or len(entity_value) < 2:
-                            continue
-                        
-                        # Create entity key
-                        entity_key = self._generate_entity_key(entity_type, entity_value)
-                        
-                        # Calculate relevance score based on context
-                        relevance_score = self._calculate_relevance(entity_value, text, context)
-                        
-                        # Extract surrounding context
-                        start_idx = max(0, match.start() - 50)
-                        end_idx = min(len(text), match.end() + 50)
-                        surrounding_context = text[start_idx:end_idx].strip()
-                        
-                        # Create entity
-                        entity = self.create_entity(
-                            key=entity_key,
-                            entity_type=entity_type,
-                            value=entity_value,
-                            context=surrounding_context,
-                            conversation_key=conversation_key,
-                            relevance_score=relevance_score,
-                            aliases=self._generate_aliases(entity_type, entity_value),
-                            metadata={
-                                "pattern_used": pattern_info["description"],
-                                "match_position": match.span(),
-                                "full_text_length": len(text)
-                            }
-                        )
-                        
-                        entities.append(entity)
-            
-            # Deduplicate entities
-            entities = self._deduplicate_entities(entities)
+            entities = [
+                self.create_entity(
+                    key=match.key,
+                    entity_type=match.entity_type,
+                    value=match.value,
+                    context=match.context,
+                    conversation_key=conversation_key,
+                    relevance_score=match.relevance_score,
+                    aliases=self._generate_aliases(match.entity_type, match.value),
+                    metadata={"pattern_used": match.pattern_description}
+                )
+                for match in self.entity_scanner.scan(text, context, self._generate_entity_key)
+            ]
             
             logger.info(f"Extracted {len(entities)} entities from text: {[e.key for e in entities]}")
             return entities
@@ -239,26 +227,10 @@ class EntityStore:
     
     def _calculate_relevance(self, entity_value: str, full_text: str, context: str) -> float:
         """Calculate relevance score for an entity based on context"""
-        base_score = 1.0
-        
-        # Boost score for entities mentioned multiple times
-        mentions = len(re.findall(re.escape(entity_value), full_text, re.IGNORECASE))
-        if mentions > 1:
-            base_score *= (1 + (mentions - 1) * 0.2)
-        
-        # Boost score for important context keywords
-        important_keywords = [
-            "important", "critical", "urgent", "deadline", "priority",
-            "assigned", "responsible", "owner", "lead", "manager",
-            "status", "update", "progress", "blocked", "issue"
-        ]
-        
-        context_text = (full_text + " " + context).lower()
-        for keyword in important_keywords:
-            if keyword in context_text:
-                base_score *= 1.1
-        
-        return min(base_score, 2.0)  # Cap at 2.0
+        return calculate_relevance(
+            count_mentions(entity_value, full_text),
+            EntityScanner.count_keyword_hits(full_text, context)
+        )
     
     def _generate_aliases(self, entity_type: str, entity_value: str) -> List[str]:
         """Generate alternative names/references for an entity"""
@@ -289,20 +261,6 @@ class EntityStore:
         
         return aliases
     
-    def _deduplicate_entities(self, entities: List[Entity]) -> List[Entity]:
-        """Remove duplicate entities, keeping the highest relevance score"""
-        entity_map = {}
-        
-        for entity in entities:
-            if entity.key in entity_map:
-                # Keep the entity with higher relevance score
-                if entity.relevance_score > entity_map[entity.key].relevance_score:
-                    entity_map[entity.key] = entity
-            else:
-                entity_map[entity.key] = entity
-        
-        return list(entity_map.values())
-    
     def create_entity(
         self,
         key: str,
@@ -353,30 +311,14 @@ class EntityStore:
             mention_count=1
         )
     
-    async def _get_existing_entity(self, entity_store_key: str, entity_key: str) -> Optional[Entity]:
-        """Retrieve an existing entity from storage"""
-        try:
-            if self.memory_service.redis_available and self.memory_service.redis_client:
-                hget_result = self.memory_service.redis_client.hget(entity_store_key, entity_key)
-                if hasattr(hget_result, '__await__'):
-                    entity_json = await hget_result
-                else:
-                    entity_json = hget_result
-            else:
-                # Use in-memory fallback
-                cache_item = self.memory_service._memory_cache.get(entity_store_key)
-                if cache_item and (not cache_item['expiry'] or datetime.now() < cache_item['expiry']):
-                    entity_json = cache_item['data'].get(entity_key)
-                else:
-                    entity_json = None
-            
-            if entity_json:
-                entity_dict = json.loads(entity_json)
-                return Entity(**entity_dict)
+    def _decode_entity(self, entity_json: Optional[str], entity_key: str) -> Optional[Entity]:
+        """Decode a stored entity payload (None if missing or unreadable)"""
+        if not entity_json:
             return None
-            
+        try:
+            return Entity(**decode_payload(entity_json))
         except Exception as e:
-            logger.warning(f"Error retrieving existing entity {entity_key}: {e}")
+            logger.warning(f"Error decoding existing entity {entity_key}: {e}")
             return None
     
     def _merge_entities(self, existing: Entity, new: Entity) -> Entity:
@@ -426,65 +368,146 @@ class EntityStore:
         logger.debug(f"Merged entity {merged.key}: {len(merged.contexts)} contexts, score {merged.relevance_score:.2f}")
         return merged
     
-    async def _execute_redis_pipeline(self, entity_store_key: str, batch_entities: Dict[str, str]) -> bool:
+    def _apply_entities(
+        self,
+        stored: Dict[str, Optional[str]],
+        entities: List[Entity],
+        merge_duplicates: bool
+    ) -> Tuple[Dict[str, str], int]:
         """
-        Execute batched Redis operations using pipeline for optimal performance.
+        Fold a batch of entities onto the stored payloads for their keys.
+        
+        Entities sharing a key within the batch are merged cumulatively, exactly
+        as if they had been stored one after another.
         
         Args:
-            entity_store_key: Redis hash key for the entity store
-            batch_entities: Dictionary of entity_key -> entity_json_data
+            stored: entity_key -> stored payload (None when absent)
+            entities: Entities to store
+            merge_duplicates: Whether to merge with existing entities
             
         Returns:
-            True if successful, False otherwise
+            Tuple of (entity_key -> payload to write, entity_key -> last-mentioned
+            epoch for the retention index, number of merges)
         """
-        try:
-            if not self.memory_service.redis_available or not self.memory_service.redis_client:
-                return False
-            
-            # Create Redis pipeline for batched operations
-            if hasattr(self.memory_service.redis_client, 'pipeline'):
-                # Use Redis pipeline for batched operations
-                pipeline = self.memory_service.redis_client.pipeline()
-                
-                # Add all HSET operations to the pipeline
-                for entity_key, entity_data in batch_entities.items():
-                    pipeline.hset(entity_store_key, entity_key, entity_data)
-                
-                # Set TTL on the hash (only need to do this once)
-                pipeline.expire(entity_store_key, 86400 * 7)  # 7 days
-                
-                # Execute all operations in a single network round-trip
-                pipeline_result = pipeline.execute()
-                
-                # Await the result if it's a coroutine
-                if hasattr(pipeline_result, '__await__'):
-                    await pipeline_result
-                
-                logger.debug(f"Batch stored {len(batch_entities)} entities using Redis pipeline")
-                return True
-                
-            else:
-                # Fallback to individual operations if pipeline not available
-                for entity_key, entity_data in batch_entities.items():
-                    hset_result = self.memory_service.redis_client.hset(
-                        entity_store_key, 
-                        entity_key, 
-                        entity_data
-                    )
-                    if hasattr(hset_result, '__await__'):
-                        await hset_result
-                
-                # Set TTL once at the end
-                expire_result = self.memory_service.redis_client.expire(entity_store_key, 86400 * 7)
-                if hasattr(expire_result, '__await__'):
-                    await expire_result
-                
-                logger.debug(f"Batch stored {len(batch_entities)} entities using individual Redis operations")
-                return True
+        final_entities: Dict[str, Entity] = {}
+        merged_count = 0
+        
+        for entity in entities:
+            final_entity = entity
+            
+            if merge_duplicates:
+                existing_entity = final_entities.get(entity.key)
+                if existing_entity is None:
+                    existing_entity = self._decode_entity(stored.get(entity.key), entity.key)
+                if existing_entity:
+                    # Merge the new entity with existing one
+                    final_entity = self._merge_entities(existing_entity, entity)
+                    merged_count += 1
+                    logger.debug(f"Merged entity {entity.key}: {existing_entity.mention_count} -> {final_entity.mention_count} mentions")
+            
+            final_entities[entity.key] = final_entity
+        
+        payloads = {key: encode_payload(asdict(entity)) for key, entity in final_entities.items()}
+        mentioned = {key: self._last_mentioned_timestamp(entity) for key, entity in final_entities.items()}
+        return payloads, mentioned, merged_count
+    
+    async def _store_entities_redis(
+        self,
+        conversation_key: str,
+        entities: List[Entity],
+        merge_duplicates: bool
+    ) -> int:
+        """
+        Merge and write entities in one optimistic Redis transaction.
+        
+        The hash is WATCHed while the affected fields are read with a single
+        HMGET; the merged payloads, their retention index scores and the TTLs are
+        written in MULTI/EXEC. A concurrent writer invalidates the transaction and
+        the merge is retried on fresh data, so no update is lost.
+        
+        Returns:
+            Number of entities merged with existing ones
+        """
+        entity_store_key = f"{conversation_key}:entity_store"
+        index_key = f"{conversation_key}:entity_index"
+        entity_keys = list(dict.fromkeys(entity.key for entity in entities))
+        
+        for attempt in range(1, ENTITY_MERGE_MAX_ATTEMPTS + 1):
+            async with self.memory_service.redis_client.pipeline(transaction=True) as pipeline:
+                try:
+                    stored = {}
+                    if merge_duplicates:
+                        await pipeline.watch(entity_store_key)
+                        stored = dict(zip(entity_keys, await pipeline.hmget(entity_store_key, entity_keys)))
+                        pipeline.multi()
+                    
+                    payloads, mentioned, merged_count = self._apply_entities(stored, entities, merge_duplicates)
+                    pipeline.hset(entity_store_key, mapping=payloads)
+                    pipeline.zadd(index_key, mentioned)
+                    pipeline.expire(entity_store_key, ENTITY_STORE_TTL)
+                    pipeline.expire(index_key, ENTITY_STORE_TTL)
+                    await pipeline.execute()
+                    return merged_count
                 
-        except Exception as e:
-            logger.error(f"Error in Redis pipeline execution: {e}")
-            return False
+                except WatchError:
+                    logger.debug(f"Entity store {entity_store_key} changed during merge (attempt {attempt}), retrying")
+        
+        raise RuntimeError(f"Entity merge for {entity_store_key} kept conflicting after {ENTITY_MERGE_MAX_ATTEMPTS} attempts")
+    
+    def _store_entities_memory(
+        self,
+        conversation_key: str,
+        entities: List[Entity],
+        merge_duplicates: bool
+    ) -> int:
+        """
+        In-memory fallback with the same semantics as the Redis transaction.
+        
+        Runs without awaiting, so it cannot interleave with another store on
+        the event loop.
+        
+        Returns:
+            Number of entities merged with existing ones
+        """
+        entity_store_key = f"{conversation_key}:entity_store"
+        index_key = f"{conversation_key}:entity_index"
+        entity_hash = dict(self._get_memory_hash(entity_store_key))
+        entity_index = dict(self._get_memory_hash(index_key))
+        
+        payloads, mentioned, merged_count = self._apply_entities(entity_hash, entities, merge_duplicates)
+        entity_hash.update(payloads)
+        entity_index.update(mentioned)
+        
+        self._store_memory_hash(entity_store_key, entity_hash)
+        self._store_memory_hash(index_key, entity_index)
+        return merged_count
+    
+    def _get_memory_hash(self, key: str) -> Dict[str, Any]:
+        """Get an unexpired hash (or sorted-set mapping) from the in-memory fallback"""
+        cache_item = self.memory_service._memory_cache.get(key)
+        if not cache_item or (cache_item['expiry'] and datetime.now() >= cache_item['expiry']):
+            return {}
+        return cache_item['data']
+    
+    def _store_memory_hash(self, key: str, data: Dict[str, Any]) -> None:
+        """Store a mapping in the in-memory fallback, refreshing its TTL like EXPIRE"""
+        # Re-assigning also refreshes the cache size accounting
+        self.memory_service._memory_cache[key] = {
+            'data': data,
+            'expiry': datetime.now() + timedelta(seconds=ENTITY_STORE_TTL)
+        }
+    
+    @staticmethod
+    def _last_mentioned_timestamp(entity: Entity) -> float:
+        """Epoch seconds of an entity's most recent mention (now if unknown)"""
+        mentioned_at = entity.last_mentioned_at or entity.mentioned_at
+        if mentioned_at:
+            try:
+                mentioned = datetime.fromisoformat(mentioned_at.replace('Z', '+00:00'))
+                return mentioned.timestamp()
+            except (TypeError, ValueError):
+                pass
+        return time.time()
     
     async def store_entities(
         self, 
@@ -504,57 +527,200 @@ class EntityStore:
             True if successful, False otherwise
         """
         try:
-            entity_store_key = f"{conversation_key}:entity_store"
-            
-            stored_count = 0
-            merged_count = 0
-            
-            for entity in entities:
-                final_entity = entity
-                
-                if merge_duplicates:
-                    # Check if entity already exists
-                    existing_entity = await self._get_existing_entity(entity_store_key, entity.key)
-                    if existing_entity:
-                        # Merge the new entity with existing one
-                        final_entity = self._merge_entities(existing_entity, entity)
-                        merged_count += 1
-                        logger.debug(f"Merged entity {entity.key}: {existing_entity.mention_count} -> {final_entity.mention_count} mentions")
-                
-                # Convert entity to JSON and prepare for batch storage
-                entity_data = json.dumps(asdict(final_entity), default=str)
-                
-                # Collect entities for batch storage
-                if self.memory_service.redis_available and self.memory_service.redis_client:
-                    # We'll batch these after the loop
-                    if not hasattr(self, '_batch_entities'):
-                        self._batch_entities = {}
-                    self._batch_entities[final_entity.key] = entity_data
-                else:
-                    # Use in-memory fallback
-                    if entity_store_key not in self.memory_service._memory_cache:
-                        self.memory_service._memory_cache[entity_store_key] = {
-                            'data': {},
-                            'expiry': datetime.now() + timedelta(days=7)
-                        }
-                    
-                    self.memory_service._memory_cache[entity_store_key]['data'][final_entity.key] = entity_data
-                
-                stored_count += 1
+            if not entities:
+                return True
             
-            # Batch Redis operations using pipeline for better performance
-            if self.memory_service.redis_available and self.memory_service.redis_client and hasattr(self, '_batch_entities'):
-                await self._execute_redis_pipeline(entity_store_key, self._batch_entities)
-                # Clean up batch storage
-                delattr(self, '_batch_entities')
+            if self.memory_service.redis_available and self.memory_service.redis_client:
+                merged_count = await self._store_entities_redis(conversation_key, entities, merge_duplicates)
+            else:
+                merged_count = self._store_entities_memory(conversation_key, entities, merge_duplicates)
             
-            logger.info(f"Stored {stored_count} entities for conversation: {conversation_key} ({merged_count} merged with existing)")
+            logger.info(f"Stored {len(entities)} entities for conversation: {conversation_key} ({merged_count} merged with existing)")
             return True
             
         except Exception as e:
             logger.error(f"Error storing entities: {e}")
             return False
     
+    def _plan_compaction(
+        self,
+        stored: Dict[str, str],
+        index: Dict[str, float],
+        now: float
+    ) -> Tuple[Dict[str, str], List[str], Dict[str, float], Dict[str, int]]:
+        """
+        Decide what compaction changes in one conversation's entity hash.
+        
+        Entities whose last mention is older than the retention window are
+        evicted, context lists are trimmed to the most recent mentions, and if
+        the hash is still over its memory budget the least recently mentioned
+        entities are evicted until it fits.
+        
+        Args:
+            stored: entity_key -> payload
+            index: entity_key -> last-mentioned epoch (may be incomplete for legacy hashes)
+            now: Current epoch seconds
+            
+        Returns:
+            Tuple of (payloads to rewrite, entity keys to remove, index entries
+            to (re)write, statistics)
+        """
+        cutoff = now - settings.ENTITY_RETENTION_DAYS * 86400
+        rewrites: Dict[str, str] = {}
+        removals: List[str] = []
+        kept: Dict[str, float] = {}
+        sizes: Dict[str, int] = {}
+        stats = {"entities_scanned": len(stored), "evicted_stale": 0, "evicted_budget": 0,
+                 "evicted_unreadable": 0, "contexts_trimmed": 0, "bytes_before": 0, "bytes_after": 0}
+        
+        for entity_key, payload in stored.items():
+            stats["bytes_before"] += len(payload)
+            entity = self._decode_entity(payload, entity_key)
+            if entity is None:
+                removals.append(entity_key)
+                stats["evicted_unreadable"] += 1
+                continue
+            
+            mentioned = index.get(entity_key) or self._last_mentioned_timestamp(entity)
+            if mentioned < cutoff:
+                removals.append(entity_key)
+                stats["evicted_stale"] += 1
+                continue
+            
+            if len(entity.contexts) > settings.ENTITY_MAX_CONTEXTS:
+                stats["contexts_trimmed"] += len(entity.contexts) - settings.ENTITY_MAX_CONTEXTS
+                recent = sorted(entity.contexts, key=lambda c: c.mentioned_at)[-settings.ENTITY_MAX_CONTEXTS:]
+                entity.contexts = recent
+                payload = encode_payload(asdict(entity))
+                rewrites[entity_key] = payload
+            
+            kept[entity_key] = mentioned
+            sizes[entity_key] = len(payload)
+        
+        # Enforce the per-conversation memory budget, evicting least recently mentioned first
+        total_bytes = sum(sizes.values())
+        for entity_key in sorted(kept, key=kept.get):
+            if total_bytes <= settings.ENTITY_STORE_MAX_BYTES:
+                break
+            total_bytes -= sizes[entity_key]
+            del kept[entity_key]
+            rewrites.pop(entity_key, None)
+            removals.append(entity_key)
+            stats["evicted_budget"] += 1
+        
+        stats["bytes_after"] = total_bytes
+        return rewrites, removals, kept, stats
+    
+    async def compact_conversation(self, conversation_key: str, now: Optional[float] = None) -> Dict[str, int]:
+        """
+        Compact one conversation's entity hash and retention index.
+        
+        Args:
+            conversation_key: Source conversation identifier
+            now: Current epoch seconds (defaults to time.time())
+            
+        Returns:
+            Compaction statistics (empty if the hash kept changing underneath)
+        """
+        now = now or time.time()
+        entity_store_key = f"{conversation_key}:entity_store"
+        index_key = f"{conversation_key}:entity_index"
+        
+        if not (self.memory_service.redis_available and self.memory_service.redis_client):
+            entity_hash = dict(self._get_memory_hash(entity_store_key))
+            rewrites, removals, kept, stats = self._plan_compaction(entity_hash, self._get_memory_hash(index_key), now)
+            for entity_key in removals:
+                entity_hash.pop(entity_key, None)
+            entity_hash.update(rewrites)
+            if entity_hash:
+                self._store_memory_hash(entity_store_key, entity_hash)
+                self._store_memory_hash(index_key, kept)
+            else:
+                self.memory_service._memory_cache.pop(entity_store_key, None)
+                self.memory_service._memory_cache.pop(index_key, None)
+            return stats
+        
+        for attempt in range(1, ENTITY_MERGE_MAX_ATTEMPTS + 1):
+            async with self.memory_service.redis_client.pipeline(transaction=True) as pipeline:
+                try:
+                    await pipeline.watch(entity_store_key, index_key)
+                    stored = await pipeline.hgetall(entity_store_key)
+                    index = dict(await pipeline.zrange(index_key, 0, -1, withscores=True))
+                    rewrites, removals, kept, stats = self._plan_compaction(stored, index, now)
+                    orphans = [entity_key for entity_key in index if entity_key not in stored]
+                    
+                    pipeline.multi()
+                    if removals:
+                        pipeline.hdel(entity_store_key, *removals)
+                    if rewrites:
+                        pipeline.hset(entity_store_key, mapping=rewrites)
+                    if removals or orphans:
+                        pipeline.zrem(index_key, *removals, *orphans)
+                    if kept:
+                        # Backfills the index for hashes written before it existed
+                        pipeline.zadd(index_key, kept)
+                    await pipeline.execute()
+                    return stats
+                
+                except WatchError:
+                    logger.debug(f"Entity store {entity_store_key} changed during compaction (attempt {attempt}), retrying")
+        
+        logger.warning(f"Skipped compaction of {entity_store_key}: kept conflicting with concurrent writes")
+        return {}
+    
+    async def compact_entity_stores(self, max_conversations: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Incrementally compact entity stores across conversations.
+        
+        Redis keys are walked with SCAN; the cursor is persisted between runs so
+        each run handles a bounded slice and successive runs cover every store.
+        
+        Args:
+            max_conversations: Entity stores to visit this run (defaults to ENTITY_COMPACTION_BATCH)
+            
+        Returns:
+            Aggregated compaction statistics
+        """
+        max_conversations = max_conversations or settings.ENTITY_COMPACTION_BATCH
+        totals: Dict[str, Any] = {"conversations_compacted": 0, "pass_completed": False}
+        
+        def accumulate(stats: Dict[str, int]) -> None:
+            totals["conversations_compacted"] += 1
+            for name, value in stats.items():
+                totals[name] = totals.get(name, 0) + value
+        
+        if not (self.memory_service.redis_available and self.memory_service.redis_client):
+            store_keys = [key for key in list(self.memory_service._memory_cache) if key.endswith(":entity_store")]
+            for store_key in store_keys:
+                accumulate(await self.compact_conversation(store_key[:-len(":entity_store")]))
+            totals["pass_completed"] = True
+            return totals
+        
+        redis_client = self.memory_service.redis_client
+        cursor = int(await redis_client.get(COMPACTION_CURSOR_KEY) or 0)
+        visited = 0
+        while True:
+            cursor, store_keys = await redis_client.scan(
+                cursor, match="*:entity_store", count=min(COMPACTION_SCAN_COUNT, max_conversations))
+            for store_key in store_keys:
+                accumulate(await self.compact_conversation(store_key[:-len(":entity_store")]))
+            visited += len(store_keys)
+            if cursor == 0 or visited >= max_conversations:
+                break
+        
+        if cursor == 0:
+            await redis_client.delete(COMPACTION_CURSOR_KEY)
+            totals["pass_completed"] = True
+        else:
+            await redis_client.set(COMPACTION_CURSOR_KEY, cursor, ex=ENTITY_STORE_TTL)
+        
+        logger.info(
+            f"Entity compaction visited {totals['conversations_compacted']} stores: "
+            f"{totals.get('evicted_stale', 0)} stale and {totals.get('evicted_budget', 0)} over-budget entities evicted, "
+            f"{totals.get('contexts_trimmed', 0)} contexts trimmed"
+        )
+        return totals
+    
     async def search_entities(
         self, 
         query_keywords: List[str],
@@ -597,7 +763,7 @@ class EntityStore:
             if entity_data:
                 for entity_key, entity_json in entity_data.items():
                     try:
-                        entity_dict = json.loads(entity_json)
+                        entity_dict = decode_payload(entity_json)
                         entity = Entity(**entity_dict)
                         
                         # Filter by entity type if specified
@@ -687,7 +853,7 @@ class EntityStore:
                     entity_json = None
             
             if entity_json:
-                entity_dict = json.loads(entity_json)
+                entity_dict = decode_payload(entity_json)
                 return Entity(**entity_dict)
             
             return None
@@ -726,7 +892,7 @@ class EntityStore:
             
             for entity_key, entity_json in entity_data.items():
                 try:
-                    entity_dict = json.loads(entity_json)
+                    entity_dict = decode_payload(entity_json)
                     entity = Entity(**entity_dict)
                     
                     # Count by type
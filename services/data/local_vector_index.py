@@ -0,0 +1,626 @@
+"""
+Local Vector Index - In-process mirror of recent vectors for local retrieval.
+
+Every VectorSearchTool.search used to be a Pinecone round trip, although most
+questions are about the last few weeks of discussion. This index keeps the
+vectors of the active namespace whose messages fall inside
+LOCAL_VECTOR_INDEX_WINDOW_DAYS in a NumPy matrix and answers searches from it:
+
+- fed by the same upserts and deletes as Pinecone (EmbeddingService), and
+  seeded from Pinecone in the background (list + fetch) when it starts empty
+- exact cosine search over L2-normalised rows: one matrix-vector product,
+  a few milliseconds at the configured cap, so no approximate graph
+  (HNSW) structure is needed
+- a search is served locally only once the window is fully loaded and the
+  k-th best local score reaches LOCAL_VECTOR_INDEX_MIN_SCORE; otherwise the
+  caller falls through to Pinecone
+- an in-memory mirror only sees this process's writes, so its trust expires
+  after LOCAL_VECTOR_INDEX_REFRESH_SECONDS: searches fall through while it
+  resyncs with Pinecone, fetching vectors other processes (Celery workers)
+  added and dropping the ones they deleted
+- seeding lists ids and fetches only the ones not mirrored yet; it reads the
+  time partitions overlapping the window when partitioning is on, and is
+  skipped for sources holding more than LOCAL_VECTOR_INDEX_SEED_MAX_VECTORS
+- Pinecone-style metadata filters ($eq, $ne, $in, $nin, $gt(e), $lt(e),
+  $and, $or) are evaluated locally; anything else falls through
+
+Without Pinecone (tests, benchmarks, offline runs) the index can be loaded
+directly and searched as the source of truth.
+
+With LOCAL_VECTOR_SNAPSHOT_DIR set, rows are kept in a memory-mapped
+VectorSnapshot instead of process memory: every process that writes vectors
+(ingestion workers included) appends to it, and a restarted web process opens
+it in constant time and only seeds from Pinecone if it was never completed.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from config import settings
+from services.data.vector_snapshot import SnapshotChanged, VectorSnapshot
+
+# NumPy is optional - without it the local index stays disabled
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+    np = None
+
+logger = logging.getLogger(__name__)
+
+SEED_FETCH_BATCH = 100  # Ids per Pinecone fetch while seeding
+SEED_RETRY_SECONDS = 600  # Wait after a failed seed before trying again
+SNAPSHOT_SEARCH_ATTEMPTS = 2  # Re-scores when another process compacts the snapshot mid-search
+COMPARISONS = {
+    "$eq": lambda value, operand: value == operand,
+    "$ne": lambda value, operand: value != operand,
+    "$in": lambda value, operand: value in operand,
+    "$nin": lambda value, operand: value not in operand,
+    "$gt": lambda value, operand: value is not None and value > operand,
+    "$gte": lambda value, operand: value is not None and value >= operand,
+    "$lt": lambda value, operand: value is not None and value < operand,
+    "$lte": lambda value, operand: value is not None and value <= operand,
+}
+
+
+class UnsupportedFilter(ValueError):
+    """A metadata filter the local index cannot evaluate"""
+
+
+def matches_filter(metadata: Dict[str, Any], filters: Optional[Dict[str, Any]]) -> bool:
+    """
+    Evaluate a Pinecone metadata filter against one vector's metadata.
+
+    Raises:
+        UnsupportedFilter: For operators Pinecone has that are not implemented here
+    """
+    if not filters:
+        return True
+    for key, condition in filters.items():
+        if key == "$and":
+            if not all(matches_filter(metadata, clause) for clause in condition):
+                return False
+        elif key == "$or":
+            if not any(matches_filter(metadata, clause) for clause in condition):
+                return False
+        elif key.startswith("$"):
+            raise UnsupportedFilter(key)
+        elif isinstance(condition, dict):
+            value = metadata.get(key)
+            for operator, operand in condition.items():
+                if operator not in COMPARISONS:
+                    raise UnsupportedFilter(operator)
+                try:
+                    if not COMPARISONS[operator](value, operand):
+                        return False
+                except TypeError:
+                    return False
+        elif metadata.get(key) != condition:
+            return False
+    return True
+
+
+def _vector_time(metadata: Dict[str, Any], default: float) -> float:
+    """Epoch seconds of the message behind a vector (ISO `timestamp` metadata)"""
+    timestamp = (metadata or {}).get("timestamp")
+    if timestamp:
+        try:
+            return datetime.fromisoformat(str(timestamp)).timestamp()
+        except ValueError:
+            pass
+    return default
+
+
+def _field(item: Any, name: str, default: Any = None) -> Any:
+    """Attribute or key access for Pinecone response objects and plain dicts"""
+    if isinstance(item, dict):
+        return item.get(name, default)
+    return getattr(item, name, default)
+
+
+class LocalVectorIndex:
+    """
+    Process-wide mirror of the recent part of the active Pinecone namespace.
+    """
+
+    def __init__(
+        self,
+        window_days: Optional[int] = None,
+        max_vectors: Optional[int] = None,
+        min_score: Optional[float] = None,
+        enabled: Optional[bool] = None,
+        seed: Optional[bool] = None,
+        snapshot_dir: Optional[str] = None,
+        refresh_seconds: Optional[int] = None,
+        seed_max_vectors: Optional[int] = None
+    ):
+        """
+        Args:
+            window_days: Age of messages mirrored
+            max_vectors: Vectors kept; the oldest are evicted beyond this
+            min_score: Weakest k-th score a search may be answered with locally
+            enabled: Overrides LOCAL_VECTOR_INDEX_ENABLED (needs NumPy)
+            seed: Whether an empty mirror loads its window from Pinecone
+            snapshot_dir: Overrides LOCAL_VECTOR_SNAPSHOT_DIR ("" keeps rows in memory)
+            refresh_seconds: How long an in-memory mirror is trusted before it resyncs (0 = always)
+            seed_max_vectors: Largest total size of the seed sources that is listed and fetched
+        """
+        self.window_seconds = (window_days or settings.LOCAL_VECTOR_INDEX_WINDOW_DAYS) * 86400
+        self.max_vectors = max_vectors or settings.LOCAL_VECTOR_INDEX_MAX_VECTORS
+        self.min_score = settings.LOCAL_VECTOR_INDEX_MIN_SCORE if min_score is None else min_score
+        self.enabled = (settings.LOCAL_VECTOR_INDEX_ENABLED if enabled is None else enabled) and NUMPY_AVAILABLE
+        self.seed_enabled = settings.LOCAL_VECTOR_INDEX_SEED if seed is None else seed
+        snapshot_dir = settings.LOCAL_VECTOR_SNAPSHOT_DIR if snapshot_dir is None else snapshot_dir
+        self.snapshot = VectorSnapshot(snapshot_dir) if self.enabled and snapshot_dir else None
+        self.refresh_seconds = (settings.LOCAL_VECTOR_INDEX_REFRESH_SECONDS
+                                if refresh_seconds is None else refresh_seconds)
+        self.seed_max_vectors = seed_max_vectors or settings.LOCAL_VECTOR_INDEX_SEED_MAX_VECTORS
+
+        self.namespace: Optional[str] = None
+        self.complete = False  # Whole window loaded, so local answers can be trusted
+        self._complete_at = 0.0  # When the in-memory mirror last matched Pinecone
+        self._lock = threading.RLock()
+        self._seed_future = None
+        self._seed_failed_at = 0.0
+        self._deleted_while_seeding: set = set()
+        self._reset_storage()
+
+        self.stats = {"local_answers": 0, "fallthroughs": 0, "upserts": 0, "deletes": 0,
+                      "evictions": 0, "seeded_vectors": 0, "seed_errors": 0, "resyncs": 0,
+                      "resync_dropped": 0, "seed_fetches_skipped": 0, "seeds_refused": 0,
+                      "snapshot_rescores": 0}
+
+    def _reset_storage(self) -> None:
+        self._matrix = None  # (capacity, dim) float32, unit-length rows
+        self._times = None  # (capacity,) epoch seconds of each row's message
+        self._alive = None  # (capacity,) False for free or deleted rows
+        self._ids: List[Optional[str]] = []
+        self._metadata: List[Optional[Dict[str, Any]]] = []
+        self._rows: Dict[str, int] = {}
+        self._size = 0  # Rows in use, including deleted ones
+        self._outside_window: set = set()  # Listed ids whose messages predate the window (never fetched again)
+
+    # Writes
+
+    def add(self, vectors: Iterable[Dict[str, Any]], namespace: str) -> int:
+        """
+        Mirror vectors just written to a namespace.
+
+        Args:
+            vectors: Pinecone vectors (id, values, metadata)
+            namespace: Namespace they were written to
+
+        Returns:
+            Vectors added or updated
+        """
+        if not self.enabled:
+            return 0
+        now = time.time()
+        cutoff = now - self.window_seconds
+        added = 0
+        with self._lock:
+            self._use_namespace(namespace)
+            if self.snapshot is not None:
+                rows = []
+                for vector in vectors:
+                    metadata = dict(_field(vector, "metadata") or {})
+                    values = _field(vector, "values")
+                    vector_time = _vector_time(metadata, now)
+                    if values is None or len(values) == 0 or vector_time < cutoff:
+                        continue
+                    row_values = np.asarray(values, dtype=np.float32)
+                    norm = float(np.linalg.norm(row_values))
+                    if norm:
+                        rows.append((_field(vector, "id"), row_values / norm, metadata, vector_time))
+                added = self.snapshot.upsert(rows, namespace, self.max_vectors, cutoff)
+            else:
+                for vector in vectors:
+                    metadata = dict(_field(vector, "metadata") or {})
+                    values = _field(vector, "values")
+                    vector_time = _vector_time(metadata, now)
+                    if values is None or len(values) == 0 or vector_time < cutoff:
+                        continue
+                    if not self._store(_field(vector, "id"), values, metadata, vector_time):
+                        continue
+                    added += 1
+                self._evict_overflow()
+        self.stats["upserts"] += added
+        return added
+
+    def _store(self, vector_id: str, values: Any, metadata: Dict[str, Any], vector_time: float) -> bool:
+        row_values = np.asarray(values, dtype=np.float32)
+        norm = float(np.linalg.norm(row_values))
+        if not norm:
+            return False
+        if self._matrix is None:
+            self._allocate(row_values.shape[0], min(1024, self.max_vectors + 1))
+        elif row_values.shape[0] != self._matrix.shape[1]:
+            logger.warning(f"Local vector index: skipping {vector_id} with dimension {row_values.shape[0]}")
+            return False
+
+        row = self._rows.get(vector_id)
+        if row is None:
+            if self._size == self._matrix.shape[0]:
+                self._compact_or_grow()
+            row = self._size
+            self._size += 1
+            self._ids.append(vector_id)
+            self._metadata.append(metadata)
+            self._rows[vector_id] = row
+        else:
+            self._metadata[row] = metadata
+        self._matrix[row] = row_values / norm
+        self._times[row] = vector_time
+        self._alive[row] = True
+        return True
+
+    def _allocate(self, dimension: int, capacity: int) -> None:
+        self._matrix = np.zeros((capacity, dimension), dtype=np.float32)
+        self._times = np.zeros(capacity, dtype=np.float64)
+        self._alive = np.zeros(capacity, dtype=bool)
+
+    def _compact_or_grow(self) -> None:
+        live = int(self._alive[:self._size].sum())
+        if live < self._size * 3 // 4:
+            self._compact()
+            return
+        capacity = min(self._matrix.shape[0] * 2, self.max_vectors + 1024)
+        capacity = max(capacity, self._size + 1)
+        for name in ("_matrix", "_times", "_alive"):
+            old = getattr(self, name)
+            grown = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            grown[:self._size] = old[:self._size]
+            setattr(self, name, grown)
+
+    def _compact(self) -> None:
+        """Drop deleted rows, keeping row order"""
+        keep = np.flatnonzero(self._alive[:self._size])
+        count = len(keep)
+        self._matrix[:count] = self._matrix[keep]
+        self._times[:count] = self._times[keep]
+        self._alive[:count] = True
+        self._alive[count:] = False
+        self._ids = [self._ids[i] for i in keep]
+        self._metadata = [self._metadata[i] for i in keep]
+        self._rows = {vector_id: row for row, vector_id in enumerate(self._ids)}
+        self._size = count
+
+    def _evict_overflow(self) -> None:
+        live_rows = np.flatnonzero(self._alive[:self._size]) if self._size else []
+        excess = len(live_rows) - self.max_vectors
+        if excess <= 0:
+            return
+        oldest = live_rows[np.argsort(self._times[live_rows], kind="stable")[:excess]]
+        for row in oldest:
+            self._drop_row(int(row))
+        self.stats["evictions"] += excess
+
+    def _drop_row(self, row: int) -> None:
+        self._alive[row] = False
+        self._rows.pop(self._ids[row], None)
+        self._ids[row] = None
+        self._metadata[row] = None
+
+    def delete(self, ids: Iterable[str]) -> int:
+        """Forget vectors deleted from Pinecone"""
+        if not self.enabled:
+            return 0
+        deleted = 0
+        with self._lock:
+            ids = list(ids)
+            if self._seed_future is not None and not self._seed_future.done():
+                self._deleted_while_seeding.update(ids)
+            if self.snapshot is not None:
+                deleted = self.snapshot.delete(ids)
+                ids = []
+            for vector_id in ids:
+                row = self._rows.get(vector_id)
+                if row is not None:
+                    self._drop_row(row)
+                    deleted += 1
+        self.stats["deletes"] += deleted
+        return deleted
+
+    def clear(self) -> None:
+        """Drop everything; the mirror reloads before answering again"""
+        with self._lock:
+            self._reset_storage()
+            if self.snapshot is not None:
+                self.snapshot.reset(None)
+            self.complete = False
+            self.namespace = None
+
+    def _use_namespace(self, namespace: str) -> None:
+        if self.snapshot is not None:
+            # The snapshot is shared, so its namespace and completeness are the ones that count
+            state = self.snapshot.get_state()
+            if state["namespace"] != namespace:
+                if state["namespace"] is not None:
+                    logger.info(f"Local vector index: snapshot namespace changed to '{namespace}', reloading")
+                self.snapshot.reset(namespace)
+                self._outside_window = set()
+                state["complete"] = False
+            self.namespace = namespace
+            self.complete = state["complete"]
+            return
+        if self.namespace != namespace:
+            if self.namespace is not None:
+                logger.info(f"Local vector index: namespace changed to '{namespace}', reloading")
+            self._reset_storage()
+            self.complete = False
+            self.namespace = namespace
+
+    def _trusted(self) -> bool:
+        """
+        Whether local answers reflect every process's writes.
+
+        A snapshot is written by every process, so it stays trusted once complete.
+        An in-memory mirror misses other processes' writes and must have been
+        resynced within refresh_seconds.
+        """
+        if not self.complete:
+            return False
+        if self.snapshot is not None or not self.refresh_seconds:
+            return True
+        return time.monotonic() - self._complete_at < self.refresh_seconds
+
+    # Reads
+
+    def search(self, vector: List[float], top_k: int, filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        Exact cosine search over the mirrored vectors.
+
+        Returns:
+            Results shaped like VectorSearchTool results (id, score, content, metadata)
+
+        Raises:
+            UnsupportedFilter: If the filter cannot be evaluated locally
+        """
+        if top_k <= 0:
+            return []
+        query = np.asarray(vector, dtype=np.float32)
+        norm = float(np.linalg.norm(query))
+        if not norm:
+            return []
+        query = query / norm
+        min_time = time.time() - self.window_seconds
+
+        with self._lock:
+            if self.snapshot is not None:
+                return self._search_snapshot(query, min_time, top_k, filters)
+            if self._matrix is None or not self._size or query.shape[0] != self._matrix.shape[1]:
+                return []
+            size = self._size
+            scores = self._matrix[:size] @ query
+            eligible = self._alive[:size] & (self._times[:size] >= min_time)
+            scores = np.where(eligible, scores, -np.inf)
+            return self._rank(scores, top_k, filters, self._lookup)
+
+    def _search_snapshot(self, query, min_time: float, top_k: int,
+                         filters: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Rank snapshot rows, re-scoring if a compaction renumbers them before they are looked up"""
+        for _ in range(SNAPSHOT_SEARCH_ATTEMPTS):
+            scored = self.snapshot.scores(query, min_time)
+            if scored is None:
+                return []
+            scores, generation = scored
+            try:
+                return self._rank(scores, top_k, filters,
+                                  lambda rows: self.snapshot.lookup(rows, generation))
+            except SnapshotChanged:
+                self.stats["snapshot_rescores"] += 1
+        # Still changing underneath: no local answer, the caller asks Pinecone
+        return []
+
+    def _held(self, ids: List[str]) -> set:
+        """Which of `ids` are already mirrored"""
+        if self.snapshot is not None:
+            return self.snapshot.existing(ids)
+        return {vector_id for vector_id in ids if vector_id in self._rows}
+
+    def _lookup(self, rows: Iterable[int]) -> Dict[int, Any]:
+        return {int(row): (self._ids[row], self._metadata[row] or {}) for row in rows if self._ids[row] is not None}
+
+    def _rank(self, scores, top_k: int, filters: Optional[Dict[str, Any]], lookup) -> List[Dict[str, Any]]:
+        """Best rows passing the filter: rank a shortlist first, widen it only if filters reject too many"""
+        size = len(scores)
+        results = []
+        shortlist = min(size, max(top_k * 8, 64))
+        seen = 0
+        while True:
+            if shortlist < size:
+                candidates = np.argpartition(-scores, shortlist - 1)[:shortlist]
+            else:
+                candidates = np.arange(size)
+            ordered = candidates[np.argsort(-scores[candidates], kind="stable")]
+            batch = [row for row in ordered[seen:] if np.isfinite(scores[row])]
+            entries = lookup(batch)
+            for row in batch:
+                if int(row) not in entries:
+                    continue
+                vector_id, metadata = entries[int(row)]
+                if matches_filter(metadata, filters):
+                    results.append({
+                        "id": vector_id,
+                        "score": float(scores[row]),
+                        "content": metadata.get("content", ""),
+                        "metadata": metadata
+                    })
+                    if len(results) == top_k:
+                        return results
+            seen = len(ordered)
+            if shortlist >= size or not np.isfinite(scores[ordered[-1]]):
+                return results
+            shortlist = min(size, shortlist * 4)
+
+    def query(
+        self,
+        vector: List[float],
+        top_k: int,
+        filters: Optional[Dict[str, Any]],
+        namespace: str
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        Answer a search locally if the mirror can be trusted for it.
+
+        Returns:
+            Results, or None when the caller should ask Pinecone
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            self._use_namespace(namespace)
+            if not self._trusted():
+                self.stats["fallthroughs"] += 1
+                return None
+            try:
+                results = self.search(vector, top_k, filters)
+            except UnsupportedFilter as e:
+                logger.debug(f"Local vector index: filter operator {e} not supported locally")
+                self.stats["fallthroughs"] += 1
+                return None
+
+        if len(results) < top_k or results[-1]["score"] < self.min_score:
+            self.stats["fallthroughs"] += 1
+            return None
+        self.stats["local_answers"] += 1
+        return results
+
+    # Seeding
+
+    def ensure_seeded(self, index, namespace: str, sources: Optional[List[str]] = None) -> None:
+        """
+        Start loading the window from Pinecone in the background, once per namespace,
+        and again whenever an in-memory mirror's trust has expired.
+        Must be called on the event loop; the load runs in its default executor.
+
+        Args:
+            index: Pinecone index handle
+            namespace: Active namespace
+            sources: Physical namespaces holding its window (its time partitions), if not `namespace` itself
+        """
+        if not self.enabled or not self.seed_enabled or index is None:
+            return
+        with self._lock:
+            self._use_namespace(namespace)
+            if self._trusted() or (self._seed_future is not None and not self._seed_future.done()):
+                return
+            if time.time() - self._seed_failed_at < SEED_RETRY_SECONDS:
+                return
+            self._deleted_while_seeding = set()
+            self._seed_future = asyncio.get_running_loop().run_in_executor(
+                None, self._seed, index, namespace, sources or [namespace]
+            )
+
+    def _source_size(self, index, sources: List[str]) -> int:
+        """Vectors held by the seed sources, from the index stats"""
+        namespaces = _field(index.describe_index_stats(), "namespaces") or {}
+        return sum(_field(namespaces.get(source), "vector_count", 0) or 0 for source in sources)
+
+    def _seed(self, index, namespace: str, sources: List[str]) -> None:
+        started = time.perf_counter()
+        loaded = 0
+        skipped = 0
+        with self._lock:
+            # Resyncing a complete mirror: rows it had that Pinecone no longer lists were deleted elsewhere
+            resync = self.complete
+            before = set(self._rows) if resync else set()
+        listed = set()
+        try:
+            # Listing is not time-scoped, so an unpartitioned namespace is listed whole
+            size = self._source_size(index, sources)
+            if size > self.seed_max_vectors:
+                self.stats["seeds_refused"] += 1
+                self._seed_failed_at = time.time()
+                logger.warning(f"Local vector index: not seeding from {len(sources)} namespace(s) of '{namespace}' "
+                               f"holding {size} vectors (limit {self.seed_max_vectors}); searches use Pinecone. "
+                               f"Use a VECTOR_PARTITION_SCHEME so only the window's partitions are read.")
+                return
+
+            for source in sources:
+                for ids in index.list(namespace=source):
+                    ids = list(ids)
+                    listed.update(ids)
+                    with self._lock:
+                        if self.namespace != namespace:
+                            return
+                        held = self._held(ids) | self._outside_window
+                        wanted = [vector_id for vector_id in ids
+                                  if vector_id not in held and vector_id not in self._deleted_while_seeding]
+                    skipped += len(ids) - len(wanted)
+                    for i in range(0, len(wanted), SEED_FETCH_BATCH):
+                        response = index.fetch(ids=wanted[i:i + SEED_FETCH_BATCH], namespace=source)
+                        fetched = _field(response, "vectors") or {}
+                        cutoff = time.time() - self.window_seconds
+                        with self._lock:
+                            if self.namespace != namespace:
+                                return
+                            self._outside_window.update(
+                                vector_id for vector_id, vector in fetched.items()
+                                if _vector_time(_field(vector, "metadata") or {}, cutoff) < cutoff
+                            )
+                            vectors = [vector for vector_id, vector in fetched.items()
+                                       if vector_id not in self._deleted_while_seeding]
+                            loaded += self.add(vectors, namespace)
+
+            dropped = 0
+            with self._lock:
+                if self.namespace == namespace:
+                    for vector_id in before - listed:
+                        row = self._rows.get(vector_id)
+                        if row is not None:
+                            self._drop_row(row)
+                            dropped += 1
+                    self._outside_window &= listed
+                    self.complete = True
+                    self._complete_at = time.monotonic()
+                    if self.snapshot is not None:
+                        self.snapshot.mark_complete(namespace)
+            self.stats["seeded_vectors"] += loaded
+            self.stats["seed_fetches_skipped"] += skipped
+            if resync:
+                self.stats["resyncs"] += 1
+                self.stats["resync_dropped"] += dropped
+            logger.info(f"Local vector index: {'resynced' if resync else 'loaded'} {loaded} recent vectors "
+                        f"from '{namespace}' ({skipped} already held, {dropped} dropped) "
+                        f"in {time.perf_counter() - started:.1f}s")
+        except Exception as e:
+            self.stats["seed_errors"] += 1
+            self._seed_failed_at = time.time()
+            logger.warning(f"Local vector index: seeding from Pinecone failed, searches use Pinecone: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Mirror statistics"""
+        with self._lock:
+            live = int(self._alive[:self._size].sum()) if self._size else 0
+            dimension = self._matrix.shape[1] if self._matrix is not None else None
+            memory_mb = round(self._matrix.nbytes / 1024 / 1024, 1) if self._matrix is not None else 0.0
+            snapshot = self.snapshot.get_stats() if self.snapshot is not None else None
+        if snapshot:
+            live, dimension = snapshot["live_vectors"], snapshot["dimension"]
+        answers = self.stats["local_answers"] + self.stats["fallthroughs"]
+        return {
+            "enabled": self.enabled,
+            "numpy_available": NUMPY_AVAILABLE,
+            "namespace": self.namespace,
+            "complete": self.complete,
+            "trusted": self._trusted(),
+            "seeding": bool(self._seed_future is not None and not self._seed_future.done()),
+            "vectors": live,
+            "dimension": dimension,
+            "matrix_mb": memory_mb,
+            "window_days": self.window_seconds // 86400,
+            "max_vectors": self.max_vectors,
+            "snapshot": snapshot,
+            "local_answer_rate": round(self.stats["local_answers"] / answers, 3) if answers else 0.0,
+            **self.stats
+        }
+
+
+# Global mirror shared by EmbeddingService writers and VectorSearchTool readers
+local_vector_index = LocalVectorIndex()
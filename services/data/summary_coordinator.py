@@ -0,0 +1,217 @@
+"""
+Summary Coordinator - Coalesces abstractive summarization per conversation.
+
+Every turn whose live history overflows the token window produces summarization
+candidates, and consecutive turns in a busy thread overlap heavily. The
+coordinator makes sure each message is summarized exactly once:
+
+- summary watermark: the newest message position folded into the stored
+  long-term summary (committed by the summarizer worker)
+- pending watermark: the newest position already handed to a queued task
+- debounce window: at most one task per conversation per window
+- deferred buffer: candidates skipped by the debounce window or the minimum
+  batch size are kept here and merged into the next claim, since raw history
+  is trimmed and may no longer hold them by then
+- idempotency key: one task per message-position range, even across processes
+"""
+
+import logging
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+from config import settings
+from services.core.memory_service import MemoryService
+
+logger = logging.getLogger(__name__)
+
+STATS_KEY = "summarization:stats"
+JOB_KEY_TTL = 86400  # Idempotency keys outlive any realistic retry of the same range
+PENDING_TTL = 600  # Pending watermark expires if a queued task is lost
+MAX_DEFERRED = 500  # Deferred candidates merged into one claim
+
+
+def message_position(message: Dict[str, Any]) -> Optional[float]:
+    """
+    Ordering position of a stored message: its Slack ts, or stored_at as a fallback.
+
+    Args:
+        message: Raw stored message
+
+    Returns:
+        Epoch seconds, or None if the message carries no usable timestamp
+    """
+    for field in ("message_ts", "ts"):
+        value = message.get(field)
+        if value:
+            try:
+                return float(value)
+            except (TypeError, ValueError):
+                pass
+
+    stored_at = message.get("stored_at")
+    if stored_at:
+        try:
+            return datetime.fromisoformat(stored_at).timestamp()
+        except (TypeError, ValueError):
+            pass
+    return None
+
+
+class SummaryCoordinator:
+    """
+    Decides which overflow messages still need summarization and whether a
+    summarization task should be queued for them now.
+    """
+
+    def __init__(
+        self,
+        memory_service: MemoryService,
+        debounce_seconds: Optional[int] = None,
+        min_messages: int = 2
+    ):
+        self.memory_service = memory_service
+        self.debounce_seconds = debounce_seconds if debounce_seconds is not None else settings.SUMMARY_DEBOUNCE_SECONDS
+        self.min_messages = min_messages
+
+        self.stats = {
+            "jobs_queued": 0,
+            "skipped_below_minimum": 0,
+            "skipped_debounced": 0,
+            "skipped_duplicate": 0,
+            "skipped_already_summarized": 0,
+            "skipped_stale_update": 0,
+            "messages_deduplicated": 0
+        }
+
+    # Watermarks
+
+    def get_watermark(self, summary_record: Optional[Dict[str, Any]]) -> float:
+        """Committed watermark stored with the long-term summary"""
+        if not summary_record:
+            return 0.0
+        try:
+            return float(summary_record.get("watermark_ts") or 0.0)
+        except (TypeError, ValueError):
+            return 0.0
+
+    def filter_unsummarized(self, messages: List[Dict[str, Any]], watermark: float) -> List[Dict[str, Any]]:
+        """
+        Drop messages already covered by a watermark (and repeats), oldest first.
+
+        Messages without a position cannot be watermarked and are kept.
+        """
+        fresh = []
+        seen = set()
+        for message in messages:
+            position = message_position(message)
+            identity = (position, message.get("stored_at"), message.get("text"))
+            if identity in seen:
+                continue
+            seen.add(identity)
+            if position is None or position > watermark:
+                fresh.append(message)
+        fresh.sort(key=lambda message: message_position(message) or 0.0)
+        return fresh
+
+    async def get_pending_watermark(self, conversation_key: str) -> float:
+        pending = await self.memory_service.get_conversation_context(self._pending_key(conversation_key))
+        return self.get_watermark(pending)
+
+    # Job claiming
+
+    async def claim(
+        self,
+        conversation_key: str,
+        messages: List[Dict[str, Any]],
+        summary_watermark: float = 0.0
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Claim a summarization job for the messages that are neither summarized nor queued.
+
+        Args:
+            conversation_key: Conversation the messages belong to
+            messages: Summarization candidates (any order)
+            summary_watermark: Committed watermark of the stored summary
+
+        Returns:
+            Job dict (messages, watermark_ts, job_key) or None if the job was coalesced away
+        """
+        pending_watermark = await self.get_pending_watermark(conversation_key)
+        deferred = await self.memory_service.dequeue_batch_items(self._deferred_key(conversation_key), MAX_DEFERRED)
+        candidates = list(messages) + deferred
+        fresh = self.filter_unsummarized(candidates, max(summary_watermark, pending_watermark))
+        self.stats["messages_deduplicated"] += len(candidates) - len(fresh)
+
+        if len(fresh) < self.min_messages:
+            await self._defer(conversation_key, fresh)
+            await self._record("skipped_below_minimum" if fresh else "skipped_already_summarized")
+            return None
+
+        if self.debounce_seconds > 0:
+            debounce_key = f"{conversation_key}:summary_debounce"
+            if not await self.memory_service.set_if_absent(debounce_key, {"at": datetime.now().isoformat()}, self.debounce_seconds):
+                # Raw history may be trimmed past these before the window passes; the next claim takes them
+                await self._defer(conversation_key, fresh)
+                await self._record("skipped_debounced")
+                return None
+
+        positions = [message_position(message) for message in fresh]
+        known_positions = [position for position in positions if position is not None]
+        first_ts = min(known_positions) if known_positions else 0.0
+        last_ts = max(known_positions) if known_positions else 0.0
+        job_key = f"{conversation_key}:summary_job:{first_ts:.6f}-{last_ts:.6f}"
+
+        if not await self.memory_service.set_if_absent(job_key, {"messages": len(fresh)}, JOB_KEY_TTL):
+            await self._record("skipped_duplicate")
+            return None
+
+        if last_ts:
+            await self.memory_service.store_conversation_context(
+                self._pending_key(conversation_key), {"watermark_ts": last_ts}, ttl=PENDING_TTL)
+
+        await self._record("jobs_queued")
+        return {"messages": fresh, "watermark_ts": last_ts, "job_key": job_key}
+
+    async def release(self, conversation_key: str, job: Dict[str, Any]) -> None:
+        """Undo a claim whose task could not be queued so the next turn retries it"""
+        await self._defer(conversation_key, job["messages"])
+        await self.memory_service.delete_temp_data(job["job_key"])
+        await self.memory_service.delete_temp_data(self._pending_key(conversation_key))
+        await self.memory_service.delete_temp_data(f"{conversation_key}:summary_debounce")
+
+    async def _defer(self, conversation_key: str, messages: List[Dict[str, Any]]) -> None:
+        """Keep unclaimed candidates for the next claim of this conversation"""
+        for message in messages:
+            await self.memory_service.enqueue_batch_item(self._deferred_key(conversation_key), message, JOB_KEY_TTL)
+
+    def _pending_key(self, conversation_key: str) -> str:
+        return f"{conversation_key}:summary_pending"
+
+    def _deferred_key(self, conversation_key: str) -> str:
+        return f"{conversation_key}:summary_deferred"
+
+    # Statistics
+
+    async def _record(self, counter: str) -> None:
+        """Count locally and in Redis so worker-side skips are visible to the API process"""
+        self.stats[counter] += 1
+        if self.memory_service.redis_available and self.memory_service.redis_client:
+            try:
+                await self.memory_service.redis_client.hincrby(STATS_KEY, counter, 1)
+            except Exception as e:
+                logger.debug(f"Failed to record summarization stat {counter}: {e}")
+
+    async def record_worker_skip(self, counter: str) -> None:
+        """Record a skip detected by the summarizer worker"""
+        await self._record(counter)
+
+    async def get_stats(self) -> Dict[str, Any]:
+        """Get coalescing statistics (shared Redis counters when available)"""
+        stats = {"debounce_seconds": self.debounce_seconds, "process": dict(self.stats)}
+        if self.memory_service.redis_available and self.memory_service.redis_client:
+            try:
+                shared = await self.memory_service.redis_client.hgetall(STATS_KEY)
+                stats["shared"] = {counter: int(value) for counter, value in shared.items()}
+            except Exception as e:
+                logger.debug(f"Failed to read summarization stats: {e}")
+        return stats
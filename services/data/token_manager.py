@@ -5,11 +5,115 @@ Uses tiktoken for accurate token counting with model-specific encoders.
 
 import tiktoken
 import logging
+import threading
+import time
+from collections import OrderedDict
 from typing import Dict, List, Any, Optional, Tuple
 from dataclasses import dataclass
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_ENCODING = "cl100k_base"
+
+# tiktoken encodings are expensive to build and safe to share, so every
+# TokenManager (and MemoryService when it stamps token counts) uses one per model
+_encodings: Dict[str, Any] = {}
+_encodings_lock = threading.Lock()
+
+# Loading an encoding may download it; after a failure (e.g. no network) callers
+# fail fast for a while instead of retrying the download on every message write
+ENCODING_RETRY_SECONDS = 300
+_encoding_failures: Dict[str, float] = {}
+
+
+def get_shared_encoding(model_name: str = "gpt-4") -> Tuple[Any, str]:
+    """
+    Get the process-wide tiktoken encoding for a model.
+
+    Args:
+        model_name: Model name for tiktoken encoder
+
+    Returns:
+        Tuple of (encoding, resolved model name)
+
+    Raises:
+        RuntimeError: If the encoding could not be loaded (recently failed loads
+            are not retried for ENCODING_RETRY_SECONDS)
+    """
+    with _encodings_lock:
+        cached = _encodings.get(model_name)
+        if cached is None:
+            failed_at = _encoding_failures.get(model_name)
+            if failed_at is not None and time.time() - failed_at < ENCODING_RETRY_SECONDS:
+                raise RuntimeError(f"Token encoding for {model_name} is unavailable (load failed recently)")
+            try:
+                try:
+                    cached = (tiktoken.encoding_for_model(model_name), model_name)
+                    logger.info(f"Loaded shared {model_name} token encoding")
+                except KeyError:
+                    # Fallback to cl100k_base encoding (used by GPT-4)
+                    logger.warning(f"Model {model_name} not found, using {DEFAULT_ENCODING} encoding")
+                    cached = (tiktoken.get_encoding(DEFAULT_ENCODING), "gpt-4")
+            except Exception as e:
+                _encoding_failures[model_name] = time.time()
+                raise RuntimeError(f"Could not load token encoding for {model_name}: {e}") from e
+            _encoding_failures.pop(model_name, None)
+            _encodings[model_name] = cached
+        return cached
+
+
+def format_message(message: Dict[str, Any]) -> Tuple[str, str, str]:
+    """
+    Normalize a raw message into (speaker, text, "Speaker: text").
+
+    Args:
+        message: Raw message dictionary
+
+    Returns:
+        Tuple of (speaker, text, formatted_text)
+    """
+    user_name = message.get("user_name", "Unknown")
+    text = message.get("text", "")
+
+    # Ensure text is string type
+    if not isinstance(text, str):
+        logger.warning(f"Non-string text in message: {type(text)}, converting to string")
+        text = str(text) if text is not None else ""
+
+    # Ensure user_name is string type
+    if not isinstance(user_name, str):
+        logger.warning(f"Non-string user_name in message: {type(user_name)}, converting to string")
+        user_name = str(user_name) if user_name is not None else "Unknown"
+
+    # Determine speaker
+    is_bot = user_name.lower() in ["bot", "autopilot", "assistant"]
+    speaker = "Bot" if is_bot else "User"
+
+    return speaker, text, f"{speaker}: {text}"
+
+
+def count_message_tokens(message: Dict[str, Any], model_name: str = "gpt-4") -> Dict[str, Any]:
+    """
+    Compute the token count stored alongside a message when it is written.
+
+    Args:
+        message: Raw message dictionary
+        model_name: Model whose encoding is used
+
+    Returns:
+        Fields to merge into the stored message (token_count, token_encoding);
+        empty if the encoding is unavailable, in which case readers count on demand
+    """
+    try:
+        encoding, _ = get_shared_encoding(model_name)
+        _, _, formatted_text = format_message(message)
+        token_count = len(encoding.encode(formatted_text))
+    except Exception as e:
+        logger.error(f"Error counting message tokens with tiktoken: {e}")
+        return {}
+    return {"token_count": token_count, "token_encoding": encoding.name}
+
+
 @dataclass
 class TokenizedMessage:
     """Container for a message with its token count and metadata"""
@@ -25,23 +129,25 @@ class TokenManager:
     Supports multiple models and provides smooth transitions between live and summarized memory.
     """
     
-    def __init__(self, model_name: str = "gpt-4"):
+    def __init__(self, model_name: str = "gpt-4", max_cached_conversations: int = 500):
         """
         Initialize token manager with model-specific encoder
         
         Args:
             model_name: Model name for tiktoken encoder (gpt-4, gpt-3.5-turbo, etc.)
+            max_cached_conversations: Conversations kept by the incremental history builder
         """
-        try:
-            # Get encoding for the specified model
-            self.encoding = tiktoken.encoding_for_model(model_name)
-            self.model_name = model_name
-            logger.info(f"Token manager initialized with {model_name} encoding")
-        except KeyError:
-            # Fallback to cl100k_base encoding (used by GPT-4)
-            logger.warning(f"Model {model_name} not found, using cl100k_base encoding")
-            self.encoding = tiktoken.get_encoding("cl100k_base")
-            self.model_name = "gpt-4"
+        self.encoding, self.model_name = get_shared_encoding(model_name)
+
+        # conversation_key -> {message identity: TokenizedMessage}, LRU ordered
+        self._history_cache: "OrderedDict[str, Dict[str, TokenizedMessage]]" = OrderedDict()
+        self.max_cached_conversations = max_cached_conversations
+        self.history_stats = {
+            "builds": 0,
+            "messages_tokenized": 0,
+            "stored_counts_used": 0,
+            "cached_counts_used": 0
+        }
     
     def count_tokens(self, text: str) -> int:
         """
@@ -87,28 +193,17 @@ class TokenManager:
             logger.warning(f"Non-dict input to tokenize_message: {type(message)}, using empty message")
             message = {"user_name": "Unknown", "text": ""}
         
-        user_name = message.get("user_name", "Unknown")
-        text = message.get("text", "")
-        
-        # Ensure text is string type
-        if not isinstance(text, str):
-            logger.warning(f"Non-string text in message: {type(text)}, converting to string")
-            text = str(text) if text is not None else ""
-        
-        # Ensure user_name is string type  
-        if not isinstance(user_name, str):
-            logger.warning(f"Non-string user_name in message: {type(user_name)}, converting to string")
-            user_name = str(user_name) if user_name is not None else "Unknown"
-        
-        # Determine speaker
-        is_bot = user_name.lower() in ["bot", "autopilot", "assistant"]
-        speaker = "Bot" if is_bot else "User"
-        
-        # Format message for context
-        formatted_text = f"{speaker}: {text}"
+        speaker, text, formatted_text = format_message(message)
         
-        # Count exact tokens
-        token_count = self.count_tokens(formatted_text)
+        # Reuse the count stamped by MemoryService.store_raw_message when it was
+        # computed with the same encoding
+        stored_count = message.get("token_count")
+        if isinstance(stored_count, int) and message.get("token_encoding") == self.encoding.name:
+            token_count = stored_count
+            self.history_stats["stored_counts_used"] += 1
+        else:
+            token_count = self.count_tokens(formatted_text)
+            self.history_stats["messages_tokenized"] += 1
         
         return TokenizedMessage(
             speaker=speaker,
@@ -141,9 +236,79 @@ class TokenManager:
         # Tokenize all messages
         tokenized_messages = [self.tokenize_message(msg) for msg in messages]
         
+        return self._select_within_budget(tokenized_messages, max_tokens, preserve_recent)
+    
+    def build_incremental_history(
+        self,
+        conversation_key: str,
+        messages: List[Dict[str, Any]],
+        max_tokens: int,
+        preserve_recent: int = 2
+    ) -> Tuple[List[TokenizedMessage], List[TokenizedMessage], Dict[str, int]]:
+        """
+        Same result as build_token_managed_history, but remembers tokenized messages
+        per conversation so each turn only tokenizes messages it has not seen yet.
+        
+        Args:
+            conversation_key: Conversation the messages belong to
+            messages: List of raw messages (same order as build_token_managed_history)
+            max_tokens: Maximum tokens for live history
+            preserve_recent: Number of most recent messages to always preserve
+            
+        Returns:
+            Tuple of (messages_to_keep, messages_to_summarize, token_stats)
+        """
+        self.history_stats["builds"] += 1
+        if not messages:
+            return [], [], {"total_tokens": 0, "kept_messages": 0, "summarized_messages": 0}
+        
+        previous = self._history_cache.pop(conversation_key, {})
+        current: Dict[str, TokenizedMessage] = {}
+        tokenized_messages = []
+        
+        for msg in messages:
+            identity = self._message_identity(msg)
+            tokenized = previous.get(identity) if identity else None
+            if tokenized is not None:
+                self.history_stats["cached_counts_used"] += 1
+            else:
+                tokenized = self.tokenize_message(msg)
+            if identity:
+                current[identity] = tokenized
+            tokenized_messages.append(tokenized)
+        
+        # Only the current window is retained; messages that slid out are dropped
+        self._history_cache[conversation_key] = current
+        while len(self._history_cache) > self.max_cached_conversations:
+            self._history_cache.popitem(last=False)
+        
+        return self._select_within_budget(tokenized_messages, max_tokens, preserve_recent)
+    
+    def _message_identity(self, message: Any) -> Optional[str]:
+        """Stable identity for a stored message (None when it cannot be identified)"""
+        if not isinstance(message, dict):
+            return None
+        message_ts = message.get("message_ts") or message.get("ts")
+        stored_at = message.get("stored_at")
+        if not message_ts and not stored_at:
+            return None
+        return f"{message_ts}:{stored_at}"
+    
+    def _select_within_budget(
+        self,
+        tokenized_messages: List[TokenizedMessage],
+        max_tokens: int,
+        preserve_recent: int
+    ) -> Tuple[List[TokenizedMessage], List[TokenizedMessage], Dict[str, int]]:
+        """Split tokenized messages into live history and summarization candidates"""
+        total = len(tokenized_messages)
+        
         # Always preserve the most recent messages
-        recent_messages = tokenized_messages[-preserve_recent:] if len(tokenized_messages) >= preserve_recent else tokenized_messages
-        older_messages = tokenized_messages[:-preserve_recent] if len(tokenized_messages) > preserve_recent else []
+        recent_start = total - preserve_recent if total >= preserve_recent else 0
+        if preserve_recent <= 0:
+            recent_start = 0
+        recent_messages = tokenized_messages[recent_start:]
+        older_messages = tokenized_messages[:recent_start] if total > preserve_recent else []
         
         # Calculate tokens for recent messages
         recent_tokens = sum(msg.token_count for msg in recent_messages)
@@ -152,19 +317,21 @@ class TokenManager:
         if recent_tokens > max_tokens:
             logger.warning(f"Recent {preserve_recent} messages ({recent_tokens} tokens) exceed limit ({max_tokens} tokens)")
             # Keep only what fits, starting from most recent
-            kept_messages = []
+            keep_from = total
             current_tokens = 0
             
-            for msg in reversed(recent_messages):
-                if current_tokens + msg.token_count <= max_tokens:
-                    kept_messages.insert(0, msg)
-                    current_tokens += msg.token_count
+            for index in range(total - 1, recent_start - 1, -1):
+                token_count = tokenized_messages[index].token_count
+                if current_tokens + token_count <= max_tokens:
+                    keep_from = index
+                    current_tokens += token_count
                 else:
                     # This message would exceed the limit
                     break
             
             # Everything else goes to summarization
-            messages_to_summarize = [msg for msg in tokenized_messages if msg not in kept_messages]
+            kept_messages = tokenized_messages[keep_from:]
+            messages_to_summarize = tokenized_messages[:keep_from]
             
             return kept_messages, messages_to_summarize, {
                 "total_tokens": current_tokens,
@@ -174,20 +341,20 @@ class TokenManager:
         
         # We have room for more than just recent messages
         available_tokens = max_tokens - recent_tokens
-        kept_messages = recent_messages.copy()
+        keep_from = len(older_messages)
         messages_to_summarize = []
         
         # Add older messages starting from most recent (working backwards)
-        for msg in reversed(older_messages):
-            if msg.token_count <= available_tokens:
-                kept_messages.insert(0, msg)  # Insert at beginning to maintain order
-                available_tokens -= msg.token_count
+        for index in range(len(older_messages) - 1, -1, -1):
+            if older_messages[index].token_count <= available_tokens:
+                keep_from = index
+                available_tokens -= older_messages[index].token_count
             else:
                 # This message and all older ones need summarization
-                remaining_older = older_messages[:older_messages.index(msg) + 1]
-                messages_to_summarize = remaining_older
+                messages_to_summarize = older_messages[:index + 1]
                 break
         
+        kept_messages = older_messages[keep_from:] + recent_messages
         total_tokens = sum(msg.token_count for msg in kept_messages)
         
         return kept_messages, messages_to_summarize, {
@@ -301,4 +468,16 @@ class TokenManager:
             "efficiency_gain": efficiency_gain,
             "is_more_efficient": efficiency_gain < 0,
             "token_difference": abs(efficiency_gain)
-        }
\ No newline at end of file
+        }
+    
+    def get_history_stats(self) -> Dict[str, Any]:
+        """Get incremental history builder statistics"""
+        reused = self.history_stats["stored_counts_used"] + self.history_stats["cached_counts_used"]
+        looked_up = reused + self.history_stats["messages_tokenized"]
+        return {
+            "model_name": self.model_name,
+            "encoding": self.encoding.name,
+            "cached_conversations": len(self._history_cache),
+            "reuse_percentage": round(reused / looked_up * 100, 1) if looked_up else 0.0,
+            **self.history_stats
+        }
@@ -0,0 +1,275 @@
+"""
+Vector Namespaces - Blue/green Pinecone namespaces behind a read alias.
+
+Rebuilding the index used to purge it first and re-embed afterwards, so search
+returned nothing (or half an index) until the rebuild finished, and a failed
+rebuild left it gutted. Reads now follow an alias naming the active namespace:
+
+- a reindex job writes into a fresh shadow namespace while live writers
+  (hourly, realtime, bulk) write to both the active and the shadow namespace
+- once the shadow namespace's vector count validates, the alias is flipped in
+  a single write, so queries see either the old or the new index, never a
+  half-built one
+- the retired namespace is deleted in the background after a grace period
+  that outlasts the per-process alias cache and in-flight queries
+
+The alias lives in Redis (`vector_namespace:alias` hash) so every process
+agrees on it; without Redis a JSON file beside the app is used instead.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+ALIAS_KEY = "vector_namespace:alias"
+
+
+class NamespaceAlias:
+    """
+    Process-wide view of the Pinecone namespace that serves reads.
+    """
+
+    def __init__(
+        self,
+        default_namespace: Optional[str] = None,
+        alias_file: Optional[str] = None,
+        cache_seconds: Optional[float] = None
+    ):
+        """
+        Args:
+            default_namespace: Namespace served before the first cutover
+            alias_file: Alias location when Redis is unavailable
+            cache_seconds: How long a process reuses the alias it last read
+        """
+        self.default_namespace = settings.PINECONE_NAMESPACE if default_namespace is None else default_namespace
+        self.alias_file = alias_file or settings.VECTOR_NAMESPACE_ALIAS_FILE
+        self.cache_seconds = settings.VECTOR_NAMESPACE_ALIAS_TTL_SECONDS if cache_seconds is None else cache_seconds
+        self._memory_service = None
+        self._lock = threading.Lock()
+        self._cached: Optional[Dict[str, Any]] = None
+        self._cached_at = 0.0
+        self._gc_tasks: set = set()
+
+        self.stats = {"cutovers": 0, "aborted_builds": 0, "namespaces_deleted": 0, "errors": 0}
+
+    def _redis_client(self):
+        if self._memory_service is None:
+            from services.core.memory_service import MemoryService
+            self._memory_service = MemoryService()
+        if self._memory_service.redis_available:
+            return self._memory_service.redis_client
+        return None
+
+    # Alias state
+
+    async def _load(self) -> Dict[str, Any]:
+        redis_client = self._redis_client()
+        if redis_client:
+            try:
+                return await redis_client.hgetall(ALIAS_KEY) or {}
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.warning(f"Namespace alias lookup failed, using the last known alias: {e}")
+                return dict(self._cached or {})
+
+        try:
+            return self._read_file()
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.warning(f"Could not read namespace alias file {self.alias_file}: {e}")
+            return dict(self._cached or {})
+
+    def _read_file(self) -> Dict[str, Any]:
+        try:
+            with open(self.alias_file) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    async def _save(self, changes: Dict[str, Any]) -> None:
+        """Apply field changes in one write (None removes a field)"""
+        redis_client = self._redis_client()
+        if redis_client:
+            pipeline = redis_client.pipeline(transaction=True)
+            updates = {key: value for key, value in changes.items() if value is not None}
+            removed = [key for key, value in changes.items() if value is None]
+            if updates:
+                pipeline.hset(ALIAS_KEY, mapping=updates)
+            if removed:
+                pipeline.hdel(ALIAS_KEY, *removed)
+            await pipeline.execute()
+        else:
+            with self._lock:
+                state = self._read_file()
+                state.update(changes)
+                state = {key: value for key, value in state.items() if value is not None}
+                tmp_path = f"{self.alias_file}.tmp"
+                with open(tmp_path, "w") as f:
+                    json.dump(state, f, indent=2)
+                os.replace(tmp_path, self.alias_file)
+        self._cached = None
+
+    async def get_state(self, refresh: bool = False) -> Dict[str, Any]:
+        """Alias fields: active, building, previous, switched_at (cached per process)"""
+        now = time.monotonic()
+        if refresh or self._cached is None or now - self._cached_at > self.cache_seconds:
+            self._cached = await self._load()
+            self._cached_at = now
+        return self._cached
+
+    async def get_active(self) -> str:
+        """Namespace that queries should read"""
+        state = await self.get_state()
+        return state.get("active", self.default_namespace)
+
+    async def get_write_namespaces(self) -> List[str]:
+        """Namespaces live writes go to: the active one, plus a shadow being built"""
+        state = await self.get_state()
+        active = state.get("active", self.default_namespace)
+        building = state.get("building")
+        return [active] if building in (None, active) else [active, building]
+
+    # Reindex lifecycle
+
+    def new_namespace_name(self, label: str = "slack") -> str:
+        return f"{label}-{datetime.now().strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+
+    async def start_build(self, namespace: str) -> None:
+        state = await self.get_state(refresh=True)
+        if state.get("building") and state["building"] != namespace:
+            raise RuntimeError(f"namespace {state['building']} is already being built")
+        if state.get("active", self.default_namespace) == namespace:
+            raise RuntimeError(f"namespace {namespace} is the active namespace")
+        await self._save({"building": namespace, "building_since": datetime.now().isoformat()})
+
+    async def cutover(self, namespace: str) -> str:
+        """
+        Make `namespace` the active one.
+
+        Returns:
+            The namespace it replaced
+        """
+        previous = (await self.get_state(refresh=True)).get("active", self.default_namespace)
+        await self._save({
+            "active": namespace,
+            "previous": previous,
+            "switched_at": datetime.now().isoformat(),
+            "building": None,
+            "building_since": None
+        })
+        self.stats["cutovers"] += 1
+        logger.info(f"Vector namespace alias switched from '{previous}' to '{namespace}'")
+        return previous
+
+    async def abort_build(self, namespace: str) -> None:
+        state = await self.get_state(refresh=True)
+        if state.get("building") == namespace:
+            await self._save({"building": None, "building_since": None})
+        self.stats["aborted_builds"] += 1
+
+    def schedule_delete(self, embedding_service, namespace: str, delay: Optional[float] = None) -> None:
+        """Delete a namespace in the background once no reader can still be using it"""
+        delay = settings.VECTOR_NAMESPACE_GC_DELAY_SECONDS if delay is None else delay
+
+        async def delete_later():
+            await asyncio.sleep(delay)
+            state = await self.get_state(refresh=True)
+            if namespace in (state.get("active", self.default_namespace), state.get("building")):
+                logger.warning(f"Not deleting namespace '{namespace}': it is live again")
+                return
+            if await embedding_service.delete_namespace(namespace):
+                self.stats["namespaces_deleted"] += 1
+
+        task = asyncio.get_running_loop().create_task(delete_later())
+        self._gc_tasks.add(task)
+        task.add_done_callback(self._gc_tasks.discard)
+
+    async def get_stats(self) -> Dict[str, Any]:
+        """Alias state and counters"""
+        state = await self.get_state(refresh=True)
+        return {
+            "backend": "redis" if self._redis_client() else "file",
+            "active": state.get("active", self.default_namespace),
+            "building": state.get("building"),
+            "previous": state.get("previous"),
+            "switched_at": state.get("switched_at"),
+            "pending_deletions": len(self._gc_tasks),
+            **self.stats
+        }
+
+
+async def reindex_into_shadow(
+    embedding_service,
+    build: Callable[[str], Awaitable[int]],
+    label: str = "slack",
+    min_vectors: int = 1,
+    alias: Optional[NamespaceAlias] = None
+) -> Dict[str, Any]:
+    """
+    Build a new namespace, validate it and flip the alias to it.
+
+    The active namespace keeps serving queries throughout; it is deleted in
+    the background after a successful cutover. A build that fails or does
+    not validate is discarded and the alias is left untouched.
+
+    Args:
+        embedding_service: EmbeddingService used for counts and deletions
+        build: Coroutine function that writes vectors into the given namespace
+            and returns how many it stored
+        label: Prefix for the shadow namespace name
+        min_vectors: Fewest vectors a build may contain and still go live
+        alias: NamespaceAlias to use (defaults to the process-wide one)
+
+    Returns:
+        Dictionary with status (cutover or aborted), namespaces and counts
+    """
+    alias = alias or vector_namespaces
+    shadow = alias.new_namespace_name(label)
+    await alias.start_build(shadow)
+    logger.info(f"Reindexing into shadow namespace '{shadow}'")
+
+    try:
+        stored = await build(shadow)
+        count = await _await_vector_count(embedding_service, shadow, stored)
+    except BaseException:
+        await alias.abort_build(shadow)
+        alias.schedule_delete(embedding_service, shadow, delay=0)
+        raise
+
+    result = {"namespace": shadow, "vectors_stored": stored, "vectors_counted": count}
+    if stored < min_vectors or count < stored:
+        await alias.abort_build(shadow)
+        alias.schedule_delete(embedding_service, shadow, delay=0)
+        reason = (f"only {stored} vectors stored (minimum {min_vectors})" if stored < min_vectors
+                  else f"shadow namespace reports {count} of {stored} vectors")
+        logger.error(f"Reindex into '{shadow}' failed validation: {reason}; alias left unchanged")
+        return {**result, "status": "aborted", "error": reason, "active": await alias.get_active()}
+
+    previous = await alias.cutover(shadow)
+    if previous != shadow:
+        alias.schedule_delete(embedding_service, previous)
+    return {**result, "status": "cutover", "active": shadow, "previous": previous}
+
+
+async def _await_vector_count(embedding_service, namespace: str, expected: int) -> int:
+    """Namespace vector count, polled until it reaches `expected` (index stats lag writes)"""
+    deadline = time.monotonic() + settings.VECTOR_REINDEX_VALIDATE_TIMEOUT_SECONDS
+    while True:
+        count = await embedding_service.get_namespace_vector_count(namespace)
+        if count >= expected or time.monotonic() >= deadline:
+            return count
+        await asyncio.sleep(2)
+
+
+# Global alias shared by every reader and writer in the process
+vector_namespaces = NamespaceAlias()
@@ -0,0 +1,249 @@
+"""
+Vector Partitions - Time-partitioned Pinecone namespaces with scoped queries.
+
+Every vector used to live in one namespace, so each query scanned the whole
+corpus and retention meant deleting vectors one by one. With
+VECTOR_PARTITION_SCHEME set to month or quarter, the logical namespace the
+alias in vector_namespaces names (so blue/green rebuilds keep working) is
+stored as one physical namespace per period, `<logical>__<period>`:
+
+- writes are routed by the message time in each vector's `timestamp`
+  metadata (2026-10 or 2026-Q4); vectors without one, such as ingested
+  documents, go to `<logical>__undated`
+- searches query only the partitions overlapping the question's time range,
+  or the last VECTOR_PARTITION_DEFAULT_WINDOW_DAYS when it has none, plus
+  undated - concurrently, merging the matches by score
+- deletes, counts and namespace drops fan out to every partition
+- retention drops partitions older than VECTOR_PARTITION_RETENTION_MONTHS
+  in a single call each
+
+The partitions of a namespace are read from the index stats and cached for
+PARTITION_CACHE_SECONDS; partitions this process writes are known at once.
+"""
+
+import asyncio
+import logging
+import re
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from config import settings
+from services.data.local_vector_index import _field
+
+logger = logging.getLogger(__name__)
+
+SEPARATOR = "__"
+UNDATED = "undated"
+SCHEMES = ("none", "month", "quarter")
+PARTITION_CACHE_SECONDS = 60
+PERIOD_PATTERN = re.compile(r"^(\d{4})-(?:(\d{2})|Q([1-4]))$")
+
+
+def _shift_months(when: datetime, months: int) -> datetime:
+    """First day of the month `months` away from `when`'s month"""
+    index = when.year * 12 + when.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+class VectorPartitions:
+    """
+    Maps logical namespaces to their time partitions.
+    """
+
+    def __init__(
+        self,
+        scheme: Optional[str] = None,
+        default_window_days: Optional[int] = None,
+        retention_months: Optional[int] = None
+    ):
+        """
+        Args:
+            scheme: none, month or quarter
+            default_window_days: Time range searched when the question has none
+            retention_months: Partitions older than this are dropped (0 keeps all)
+        """
+        self.scheme = (scheme if scheme is not None else settings.VECTOR_PARTITION_SCHEME).lower() or "none"
+        if self.scheme not in SCHEMES:
+            raise ValueError(f"partition scheme must be one of {SCHEMES}, not {self.scheme!r}")
+        self.enabled = self.scheme != "none"
+        self.default_window_days = (settings.VECTOR_PARTITION_DEFAULT_WINDOW_DAYS
+                                    if default_window_days is None else default_window_days)
+        self.retention_months = (settings.VECTOR_PARTITION_RETENTION_MONTHS
+                                 if retention_months is None else retention_months)
+        self._known: Dict[str, Set[str]] = {}
+        self._listed_at: Dict[str, float] = {}
+
+        self.stats = {"scoped_queries": 0, "partitions_queried": 0, "partitions_skipped": 0,
+                      "partitions_dropped": 0}
+
+    # Naming
+
+    def period_of(self, when: datetime) -> str:
+        if self.scheme == "quarter":
+            return f"{when.year}-Q{(when.month - 1) // 3 + 1}"
+        return f"{when.year}-{when.month:02d}"
+
+    def period_bounds(self, period: str) -> Tuple[datetime, datetime]:
+        """[start, end) of a period"""
+        match = PERIOD_PATTERN.match(period)
+        year = int(match.group(1))
+        if match.group(3):
+            start = datetime(year, (int(match.group(3)) - 1) * 3 + 1, 1)
+            return start, _shift_months(start, 3)
+        start = datetime(year, int(match.group(2)), 1)
+        return start, _shift_months(start, 1)
+
+    def periods_between(self, start: datetime, end: datetime) -> List[str]:
+        periods = []
+        cursor, end = start.replace(tzinfo=None), end.replace(tzinfo=None)
+        while cursor <= end:
+            period = self.period_of(cursor)
+            periods.append(period)
+            cursor = self.period_bounds(period)[1]
+        return periods
+
+    def partition_name(self, namespace: str, period: str) -> str:
+        return f"{namespace}{SEPARATOR}{period}"
+
+    def period_from_name(self, namespace: str, name: str) -> Optional[str]:
+        """Period of a physical namespace if it is a partition of `namespace`"""
+        prefix = f"{namespace}{SEPARATOR}"
+        if not name.startswith(prefix):
+            return None
+        period = name[len(prefix):]
+        return period if period == UNDATED or PERIOD_PATTERN.match(period) else None
+
+    def _vector_period(self, vector: Any) -> str:
+        timestamp = (_field(vector, "metadata") or {}).get("timestamp")
+        if timestamp:
+            try:
+                return self.period_of(datetime.fromisoformat(str(timestamp)))
+            except ValueError:
+                pass
+        return UNDATED
+
+    # Writes
+
+    def route(self, vectors: List[Any], namespace: str) -> Dict[str, List[Any]]:
+        """
+        Group vectors by the physical namespace they belong in.
+
+        Returns:
+            {physical namespace: vectors}; just {namespace: vectors} when partitioning is off
+        """
+        if not self.enabled:
+            return {namespace: vectors}
+        groups: Dict[str, List[Any]] = {}
+        for vector in vectors:
+            groups.setdefault(self.partition_name(namespace, self._vector_period(vector)), []).append(vector)
+        self._known.setdefault(namespace, set()).update(groups)
+        return groups
+
+    # Reads
+
+    async def partitions(self, index, namespace: str, refresh: bool = False) -> List[str]:
+        """
+        Physical namespaces holding a logical namespace's vectors.
+
+        Returns:
+            Existing partitions, oldest first; [namespace] when partitioning is off
+        """
+        if not self.enabled:
+            return [namespace]
+        if refresh or time.monotonic() - self._listed_at.get(namespace, 0.0) > PARTITION_CACHE_SECONDS:
+            stats = await asyncio.to_thread(index.describe_index_stats)
+            listed = {name for name in (_field(stats, "namespaces") or {})
+                      if self.period_from_name(namespace, name)}
+            self._known[namespace] = self._known.get(namespace, set()) | listed
+            self._listed_at[namespace] = time.monotonic()
+        return sorted(self._known.get(namespace, ()))
+
+    async def query_partitions(
+        self,
+        index,
+        namespace: str,
+        time_range: Optional[Tuple[datetime, datetime]] = None
+    ) -> List[str]:
+        """
+        Partitions a search over `time_range` has to query.
+
+        Args:
+            index: Pinecone index handle
+            namespace: Logical namespace
+            time_range: (start, end) of the question, or None for the default recency window
+        """
+        if not self.enabled:
+            return [namespace]
+        if time_range is None:
+            now = datetime.now()
+            time_range = (now - timedelta(days=self.default_window_days), now)
+        existing = await self.partitions(index, namespace)
+        selected = await self.partitions_between(index, namespace, time_range)
+        self.stats["scoped_queries"] += 1
+        self.stats["partitions_queried"] += len(selected)
+        self.stats["partitions_skipped"] += len(existing) - len(selected)
+        return selected
+
+    async def partitions_between(self, index, namespace: str, time_range: Tuple[datetime, datetime]) -> List[str]:
+        """Existing partitions overlapping (start, end), plus the undated one"""
+        if not self.enabled:
+            return [namespace]
+        wanted = set(self.periods_between(*time_range)) | {UNDATED}
+        return [name for name in await self.partitions(index, namespace)
+                if self.period_from_name(namespace, name) in wanted]
+
+    def forget(self, namespace: str, names: Optional[Iterable[str]] = None) -> None:
+        """Drop partitions (default: all of them) from the cache after deleting them"""
+        if names is None:
+            self._known.pop(namespace, None)
+            self._listed_at.pop(namespace, None)
+        else:
+            self._known.get(namespace, set()).difference_update(names)
+
+    # Retention
+
+    async def drop_expired(self, index, namespaces: Optional[List[str]] = None) -> List[str]:
+        """
+        Delete partitions whose whole period is older than the retention window.
+
+        Args:
+            index: Pinecone index handle
+            namespaces: Logical namespaces to prune (default: the live write namespaces)
+
+        Returns:
+            Physical namespaces dropped
+        """
+        if not self.enabled or not self.retention_months:
+            return []
+        if namespaces is None:
+            from services.data.vector_namespaces import vector_namespaces
+            namespaces = await vector_namespaces.get_write_namespaces()
+
+        cutoff = _shift_months(datetime.now(), -self.retention_months)
+        dropped = []
+        for namespace in namespaces:
+            for name in await self.partitions(index, namespace, refresh=True):
+                period = self.period_from_name(namespace, name)
+                if period == UNDATED or self.period_bounds(period)[1] > cutoff:
+                    continue
+                await asyncio.to_thread(index.delete, delete_all=True, namespace=name)
+                self.forget(namespace, [name])
+                dropped.append(name)
+                logger.info(f"Dropped expired vector partition '{name}'")
+        self.stats["partitions_dropped"] += len(dropped)
+        return dropped
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Scheme, known partitions and query pruning counters"""
+        return {
+            "scheme": self.scheme,
+            "default_window_days": self.default_window_days,
+            "retention_months": self.retention_months,
+            "partitions": {namespace: sorted(names) for namespace, names in self._known.items()},
+            **self.stats
+        }
+
+
+# Global partition map shared by EmbeddingService writers and VectorSearchTool readers
+vector_partitions = VectorPartitions()
@@ -0,0 +1,472 @@
+"""
+Vector Snapshot - Memory-mapped on-disk storage for the local vector index.
+
+The in-process mirror (LocalVectorIndex) was rebuilt from Pinecone on every
+process start, and restarts are frequent. With LOCAL_VECTOR_SNAPSHOT_DIR set
+the mirror lives in a snapshot directory shared by every process instead:
+
+- vectors-<generation>.npy: (capacity, dimension) matrix of unit rows,
+  quantised to float16 or int8 (LOCAL_VECTOR_SNAPSHOT_DTYPE)
+- times-<generation>.npy: (capacity,) message time of each row, NaN for free
+  or deleted rows
+- snapshot.db: SQLite (WAL) sidecar holding the row -> id/metadata table and
+  a single state row (namespace, dimension, rows in use, generation, whether
+  the window is fully loaded)
+
+Both .npy files are opened with mmap, so opening a snapshot reads two headers
+and one SQLite row whatever the corpus size, and only the pages a search
+touches become resident (as shared, evictable page cache). Writers (ingestion
+workers, the web process's realtime path) append under a BEGIN IMMEDIATE
+transaction: rows are written and flushed to the matrix before the state row
+that makes them visible is committed. Rows are never rewritten in place - a
+replaced vector gets a fresh row and its old row is freed after the commit -
+so a reader never scores bytes whose id and metadata are not committed yet.
+When the matrix fills up, live rows are compacted into the next generation
+and the old files are unlinked. Row numbers are only stable within a
+generation, so lookups check that the generation a search scored is still
+current (SnapshotChanged otherwise).
+"""
+
+import glob
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from config import settings
+
+# NumPy is optional - without it there is no local index to persist
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+    np = None
+
+logger = logging.getLogger(__name__)
+
+INT8_SCALE = 127.0  # Unit-row components are stored as round(x * 127)
+SCORE_CHUNK_ROWS = 256  # Rows dequantised at a time (kept small enough to stay in cache)
+MIN_CAPACITY = 1024
+DTYPES = ("float16", "int8")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshot_state (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    namespace TEXT,
+    dimension INTEGER,
+    dtype TEXT NOT NULL,
+    capacity INTEGER NOT NULL DEFAULT 0,
+    rows INTEGER NOT NULL DEFAULT 0,
+    generation INTEGER NOT NULL DEFAULT 0,
+    complete INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS snapshot_vectors (
+    row INTEGER PRIMARY KEY,
+    vector_id TEXT NOT NULL UNIQUE,
+    vector_time REAL NOT NULL,
+    metadata TEXT NOT NULL DEFAULT '{}'
+);
+"""
+
+SnapshotRow = Tuple[str, Any, Dict[str, Any], float]  # id, unit-length values, metadata, message time
+
+
+class SnapshotChanged(RuntimeError):
+    """The snapshot was compacted into a new generation since its rows were scored"""
+
+
+class VectorSnapshot:
+    """
+    Memory-mapped vector matrix plus SQLite sidecar, shared across processes.
+    """
+
+    def __init__(self, directory: Optional[str] = None, dtype: Optional[str] = None):
+        """
+        Args:
+            directory: Snapshot directory (created on first use)
+            dtype: float16 or int8 for new generations
+        """
+        self.directory = directory or settings.LOCAL_VECTOR_SNAPSHOT_DIR
+        self.dtype = dtype or settings.LOCAL_VECTOR_SNAPSHOT_DTYPE
+        if self.dtype not in DTYPES:
+            raise ValueError(f"snapshot dtype must be one of {DTYPES}, not {self.dtype!r}")
+        self.path = os.path.join(self.directory, "snapshot.db")
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.RLock()
+        self._generation: Optional[int] = None
+        self._vectors = None
+        self._times = None
+
+        self.stats = {"rows_written": 0, "rows_deleted": 0, "generations_written": 0, "rows_dropped": 0}
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(self.directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            conn.execute(
+                "INSERT OR IGNORE INTO snapshot_state (id, dtype, updated_at) VALUES (0, ?, ?)",
+                (self.dtype, time.time())
+            )
+            self._conn = conn
+        return self._conn
+
+    def _transaction(self):
+        return _Transaction(self)
+
+    def _state(self, conn: sqlite3.Connection) -> Dict[str, Any]:
+        return dict(conn.execute("SELECT * FROM snapshot_state WHERE id = 0").fetchone())
+
+    def _file(self, kind: str, generation: int) -> str:
+        return os.path.join(self.directory, f"{kind}-{generation}.npy")
+
+    def _mapped(self, state: Dict[str, Any]) -> bool:
+        """Map the state's generation if it is not the one already mapped"""
+        if not state["capacity"]:
+            self._generation = self._vectors = self._times = None
+            return False
+        if self._generation != state["generation"]:
+            self._vectors = np.load(self._file("vectors", state["generation"]), mmap_mode="r+")
+            self._times = np.load(self._file("times", state["generation"]), mmap_mode="r+")
+            self._generation = state["generation"]
+        return True
+
+    # State
+
+    def get_state(self) -> Dict[str, Any]:
+        """namespace, dimension, dtype, capacity, rows, generation and complete"""
+        with self._lock:
+            state = self._state(self._connection())
+        state["complete"] = bool(state["complete"])
+        return state
+
+    def reset(self, namespace: Optional[str]) -> None:
+        """Drop every row and start over for a namespace"""
+        with self._lock:
+            with self._transaction() as conn:
+                self._reset(conn, self._state(conn), namespace)
+            self._remove_stale_files()
+
+    def _reset(self, conn: sqlite3.Connection, state: Dict[str, Any], namespace: Optional[str]) -> None:
+        conn.execute("DELETE FROM snapshot_vectors")
+        conn.execute(
+            "UPDATE snapshot_state SET namespace = ?, dimension = NULL, dtype = ?, capacity = 0, rows = 0, "
+            "generation = ?, complete = 0, updated_at = ? WHERE id = 0",
+            (namespace, self.dtype, state["generation"] + 1, time.time())
+        )
+        state.update(namespace=namespace, dimension=None, dtype=self.dtype, capacity=0, rows=0,
+                     generation=state["generation"] + 1, complete=0)
+        logger.info(f"Vector snapshot reset for namespace '{namespace}'")
+
+    def mark_complete(self, namespace: str) -> None:
+        """Record that the whole window of `namespace` has been loaded"""
+        with self._lock:
+            with self._transaction() as conn:
+                conn.execute("UPDATE snapshot_state SET complete = 1, updated_at = ? WHERE id = 0 AND namespace = ?",
+                             (time.time(), namespace))
+
+    # Writes
+
+    def upsert(self, rows: List[SnapshotRow], namespace: str, max_vectors: int, min_time: float) -> int:
+        """
+        Write unit-length rows for a namespace, replacing rows with the same id.
+
+        Every write goes to a fresh row; rows of replaced vectors are freed
+        once the transaction has committed.
+
+        Args:
+            rows: (id, unit values, metadata, message time) tuples
+            namespace: Namespace the vectors belong to (a different one resets the snapshot)
+            max_vectors: Live rows kept when the matrix is compacted (newest win)
+            min_time: Rows with older messages are dropped when compacting
+
+        Returns:
+            Rows written
+        """
+        latest: Dict[str, SnapshotRow] = {}
+        for row in rows:
+            latest[row[0]] = row
+        if not latest:
+            return 0
+
+        with self._lock:
+            with self._transaction() as conn:
+                state = self._state(conn)
+                if state["namespace"] != namespace:
+                    self._reset(conn, state, namespace)
+                dimension = state["dimension"] or len(next(iter(latest.values()))[1])
+                writes = [row for row in latest.values() if len(row[1]) == dimension]
+                if len(writes) < len(latest):
+                    logger.warning(f"Vector snapshot: skipping {len(latest) - len(writes)} vectors "
+                                   f"whose dimension is not {dimension}")
+                if not writes:
+                    return 0
+
+                if state["rows"] + len(writes) > state["capacity"]:
+                    self._write_generation(conn, state, dimension, len(writes), max_vectors, min_time)
+                else:
+                    self._mapped(state)
+                replaced = list(self._rows_for(conn, [row[0] for row in writes]).values())
+
+                next_row = state["rows"] + len(writes)
+                positions = list(range(state["rows"], next_row))
+                records = [
+                    (position, vector_id, vector_time, json.dumps(metadata, default=str))
+                    for position, (vector_id, values, metadata, vector_time) in zip(positions, writes)
+                ]
+
+                order = np.asarray(positions)
+                matrix = np.asarray([row[1] for row in writes], dtype=np.float32)
+                self._vectors[order] = self._encode(matrix, state["dtype"])
+                self._times[order] = [row[3] for row in writes]
+                self._vectors.flush()
+                self._times.flush()
+
+                conn.executemany(
+                    "INSERT INTO snapshot_vectors (row, vector_id, vector_time, metadata) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(vector_id) DO UPDATE SET row = excluded.row, "
+                    "vector_time = excluded.vector_time, metadata = excluded.metadata",
+                    records
+                )
+                conn.execute("UPDATE snapshot_state SET rows = ?, updated_at = ? WHERE id = 0",
+                             (next_row, time.time()))
+            self._free_rows(replaced)
+            self._remove_stale_files()
+
+        self.stats["rows_written"] += len(writes)
+        return len(writes)
+
+    def delete(self, ids: Iterable[str]) -> int:
+        """Free the rows of deleted vectors"""
+        ids = list(ids)
+        if not ids:
+            return 0
+        with self._lock:
+            with self._transaction() as conn:
+                found = self._rows_for(conn, ids)
+                if not found or not self._mapped(self._state(conn)):
+                    return 0
+                conn.executemany("DELETE FROM snapshot_vectors WHERE vector_id = ?", [(i,) for i in found])
+            self._free_rows(list(found.values()))
+        self.stats["rows_deleted"] += len(found)
+        return len(found)
+
+    def _free_rows(self, rows: List[int]) -> None:
+        """
+        Stop scoring rows whose ids were committed elsewhere (or deleted).
+
+        Runs after the commit: until then the rows are still the committed
+        version. If a compaction has already moved to a new generation this
+        only touches the old, unlinked mapping, which copied live rows only.
+        """
+        if rows and self._times is not None:
+            self._times[np.asarray(rows)] = np.nan
+            self._times.flush()
+
+    def _rows_for(self, conn: sqlite3.Connection, ids: List[str]) -> Dict[str, int]:
+        found = {}
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            marks = ",".join("?" * len(chunk))
+            found.update(conn.execute(
+                f"SELECT vector_id, row FROM snapshot_vectors WHERE vector_id IN ({marks})", chunk
+            ).fetchall())
+        return found
+
+    def _encode(self, unit_rows, dtype: str):
+        if dtype == "int8":
+            return np.clip(np.rint(unit_rows * INT8_SCALE), -127, 127).astype(np.int8)
+        return unit_rows.astype(np.float16)
+
+    def _write_generation(
+        self,
+        conn: sqlite3.Connection,
+        state: Dict[str, Any],
+        dimension: int,
+        incoming: int,
+        max_vectors: int,
+        min_time: float
+    ) -> None:
+        """Copy live rows into a larger (or just compacted) next generation"""
+        keep = np.zeros(0, dtype=np.int64)
+        if self._mapped(state) and state["rows"]:
+            times = np.asarray(self._times[:state["rows"]])
+            # Rows freed after a commit that never ran (crash) still have a time but no id
+            owned = np.zeros(state["rows"], dtype=bool)
+            owned[[row for (row,) in conn.execute("SELECT row FROM snapshot_vectors") if row < state["rows"]]] = True
+            keep = np.flatnonzero((times >= min_time) & owned)
+            room = max(max_vectors - incoming, 0)
+            if len(keep) > room:
+                newest = np.argsort(times[keep], kind="stable")[len(keep) - room:]
+                keep = np.sort(keep[newest])
+
+        needed = len(keep) + incoming
+        capacity = state["capacity"]
+        if needed > capacity * 3 // 4:
+            capacity = min(max(capacity * 2, MIN_CAPACITY), max_vectors + MIN_CAPACITY)
+        capacity = max(capacity, needed)
+
+        generation = state["generation"] + 1
+        vectors = np.lib.format.open_memmap(self._file("vectors", generation), mode="w+",
+                                            dtype=state["dtype"], shape=(capacity, dimension))
+        times_out = np.lib.format.open_memmap(self._file("times", generation), mode="w+",
+                                              dtype=np.float64, shape=(capacity,))
+        times_out[:] = np.nan
+        for start in range(0, len(keep), SCORE_CHUNK_ROWS):
+            chunk = keep[start:start + SCORE_CHUNK_ROWS]
+            vectors[start:start + len(chunk)] = self._vectors[chunk]
+            times_out[start:start + len(chunk)] = self._times[chunk]
+        vectors.flush()
+        times_out.flush()
+        del vectors, times_out
+
+        # Renumber the sidecar to match; negative rows avoid primary key clashes mid-update
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS snapshot_remap (old INTEGER PRIMARY KEY, new INTEGER NOT NULL)")
+        conn.execute("DELETE FROM snapshot_remap")
+        conn.executemany("INSERT INTO snapshot_remap (old, new) VALUES (?, ?)",
+                         [(int(old), new) for new, old in enumerate(keep)])
+        dropped = conn.execute("DELETE FROM snapshot_vectors WHERE row NOT IN (SELECT old FROM snapshot_remap)").rowcount
+        conn.execute("UPDATE snapshot_vectors SET row = -1 - (SELECT new FROM snapshot_remap WHERE old = row)")
+        conn.execute("UPDATE snapshot_vectors SET row = -1 - row")
+        conn.execute(
+            "UPDATE snapshot_state SET dimension = ?, capacity = ?, rows = ?, generation = ?, updated_at = ? WHERE id = 0",
+            (dimension, capacity, len(keep), generation, time.time())
+        )
+        state.update(dimension=dimension, capacity=capacity, rows=len(keep), generation=generation)
+        self._mapped(state)
+        self.stats["generations_written"] += 1
+        self.stats["rows_dropped"] += dropped
+        logger.info(f"Vector snapshot generation {generation}: {len(keep)} rows kept, "
+                    f"{dropped} dropped, capacity {capacity}")
+
+    def _remove_stale_files(self) -> None:
+        """Unlink older generations (processes still mapping them keep their pages)"""
+        current = self._state(self._connection())["generation"]
+        for path in glob.glob(os.path.join(self.directory, "*-*.npy")):
+            try:
+                generation = int(os.path.basename(path).rsplit("-", 1)[1][:-len(".npy")])
+            except ValueError:
+                continue
+            if generation < current:
+                try:
+                    os.remove(path)
+                except OSError as e:
+                    logger.debug(f"Could not remove stale snapshot file {path}: {e}")
+
+    # Reads
+
+    def scores(self, query, min_time: float):
+        """
+        Cosine score of a unit-length query against every row in use.
+
+        Returns:
+            (scores, generation): float32 array indexed by row, -inf for deleted
+            rows and rows older than `min_time`, and the generation the rows
+            belong to (pass it to lookup); None when the snapshot is empty or
+            of another dimension
+        """
+        with self._lock:
+            state = self._state(self._connection())
+            if not state["rows"] or state["dimension"] != query.shape[0] or not self._mapped(state):
+                return None
+            rows = state["rows"]
+            vectors = self._vectors[:rows]
+            times = self._times[:rows]
+
+        scores = np.empty(rows, dtype=np.float32)
+        for start in range(0, rows, SCORE_CHUNK_ROWS):
+            scores[start:start + SCORE_CHUNK_ROWS] = vectors[start:start + SCORE_CHUNK_ROWS].astype(np.float32) @ query
+        if state["dtype"] == "int8":
+            scores /= INT8_SCALE
+        scores[~(times >= min_time)] = -np.inf
+        return scores, state["generation"]
+
+    def existing(self, ids: Iterable[str]) -> set:
+        """Which of `ids` have a row"""
+        with self._lock:
+            return set(self._rows_for(self._connection(), list(ids)))
+
+    def lookup(self, rows: Iterable[int], generation: Optional[int] = None) -> Dict[int, Tuple[str, Dict[str, Any]]]:
+        """
+        Id and metadata of rows (rows deleted or replaced in the meantime are missing).
+
+        Args:
+            rows: Row numbers from scores()
+            generation: Generation returned with the scores
+
+        Raises:
+            SnapshotChanged: If the rows were renumbered into another generation since
+        """
+        rows = [int(row) for row in rows]
+        found = {}
+        with self._lock:
+            conn = self._connection()
+            # One read transaction, so the generation checked is the one the rows are read from
+            conn.execute("BEGIN")
+            try:
+                if generation is not None and self._state(conn)["generation"] != generation:
+                    raise SnapshotChanged(f"snapshot generation {generation} was replaced")
+                for i in range(0, len(rows), 500):
+                    chunk = rows[i:i + 500]
+                    marks = ",".join("?" * len(chunk))
+                    for record in conn.execute(
+                        f"SELECT row, vector_id, metadata FROM snapshot_vectors WHERE row IN ({marks})", chunk
+                    ):
+                        found[record["row"]] = (record["vector_id"], json.loads(record["metadata"]))
+            finally:
+                conn.execute("COMMIT")
+        return found
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Snapshot state and file sizes"""
+        with self._lock:
+            conn = self._connection()
+            state = self._state(conn)
+            live = conn.execute("SELECT COUNT(*) FROM snapshot_vectors").fetchone()[0]
+        disk_bytes = sum(os.path.getsize(self._file(kind, state["generation"]))
+                         for kind in ("vectors", "times")
+                         if os.path.exists(self._file(kind, state["generation"])))
+        return {
+            "directory": self.directory,
+            "namespace": state["namespace"],
+            "dtype": state["dtype"],
+            "dimension": state["dimension"],
+            "generation": state["generation"],
+            "capacity": state["capacity"],
+            "rows_in_use": state["rows"],
+            "live_vectors": live,
+            "complete": bool(state["complete"]),
+            "disk_mb": round(disk_bytes / 1024 / 1024, 1),
+            **self.stats
+        }
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT under the snapshot lock (serialises writer processes)"""
+
+    def __init__(self, snapshot: VectorSnapshot):
+        self.snapshot = snapshot
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.snapshot._lock.acquire()
+        try:
+            self.conn = self.snapshot._connection()
+            self.conn.execute("BEGIN IMMEDIATE")
+        except Exception:
+            self.snapshot._lock.release()
+            raise
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        try:
+            self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        finally:
+            self.snapshot._lock.release()
@@ -0,0 +1,356 @@
+"""
+Vector Transfer - Copy stored vectors between Pinecone indexes without re-embedding.
+
+Moving to another index or region used to mean re-extracting every channel
+from Slack and re-embedding it through Gemini, which takes days under the
+rate limits. Vectors are now copied as they are:
+
+- export pages through a namespace, or each of its time partitions, with
+  list + fetch and writes fixed-size chunks (chunk-NNNNNN.jsonl.gz: id,
+  values, metadata per line) next to a manifest.json that records each
+  chunk's vector count and SHA-256 and where to resume listing from
+- import verifies each chunk's checksum and bulk-upserts it into a target
+  index/namespace (routed to its time partitions when partitioning is on)
+  with VECTOR_IMPORT_WORKERS parallel workers; finished chunks are recorded
+  in import-<index>-<namespace>.json so an interrupted import skips them
+  when restarted
+
+Snapshots live under VECTOR_EXPORT_DIR, one directory each, and their
+progress is reported by /admin/pinecone-status. Vectors keep their
+dimension, so a target index must have the same dimension as the source.
+"""
+
+import asyncio
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from config import settings
+from services.data.local_vector_index import _field
+from services.data.vector_partitions import vector_partitions
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMAT = 1
+MANIFEST_FILE = "manifest.json"
+LIST_PAGE_SIZE = 100  # Pinecone's list limit
+FETCH_BATCH = 100  # Ids per fetch call
+UPSERT_BATCH = 100  # Vectors per upsert call
+
+
+class ChecksumMismatch(ValueError):
+    """A snapshot chunk does not match the checksum recorded at export"""
+
+
+def _write_json(path: str, data: Dict[str, Any]) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _read_json(path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _slug(value: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", value) or "default"
+
+
+def snapshot_path(name: str, root: Optional[str] = None) -> str:
+    """Directory of a named export under VECTOR_EXPORT_DIR"""
+    return os.path.join(root or settings.VECTOR_EXPORT_DIR, _slug(name))
+
+
+def read_manifest(directory: str) -> Optional[Dict[str, Any]]:
+    """Manifest of the export in `directory`, or None"""
+    return _read_json(os.path.join(directory, MANIFEST_FILE))
+
+
+def _vector_record(vector: Any) -> Dict[str, Any]:
+    record = {
+        "id": _field(vector, "id"),
+        "values": [float(value) for value in _field(vector, "values") or []],
+        "metadata": dict(_field(vector, "metadata") or {})
+    }
+    sparse = _field(vector, "sparse_values")
+    if sparse:
+        record["sparse_values"] = {"indices": list(_field(sparse, "indices")), "values": list(_field(sparse, "values"))}
+    return record
+
+
+async def export_vectors(
+    index,
+    directory: str,
+    namespace: str = "",
+    index_name: Optional[str] = None,
+    chunk_vectors: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Stream a namespace into a chunked local snapshot, resuming an unfinished export.
+
+    Args:
+        index: Pinecone index handle to read
+        directory: Snapshot directory (created if missing)
+        namespace: Namespace to export
+        index_name: Source index name, recorded in the manifest
+        chunk_vectors: Vectors per chunk file
+
+    Returns:
+        The manifest
+    """
+    os.makedirs(directory, exist_ok=True)
+    manifest_path = os.path.join(directory, MANIFEST_FILE)
+    manifest = _read_json(manifest_path)
+    source = {"index": index_name or settings.PINECONE_INDEX_NAME, "namespace": namespace}
+
+    if manifest is None:
+        stats = await asyncio.to_thread(index.describe_index_stats)
+        reported = sum(_field(summary, "vector_count", 0) for name, summary in (_field(stats, "namespaces") or {}).items()
+                       if name == namespace or vector_partitions.period_from_name(namespace, name))
+        manifest = {
+            "format": EXPORT_FORMAT,
+            "source": {**source, "dimension": _field(stats, "dimension"), "vectors_reported": reported},
+            "status": "exporting",
+            "chunk_vectors": chunk_vectors or settings.VECTOR_EXPORT_CHUNK_VECTORS,
+            # Physical namespaces read in turn: the namespace itself or its time partitions
+            "partitions": await vector_partitions.partitions(index, namespace, refresh=True),
+            "partition_position": 0,
+            "next_token": None,
+            "chunks": [],
+            "vectors": 0,
+            "started_at": datetime.now().isoformat(),
+            "updated_at": datetime.now().isoformat()
+        }
+        _write_json(manifest_path, manifest)
+    elif {key: manifest["source"].get(key) for key in source} != source:
+        raise ValueError(f"{directory} holds an export of {manifest['source']}, not {source}")
+    elif manifest["status"] == "complete":
+        return manifest
+    else:
+        logger.info(f"Resuming vector export into {directory} after {len(manifest['chunks'])} chunks")
+
+    try:
+        started = time.perf_counter()
+        while manifest["partition_position"] < len(manifest["partitions"]):
+            await _export_pages(index, directory, manifest["partitions"][manifest["partition_position"]],
+                                manifest, manifest_path)
+            manifest["partition_position"] += 1
+            manifest["next_token"] = None
+            _write_json(manifest_path, manifest)
+    except BaseException:
+        manifest["status"] = "interrupted"
+        manifest["updated_at"] = datetime.now().isoformat()
+        _write_json(manifest_path, manifest)
+        raise
+
+    manifest["status"] = "complete"
+    manifest["completed_at"] = manifest["updated_at"] = datetime.now().isoformat()
+    _write_json(manifest_path, manifest)
+    logger.info(f"Exported {manifest['vectors']} vectors from '{namespace}' into {len(manifest['chunks'])} "
+                f"chunks in {time.perf_counter() - started:.1f}s")
+    return manifest
+
+
+async def _export_pages(
+    index,
+    directory: str,
+    namespace: str,
+    manifest: Dict[str, Any],
+    manifest_path: str
+) -> None:
+    """Export one physical namespace, continuing from the manifest's pagination token"""
+    token = manifest["next_token"]
+    pending: List[str] = []
+    while True:
+        page = await asyncio.to_thread(index.list_paginated, namespace=namespace, limit=LIST_PAGE_SIZE,
+                                       pagination_token=token)
+        pending.extend(_field(item, "id") for item in _field(page, "vectors") or [])
+        pagination = _field(page, "pagination")
+        token = _field(pagination, "next") if pagination else None
+
+        if len(pending) >= manifest["chunk_vectors"] or (token is None and pending):
+            manifest["chunks"].append(await _write_chunk(index, directory, namespace, len(manifest["chunks"]), pending))
+            manifest["vectors"] += manifest["chunks"][-1]["vectors"]
+            pending = []
+            # The token resumes after the chunk just written, never in the middle of one
+            manifest["next_token"] = token
+            manifest["updated_at"] = datetime.now().isoformat()
+            _write_json(manifest_path, manifest)
+        if token is None:
+            break
+
+
+async def _write_chunk(index, directory: str, namespace: str, number: int, ids: List[str]) -> Dict[str, Any]:
+    lines = []
+    for i in range(0, len(ids), FETCH_BATCH):
+        response = await asyncio.to_thread(index.fetch, ids=ids[i:i + FETCH_BATCH], namespace=namespace)
+        fetched = _field(response, "vectors") or {}
+        # Vectors deleted since they were listed are simply absent
+        lines.extend(json.dumps(_vector_record(fetched[vector_id])) for vector_id in ids[i:i + FETCH_BATCH]
+                     if vector_id in fetched)
+
+    data = gzip.compress(("\n".join(lines) + "\n").encode() if lines else b"")
+    file_name = f"chunk-{number:06d}.jsonl.gz"
+    path = os.path.join(directory, file_name)
+    with open(f"{path}.tmp", "wb") as f:
+        f.write(data)
+    os.replace(f"{path}.tmp", path)
+    return {"file": file_name, "vectors": len(lines), "bytes": len(data), "sha256": hashlib.sha256(data).hexdigest()}
+
+
+def read_chunk(directory: str, chunk: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Load one chunk's vectors after verifying its checksum.
+
+    Raises:
+        ChecksumMismatch: If the file was truncated or altered since export
+    """
+    with open(os.path.join(directory, chunk["file"]), "rb") as f:
+        data = f.read()
+    if hashlib.sha256(data).hexdigest() != chunk["sha256"]:
+        raise ChecksumMismatch(f"{chunk['file']} does not match its export checksum")
+    return [json.loads(line) for line in gzip.decompress(data).decode().splitlines() if line]
+
+
+def _import_state_path(directory: str, index_name: str, namespace: str) -> str:
+    return os.path.join(directory, f"import-{_slug(index_name)}-{_slug(namespace)}.json")
+
+
+async def import_vectors(
+    index,
+    directory: str,
+    namespace: str,
+    index_name: Optional[str] = None,
+    workers: Optional[int] = None,
+    budget=None
+) -> Dict[str, Any]:
+    """
+    Upsert a complete snapshot into an index/namespace, skipping chunks already imported.
+
+    Args:
+        index: Pinecone index handle to write
+        directory: Snapshot directory
+        namespace: Target namespace
+        index_name: Target index name (keys the resume state)
+        workers: Chunks upserted concurrently
+        budget: IngestionBudget pacing upsert calls (defaults to the shared one)
+
+    Returns:
+        Import state: status, chunks_done, vectors_imported, errors
+    """
+    if budget is None:
+        from services.processing.ingestion_scheduler import ingestion_budget
+        budget = ingestion_budget
+
+    manifest = read_manifest(directory)
+    if manifest is None or manifest.get("status") != "complete":
+        raise ValueError(f"{directory} does not hold a complete export")
+    index_name = index_name or settings.PINECONE_INDEX_NAME
+
+    stats = await asyncio.to_thread(index.describe_index_stats)
+    dimension = _field(stats, "dimension")
+    if dimension and manifest["source"]["dimension"] and dimension != manifest["source"]["dimension"]:
+        raise ValueError(f"target index has dimension {dimension}, the export has "
+                         f"{manifest['source']['dimension']}; vectors would have to be re-embedded")
+
+    state_path = _import_state_path(directory, index_name, namespace)
+    state = _read_json(state_path) or {
+        "target": {"index": index_name, "namespace": namespace},
+        "chunks_done": [],
+        "vectors_imported": 0,
+        "started_at": datetime.now().isoformat()
+    }
+    state.update(status="importing", errors=[], updated_at=datetime.now().isoformat())
+    _write_json(state_path, state)
+
+    done = set(state["chunks_done"])
+    queue: asyncio.Queue = asyncio.Queue()
+    for number, chunk in enumerate(manifest["chunks"]):
+        if number not in done:
+            queue.put_nowait((number, chunk))
+    if done:
+        logger.info(f"Resuming vector import into '{namespace}': {len(done)} of {len(manifest['chunks'])} chunks done")
+
+    state_lock = asyncio.Lock()
+    started = time.perf_counter()
+
+    async def worker():
+        while True:
+            try:
+                number, chunk = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            try:
+                vectors = await asyncio.to_thread(read_chunk, directory, chunk)
+                for i in range(0, len(vectors), UPSERT_BATCH):
+                    # Vectors land in the target's time partitions when partitioning is on
+                    for partition, batch in vector_partitions.route(vectors[i:i + UPSERT_BATCH], namespace).items():
+                        await budget.acquire("pinecone")
+                        await asyncio.to_thread(index.upsert, vectors=batch, namespace=partition)
+            except Exception as e:
+                logger.error(f"Vector import of {chunk['file']} failed: {e}")
+                async with state_lock:
+                    state["errors"].append(f"{chunk['file']}: {e}")
+                continue
+            async with state_lock:
+                state["chunks_done"].append(number)
+                state["vectors_imported"] += len(vectors)
+                state["updated_at"] = datetime.now().isoformat()
+                _write_json(state_path, state)
+
+    await asyncio.gather(*(worker() for _ in range(max(1, workers or settings.VECTOR_IMPORT_WORKERS))))
+
+    state["chunks_done"].sort()
+    state["status"] = "complete" if len(state["chunks_done"]) == len(manifest["chunks"]) else "incomplete"
+    state["completed_at"] = state["updated_at"] = datetime.now().isoformat()
+    _write_json(state_path, state)
+    logger.info(f"Imported {state['vectors_imported']} of {manifest['vectors']} vectors into '{namespace}' "
+                f"in {time.perf_counter() - started:.1f}s ({state['status']})")
+    return state
+
+
+def list_transfers(root: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Progress of every export under VECTOR_EXPORT_DIR and of the imports made from it"""
+    root = root or settings.VECTOR_EXPORT_DIR
+    transfers = []
+    if not os.path.isdir(root):
+        return transfers
+    for name in sorted(os.listdir(root)):
+        directory = os.path.join(root, name)
+        manifest = read_manifest(directory)
+        if manifest is None:
+            continue
+        imports = []
+        for file_name in sorted(os.listdir(directory)):
+            if file_name.startswith("import-") and file_name.endswith(".json"):
+                state = _read_json(os.path.join(directory, file_name)) or {}
+                imports.append({
+                    "target": state.get("target"),
+                    "status": state.get("status"),
+                    "chunks_done": len(state.get("chunks_done", [])),
+                    "vectors_imported": state.get("vectors_imported", 0),
+                    "errors": state.get("errors", []),
+                    "updated_at": state.get("updated_at")
+                })
+        transfers.append({
+            "name": name,
+            "source": manifest["source"],
+            "status": manifest["status"],
+            "chunks": len(manifest["chunks"]),
+            "vectors": manifest["vectors"],
+            "megabytes": round(sum(chunk["bytes"] for chunk in manifest["chunks"]) / 1024 / 1024, 1),
+            "updated_at": manifest["updated_at"],
+            "imports": imports
+        })
+    return transfers
@@ -5,18 +5,24 @@ Properly handles message ordering, thread nesting, and complete historical data
 
 import logging
 from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional, Set
+from typing import List, Dict, Any, Optional, Set, Tuple, Callable, AsyncIterator
 import asyncio
+import inspect
 from slack_sdk import WebClient
 from slack_sdk.errors import SlackApiError
 import time
 import json
-from dataclasses import dataclass
+from dataclasses import dataclass, asdict
 
 from config import settings
+from services.external_apis.slack_directory import slack_directory
+from services.external_apis.slack_rate_limiter import slack_rate_limiter
+from services.processing.ingestion_checkpoints import ChannelCheckpoint, CheckpointPage, PagePosition
 
 logger = logging.getLogger(__name__)
 
+THREAD_REPLIES_PAGE_SIZE = 200
+
 @dataclass
 class SlackMessage:
     """Enhanced message structure with proper thread relationships"""
@@ -46,6 +52,12 @@ class SlackMessage:
             self.files = []
         if self.attachments is None:
             self.attachments = []
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain dict form (ISO timestamp) as consumed by DataProcessor"""
+        data = asdict(self)
+        data["timestamp"] = self.timestamp.isoformat()
+        return data
 
 class EnhancedSlackConnector:
     """
@@ -54,10 +66,9 @@ class EnhancedSlackConnector:
     
     def __init__(self):
         self.client = WebClient(token=settings.SLACK_BOT_TOKEN)
-        self.base_delay = 1.0  # Base delay between API calls
-        self.max_delay = 30.0  # Maximum delay for exponential backoff
-        self.user_cache = {}  # Cache for user information
-        self.channel_cache = {}  # Cache for channel information
+        self.rate_limiter = slack_rate_limiter  # Process-wide, paces calls per Slack tier
+        self.directory = slack_directory  # Shared, bulk-loaded user/channel directory
+        self.thread_fetch_progress: Dict[str, Dict[str, Any]] = {}  # channel_id -> latest thread fetch progress
         
     async def extract_channel_history_complete(
         self, 
@@ -65,7 +76,8 @@ class EnhancedSlackConnector:
         channel_name: str,
         max_messages: int = 1000,
         start_date: Optional[datetime] = None,
-        max_age_days: int = 365
+        max_age_days: int = 365,
+        progress_callback: Optional[Callable[[Dict[str, Any]], Any]] = None
     ) -> List[SlackMessage]:
         """
         Extract complete channel history with proper thread relationships.
@@ -76,6 +88,7 @@ class EnhancedSlackConnector:
             max_messages: Maximum messages to extract (to handle rate limits)
             start_date: Optional start date (defaults to 1 year ago for initial embedding)
             max_age_days: Maximum age of messages to include (default: 365 days)
+            progress_callback: Optional callable (sync or async) receiving thread fetch progress
             
         Returns:
             List of SlackMessage objects with proper thread relationships
@@ -102,7 +115,7 @@ class EnhancedSlackConnector:
             )
             
             # Build thread relationships
-            threaded_messages = await self._build_thread_relationships(all_messages, channel_id)
+            threaded_messages = await self._build_thread_relationships(all_messages, channel_id, progress_callback)
             
             # Sort messages chronologically, preserving thread order
             sorted_messages = self._sort_messages_with_threads(threaded_messages)
@@ -123,28 +136,51 @@ class EnhancedSlackConnector:
         """Extract messages with pagination and rate limiting"""
         
         messages = []
-        cursor = None
-        oldest_ts = str(start_date.timestamp())
-        call_count = 0
         max_calls = max_messages // 100  # Limit API calls
         
         logger.info(f"Extracting messages from {start_date.isoformat()}, max {max_calls} API calls")
         
-        while call_count < max_calls:
+        async for page in self._iter_history_pages(channel_id, str(start_date.timestamp()), max_calls=max_calls):
+            messages.extend(page)
+        
+        logger.info(f"Completed extraction: {len(messages)} messages")
+        return messages
+    
+    async def _iter_history_pages(
+        self,
+        channel_id: str,
+        oldest_ts: str,
+        latest_ts: Optional[str] = None,
+        max_calls: Optional[int] = None,
+        page_size: int = 100,
+        start_page: int = 0
+    ) -> AsyncIterator[CheckpointPage]:
+        """
+        Yield valid raw messages one conversations.history page at a time.
+        
+        Pages arrive newest first, each with its PagePosition (numbered after
+        start_page); the window's last page is marked final, and an empty final
+        page is yielded when the window ends on a page without valid messages.
+        Slack errors end the iteration after logging, without a final page.
+        """
+        cursor = None
+        call_count = 0
+        total = 0
+        page_number = start_page
+        
+        while max_calls is None or call_count < max_calls:
             try:
-                # Exponential backoff based on call count
-                if call_count > 0:
-                    delay = min(self.base_delay * (1.5 ** call_count), self.max_delay)
-                    logger.info(f"Rate limiting delay: {delay:.1f}s (call {call_count + 1})")
-                    await asyncio.sleep(delay)
+                params = {
+                    "channel": channel_id,
+                    "limit": page_size,
+                    "oldest": oldest_ts,
+                    "cursor": cursor,
+                    "include_all_metadata": True
+                }
+                if latest_ts:
+                    params["latest"] = latest_ts
                 
-                response = self.client.conversations_history(
-                    channel=channel_id,
-                    limit=100,
-                    oldest=oldest_ts,
-                    cursor=cursor,
-                    include_all_metadata=True
-                )
+                response = await self.rate_limiter.call(self.client, "conversations_history", **params)
                 
                 if not response["ok"]:
                     logger.error(f"Slack API error: {response.get('error')}")
@@ -153,50 +189,137 @@ class EnhancedSlackConnector:
                 batch_messages = response.get("messages", [])
                 if not batch_messages:
                     logger.info("No more messages found")
+                    yield CheckpointPage([], PagePosition(page_number + 1, cursor=cursor, final=True))
                     break
                 
-                # Filter and add messages
-                valid_messages = [
-                    msg for msg in batch_messages 
-                    if self._is_valid_message(msg)
-                ]
-                
-                messages.extend(valid_messages)
                 call_count += 1
-                
-                logger.info(f"Extracted {len(valid_messages)} valid messages (total: {len(messages)})")
-                
-                # Check for more messages
-                if not response.get("has_more", False):
-                    logger.info("No more pages available")
-                    break
-                
-                cursor = response.get("response_metadata", {}).get("next_cursor")
-                if not cursor:
-                    logger.info("No next cursor available")
-                    break
+                has_more = response.get("has_more", False)
+                page_cursor, cursor = cursor, response.get("response_metadata", {}).get("next_cursor")
                 
             except SlackApiError as e:
-                if e.response["error"] == "rate_limited":
-                    retry_after = int(e.response.get("headers", {}).get("Retry-After", 60))
-                    logger.warning(f"Rate limited! Waiting {retry_after} seconds")
-                    await asyncio.sleep(retry_after)
-                    continue
-                else:
-                    logger.error(f"Slack API error: {e.response['error']}")
-                    break
+                logger.error(f"Slack API error: {e.response['error']}")
+                break
             
             except Exception as e:
                 logger.error(f"Error during message extraction: {e}")
                 break
+            
+            # Filter and yield messages
+            valid_messages = [
+                msg for msg in batch_messages 
+                if self._is_valid_message(msg)
+            ]
+            total += len(valid_messages)
+            logger.info(f"Extracted {len(valid_messages)} valid messages (total: {total})")
+            
+            page_number += 1
+            final = not has_more or not cursor
+            # Positions span every message on the page, so filtered ones are not fetched again
+            position = PagePosition.for_messages(
+                page_number, [msg["ts"] for msg in batch_messages if msg.get("ts")],
+                cursor=page_cursor, next_cursor=cursor, final=final
+            )
+            if valid_messages or final:
+                yield CheckpointPage(valid_messages, position)
+            
+            # Check for more messages
+            if not has_more:
+                logger.info("No more pages available")
+                break
+            
+            if not cursor:
+                logger.info("No next cursor available")
+                break
+        
+        logger.debug(f"History pagination for {channel_id} finished after {call_count} API calls")
+    
+    async def iter_channel_messages(
+        self,
+        channel_id: str,
+        start_time: datetime,
+        end_time: Optional[datetime] = None,
+        max_messages: Optional[int] = None,
+        page_size: int = 100,
+        include_threads: bool = True,
+        progress_callback: Optional[Callable[[Dict[str, Any]], Any]] = None,
+        checkpoint: Optional[ChannelCheckpoint] = None
+    ) -> AsyncIterator[CheckpointPage]:
+        """
+        Stream a channel's messages one history page at a time.
         
-        logger.info(f"Completed extraction: {len(messages)} messages, {call_count} API calls")
+        Each yielded batch holds one page of parent messages followed by the
+        replies of the threads started on that page, in thread order, so a
+        consumer can process it without the rest of the channel.
+        
+        Args:
+            channel_id: Slack channel ID
+            start_time: Oldest message time to include
+            end_time: Newest message time to include (defaults to now)
+            max_messages: Stop after roughly this many parent messages
+            page_size: Messages requested per conversations.history call
+            include_threads: Whether to fetch thread replies
+            progress_callback: Optional callable (sync or async) receiving thread fetch progress
+            checkpoint: Open ChannelCheckpoint; its window replaces start/end time and
+                iteration continues below the oldest page it has committed
+            
+        Yields:
+            Lists of SlackMessage objects (CheckpointPages carrying their position)
+        """
+        max_calls = -(-max_messages // page_size) if max_messages else None
+        oldest_ts = str(start_time.timestamp())
+        latest_ts = str(end_time.timestamp()) if end_time else None
+        start_page = 0
+        if checkpoint:
+            oldest_ts = checkpoint.window_oldest_ts or oldest_ts
+            latest_ts = checkpoint.resume_latest_ts or latest_ts
+            start_page = checkpoint.page
+        
+        async for page in self._iter_history_pages(
+            channel_id, oldest_ts, latest_ts, max_calls=max_calls, page_size=page_size, start_page=start_page
+        ):
+            if include_threads:
+                batch = await self._build_thread_relationships(page, channel_id, progress_callback)
+            else:
+                batch = []
+                for raw_msg in page:
+                    enhanced_msg = await self._create_enhanced_message(raw_msg, channel_id)
+                    if enhanced_msg:
+                        batch.append(enhanced_msg)
+
+            if batch or page.position.final:
+                yield CheckpointPage(self._sort_messages_with_threads(batch), page.position)
+    
+    async def extract_channel_messages(
+        self,
+        channel_id: str,
+        start_time: datetime,
+        end_time: Optional[datetime] = None,
+        batch_size: int = 100
+    ) -> List[Dict[str, Any]]:
+        """
+        Extract a time range of channel messages (with thread replies) as dicts.
+        
+        Materializes the whole range; ingestion should stream iter_channel_messages instead.
+        
+        Args:
+            channel_id: Slack channel ID
+            start_time: Oldest message time to include
+            end_time: Newest message time to include (defaults to now)
+            batch_size: Messages requested per conversations.history call
+            
+        Returns:
+            Message dicts as produced by SlackMessage.to_dict
+        """
+        messages = []
+        async for batch in self.iter_channel_messages(channel_id, start_time, end_time, page_size=batch_size):
+            messages.extend(msg.to_dict() for msg in batch)
         return messages
     
     async def _build_thread_relationships(
         self, 
         messages: List[Dict[str, Any]], 
-        channel_id: str
+        channel_id: str,
+        progress_callback: Optional[Callable[[Dict[str, Any]], Any]] = None
     ) -> List[SlackMessage]:
         """Build proper thread relationships and extract thread replies"""
         
@@ -214,15 +337,7 @@ class EnhancedSlackConnector:
                     thread_parents[enhanced_msg.ts] = enhanced_msg
         
         # Second pass: Extract thread replies for each parent
-        thread_replies = []
-        for thread_ts, parent_msg in thread_parents.items():
-            logger.info(f"Extracting {parent_msg.reply_count} replies for thread {thread_ts}")
-            
-            replies = await self._extract_thread_replies(channel_id, thread_ts, parent_msg)
-            thread_replies.extend(replies)
-            
-            # Rate limiting between thread extractions
-            await asyncio.sleep(self.base_delay)
+        thread_replies = await self._fetch_thread_replies_concurrently(channel_id, thread_parents, progress_callback)
         
         # Combine parent messages and replies
         all_messages = enhanced_messages + thread_replies
@@ -230,47 +345,135 @@ class EnhancedSlackConnector:
         logger.info(f"Built relationships: {len(enhanced_messages)} parents + {len(thread_replies)} replies = {len(all_messages)} total")
         return all_messages
     
+    async def _fetch_thread_replies_concurrently(
+        self,
+        channel_id: str,
+        thread_parents: Dict[str, SlackMessage],
+        progress_callback: Optional[Callable[[Dict[str, Any]], Any]] = None
+    ) -> List[SlackMessage]:
+        """
+        Fetch replies for many threads with bounded concurrency.
+        
+        Requests still go through the shared rate limiter, so concurrency only
+        overlaps round trips; it never exceeds the conversations.replies tier.
+        A failing thread keeps whatever pages it fetched and does not affect
+        the others.
+        
+        Args:
+            channel_id: Slack channel ID
+            thread_parents: thread_ts -> parent message
+            progress_callback: Optional callable (sync or async) receiving progress dicts
+            
+        Returns:
+            Replies of all threads, grouped per thread in parent order
+        """
+        progress = {
+            "channel_id": channel_id,
+            "threads_total": len(thread_parents),
+            "threads_done": 0,
+            "threads_failed": 0,
+            "replies": 0,
+            "started_at": time.time()
+        }
+        self.thread_fetch_progress[channel_id] = progress
+        if not thread_parents:
+            return []
+        
+        semaphore = asyncio.Semaphore(settings.SLACK_THREAD_FETCH_CONCURRENCY)
+        
+        async def fetch(thread_ts: str, parent_msg: SlackMessage) -> List[SlackMessage]:
+            async with semaphore:
+                replies, complete = await self._extract_thread_replies(channel_id, thread_ts, parent_msg)
+            
+            progress["threads_done"] += 1
+            progress["replies"] += len(replies)
+            if not complete:
+                progress["threads_failed"] += 1
+            if progress_callback:
+                try:
+                    result = progress_callback(dict(progress))
+                    if inspect.isawaitable(result):
+                        await result
+                except Exception as e:
+                    logger.debug(f"Thread fetch progress callback failed: {e}")
+            if progress["threads_done"] % 25 == 0 or progress["threads_done"] == progress["threads_total"]:
+                logger.info(
+                    f"Channel {channel_id}: fetched {progress['threads_done']}/{progress['threads_total']} threads "
+                    f"({progress['replies']} replies, {progress['threads_failed']} incomplete)"
+                )
+            return replies
+        
+        logger.info(f"Fetching replies for {len(thread_parents)} threads (concurrency {settings.SLACK_THREAD_FETCH_CONCURRENCY})")
+        per_thread = await asyncio.gather(*(
+            fetch(thread_ts, parent_msg) for thread_ts, parent_msg in thread_parents.items()
+        ))
+        
+        progress["elapsed_seconds"] = round(time.time() - progress["started_at"], 2)
+        return [reply for replies in per_thread for reply in replies]
+    
+    def get_thread_fetch_progress(self, channel_id: str) -> Optional[Dict[str, Any]]:
+        """Progress of the latest thread fetch for a channel"""
+        progress = self.thread_fetch_progress.get(channel_id)
+        return dict(progress) if progress else None
+    
     async def _extract_thread_replies(
         self, 
         channel_id: str, 
         thread_ts: str, 
         parent_msg: SlackMessage
-    ) -> List[SlackMessage]:
-        """Extract all replies for a specific thread"""
+    ) -> Tuple[List[SlackMessage], bool]:
+        """
+        Extract all replies for a specific thread, following pagination.
+        
+        Returns:
+            Tuple of (replies fetched, whether the thread was read completely)
+        """
+        replies = []
+        cursor = None
+        position = 0
         
         try:
-            response = self.client.conversations_replies(
-                channel=channel_id,
-                ts=thread_ts,
-                limit=1000
-            )
-            
-            if not response["ok"]:
-                logger.error(f"Failed to get thread replies: {response.get('error')}")
-                return []
-            
-            thread_messages = response.get("messages", [])
-            replies = []
-            
-            # Skip the first message (parent) and process replies
-            for i, raw_reply in enumerate(thread_messages[1:], 1):
-                enhanced_reply = await self._create_enhanced_message(
-                    raw_reply, 
-                    channel_id,
-                    thread_ts=thread_ts,
-                    parent_message_id=parent_msg.id,
-                    thread_position=i
+            while True:
+                response = await self.rate_limiter.call(
+                    self.client,
+                    "conversations_replies",
+                    channel=channel_id,
+                    ts=thread_ts,
+                    limit=THREAD_REPLIES_PAGE_SIZE,
+                    cursor=cursor
                 )
                 
-                if enhanced_reply:
-                    replies.append(enhanced_reply)
+                if not response["ok"]:
+                    logger.error(f"Failed to get thread replies: {response.get('error')}")
+                    return replies, False
+                
+                for raw_reply in response.get("messages", []):
+                    # The parent is returned with the replies - skip it
+                    if raw_reply.get("ts") == thread_ts:
+                        continue
+                    position += 1
+                    
+                    enhanced_reply = await self._create_enhanced_message(
+                        raw_reply, 
+                        channel_id,
+                        thread_ts=thread_ts,
+                        parent_message_id=parent_msg.id,
+                        thread_position=position
+                    )
+                    
+                    if enhanced_reply:
+                        replies.append(enhanced_reply)
+                
+                cursor = response.get("response_metadata", {}).get("next_cursor")
+                if not response.get("has_more") or not cursor:
+                    break
             
-            logger.info(f"Extracted {len(replies)} replies for thread {thread_ts}")
-            return replies
+            logger.debug(f"Extracted {len(replies)} replies for thread {thread_ts}")
+            return replies, True
             
         except Exception as e:
-            logger.error(f"Error extracting thread replies: {e}")
-            return []
+            logger.error(f"Error extracting thread replies for {thread_ts} (kept {len(replies)}): {e}")
+            return replies, False
     
     async def _create_enhanced_message(
         self,
@@ -324,6 +527,24 @@ class EnhancedSlackConnector:
             logger.error(f"Error creating enhanced message: {e}")
             return None
     
+    async def message_from_event(self, raw_message: Dict[str, Any], channel_id: str) -> Optional[SlackMessage]:
+        """
+        Create an enhanced message from a message delivered by the Events API.
+
+        Thread replies get the same thread fields as history extraction, so
+        they process to the same vector ids; their position within the thread
+        is not part of the event and is left at 0.
+        """
+        thread_ts = raw_message.get("thread_ts")
+        if thread_ts and thread_ts != raw_message.get("ts"):
+            return await self._create_enhanced_message(
+                raw_message,
+                channel_id,
+                thread_ts=thread_ts,
+                parent_message_id=f"{channel_id}_{thread_ts}"
+            )
+        return await self._create_enhanced_message(raw_message, channel_id)
+
     def _is_valid_message(self, message: Dict[str, Any]) -> bool:
         """Check if message should be processed"""
         
@@ -343,47 +564,12 @@ class EnhancedSlackConnector:
         return True
     
     async def _get_cached_user_info(self, user_id: str) -> Dict[str, Any]:
-        """Get user info with caching"""
-        
-        if not user_id:
-            return {}
-        
-        if user_id in self.user_cache:
-            return self.user_cache[user_id]
-        
-        try:
-            response = self.client.users_info(user=user_id)
-            if response["ok"]:
-                user_info = response["user"]
-                self.user_cache[user_id] = user_info
-                return user_info
-            
-        except Exception as e:
-            logger.error(f"Error getting user info for {user_id}: {e}")
-        
-        # Cache empty result to avoid repeated failures
-        self.user_cache[user_id] = {}
-        return {}
+        """Get user info from the shared workspace directory"""
+        return await self.directory.get_user(user_id)
     
     async def _get_cached_channel_info(self, channel_id: str) -> Dict[str, Any]:
-        """Get channel info with caching"""
-        
-        if channel_id in self.channel_cache:
-            return self.channel_cache[channel_id]
-        
-        try:
-            response = self.client.conversations_info(channel=channel_id)
-            if response["ok"]:
-                channel_info = response["channel"]
-                self.channel_cache[channel_id] = channel_info
-                return channel_info
-            
-        except Exception as e:
-            logger.error(f"Error getting channel info for {channel_id}: {e}")
-        
-        # Cache empty result
-        self.channel_cache[channel_id] = {}
-        return {}
+        """Get channel info from the shared workspace directory"""
+        return await self.directory.get_channel(channel_id)
     
     def _sort_messages_with_threads(self, messages: List[SlackMessage]) -> List[SlackMessage]:
         """Sort messages chronologically while preserving thread order"""
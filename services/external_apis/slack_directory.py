@@ -0,0 +1,355 @@
+"""
+Slack Workspace Directory Service
+
+Process-wide user/channel directory shared by every EnhancedSlackConnector and
+the Slack gateway. Replaces per-instance `users.info` / `conversations.info`
+lookups with a bulk `users.list` / `conversations.list` preload that is
+persisted to Redis (so new workers start warm) and refreshed incrementally in
+the background. Lookups are served from memory; a single `*.info` call is only
+made for IDs that appeared after the last refresh.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Dict, Any, List, Optional, Tuple
+
+from slack_sdk import WebClient
+from slack_sdk.errors import SlackApiError
+
+from config import settings
+from services.core.memory_service import MemoryService
+from services.core.serialization import encode_payload, decode_payload
+from services.external_apis.slack_rate_limiter import slack_rate_limiter
+
+logger = logging.getLogger(__name__)
+
+USERS_KEY = "slack_directory:users"
+CHANNELS_KEY = "slack_directory:channels"
+META_KEY = "slack_directory:meta"
+REFRESH_RETRY_SECONDS = 60  # Wait after a failed refresh before trying again
+
+
+class SlackDirectoryService:
+    """
+    Bulk-loaded, Redis-persisted cache of workspace users and channels.
+    """
+
+    def __init__(
+        self,
+        refresh_interval: int = 3600,
+        miss_ttl: int = 300,
+        page_size: int = 200
+    ):
+        self.client = WebClient(token=settings.SLACK_BOT_TOKEN)
+        self.memory_service = MemoryService()
+        self.refresh_interval = refresh_interval  # Seconds between background refreshes
+        self.miss_ttl = miss_ttl  # Seconds to remember failed lookups
+        self.page_size = page_size
+
+        self.users: Dict[str, Dict[str, Any]] = {}
+        self.channels: Dict[str, Dict[str, Any]] = {}
+        self._misses: Dict[str, float] = {}
+
+        self._loaded = False
+        self._last_refresh = 0.0  # Start of the last successful refresh
+        self._refresh_failed_at = 0.0
+        self._load_task: Optional[asyncio.Task] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+
+        self.stats = {
+            "user_hits": 0,
+            "channel_hits": 0,
+            "single_lookups": 0,
+            "bulk_pages": 0,
+            "refreshes": 0,
+            "refresh_failures": 0,
+            "records_updated": 0,
+            "loaded_from_redis": False
+        }
+
+    # Lookups
+
+    async def get_user(self, user_id: str) -> Dict[str, Any]:
+        """
+        Get user info from the directory.
+
+        Args:
+            user_id: Slack user ID
+
+        Returns:
+            Slack user object, or {} if unknown
+        """
+        if not user_id:
+            return {}
+
+        await self.ensure_loaded()
+        user = self.users.get(user_id)
+        if user is not None:
+            self.stats["user_hits"] += 1
+            return user
+
+        return await self._lookup_single("user", user_id)
+
+    async def get_channel(self, channel_id: str) -> Dict[str, Any]:
+        """
+        Get channel info from the directory.
+
+        Args:
+            channel_id: Slack channel ID
+
+        Returns:
+            Slack channel object, or {} if unknown
+        """
+        if not channel_id:
+            return {}
+
+        await self.ensure_loaded()
+        channel = self.channels.get(channel_id)
+        if channel is not None:
+            self.stats["channel_hits"] += 1
+            return channel
+
+        return await self._lookup_single("channel", channel_id)
+
+    async def _lookup_single(self, kind: str, object_id: str) -> Dict[str, Any]:
+        """Fetch one user/channel that appeared after the last bulk load"""
+        missed_at = self._misses.get(object_id)
+        if missed_at and time.time() - missed_at < self.miss_ttl:
+            return {}
+
+        self.stats["single_lookups"] += 1
+        try:
+            if kind == "user":
+                response = await slack_rate_limiter.call(self.client, "users_info", user=object_id)
+                record = self._slim_user(response["user"]) if response["ok"] else None
+            else:
+                response = await slack_rate_limiter.call(self.client, "conversations_info", channel=object_id)
+                record = response["channel"] if response["ok"] else None
+
+            if record:
+                self._misses.pop(object_id, None)
+                await self._store_records(kind, {object_id: record})
+                return record
+
+        except Exception as e:
+            logger.error(f"Error getting {kind} info for {object_id}: {e}")
+
+        # Failures are only remembered briefly so transient errors heal
+        self._misses[object_id] = time.time()
+        return {}
+
+    # Loading and refresh
+
+    async def ensure_loaded(self) -> None:
+        """Load the directory once per process and schedule refreshes when stale"""
+        if self._loaded:
+            self._maybe_schedule_refresh()
+            return
+
+        loop = asyncio.get_running_loop()
+        if self._load_task is None or self._load_task.get_loop() is not loop or self._load_task.done():
+            self._load_task = loop.create_task(self._initial_load())
+        try:
+            await asyncio.shield(self._load_task)
+        except Exception as e:
+            logger.error(f"Slack directory load failed: {e}")
+
+    async def _initial_load(self) -> None:
+        """
+        Warm start from Redis. Without a snapshot the bulk load runs in the
+        background and lookups fall back to single calls until it completes.
+        """
+        loaded_at = await self._load_from_redis()
+        if loaded_at:
+            self._last_refresh = loaded_at
+            self.stats["loaded_from_redis"] = True
+            logger.info(f"Slack directory loaded from Redis: {len(self.users)} users, {len(self.channels)} channels")
+        else:
+            logger.info("No Slack directory snapshot in Redis, bulk loading in background")
+        self._loaded = True
+        self._maybe_schedule_refresh()
+
+    def _maybe_schedule_refresh(self) -> None:
+        """Start a background incremental refresh when the directory is stale"""
+        now = time.time()
+        if now - self._last_refresh < self.refresh_interval:
+            return
+        if now - self._refresh_failed_at < min(REFRESH_RETRY_SECONDS, self.refresh_interval):
+            return
+        if self._refresh_task and not self._refresh_task.done():
+            return
+        self._refresh_task = asyncio.get_running_loop().create_task(self.refresh())
+
+    async def refresh(self) -> Dict[str, int]:
+        """
+        Re-list users and channels and persist only the records that changed.
+
+        The directory only counts as refreshed when both lists were read in full
+        and returned users; otherwise the records read are kept and the refresh
+        is retried after REFRESH_RETRY_SECONDS instead of a whole interval.
+
+        Returns:
+            Number of changed users and channels, and whether the refresh succeeded
+        """
+        started = time.time()
+        self.stats["refreshes"] += 1
+
+        users, users_complete = await self._list_all("users_list", "members", {})
+        changed_users = {
+            user["id"]: self._slim_user(user)
+            for user in users
+            if user.get("id") and self.users.get(user["id"], {}).get("updated") != user.get("updated")
+        }
+
+        channels, channels_complete = await self._list_all(
+            "conversations_list",
+            "channels",
+            {"types": "public_channel,private_channel", "exclude_archived": False}
+        )
+        changed_channels = {
+            channel["id"]: channel
+            for channel in channels
+            if channel.get("id") and self._channel_changed(self.channels.get(channel["id"]), channel)
+        }
+
+        await self._store_records("user", changed_users)
+        await self._store_records("channel", changed_channels)
+
+        succeeded = users_complete and channels_complete and bool(users)
+        if succeeded:
+            self._last_refresh = started
+            await self._store_meta()
+            logger.info(
+                f"Slack directory refreshed: {len(changed_users)}/{len(users)} users and "
+                f"{len(changed_channels)}/{len(channels)} channels changed"
+            )
+        else:
+            self._refresh_failed_at = time.time()
+            self.stats["refresh_failures"] += 1
+            logger.warning(
+                f"Slack directory refresh incomplete ({len(users)} users, {len(channels)} channels read); "
+                f"retrying in {REFRESH_RETRY_SECONDS}s"
+            )
+        return {"users_changed": len(changed_users), "channels_changed": len(changed_channels),
+                "succeeded": succeeded}
+
+    async def _list_all(
+        self,
+        method: str,
+        result_key: str,
+        params: Dict[str, Any]
+    ) -> Tuple[List[Dict[str, Any]], bool]:
+        """
+        Page through a Slack list method.
+
+        Returns:
+            Records read, and whether every page was read
+        """
+        results = []
+        cursor = None
+
+        while True:
+            try:
+                response = await slack_rate_limiter.call(self.client, method, limit=self.page_size, cursor=cursor, **params)
+            except SlackApiError as e:
+                error = e.response.get("error")
+                if error == "missing_scope" and params.get("types") == "public_channel,private_channel":
+                    # Bot token without groups:read - public channels only
+                    params = {**params, "types": "public_channel"}
+                    continue
+                logger.error(f"{method} failed: {error}")
+                return results, False
+            except Exception as e:
+                logger.error(f"{method} failed: {e}")
+                return results, False
+
+            self.stats["bulk_pages"] += 1
+            results.extend(response.get(result_key, []))
+            cursor = response.get("response_metadata", {}).get("next_cursor")
+            if not cursor:
+                return results, True
+
+    def _slim_user(self, user: Dict[str, Any]) -> Dict[str, Any]:
+        """Drop avatar URLs, which are most of a user record's size"""
+        profile = {
+            key: value for key, value in user.get("profile", {}).items()
+            if not key.startswith("image_")
+        }
+        return {**user, "profile": profile}
+
+    def _channel_changed(self, existing: Optional[Dict[str, Any]], channel: Dict[str, Any]) -> bool:
+        if existing is None:
+            return True
+        for field in ("name", "is_archived", "num_members"):
+            if existing.get(field) != channel.get(field):
+                return True
+        return (
+            existing.get("purpose", {}).get("value") != channel.get("purpose", {}).get("value") or
+            existing.get("topic", {}).get("value") != channel.get("topic", {}).get("value")
+        )
+
+    # Persistence
+
+    async def _store_records(self, kind: str, records: Dict[str, Dict[str, Any]]) -> None:
+        """Update memory and persist changed records to Redis"""
+        if not records:
+            return
+
+        (self.users if kind == "user" else self.channels).update(records)
+        self.stats["records_updated"] += len(records)
+
+        if not (self.memory_service.redis_available and self.memory_service.redis_client):
+            return
+        try:
+            await self.memory_service.redis_client.hset(
+                USERS_KEY if kind == "user" else CHANNELS_KEY,
+                mapping={object_id: encode_payload(record) for object_id, record in records.items()}
+            )
+        except Exception as e:
+            logger.warning(f"Failed to persist Slack directory {kind}s: {e}")
+
+    async def _store_meta(self) -> None:
+        if not (self.memory_service.redis_available and self.memory_service.redis_client):
+            return
+        try:
+            await self.memory_service.redis_client.hset(META_KEY, mapping={"refreshed_at": str(self._last_refresh)})
+        except Exception as e:
+            logger.warning(f"Failed to persist Slack directory metadata: {e}")
+
+    async def _load_from_redis(self) -> Optional[float]:
+        """Load a persisted directory snapshot, returning its refresh time"""
+        if not (self.memory_service.redis_available and self.memory_service.redis_client):
+            return None
+        try:
+            pipeline = self.memory_service.redis_client.pipeline()
+            pipeline.hget(META_KEY, "refreshed_at")
+            pipeline.hgetall(USERS_KEY)
+            pipeline.hgetall(CHANNELS_KEY)
+            refreshed_at, users, channels = await pipeline.execute()
+            if not refreshed_at or not users:
+                return None
+
+            self.users = {user_id: decode_payload(data) for user_id, data in users.items()}
+            self.channels = {channel_id: decode_payload(data) for channel_id, data in channels.items()}
+            return float(refreshed_at)
+
+        except Exception as e:
+            logger.warning(f"Failed to load Slack directory from Redis: {e}")
+            return None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get directory statistics"""
+        return {
+            "loaded": self._loaded,
+            "users": len(self.users),
+            "channels": len(self.channels),
+            "last_refresh_age_seconds": round(time.time() - self._last_refresh, 1) if self._last_refresh else None,
+            "refresh_interval_seconds": self.refresh_interval,
+            "negative_cache_entries": len(self._misses),
+            **self.stats
+        }
+
+
+# Global directory instance shared by all connectors in the process
+slack_directory = SlackDirectoryService()
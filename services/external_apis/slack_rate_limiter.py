@@ -0,0 +1,259 @@
+"""
+Slack Rate Limiter - Adaptive per-tier rate limiting shared by all Slack callers.
+
+Slack limits Web API methods by tier (Tier 1: 1+/min, Tier 2: 20+/min,
+Tier 3: 50+/min, Tier 4: 100+/min) per workspace, and answers excess calls
+with HTTP 429 and a `Retry-After` header. Ingestion paths used to guess with
+fixed or geometric sleeps, which made long backfills slow down for no reason
+and still did not coordinate between connector instances.
+
+One limiter per process schedules every call with GCRA (a token bucket
+expressed as a theoretical arrival time), one bucket per tier:
+
+- calls proceed at the tier's documented rate with a short burst allowance
+- a 429 blocks the tier for `Retry-After` seconds and halves its rate
+- successful calls restore the rate additively up to the tier ceiling
+- with SLACK_RATE_LIMIT_SHARED, per-minute tier counters and Retry-After blocks
+  are also kept in Redis so every worker process respects the same budget
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from slack_sdk.errors import SlackApiError
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Documented per-minute floors for each tier
+TIER_LIMITS = {1: 1, 2: 20, 3: 50, 4: 100}
+
+METHOD_TIERS = {
+    "conversations_history": 3,
+    "conversations_replies": 3,
+    "conversations_info": 3,
+    "conversations_members": 4,
+    "conversations_list": 2,
+    "users_info": 4,
+    "users_list": 2,
+}
+DEFAULT_TIER = 3
+
+BURST_SECONDS = 10  # Burst allowance, in seconds of sustained rate
+MIN_RATE_FRACTION = 0.1  # Rate never drops below this share of the tier ceiling
+RECOVERY_FRACTION = 0.05  # Share of the ceiling regained per successful call
+DEFAULT_RETRY_AFTER = 30
+SHARED_KEY_PREFIX = "slack_rate_limit"
+
+
+def is_rate_limited(error: SlackApiError) -> bool:
+    """Whether a SlackApiError is a rate-limit response"""
+    response = error.response
+    if getattr(response, "status_code", None) == 429:
+        return True
+    try:
+        return response.get("error") in ("ratelimited", "rate_limited")
+    except Exception:
+        return False
+
+
+def retry_after_seconds(error: SlackApiError) -> float:
+    """Retry-After from a rate-limit response (seconds)"""
+    headers = getattr(error.response, "headers", None) or {}
+    for name in ("Retry-After", "retry-after"):
+        value = headers.get(name)
+        if value:
+            try:
+                return max(1.0, float(value[0] if isinstance(value, list) else value))
+            except (TypeError, ValueError):
+                pass
+    return float(DEFAULT_RETRY_AFTER)
+
+
+class TierBucket:
+    """GCRA scheduler for one Slack tier (not async - guarded by the limiter lock)"""
+
+    def __init__(self, tier: int, per_minute: int):
+        self.tier = tier
+        self.max_rate = per_minute / 60.0
+        self.rate = self.max_rate
+        self.burst = max(1.0, self.max_rate * BURST_SECONDS)
+        self.tat = 0.0  # Theoretical arrival time of the next call
+        self.blocked_until = 0.0
+
+        self.stats = {"calls": 0, "delayed_calls": 0, "wait_time": 0.0, "rate_limited": 0}
+
+    def reserve(self, now: float) -> float:
+        """Reserve the next slot and return how long the caller must wait"""
+        interval = 1.0 / self.rate
+        tolerance = (self.burst - 1) * interval
+        tat = max(self.tat, now, self.blocked_until)
+        start = max(now, tat - tolerance, self.blocked_until)
+        self.tat = tat + interval
+
+        wait = start - now
+        self.stats["calls"] += 1
+        if wait > 0:
+            self.stats["delayed_calls"] += 1
+            self.stats["wait_time"] += wait
+        return wait
+
+    def on_success(self) -> None:
+        self.rate = min(self.max_rate, self.rate + self.max_rate * RECOVERY_FRACTION)
+
+    def on_rate_limited(self, retry_after: float, now: float) -> None:
+        self.stats["rate_limited"] += 1
+        self.blocked_until = max(self.blocked_until, now + retry_after)
+        self.rate = max(self.max_rate * MIN_RATE_FRACTION, self.rate / 2)
+        # No burst right after the block lifts
+        self.tat = max(self.tat, self.blocked_until + (self.burst - 1) / self.rate)
+
+    def to_dict(self) -> Dict[str, Any]:
+        now = time.time()
+        return {
+            "rate_per_minute": round(self.rate * 60, 1),
+            "ceiling_per_minute": round(self.max_rate * 60, 1),
+            "blocked_for": round(max(0.0, self.blocked_until - now), 1),
+            **{name: round(value, 2) if isinstance(value, float) else value for name, value in self.stats.items()}
+        }
+
+
+class SlackRateLimiter:
+    """
+    Process-wide Slack rate limiter. Safe to use from several event loops and threads.
+    """
+
+    def __init__(self, shared: Optional[bool] = None):
+        self.shared = settings.SLACK_RATE_LIMIT_SHARED if shared is None else shared
+        self._buckets: Dict[int, TierBucket] = {tier: TierBucket(tier, limit) for tier, limit in TIER_LIMITS.items()}
+        self._lock = threading.Lock()
+        self._memory_service = None
+
+    def tier_for(self, method: str) -> int:
+        return METHOD_TIERS.get(method, DEFAULT_TIER)
+
+    async def acquire(self, method: str) -> None:
+        """Wait until a call to `method` is allowed"""
+        bucket = self._buckets[self.tier_for(method)]
+        with self._lock:
+            wait = bucket.reserve(time.time())
+        if wait > 0:
+            logger.debug(f"Slack {method} throttled for {wait:.2f}s (tier {bucket.tier})")
+            await asyncio.sleep(wait)
+
+        if self.shared:
+            await self._acquire_shared(bucket)
+
+    def record_success(self, method: str) -> None:
+        bucket = self._buckets[self.tier_for(method)]
+        with self._lock:
+            bucket.on_success()
+
+    async def record_rate_limited(self, method: str, retry_after: float) -> None:
+        """Apply a 429 Retry-After to the method's tier (and to other processes when shared)"""
+        bucket = self._buckets[self.tier_for(method)]
+        now = time.time()
+        with self._lock:
+            bucket.on_rate_limited(retry_after, now)
+        logger.warning(f"Slack {method} rate limited (tier {bucket.tier}), pausing tier for {retry_after:.0f}s")
+
+        if self.shared:
+            redis_client = self._redis_client()
+            if redis_client:
+                try:
+                    await redis_client.set(
+                        f"{SHARED_KEY_PREFIX}:tier{bucket.tier}:blocked_until", str(now + retry_after),
+                        ex=int(retry_after) + 1)
+                except Exception as e:
+                    logger.debug(f"Failed to share Slack rate limit block: {e}")
+
+    async def call(self, client, method: str, max_retries: int = 5, **kwargs) -> Any:
+        """
+        Call a Slack WebClient method under the limiter, retrying rate-limited calls.
+
+        Args:
+            client: slack_sdk WebClient
+            method: WebClient method name (e.g. "conversations_history")
+            max_retries: Rate-limit retries before the error is raised
+            **kwargs: Method arguments
+
+        Returns:
+            The Slack response
+
+        Raises:
+            SlackApiError: Non-rate-limit errors, or rate limiting beyond max_retries
+        """
+        api_call: Callable = getattr(client, method)
+        attempt = 0
+        while True:
+            await self.acquire(method)
+            try:
+                # WebClient is blocking - keep it off the event loop
+                response = await asyncio.to_thread(api_call, **kwargs)
+            except SlackApiError as e:
+                if not is_rate_limited(e) or attempt >= max_retries:
+                    raise
+                attempt += 1
+                await self.record_rate_limited(method, retry_after_seconds(e))
+                continue
+
+            self.record_success(method)
+            return response
+
+    # Cross-process coordination
+
+    def _redis_client(self):
+        if self._memory_service is None:
+            from services.core.memory_service import MemoryService
+            self._memory_service = MemoryService()
+        if self._memory_service.redis_available:
+            return self._memory_service.redis_client
+        return None
+
+    async def _acquire_shared(self, bucket: TierBucket) -> None:
+        """Respect blocks and per-minute budgets recorded by other processes"""
+        redis_client = self._redis_client()
+        if not redis_client:
+            return
+
+        limit = TIER_LIMITS[bucket.tier]
+        try:
+            while True:
+                now = time.time()
+                window = int(now // 60)
+                counter_key = f"{SHARED_KEY_PREFIX}:tier{bucket.tier}:{window}"
+                pipeline = redis_client.pipeline()
+                pipeline.incr(counter_key)
+                pipeline.expire(counter_key, 120)
+                pipeline.get(f"{SHARED_KEY_PREFIX}:tier{bucket.tier}:blocked_until")
+                count, _, blocked_until = await pipeline.execute()
+
+                wait = float(blocked_until) - now if blocked_until else 0.0
+                if count > limit:
+                    wait = max(wait, (window + 1) * 60 - now)
+                if wait <= 0:
+                    return
+
+                with self._lock:
+                    bucket.stats["delayed_calls"] += 1
+                    bucket.stats["wait_time"] += wait
+                await asyncio.sleep(wait)
+
+        except Exception as e:
+            logger.debug(f"Shared Slack rate limit unavailable, using local limiter only: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get per-tier limiter statistics"""
+        with self._lock:
+            return {
+                "shared": self.shared,
+                "tiers": {f"tier{tier}": bucket.to_dict() for tier, bucket in self._buckets.items()}
+            }
+
+
+# Global limiter shared by every Slack caller in the process
+slack_rate_limiter = SlackRateLimiter()
@@ -8,9 +8,9 @@ import logging
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 import json
-import os
 
 from config import settings
+from services.processing.ingestion_checkpoints import checkpoint_store
 from workers.bulk_channel_embedder import run_bulk_embedding, ChannelConfig
 
 logger = logging.getLogger(__name__)
@@ -21,7 +21,7 @@ class ChannelEmbeddingScheduler:
     """
     
     def __init__(self):
-        self.state_file = "channel_embedding_state.json"
+        self.checkpoints = checkpoint_store  # Shared with the bulk embedder's per-page checkpoints
         self.channels = [
             ChannelConfig(
                 id="C087QKECFKQ",
@@ -37,39 +37,34 @@ class ChannelEmbeddingScheduler:
         self.load_state()
     
     def load_state(self):
-        """Load previous embedding state from disk."""
+        """Load previous embedding state from the checkpoint store."""
         try:
-            if os.path.exists(self.state_file):
-                with open(self.state_file, 'r') as f:
-                    state = json.load(f)
-                
-                # Update channel configs with saved state
-                for channel in self.channels:
-                    channel_state = state.get(channel.id, {})
-                    channel.last_embedded_ts = channel_state.get('last_embedded_ts')
-                    channel.total_messages_embedded = channel_state.get('total_messages_embedded', 0)
-                
-                logger.info(f"Loaded embedding state for {len(state)} channels")
+            checkpoints = {cp.channel_id: cp for cp in self.checkpoints.list_checkpoints("bulk")}
+            
+            # Update channel configs with saved state
+            for channel in self.channels:
+                checkpoint = checkpoints.get(channel.id)
+                if checkpoint:
+                    channel.last_embedded_ts = checkpoint.last_embedded_ts
+                    channel.total_messages_embedded = checkpoint.total_messages
+            
+            logger.info(f"Loaded embedding state for {len(checkpoints)} channels")
                 
         except Exception as e:
             logger.warning(f"Could not load embedding state: {e}")
     
     def save_state(self):
-        """Save current embedding state to disk."""
+        """Record run bookkeeping; cursors and totals are committed page by page during the run."""
         try:
-            state = {}
             for channel in self.channels:
-                state[channel.id] = {
-                    'name': channel.name,
-                    'last_embedded_ts': channel.last_embedded_ts,
-                    'total_messages_embedded': channel.total_messages_embedded,
-                    'last_update': datetime.now().isoformat()
-                }
-            
-            with open(self.state_file, 'w') as f:
-                json.dump(state, f, indent=2)
+                self.checkpoints.update(
+                    "bulk", channel.id,
+                    channel_name=channel.name,
+                    last_embedded_ts=channel.last_embedded_ts,
+                    details={'last_update': datetime.now().isoformat()}
+                )
             
-            logger.info(f"Saved embedding state for {len(state)} channels")
+            logger.info(f"Saved embedding state for {len(self.channels)} channels")
             
         except Exception as e:
             logger.error(f"Could not save embedding state: {e}")
@@ -81,7 +76,7 @@ class ChannelEmbeddingScheduler:
         logger.info("Starting incremental channel embedding update")
         
         try:
-            stats = await run_bulk_embedding(max_messages_per_channel)
+            stats = await run_bulk_embedding(max_messages_per_channel, self.channels)
             
             # Save updated state
             self.save_state()
@@ -92,6 +87,7 @@ class ChannelEmbeddingScheduler:
                 "channels_processed": stats.channels_processed,
                 "total_messages_extracted": stats.total_messages_extracted,
                 "total_messages_embedded": stats.total_messages_embedded,
+                "embedding_cache_hits": stats.total_cache_hits,
                 "duration_seconds": (stats.end_time - stats.start_time).total_seconds(),
                 "errors": stats.errors,
                 "timestamp": datetime.now().isoformat()
@@ -116,12 +112,13 @@ class ChannelEmbeddingScheduler:
         logger.info("Starting full channel embedding refresh")
         
         try:
-            # Clear previous state
+            # Clear previous state, including any interrupted run
+            self.checkpoints.reset("bulk")
             for channel in self.channels:
                 channel.last_embedded_ts = None
                 channel.total_messages_embedded = 0
             
-            stats = await run_bulk_embedding(max_messages_per_channel)
+            stats = await run_bulk_embedding(max_messages_per_channel, self.channels)
             
             # Save new state
             self.save_state()
@@ -132,6 +129,7 @@ class ChannelEmbeddingScheduler:
                 "channels_processed": stats.channels_processed,
                 "total_messages_extracted": stats.total_messages_extracted,
                 "total_messages_embedded": stats.total_messages_embedded,
+                "embedding_cache_hits": stats.total_cache_hits,
                 "duration_seconds": (stats.end_time - stats.start_time).total_seconds(),
                 "errors": stats.errors,
                 "timestamp": datetime.now().isoformat()
@@ -151,20 +149,24 @@ class ChannelEmbeddingScheduler:
     
     def get_status(self) -> Dict:
         """Get current embedding status."""
+        checkpoints = {cp.channel_id: cp for cp in self.checkpoints.list_checkpoints("bulk")}
         status = {
             "channels": [],
             "total_messages_embedded": 0,
-            "state_file_exists": os.path.exists(self.state_file)
+            "checkpoint_db": self.checkpoints.path
         }
         
         for channel in self.channels:
+            checkpoint = checkpoints.get(channel.id)
             channel_status = {
                 "id": channel.id,
                 "name": channel.name,
                 "is_private": channel.is_private,
                 "total_messages_embedded": channel.total_messages_embedded,
                 "last_embedded_ts": channel.last_embedded_ts,
-                "has_previous_data": channel.last_embedded_ts is not None
+                "has_previous_data": channel.last_embedded_ts is not None,
+                "run_in_progress": bool(checkpoint and checkpoint.in_progress),
+                "pages_committed": checkpoint.page if checkpoint and checkpoint.in_progress else 0
             }
             
             status["channels"].append(channel_status)
@@ -179,8 +181,9 @@ class ChannelEmbeddingScheduler:
         if force_full_refresh:
             return await self.run_full_refresh()
         
-        # Check if we have previous state
-        has_state = any(channel.last_embedded_ts for channel in self.channels)
+        # Check if we have previous state (an interrupted run counts - it is resumed)
+        has_state = any(channel.last_embedded_ts for channel in self.channels) or any(
+            cp.in_progress for cp in self.checkpoints.list_checkpoints("bulk"))
         
         if has_state:
             logger.info("Previous state found, running incremental update")
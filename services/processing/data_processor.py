@@ -39,7 +39,10 @@ class DataProcessor:
             for message in messages:
                 try:
                     processed_message = await self._process_single_message(message)
-                    if processed_message:
+                    if isinstance(processed_message, list):
+                        # Long messages come back as their chunks
+                        processed_messages.extend(processed_message)
+                    elif processed_message:
                         processed_messages.append(processed_message)
                 except Exception as e:
                     logger.error(f"Error processing message {message.get('id', 'unknown')}: {e}")
@@ -171,6 +174,12 @@ class DataProcessor:
                 "has_attachments": len(message.get("attachments", [])) > 0
             }
             
+            # Day of the message, as EnhancedDataProcessor stores it, for date filters
+            try:
+                metadata["date"] = datetime.fromisoformat(str(message.get("timestamp"))).date().isoformat()
+            except ValueError:
+                pass
+            
             # Add thread information if available
             if message.get("thread_ts"):
                 metadata["thread_ts"] = message["thread_ts"]
@@ -8,6 +8,8 @@ import logging
 from typing import List, Dict, Any, Optional
 from services.embedding_service import EmbeddingService
 from tools.vector_search import VectorSearchTool
+from services.data.vector_namespaces import vector_namespaces
+from services.data.vector_partitions import vector_partitions
 import hashlib
 import re
 
@@ -168,7 +170,9 @@ class DocumentIngestionService:
             # Upsert vectors to Pinecone
             if self.vector_tool.pinecone_available:
                 try:
-                    self.vector_tool.index.upsert(vectors=vectors_to_upsert)
+                    for namespace in await vector_namespaces.get_write_namespaces():
+                        for partition, partition_vectors in vector_partitions.route(vectors_to_upsert, namespace).items():
+                            self.vector_tool.index.upsert(vectors=partition_vectors, namespace=partition)
                     logger.info(f"Successfully upserted {len(vectors_to_upsert)} vectors to Pinecone")
                 except Exception as e:
                     logger.error(f"Error upserting to Pinecone: {str(e)}")
@@ -0,0 +1,556 @@
+"""
+Ingestion Checkpoints - Durable per-channel progress shared by every ingestion path.
+
+Progress used to live in whole-file JSON rewrites (hourly_embedding_state.json,
+first_generation_state.json, channel_embedding_state.json) that only recorded
+a per-channel latest ts, were not written atomically and were shared by two
+writers with different formats. A crash mid-backfill restarted the channel.
+
+One SQLite database in WAL mode (INGESTION_CHECKPOINT_DB) now holds a
+checkpoint per (source, channel):
+
+- a run opens a window (oldest/latest ts) with `begin`; an unfinished run is
+  resumed instead of replaced, widened to cover a later caller's window, and
+  abandoned after INGESTION_MAX_RESUME_ATTEMPTS resumes so a page that always
+  fails cannot pin the channel to a stale window
+- IngestionPipeline commits a history page only once every message on it, and
+  on every newer page, has been upserted - the page's cursor, number, oldest
+  ts and batch id are written in one transaction
+- history iterators resume below the oldest committed ts of the open run
+- `complete` promotes the run's newest ts to last_embedded_ts, the incremental
+  high-water mark the next run starts from
+
+Legacy JSON state files are imported the first time the store is opened.
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+MAX_BATCH_IDS = 20  # Recent batch ids returned with a checkpoint
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS channel_checkpoints (
+    source TEXT NOT NULL,
+    channel_id TEXT NOT NULL,
+    channel_name TEXT NOT NULL DEFAULT '',
+    status TEXT NOT NULL DEFAULT 'idle',
+    run_id TEXT,
+    window_oldest_ts TEXT,
+    window_latest_ts TEXT,
+    cursor TEXT,
+    page INTEGER NOT NULL DEFAULT 0,
+    resume_ts TEXT,
+    run_newest_ts TEXT,
+    last_embedded_ts TEXT,
+    run_messages INTEGER NOT NULL DEFAULT 0,
+    total_messages INTEGER NOT NULL DEFAULT 0,
+    details TEXT NOT NULL DEFAULT '{}',
+    updated_at REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (source, channel_id)
+);
+CREATE TABLE IF NOT EXISTS ingestion_batches (
+    source TEXT NOT NULL,
+    channel_id TEXT NOT NULL,
+    run_id TEXT NOT NULL,
+    batch_id TEXT NOT NULL,
+    page INTEGER NOT NULL,
+    cursor TEXT,
+    oldest_ts TEXT,
+    newest_ts TEXT,
+    messages INTEGER NOT NULL,
+    committed_at REAL NOT NULL,
+    PRIMARY KEY (source, channel_id, batch_id)
+);
+"""
+
+
+def _min_ts(a: Optional[str], b: Optional[str]) -> Optional[str]:
+    if a is None or b is None:
+        return a if b is None else b
+    return a if float(a) <= float(b) else b
+
+
+def _max_ts(a: Optional[str], b: Optional[str]) -> Optional[str]:
+    if a is None or b is None:
+        return a if b is None else b
+    return a if float(a) >= float(b) else b
+
+
+def _union_window(
+    oldest_a: Optional[str], latest_a: Optional[str], oldest_b: Optional[str], latest_b: Optional[str]
+) -> Tuple[Optional[str], Optional[str]]:
+    """Smallest window covering both; a None bound is open-ended"""
+    oldest = None if oldest_a is None or oldest_b is None else _min_ts(oldest_a, oldest_b)
+    latest = None if latest_a is None or latest_b is None else _max_ts(latest_a, latest_b)
+    return oldest, latest
+
+
+@dataclass
+class PagePosition:
+    """Where one history page sits in its run"""
+    page: int  # 1-based page number within the run
+    cursor: Optional[str] = None  # Cursor that fetched this page
+    next_cursor: Optional[str] = None  # Cursor for the following page
+    oldest_ts: Optional[str] = None  # Oldest message ts on the page
+    newest_ts: Optional[str] = None  # Newest message ts on the page
+    final: bool = False  # Last page of the window
+
+    @classmethod
+    def for_messages(cls, page: int, timestamps: List[str], **kwargs) -> "PagePosition":
+        ordered = sorted(timestamps, key=float)
+        return cls(page, oldest_ts=ordered[0] if ordered else None,
+                   newest_ts=ordered[-1] if ordered else None, **kwargs)
+
+
+class CheckpointPage(list):
+    """A batch of messages carrying its PagePosition (yielded by resumable sources)"""
+
+    def __init__(self, messages=(), position: Optional[PagePosition] = None):
+        super().__init__(messages)
+        self.position = position
+
+
+@dataclass
+class ChannelCheckpoint:
+    """Durable progress of one channel for one ingestion source"""
+    source: str
+    channel_id: str
+    channel_name: str = ""
+    status: str = "idle"  # idle, in_progress, completed
+    run_id: Optional[str] = None
+    window_oldest_ts: Optional[str] = None
+    window_latest_ts: Optional[str] = None
+    cursor: Optional[str] = None  # Slack cursor after the last committed page
+    page: int = 0  # Pages committed in the current run
+    resume_ts: Optional[str] = None  # Oldest ts committed in the current run
+    run_newest_ts: Optional[str] = None  # Newest ts committed in the current run
+    last_embedded_ts: Optional[str] = None  # Newest ts of the last completed run
+    run_messages: int = 0
+    total_messages: int = 0
+    details: Dict[str, Any] = field(default_factory=dict)  # Source-specific bookkeeping
+    updated_at: float = 0.0
+    attempts: int = 0  # Times the open run has been resumed
+    batch_ids: List[str] = field(default_factory=list)
+    resumed: bool = False  # begin() picked up an unfinished run
+
+    @property
+    def in_progress(self) -> bool:
+        return self.status == "in_progress"
+
+    @property
+    def resume_latest_ts(self) -> Optional[str]:
+        """Exclusive upper bound for the next history request of the open run"""
+        return self.resume_ts or self.window_latest_ts
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class CheckpointStore:
+    """
+    SQLite-backed checkpoint store. Safe to use from several threads; every
+    write is a single transaction.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        import_legacy: bool = True,
+        max_resume_attempts: Optional[int] = None
+    ):
+        self.path = path or settings.INGESTION_CHECKPOINT_DB
+        self.max_resume_attempts = (settings.INGESTION_MAX_RESUME_ATTEMPTS
+                                    if max_resume_attempts is None else max_resume_attempts)
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._import_legacy = import_legacy
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(channel_checkpoints)")}
+            if "attempts" not in columns:
+                # Databases created before resume attempts were counted
+                conn.execute("ALTER TABLE channel_checkpoints ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0")
+            self._conn = conn
+            if self._import_legacy:
+                self._import_legacy_state()
+        return self._conn
+
+    def _transaction(self):
+        return _Transaction(self)
+
+    # Reads
+
+    def get(self, source: str, channel_id: str) -> Optional[ChannelCheckpoint]:
+        """Checkpoint for a channel, or None"""
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT * FROM channel_checkpoints WHERE source = ? AND channel_id = ?", (source, channel_id)
+            ).fetchone()
+            return self._load(conn, row) if row else None
+
+    def list_checkpoints(self, source: Optional[str] = None) -> List[ChannelCheckpoint]:
+        """All checkpoints, optionally for one source"""
+        with self._lock:
+            conn = self._connection()
+            if source:
+                rows = conn.execute(
+                    "SELECT * FROM channel_checkpoints WHERE source = ? ORDER BY channel_id", (source,)
+                ).fetchall()
+            else:
+                rows = conn.execute("SELECT * FROM channel_checkpoints ORDER BY source, channel_id").fetchall()
+            return [self._load(conn, row) for row in rows]
+
+    def _load(self, conn: sqlite3.Connection, row: sqlite3.Row) -> ChannelCheckpoint:
+        values = dict(row)
+        values["details"] = json.loads(values["details"] or "{}")
+        checkpoint = ChannelCheckpoint(**values)
+        if checkpoint.run_id:
+            checkpoint.batch_ids = [r["batch_id"] for r in conn.execute(
+                "SELECT batch_id FROM ingestion_batches WHERE source = ? AND channel_id = ? AND run_id = ? "
+                "ORDER BY page DESC LIMIT ?",
+                (checkpoint.source, checkpoint.channel_id, checkpoint.run_id, MAX_BATCH_IDS)
+            )][::-1]
+        return checkpoint
+
+    # Writes
+
+    def begin(
+        self,
+        source: str,
+        channel_id: str,
+        oldest_ts: Optional[str],
+        latest_ts: Optional[str],
+        channel_name: str = ""
+    ) -> ChannelCheckpoint:
+        """
+        Open a run over (oldest_ts, latest_ts), or resume the unfinished one.
+
+        An unfinished run is widened to cover the requested window too. Only a
+        wider start keeps its committed pages; a later end restarts the page walk
+        over the union, since pages are committed newest first. After
+        `max_resume_attempts` resumes the unfinished run is abandoned and a run
+        over just the requested window is opened instead.
+
+        Args:
+            source: Ingestion path ("hourly", "daily", "bulk", ...)
+            channel_id: Slack channel ID
+            oldest_ts: Window start (exclusive)
+            latest_ts: Window end (exclusive)
+            channel_name: Channel name for status output
+
+        Returns:
+            The checkpoint; `resumed` is True when an unfinished run was picked up
+            (its window is the union of the old and requested ones)
+        """
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT * FROM channel_checkpoints WHERE source = ? AND channel_id = ?", (source, channel_id)
+            ).fetchone()
+            attempts = 0
+            if row and row["status"] == "in_progress":
+                checkpoint = self._load(conn, row)
+                name = checkpoint.channel_name or channel_id
+                if checkpoint.attempts >= self.max_resume_attempts:
+                    logger.warning(
+                        f"Abandoning {source} ingestion of {name} after {checkpoint.attempts} resumes "
+                        f"stuck below ts {checkpoint.resume_ts}; starting the requested window"
+                    )
+                    abandoned = {"run_id": checkpoint.run_id, "window_oldest_ts": checkpoint.window_oldest_ts,
+                                 "window_latest_ts": checkpoint.window_latest_ts, "page": checkpoint.page,
+                                 "resume_ts": checkpoint.resume_ts, "abandoned_at": time.time()}
+                    conn.execute(
+                        "UPDATE channel_checkpoints SET details = ? WHERE source = ? AND channel_id = ?",
+                        (json.dumps({**checkpoint.details, "last_abandoned_run": abandoned}), source, channel_id)
+                    )
+                else:
+                    attempts = checkpoint.attempts + 1
+                    window_oldest, window_latest = _union_window(
+                        checkpoint.window_oldest_ts, checkpoint.window_latest_ts, oldest_ts, latest_ts
+                    )
+                    if window_latest == checkpoint.window_latest_ts:
+                        conn.execute(
+                            "UPDATE channel_checkpoints SET window_oldest_ts = ?, attempts = ?, updated_at = ? "
+                            "WHERE source = ? AND channel_id = ?",
+                            (window_oldest, attempts, time.time(), source, channel_id)
+                        )
+                        checkpoint.window_oldest_ts = window_oldest
+                        checkpoint.attempts = attempts
+                        checkpoint.resumed = True
+                        logger.info(
+                            f"Resuming {source} ingestion of {name} after page {checkpoint.page} "
+                            f"(below ts {checkpoint.resume_ts}, attempt {attempts})"
+                        )
+                        return checkpoint
+                    logger.info(
+                        f"Restarting unfinished {source} ingestion of {name} over its window widened to "
+                        f"({window_oldest}, {window_latest}), attempt {attempts}"
+                    )
+                    oldest_ts, latest_ts = window_oldest, window_latest
+
+            run_id = uuid.uuid4().hex[:12]
+            now = time.time()
+            conn.execute(
+                """
+                INSERT INTO channel_checkpoints (source, channel_id, channel_name, status, run_id,
+                    window_oldest_ts, window_latest_ts, cursor, page, resume_ts, run_newest_ts,
+                    run_messages, updated_at, attempts)
+                VALUES (?, ?, ?, 'in_progress', ?, ?, ?, NULL, 0, NULL, NULL, 0, ?, ?)
+                ON CONFLICT (source, channel_id) DO UPDATE SET
+                    channel_name = COALESCE(NULLIF(excluded.channel_name, ''), channel_name),
+                    status = 'in_progress', run_id = excluded.run_id,
+                    window_oldest_ts = excluded.window_oldest_ts, window_latest_ts = excluded.window_latest_ts,
+                    cursor = NULL, page = 0, resume_ts = NULL, run_newest_ts = NULL, run_messages = 0,
+                    updated_at = excluded.updated_at, attempts = excluded.attempts
+                """,
+                (source, channel_id, channel_name, run_id, oldest_ts, latest_ts, now, attempts)
+            )
+            row = conn.execute(
+                "SELECT * FROM channel_checkpoints WHERE source = ? AND channel_id = ?", (source, channel_id)
+            ).fetchone()
+            return self._load(conn, row)
+
+    def commit_page(self, checkpoint: ChannelCheckpoint, position: PagePosition, messages: int) -> str:
+        """
+        Record a fully upserted page.
+
+        Args:
+            checkpoint: Checkpoint returned by begin()
+            position: The page's position
+            messages: Messages from the page that were stored
+
+        Returns:
+            The batch id
+        """
+        batch_id = f"{checkpoint.run_id}:{position.page}"
+        now = time.time()
+        with self._transaction() as conn:
+            inserted = conn.execute(
+                """
+                INSERT OR IGNORE INTO ingestion_batches (source, channel_id, run_id, batch_id, page, cursor,
+                    oldest_ts, newest_ts, messages, committed_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (checkpoint.source, checkpoint.channel_id, checkpoint.run_id, batch_id, position.page,
+                 position.cursor, position.oldest_ts, position.newest_ts, messages, now)
+            ).rowcount
+            if not inserted:
+                return batch_id
+
+            checkpoint.page = max(checkpoint.page, position.page)
+            checkpoint.cursor = position.next_cursor
+            checkpoint.resume_ts = _min_ts(checkpoint.resume_ts, position.oldest_ts)
+            checkpoint.run_newest_ts = _max_ts(checkpoint.run_newest_ts, position.newest_ts)
+            checkpoint.run_messages += messages
+            checkpoint.total_messages += messages
+            checkpoint.updated_at = now
+            checkpoint.batch_ids = (checkpoint.batch_ids + [batch_id])[-MAX_BATCH_IDS:]
+            conn.execute(
+                """
+                UPDATE channel_checkpoints SET cursor = ?, page = ?, resume_ts = ?, run_newest_ts = ?,
+                    run_messages = run_messages + ?, total_messages = total_messages + ?, updated_at = ?
+                WHERE source = ? AND channel_id = ? AND run_id = ?
+                """,
+                (checkpoint.cursor, checkpoint.page, checkpoint.resume_ts, checkpoint.run_newest_ts,
+                 messages, messages, now, checkpoint.source, checkpoint.channel_id, checkpoint.run_id)
+            )
+        return batch_id
+
+    def complete(self, checkpoint: ChannelCheckpoint, last_embedded_ts: Optional[str] = None) -> None:
+        """
+        Close the run: its newest ts (or `last_embedded_ts`) becomes the channel's high-water mark.
+        """
+        newest = _max_ts(checkpoint.run_newest_ts, last_embedded_ts)
+        checkpoint.last_embedded_ts = _max_ts(checkpoint.last_embedded_ts, newest)
+        checkpoint.status = "completed"
+        checkpoint.cursor = None
+        checkpoint.updated_at = time.time()
+        with self._transaction() as conn:
+            conn.execute(
+                """
+                UPDATE channel_checkpoints SET status = 'completed', cursor = NULL, last_embedded_ts = ?,
+                    updated_at = ?
+                WHERE source = ? AND channel_id = ? AND run_id = ?
+                """,
+                (checkpoint.last_embedded_ts, checkpoint.updated_at,
+                 checkpoint.source, checkpoint.channel_id, checkpoint.run_id)
+            )
+            # Only the latest run's batch log is kept
+            conn.execute(
+                "DELETE FROM ingestion_batches WHERE source = ? AND channel_id = ? AND run_id != ?",
+                (checkpoint.source, checkpoint.channel_id, checkpoint.run_id)
+            )
+        logger.info(
+            f"{checkpoint.source} ingestion of {checkpoint.channel_name or checkpoint.channel_id} complete: "
+            f"{checkpoint.run_messages} messages in {checkpoint.page} pages"
+        )
+
+    def update(
+        self,
+        source: str,
+        channel_id: str,
+        channel_name: Optional[str] = None,
+        status: Optional[str] = None,
+        last_embedded_ts: Optional[str] = None,
+        add_messages: int = 0,
+        details: Optional[Dict[str, Any]] = None
+    ) -> ChannelCheckpoint:
+        """
+        Record progress made outside a checkpointed run (merged into `details`).
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT * FROM channel_checkpoints WHERE source = ? AND channel_id = ?", (source, channel_id)
+            ).fetchone()
+            if row is None:
+                conn.execute(
+                    "INSERT INTO channel_checkpoints (source, channel_id, updated_at) VALUES (?, ?, ?)",
+                    (source, channel_id, now)
+                )
+                row = conn.execute(
+                    "SELECT * FROM channel_checkpoints WHERE source = ? AND channel_id = ?", (source, channel_id)
+                ).fetchone()
+            merged = {**json.loads(row["details"] or "{}"), **(details or {})}
+            conn.execute(
+                """
+                UPDATE channel_checkpoints SET channel_name = COALESCE(?, channel_name),
+                    status = COALESCE(?, status), last_embedded_ts = COALESCE(?, last_embedded_ts),
+                    total_messages = total_messages + ?, details = ?, updated_at = ?
+                WHERE source = ? AND channel_id = ?
+                """,
+                (channel_name, status, last_embedded_ts, add_messages, json.dumps(merged), now, source, channel_id)
+            )
+            row = conn.execute(
+                "SELECT * FROM channel_checkpoints WHERE source = ? AND channel_id = ?", (source, channel_id)
+            ).fetchone()
+            return self._load(conn, row)
+
+    def reset(self, source: str, channel_id: Optional[str] = None) -> int:
+        """
+        Forget checkpoints (and batch logs) for a source or one of its channels.
+
+        Returns:
+            Number of checkpoints removed
+        """
+        with self._transaction() as conn:
+            if channel_id:
+                where, params = "source = ? AND channel_id = ?", (source, channel_id)
+            else:
+                where, params = "source = ?", (source,)
+            conn.execute(f"DELETE FROM ingestion_batches WHERE {where}", params)
+            return conn.execute(f"DELETE FROM channel_checkpoints WHERE {where}", params).rowcount
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Checkpoint counts per source and status"""
+        with self._lock:
+            conn = self._connection()
+            rows = conn.execute(
+                "SELECT source, status, COUNT(*) AS channels, SUM(total_messages) AS messages "
+                "FROM channel_checkpoints GROUP BY source, status"
+            ).fetchall()
+        sources: Dict[str, Dict[str, Any]] = {}
+        for row in rows:
+            source = sources.setdefault(row["source"], {"channels": 0, "messages": 0, "in_progress": 0})
+            source["channels"] += row["channels"]
+            source["messages"] += row["messages"] or 0
+            if row["status"] == "in_progress":
+                source["in_progress"] += row["channels"]
+        return {"path": self.path, "sources": sources}
+
+    # Legacy JSON state
+
+    def _import_legacy_state(self) -> None:
+        """One-off import of the JSON state files the store replaces"""
+        conn = self._conn
+        if conn.execute("SELECT COUNT(*) FROM channel_checkpoints").fetchone()[0]:
+            return
+
+        def read(path: str) -> Dict[str, Any]:
+            try:
+                with open(path, "r") as f:
+                    return json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                return {}
+
+        rows = []
+        first_gen = read("first_generation_state.json")
+        for channel_id, channel in first_gen.get("channels", {}).items():
+            rows.append(("first_generation", channel_id, channel.get("channel_name", ""),
+                         "completed" if channel.get("status") == "completed" else "idle",
+                         channel.get("latest_timestamp"), channel.get("messages_processed", 0),
+                         {"total_extracted": channel.get("total_extracted", 0)}))
+
+        hourly = read("hourly_embedding_state.json")
+        # Written both as {channel: {...}} (hourly worker) and {"channels": {...}} (state manager)
+        hourly_channels = hourly.get("channels") if isinstance(hourly.get("channels"), dict) else hourly
+        for channel_id, channel in hourly_channels.items():
+            if not isinstance(channel, dict):
+                continue
+            details = {k: v for k, v in channel.items()
+                       if k not in ("last_check_ts", "latest_timestamp", "total_messages_embedded", "messages_embedded")}
+            rows.append(("hourly", channel_id, "", "completed",
+                         channel.get("last_check_ts") or channel.get("latest_timestamp"),
+                         channel.get("total_messages_embedded", channel.get("messages_embedded", 0)), details))
+
+        for channel_id, channel in read("channel_embedding_state.json").items():
+            if isinstance(channel, dict):
+                rows.append(("bulk", channel_id, channel.get("name", ""), "completed",
+                             channel.get("last_embedded_ts"), channel.get("total_messages_embedded", 0), {}))
+
+        if not rows:
+            return
+        now = time.time()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(
+                "INSERT OR IGNORE INTO channel_checkpoints (source, channel_id, channel_name, status, "
+                "last_embedded_ts, total_messages, details, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(source, channel_id, name, status, ts, total or 0, json.dumps(details), now)
+                 for source, channel_id, name, status, ts, total, details in rows]
+            )
+        logger.info(f"Imported {len(rows)} channel checkpoints from legacy JSON state files")
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT under the store lock"""
+
+    def __init__(self, store: CheckpointStore):
+        self.store = store
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.store._lock.acquire()
+        try:
+            self.conn = self.store._connection()
+            self.conn.execute("BEGIN IMMEDIATE")
+        except Exception:
+            self.store._lock.release()
+            raise
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        try:
+            self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        finally:
+            self.store._lock.release()
+
+
+# Global store shared by every ingestion path in the process
+checkpoint_store = CheckpointStore()
@@ -0,0 +1,452 @@
+"""
+Ingestion Pipeline - Streaming extract -> process -> embed -> upsert.
+
+Ingestion paths used to materialize a whole channel in memory, then process
+all of it, then embed all of it, then upsert. The pipeline runs the four steps
+as concurrent stages connected by bounded asyncio queues:
+
+- extract pulls batches (usually one Slack page) from an async iterator
+- process turns a raw batch into processed message dicts
+- embed generates vectors for bounded chunks of processed messages
+- upsert buffers vectors up to one Pinecone batch and writes them
+
+Embedding starts as soon as the first page arrives, and at most a few batches
+per stage are in flight, so peak memory does not grow with channel size.
+Embed and upsert calls draw from the process-wide IngestionBudget, so
+pipelines running side by side share one Gemini/Pinecone allowance.
+Per-batch failures are logged and counted without stopping the run;
+`cancel()` stops every stage and closes the source.
+
+Given a ChannelCheckpoint, the pipeline commits source pages to the checkpoint
+store in order, each once all of its messages are upserted. A page whose
+processing, embedding or upsert failed stops the commits there, so the next
+run resumes from it; the run is closed when the source's final page commits.
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from config import settings
+from services.processing.ingestion_checkpoints import (
+    ChannelCheckpoint, PagePosition, checkpoint_store as default_checkpoint_store
+)
+from services.processing.ingestion_scheduler import ingestion_budget
+
+logger = logging.getLogger(__name__)
+
+_END = object()  # End-of-stream marker passed between stages
+
+
+@dataclass
+class StageStats:
+    """Throughput counters for one pipeline stage"""
+    name: str
+    batches: int = 0
+    items_in: int = 0
+    items_out: int = 0
+    errors: int = 0
+    busy_seconds: float = 0.0  # Time spent working, excluding queue waits
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "batches": self.batches,
+            "items_in": self.items_in,
+            "items_out": self.items_out,
+            "errors": self.errors,
+            "busy_seconds": round(self.busy_seconds, 3),
+            "items_per_second": round(self.items_out / self.busy_seconds, 1) if self.busy_seconds else 0.0
+        }
+
+
+@dataclass
+class _PageProgress:
+    """Commit tracking for one source batch"""
+    position: Optional[PagePosition]
+    remaining: Optional[int] = None  # Messages not yet upserted; None until processed
+    stored: int = 0
+    failed: bool = False
+
+
+@dataclass
+class PipelineResult:
+    """Outcome of one pipeline run"""
+    name: str
+    extracted: int = 0
+    processed: int = 0
+    embedded: int = 0
+    upserted: int = 0
+    cache_hits: int = 0  # Embeddings served from the embedding cache
+    cache_misses: int = 0
+    pages_committed: int = 0  # Source pages recorded in the checkpoint store
+    checkpoint_completed: bool = False  # Final page committed and the checkpoint run closed
+    cancelled: bool = False
+    errors: List[str] = field(default_factory=list)
+    duration_seconds: float = 0.0
+    stages: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+
+
+class IngestionPipeline:
+    """
+    One streaming ingestion run. Create a new pipeline per source.
+    """
+
+    STAGES = ("extract", "process", "embed", "upsert")
+
+    def __init__(
+        self,
+        name: str,
+        source: AsyncIterator[List[Any]],
+        process: Callable[[List[Any]], Awaitable[List[Dict[str, Any]]]],
+        embedding_service,
+        embed_batch_size: Optional[int] = None,
+        upsert_batch_size: Optional[int] = None,
+        queue_size: Optional[int] = None,
+        embed_interval: float = 0.0,
+        budget=None,
+        checkpoint: Optional[ChannelCheckpoint] = None,
+        checkpoint_store=None
+    ):
+        """
+        Args:
+            name: Label for logs and results (e.g. the channel name)
+            source: Async iterator yielding batches of raw messages
+            process: Coroutine function turning a raw batch into processed message dicts
+            embedding_service: EmbeddingService providing embed_messages / upsert_vectors
+            embed_batch_size: Processed messages per embedding call
+            upsert_batch_size: Vectors per Pinecone upsert
+            queue_size: Batches buffered between consecutive stages
+            embed_interval: Minimum seconds between embedding calls (API pacing)
+            budget: IngestionBudget to draw from (defaults to the process-wide budget)
+            checkpoint: Open ChannelCheckpoint to commit pages to (source yields CheckpointPages)
+            checkpoint_store: CheckpointStore holding it (defaults to the process-wide store)
+        """
+        self.name = name
+        self.source = source
+        self.process = process
+        self.embedding_service = embedding_service
+        self.embed_batch_size = embed_batch_size or settings.INGESTION_EMBED_BATCH_SIZE
+        self.upsert_batch_size = upsert_batch_size or settings.INGESTION_UPSERT_BATCH_SIZE
+        self.queue_size = queue_size or settings.INGESTION_QUEUE_SIZE
+        self.embed_interval = embed_interval
+        self.budget = budget or ingestion_budget
+        self.checkpoint = checkpoint
+        self.checkpoint_store = checkpoint_store or default_checkpoint_store
+
+        self.stats = {stage: StageStats(stage) for stage in self.STAGES}
+        self.cache_stats = {"cache_hits": 0, "cache_misses": 0}
+        self.errors: List[str] = []
+        self._tasks: List[asyncio.Task] = []
+        self._cancelled = False
+        self._started_at: Optional[float] = None
+
+        self._pages: Dict[int, _PageProgress] = {}
+        self._next_page = 0
+        self._commit_page = 0
+        self._commit_lock = asyncio.Lock()
+        self._last_committed: Optional[PagePosition] = None
+        self.pages_committed = 0
+        self.checkpoint_completed = False
+
+    async def run(self) -> PipelineResult:
+        """
+        Run all stages to completion (or until cancelled).
+
+        Returns:
+            PipelineResult with per-stage counters; partial counts when cancelled
+        """
+        if self._tasks:
+            raise RuntimeError("IngestionPipeline instances run once; create a new pipeline")
+
+        self._started_at = time.perf_counter()
+        raw_queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        processed_queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        vector_queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+
+        self._tasks = [
+            asyncio.create_task(self._extract_stage(raw_queue), name=f"{self.name}:extract"),
+            asyncio.create_task(self._process_stage(raw_queue, processed_queue), name=f"{self.name}:process"),
+            asyncio.create_task(self._embed_stage(processed_queue, vector_queue), name=f"{self.name}:embed"),
+            asyncio.create_task(self._upsert_stage(vector_queue), name=f"{self.name}:upsert"),
+        ]
+
+        try:
+            pending = set(self._tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_EXCEPTION)
+                failed = [task for task in done if not task.cancelled() and task.exception()]
+                if failed:
+                    # A stage died outside its per-batch handling; its neighbours would block forever
+                    self.errors.append(f"{failed[0].get_name()} stage failed: {failed[0].exception()}")
+                    logger.error(f"Ingestion pipeline {self.name}: {self.errors[-1]}")
+                    self._cancel_tasks()
+                    await asyncio.gather(*pending, return_exceptions=True)
+                    break
+        finally:
+            if any(not task.done() for task in self._tasks):
+                # run() itself was cancelled - stop the stages before propagating
+                self._cancelled = True
+                self._cancel_tasks()
+                await asyncio.gather(*self._tasks, return_exceptions=True)
+
+        await self._complete_checkpoint()
+        result = self.get_result()
+        logger.info(
+            f"Ingestion pipeline {self.name}: extracted {result.extracted}, processed {result.processed}, "
+            f"embedded {result.embedded} ({result.cache_hits} cached), upserted {result.upserted} "
+            f"in {result.duration_seconds:.1f}s"
+            + (" (cancelled)" if result.cancelled else "")
+        )
+        return result
+
+    def cancel(self) -> None:
+        """Stop all stages; run() returns the partial result"""
+        if not self._cancelled:
+            logger.info(f"Cancelling ingestion pipeline {self.name}")
+        self._cancelled = True
+        self._cancel_tasks()
+
+    def _cancel_tasks(self) -> None:
+        for task in self._tasks:
+            if not task.done():
+                task.cancel()
+
+    def get_result(self) -> PipelineResult:
+        """Current counters as a PipelineResult (safe to call while running)"""
+        return PipelineResult(
+            name=self.name,
+            extracted=self.stats["extract"].items_out,
+            processed=self.stats["process"].items_out,
+            embedded=self.stats["embed"].items_out,
+            upserted=self.stats["upsert"].items_out,
+            cache_hits=self.cache_stats["cache_hits"],
+            cache_misses=self.cache_stats["cache_misses"],
+            pages_committed=self.pages_committed,
+            checkpoint_completed=self.checkpoint_completed,
+            cancelled=self._cancelled,
+            errors=list(self.errors),
+            duration_seconds=time.perf_counter() - self._started_at if self._started_at else 0.0,
+            stages=self.get_stats()
+        )
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-stage throughput counters"""
+        return {stage: stats.to_dict() for stage, stats in self.stats.items()}
+
+    # Stages
+
+    def _record_error(self, stats: StageStats, message: str) -> None:
+        stats.errors += 1
+        self.errors.append(message)
+        logger.error(f"Ingestion pipeline {self.name}: {message}")
+
+    async def _extract_stage(self, output: asyncio.Queue) -> None:
+        stats = self.stats["extract"]
+        iterator = self.source.__aiter__()
+        try:
+            while True:
+                started = time.perf_counter()
+                try:
+                    batch = await iterator.__anext__()
+                except StopAsyncIteration:
+                    break
+                except Exception as e:
+                    # The source cannot resume after raising; downstream drains what it has
+                    self._record_error(stats, f"extract failed after {stats.items_out} messages: {e}")
+                    break
+                finally:
+                    stats.busy_seconds += time.perf_counter() - started
+
+                position = getattr(batch, "position", None)
+                if not batch and position is None:
+                    continue
+                page = self._next_page
+                self._next_page += 1
+                self._pages[page] = _PageProgress(position)
+                if not batch:
+                    # Nothing to ingest, but the page still moves the checkpoint
+                    self._pages[page].remaining = 0
+                    await self._advance_checkpoint()
+                    continue
+                stats.batches += 1
+                stats.items_in += len(batch)
+                stats.items_out += len(batch)
+                await output.put((page, batch))
+        finally:
+            aclose = getattr(iterator, "aclose", None)
+            if aclose:
+                try:
+                    await aclose()
+                except Exception as e:
+                    logger.debug(f"Error closing ingestion source for {self.name}: {e}")
+        await output.put(_END)
+
+    async def _process_stage(self, input_queue: asyncio.Queue, output: asyncio.Queue) -> None:
+        stats = self.stats["process"]
+        while True:
+            item = await input_queue.get()
+            if item is _END:
+                break
+
+            page, batch = item
+            stats.batches += 1
+            stats.items_in += len(batch)
+            started = time.perf_counter()
+            try:
+                processed = await self.process(batch) or []
+            except Exception as e:
+                self._pages[page].failed = True
+                self._record_error(stats, f"processing a batch of {len(batch)} failed: {e}")
+                continue
+            finally:
+                stats.busy_seconds += time.perf_counter() - started
+
+            stats.items_out += len(processed)
+            self._pages[page].remaining = len(processed)
+            if not processed:
+                await self._advance_checkpoint()
+            for i in range(0, len(processed), self.embed_batch_size):
+                await output.put((page, processed[i:i + self.embed_batch_size]))
+        await output.put(_END)
+
+    async def _embed_stage(self, input_queue: asyncio.Queue, output: asyncio.Queue) -> None:
+        stats = self.stats["embed"]
+        last_call = 0.0
+        while True:
+            item = await input_queue.get()
+            if item is _END:
+                break
+
+            page, chunk = item
+            if self.embed_interval:
+                wait = last_call + self.embed_interval - time.monotonic()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                last_call = time.monotonic()
+
+            stats.batches += 1
+            stats.items_in += len(chunk)
+            started = time.perf_counter()
+            try:
+                # Only texts missing from the embedding cache are charged to the Gemini budget
+                vectors = await self.embedding_service.embed_messages(chunk, self.cache_stats, self.budget)
+            except Exception as e:
+                self._pages[page].failed = True
+                self._record_error(stats, f"embedding a batch of {len(chunk)} failed: {e}")
+                continue
+            finally:
+                stats.busy_seconds += time.perf_counter() - started
+
+            stats.items_out += len(vectors)
+            if len(vectors) < len(chunk):
+                # Messages without an embedding are skipped (and logged) by embed_messages
+                self._pages[page].remaining -= len(chunk) - len(vectors)
+                await self._advance_checkpoint()
+            if vectors:
+                await output.put((page, vectors))
+        await output.put(_END)
+
+    async def _upsert_stage(self, input_queue: asyncio.Queue) -> None:
+        stats = self.stats["upsert"]
+        buffer: List[tuple] = []  # (page, vector)
+        while True:
+            item = await input_queue.get()
+            vectors = item if item is _END else item[1]
+            if vectors is not _END:
+                buffer.extend((item[0], vector) for vector in vectors)
+                stats.items_in += len(vectors)
+
+            # Write full Pinecone batches as they fill; flush the remainder at the end
+            while len(buffer) >= self.upsert_batch_size or (vectors is _END and buffer):
+                batch, buffer = buffer[:self.upsert_batch_size], buffer[self.upsert_batch_size:]
+                stats.batches += 1
+                started = time.perf_counter()
+                try:
+                    # Charged per upsert call, so partition and shadow-namespace fan-out counts
+                    stored = await self.embedding_service.upsert_vectors(
+                        [vector for _, vector in batch], batch_size=self.upsert_batch_size, budget=self.budget)
+                except Exception as e:
+                    self._mark_failed(batch)
+                    self._record_error(stats, f"upserting {len(batch)} vectors failed: {e}")
+                    continue
+                finally:
+                    stats.busy_seconds += time.perf_counter() - started
+
+                stats.items_out += stored
+                if stored < len(batch):
+                    stats.errors += 1
+                    self._mark_failed(batch)
+                    continue
+                for page, _ in batch:
+                    self._pages[page].remaining -= 1
+                    self._pages[page].stored += 1
+                await self._advance_checkpoint()
+
+            if vectors is _END:
+                break
+
+    # Checkpointing
+
+    def _mark_failed(self, batch: List[tuple]) -> None:
+        for page in {page for page, _ in batch}:
+            self._pages[page].failed = True
+
+    async def _advance_checkpoint(self) -> None:
+        """Commit finished pages in source order, stopping at the first unfinished or failed one"""
+        async with self._commit_lock:
+            while self._commit_page in self._pages:
+                progress = self._pages[self._commit_page]
+                if progress.failed or progress.remaining is None or progress.remaining > 0:
+                    return
+                if self.checkpoint and progress.position is not None:
+                    try:
+                        await asyncio.to_thread(
+                            self.checkpoint_store.commit_page, self.checkpoint, progress.position, progress.stored)
+                    except Exception as e:
+                        progress.failed = True
+                        self.errors.append(f"checkpoint commit failed: {e}")
+                        logger.error(f"Ingestion pipeline {self.name}: {self.errors[-1]}")
+                        return
+                    self.pages_committed += 1
+                    self._last_committed = progress.position
+                del self._pages[self._commit_page]
+                self._commit_page += 1
+
+    async def _complete_checkpoint(self) -> None:
+        """Close the checkpoint run once the source's final page has committed"""
+        if not self.checkpoint or self._cancelled or self._pages:
+            return
+        if self._last_committed is None or not self._last_committed.final:
+            return
+        try:
+            await asyncio.to_thread(self.checkpoint_store.complete, self.checkpoint)
+            self.checkpoint_completed = True
+        except Exception as e:
+            self.errors.append(f"checkpoint completion failed: {e}")
+            logger.error(f"Ingestion pipeline {self.name}: {self.errors[-1]}")
+
+
+async def run_ingestion_pipeline(
+    name: str,
+    source: AsyncIterator[List[Any]],
+    process: Callable[[List[Any]], Awaitable[List[Dict[str, Any]]]],
+    embedding_service,
+    **options
+) -> PipelineResult:
+    """
+    Build and run an IngestionPipeline.
+
+    Args:
+        name: Label for logs and results
+        source: Async iterator yielding batches of raw messages
+        process: Coroutine function turning a raw batch into processed message dicts
+        embedding_service: EmbeddingService providing embed_messages / upsert_vectors
+        **options: Extra IngestionPipeline arguments (batch sizes, queue size, embed_interval, checkpoint)
+
+    Returns:
+        PipelineResult
+    """
+    pipeline = IngestionPipeline(name, source, process, embedding_service, **options)
+    return await pipeline.run()
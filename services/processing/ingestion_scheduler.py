@@ -0,0 +1,342 @@
+"""
+Ingestion Scheduler - Concurrent multi-channel ingestion under a shared API budget.
+
+Ingestion paths used to walk their channels one at a time, so a run took the
+sum of every channel's time. The scheduler runs up to K channel jobs at once
+(INGESTION_CHANNEL_CONCURRENCY) while every job draws from one budget:
+
+- Slack calls go through the process-wide slack_rate_limiter (per tier)
+- Gemini embedding requests and Pinecone upserts are paced by IngestionBudget,
+  which IngestionPipeline consults before every embed and upsert call
+
+Channels start in priority order: never-ingested channels first, then by
+staleness weighted by recent activity, so busy channels that have waited
+longest are refreshed first and the longest jobs do not start last. An ETA
+is derived from the throughput of finished channels and logged as channels
+complete.
+"""
+
+import asyncio
+import inspect
+import logging
+import math
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+BUDGET_BURST_SECONDS = 5  # Burst allowance, in seconds of sustained rate
+
+
+class _RateBucket:
+    """GCRA pacing for one API (not async - guarded by the budget lock)"""
+
+    def __init__(self, per_second: float):
+        self.interval = 1.0 / per_second
+        self.tolerance = max(0.0, per_second * BUDGET_BURST_SECONDS - 1) * self.interval
+        self.tat = 0.0
+        self.stats = {"units": 0, "delayed_calls": 0, "wait_time": 0.0}
+
+    def reserve(self, now: float, units: int) -> float:
+        tat = max(self.tat, now)
+        start = max(now, tat - self.tolerance)
+        self.tat = tat + units * self.interval
+
+        wait = start - now
+        self.stats["units"] += units
+        if wait > 0:
+            self.stats["delayed_calls"] += 1
+            self.stats["wait_time"] += wait
+        return wait
+
+
+class IngestionBudget:
+    """
+    Process-wide Gemini and Pinecone pacing shared by all ingestion pipelines.
+    """
+
+    def __init__(self, gemini_per_minute: Optional[int] = None, pinecone_per_second: Optional[float] = None):
+        self._buckets = {
+            "gemini": _RateBucket((gemini_per_minute or settings.INGESTION_GEMINI_REQUESTS_PER_MINUTE) / 60.0),
+            "pinecone": _RateBucket(pinecone_per_second or settings.INGESTION_PINECONE_UPSERTS_PER_SECOND),
+        }
+        self._lock = threading.Lock()
+
+    async def acquire(self, api: str, units: int = 1) -> None:
+        """
+        Wait until `units` requests to `api` fit the budget.
+
+        Args:
+            api: "gemini" (one unit per embedded text) or "pinecone" (one unit per upsert call)
+            units: Requests about to be made
+        """
+        bucket = self._buckets[api]
+        with self._lock:
+            wait = bucket.reserve(time.time(), units)
+        if wait > 0:
+            logger.debug(f"Ingestion budget: {api} throttled for {wait:.2f}s")
+            await asyncio.sleep(wait)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Budget statistics, including the Slack limiter's"""
+        from services.external_apis.slack_rate_limiter import slack_rate_limiter
+        with self._lock:
+            stats = {
+                api: {
+                    "per_minute": round(60.0 / bucket.interval, 1),
+                    **{name: round(value, 2) if isinstance(value, float) else value for name, value in bucket.stats.items()}
+                }
+                for api, bucket in self._buckets.items()
+            }
+        stats["slack"] = slack_rate_limiter.get_stats()
+        return stats
+
+
+@dataclass
+class ChannelJob:
+    """One channel's ingestion work"""
+    channel_id: str
+    name: str
+    run: Callable[[], Awaitable[Any]]  # Returns a PipelineResult or a result dict
+    last_ingested_at: Optional[float] = None  # Epoch seconds; None = never ingested
+    activity: float = 0.0  # Recent message volume (e.g. messages in the previous run)
+    estimated_messages: Optional[int] = None  # Expected messages this run, when known
+
+    def priority(self, now: float) -> float:
+        """Higher runs first: staleness in hours, weighted by activity"""
+        if self.last_ingested_at is None:
+            return math.inf
+        staleness_hours = max(0.0, now - self.last_ingested_at) / 3600
+        return staleness_hours * math.log2(2 + max(0.0, self.activity))
+
+
+@dataclass
+class JobOutcome:
+    """Result of one scheduled channel job"""
+    channel_id: str
+    name: str
+    priority: float
+    status: str = "pending"  # pending, running, completed, failed, cancelled
+    result: Any = None
+    error: Optional[str] = None
+    messages: int = 0
+    started_at: Optional[float] = None
+    duration_seconds: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "channel_id": self.channel_id,
+            "name": self.name,
+            "priority": None if math.isinf(self.priority) else round(self.priority, 3),
+            "status": self.status,
+            "error": self.error,
+            "messages": self.messages,
+            "duration_seconds": round(self.duration_seconds, 2)
+        }
+
+
+def _result_messages(result: Any) -> int:
+    """Messages a job handled, from a PipelineResult or a result dict"""
+    if result is None:
+        return 0
+    extracted = getattr(result, "extracted", None)
+    if extracted is not None:
+        return extracted
+    if isinstance(result, dict):
+        return result.get("messages_extracted", 0) or 0
+    return 0
+
+
+class IngestionScheduler:
+    """
+    Runs channel jobs K at a time in priority order. Create one per run.
+    """
+
+    def __init__(
+        self,
+        name: str = "ingestion",
+        concurrency: Optional[int] = None,
+        progress_callback: Optional[Callable[[Dict[str, Any]], Any]] = None
+    ):
+        """
+        Args:
+            name: Label for logs
+            concurrency: Channels processed in parallel
+            progress_callback: Optional callable (sync or async) receiving get_progress() after each job
+        """
+        self.name = name
+        self.concurrency = max(1, concurrency or settings.INGESTION_CHANNEL_CONCURRENCY)
+        self.progress_callback = progress_callback
+
+        self.jobs: List[ChannelJob] = []
+        self.outcomes: List[JobOutcome] = []
+        self._started_at: Optional[float] = None
+
+    async def run(self, jobs: List[ChannelJob]) -> List[JobOutcome]:
+        """
+        Run all jobs to completion.
+
+        A failing job is recorded and does not affect the others; cancelling
+        run() cancels the running jobs.
+
+        Args:
+            jobs: Channel jobs (any order)
+
+        Returns:
+            One JobOutcome per job, in the order they were started
+        """
+        now = time.time()
+        order = sorted(range(len(jobs)), key=lambda i: jobs[i].priority(now), reverse=True)
+        self.jobs = [jobs[i] for i in order]
+        self.outcomes = [JobOutcome(job.channel_id, job.name, job.priority(now)) for job in self.jobs]
+        self._started_at = time.perf_counter()
+        if not jobs:
+            return []
+
+        logger.info(
+            f"{self.name}: scheduling {len(jobs)} channels, {self.concurrency} at a time "
+            f"(order: {', '.join(job.name for job in self.jobs)})"
+        )
+
+        queue: asyncio.Queue = asyncio.Queue()
+        for index in range(len(self.jobs)):
+            queue.put_nowait(index)
+
+        workers = [asyncio.create_task(self._worker(queue)) for _ in range(min(self.concurrency, len(self.jobs)))]
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            for worker in workers:
+                if not worker.done():
+                    worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            for outcome in self.outcomes:
+                if outcome.status in ("pending", "running"):
+                    outcome.status = "cancelled"
+
+        progress = self.get_progress()
+        logger.info(
+            f"{self.name}: {progress['completed']}/{progress['channels']} channels completed, "
+            f"{progress['failed']} failed, {progress['messages']} messages in {progress['elapsed_seconds']:.1f}s"
+        )
+        return self.outcomes
+
+    async def _worker(self, queue: asyncio.Queue) -> None:
+        while True:
+            try:
+                index = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+
+            job, outcome = self.jobs[index], self.outcomes[index]
+            outcome.status = "running"
+            outcome.started_at = time.perf_counter()
+            try:
+                outcome.result = await job.run()
+                outcome.messages = _result_messages(outcome.result)
+                outcome.status = "completed"
+            except asyncio.CancelledError:
+                outcome.status = "cancelled"
+                raise
+            except Exception as e:
+                outcome.status = "failed"
+                outcome.error = str(e)
+                logger.error(f"{self.name}: channel {job.name} failed: {e}")
+            finally:
+                outcome.duration_seconds = time.perf_counter() - outcome.started_at
+
+            await self._report_progress(outcome)
+
+    async def _report_progress(self, outcome: JobOutcome) -> None:
+        progress = self.get_progress()
+        eta = progress["eta_seconds"]
+        logger.info(
+            f"{self.name}: {outcome.name} {outcome.status} ({outcome.messages} messages, "
+            f"{outcome.duration_seconds:.1f}s) - {progress['completed'] + progress['failed']}/{progress['channels']} done"
+            + (f", ETA {eta:.0f}s" if eta is not None else "")
+        )
+        if self.progress_callback:
+            try:
+                result = self.progress_callback(progress)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                logger.debug(f"Ingestion scheduler progress callback failed: {e}")
+
+    def get_progress(self) -> Dict[str, Any]:
+        """
+        Current progress and ETA.
+
+        The ETA spreads the expected remaining work over the parallel slots:
+        channels with an estimated message count are costed at the measured
+        messages-per-second of finished channels, the rest at the average
+        finished channel's duration. It is None until a channel finishes.
+        """
+        now = time.perf_counter()
+        finished = [o for o in self.outcomes if o.status in ("completed", "failed")]
+        counts = {status: sum(1 for o in self.outcomes if o.status == status)
+                  for status in ("pending", "running", "completed", "failed", "cancelled")}
+
+        eta = None
+        if finished:
+            busy = sum(o.duration_seconds for o in finished)
+            messages = sum(o.messages for o in finished)
+            avg_duration = busy / len(finished)
+            rate = messages / busy if busy and messages else None
+
+            def expected(job: ChannelJob) -> float:
+                if job.estimated_messages is not None and rate:
+                    return job.estimated_messages / rate
+                return avg_duration
+
+            remaining = 0.0
+            longest_running = 0.0
+            for job, outcome in zip(self.jobs, self.outcomes):
+                if outcome.status == "pending":
+                    remaining += expected(job)
+                elif outcome.status == "running":
+                    left = max(0.0, expected(job) - (now - outcome.started_at))
+                    remaining += left
+                    longest_running = max(longest_running, left)
+            eta = max(longest_running, remaining / self.concurrency)
+
+        return {
+            "name": self.name,
+            "channels": len(self.outcomes),
+            "concurrency": self.concurrency,
+            **counts,
+            "messages": sum(o.messages for o in self.outcomes),
+            "elapsed_seconds": round(now - self._started_at, 2) if self._started_at else 0.0,
+            "eta_seconds": round(eta, 1) if eta is not None else None,
+            "jobs": [o.to_dict() for o in self.outcomes]
+        }
+
+
+async def run_channel_jobs(
+    name: str,
+    jobs: List[ChannelJob],
+    concurrency: Optional[int] = None,
+    progress_callback: Optional[Callable[[Dict[str, Any]], Any]] = None
+) -> List[JobOutcome]:
+    """
+    Build an IngestionScheduler and run the jobs.
+
+    Args:
+        name: Label for logs
+        jobs: Channel jobs
+        concurrency: Channels processed in parallel (defaults to INGESTION_CHANNEL_CONCURRENCY)
+        progress_callback: Optional callable receiving progress dicts
+
+    Returns:
+        JobOutcome list in start order
+    """
+    scheduler = IngestionScheduler(name, concurrency, progress_callback)
+    return await scheduler.run(jobs)
+
+
+# Global budget shared by every ingestion pipeline in the process
+ingestion_budget = IngestionBudget()
@@ -1,13 +1,16 @@
 """
 Ingestion State Manager - Coordinates between first generation and hourly daemon.
 Ensures no messages are lost if first generation ingestion fails partway through.
+
+State lives in the shared checkpoint store ("first_generation" and "hourly"
+sources), the same checkpoints the ingestion pipelines resume from.
 """
 
-import json
 import logging
 from datetime import datetime, timedelta
 from typing import Dict, Any, Optional, List
-from pathlib import Path
+
+from services.processing.ingestion_checkpoints import checkpoint_store
 
 logger = logging.getLogger(__name__)
 
@@ -18,8 +21,7 @@ class IngestionStateManager:
     """
     
     def __init__(self):
-        self.first_gen_state_file = "first_generation_state.json"
-        self.hourly_state_file = "hourly_embedding_state.json"
+        self.checkpoints = checkpoint_store
         self.channels = [
             {
                 "id": "C087QKECFKQ",
@@ -35,61 +37,68 @@ class IngestionStateManager:
     
     def get_first_generation_state(self) -> Dict[str, Any]:
         """Get the current state of first generation ingestion."""
-        try:
-            with open(self.first_gen_state_file, 'r') as f:
-                return json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            return {
-                "status": "not_started",
-                "channels": {},
-                "created_at": datetime.now().isoformat(),
-                "last_updated": datetime.now().isoformat()
+        channels = {}
+        for checkpoint in self.checkpoints.list_checkpoints("first_generation"):
+            channels[checkpoint.channel_id] = {
+                "channel_name": checkpoint.channel_name,
+                "messages_processed": checkpoint.total_messages,
+                "total_extracted": checkpoint.details.get("total_extracted", 0),
+                "latest_timestamp": checkpoint.last_embedded_ts or checkpoint.run_newest_ts,
+                "status": "completed" if checkpoint.status == "completed" else checkpoint.details.get("status", checkpoint.status),
+                "pages_committed": checkpoint.page if checkpoint.in_progress else None,
+                "resume_ts": checkpoint.resume_ts if checkpoint.in_progress else None,
+                "last_updated": datetime.fromtimestamp(checkpoint.updated_at).isoformat()
             }
+        
+        # Overall status
+        if not channels:
+            status = "not_started"
+        elif len(channels) >= len(self.channels) and all(ch["status"] == "completed" for ch in channels.values()):
+            status = "completed"
+        elif any(ch["status"] == "failed" for ch in channels.values()):
+            status = "partial_failure"
+        else:
+            status = "in_progress"
+        
+        return {
+            "status": status,
+            "channels": channels,
+            "last_updated": max((ch["last_updated"] for ch in channels.values()), default=None)
+        }
     
     def update_first_generation_progress(self, channel_id: str, channel_name: str, 
                                        messages_processed: int, latest_timestamp: str,
                                        total_extracted: int, status: str = "in_progress"):
-        """Update progress for a specific channel during first generation ingestion."""
-        state = self.get_first_generation_state()
-        
-        state["channels"][channel_id] = {
-            "channel_name": channel_name,
-            "messages_processed": messages_processed,
-            "total_extracted": total_extracted,
-            "latest_timestamp": latest_timestamp,
-            "status": status,  # "in_progress", "completed", "failed"
-            "last_updated": datetime.now().isoformat()
-        }
+        """
+        Update progress for a specific channel during first generation ingestion.
         
-        # Update overall status
-        all_completed = all(
-            ch.get("status") == "completed" 
-            for ch in state["channels"].values()
+        Message counts and the resume position are committed page by page by the
+        pipeline; this records the run's outcome ("in_progress", "completed", "failed").
+        """
+        checkpoint = self.checkpoints.get("first_generation", channel_id)
+        self.checkpoints.update(
+            "first_generation", channel_id,
+            channel_name=channel_name,
+            # An open run keeps its status so it is resumed, not restarted
+            status="completed" if status == "completed" else None,
+            last_embedded_ts=latest_timestamp if status == "completed" else None,
+            details={
+                "status": status,
+                "total_extracted": (checkpoint.details.get("total_extracted", 0) if checkpoint else 0) + total_extracted
+            }
         )
         
-        if all_completed and len(state["channels"]) == len(self.channels):
-            state["status"] = "completed"
-        elif any(ch.get("status") == "failed" for ch in state["channels"].values()):
-            state["status"] = "partial_failure"
-        else:
-            state["status"] = "in_progress"
-        
-        state["last_updated"] = datetime.now().isoformat()
-        
-        with open(self.first_gen_state_file, 'w') as f:
-            json.dump(state, f, indent=2)
-        
         logger.info(f"Updated first generation state for {channel_name}: {messages_processed} messages processed")
     
     def mark_first_generation_complete(self):
         """Mark first generation ingestion as fully completed."""
-        state = self.get_first_generation_state()
-        state["status"] = "completed"
-        state["completed_at"] = datetime.now().isoformat()
-        state["last_updated"] = datetime.now().isoformat()
-        
-        with open(self.first_gen_state_file, 'w') as f:
-            json.dump(state, f, indent=2)
+        for channel in self.channels:
+            self.checkpoints.update(
+                "first_generation", channel["id"],
+                channel_name=channel["name"],
+                status="completed",
+                details={"status": "completed", "completed_at": datetime.now().isoformat()}
+            )
         
         logger.info("First generation ingestion marked as complete")
     
@@ -146,30 +155,32 @@ class IngestionStateManager:
         }
     
     def get_hourly_state(self) -> Dict[str, Any]:
-        """Get hourly daemon state."""
-        try:
-            with open(self.hourly_state_file, 'r') as f:
-                return json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            return {
-                "last_run": None,
-                "channels": {},
-                "created_at": datetime.now().isoformat()
+        """Get hourly daemon state (shared with the hourly embedding worker)."""
+        channels = {}
+        for checkpoint in self.checkpoints.list_checkpoints("hourly"):
+            channels[checkpoint.channel_id] = {
+                "latest_timestamp": checkpoint.last_embedded_ts,
+                "last_check": checkpoint.details.get("last_check") or checkpoint.details.get("last_check_time"),
+                "messages_embedded": checkpoint.details.get("messages_embedded", 0),
+                "total_messages_embedded": checkpoint.total_messages,
+                "resume_pending": checkpoint.in_progress
             }
+        
+        return {
+            "last_run": max((ch["last_check"] for ch in channels.values() if ch["last_check"]), default=None),
+            "channels": channels
+        }
     
     def update_hourly_state(self, channel_id: str, latest_timestamp: str, messages_embedded: int):
         """Update hourly daemon state after successful processing."""
-        state = self.get_hourly_state()
-        
-        state["channels"][channel_id] = {
-            "latest_timestamp": latest_timestamp,
-            "last_check": datetime.now().isoformat(),
-            "messages_embedded": messages_embedded
-        }
-        state["last_run"] = datetime.now().isoformat()
-        
-        with open(self.hourly_state_file, 'w') as f:
-            json.dump(state, f, indent=2)
+        self.checkpoints.update(
+            "hourly", channel_id,
+            last_embedded_ts=latest_timestamp,
+            details={
+                "last_check": datetime.now().isoformat(),
+                "messages_embedded": messages_embedded
+            }
+        )
     
     def get_comprehensive_status(self) -> Dict[str, Any]:
         """Get comprehensive status of both first generation and hourly systems."""
@@ -0,0 +1,231 @@
+"""
+Query Filters - Push the scope of a question down into vector search.
+
+"What did #genai-designsys say last week about X" names a channel and a
+period; searching the whole corpus for it and hoping the right channel wins
+on similarity wastes the candidate set. This turns the parts of a question
+that map onto stored metadata into a Pinecone filter:
+
+- `#channel` (or a raw `<#C123|channel>`) -> `channel_name` / `channel_id`
+- `<@U123>` or an `@Name` the workspace directory resolves -> `user_id`
+- today, yesterday, this/last week|month|quarter, past N days|weeks|months,
+  month names, ISO dates and ranges -> `date` (YYYY-MM-DD, stored by both
+  processors) plus a time range for partition pruning
+- Jira keys (PROJ-123) are not stored as metadata, so they are returned for
+  ranking: matches that mention them are preferred over ones that do not
+"""
+
+import logging
+import re
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+MAX_DATE_FILTER_DAYS = 62  # Longer ranges only prune partitions
+MAX_USERS_PER_MENTION = 5  # An ambiguous first name is not a useful filter
+
+MONTHS = ["january", "february", "march", "april", "may", "june", "july",
+          "august", "september", "october", "november", "december"]
+
+CHANNEL_LINK_PATTERN = re.compile(r"<#([A-Z0-9]+)(?:\|([^>]+))?>")
+CHANNEL_PATTERN = re.compile(r"(?<![\w&])#(?=[\w.-]*[a-z])([a-z0-9][a-z0-9._-]{0,79})", re.IGNORECASE)
+USER_LINK_PATTERN = re.compile(r"<@([UW][A-Z0-9]+)>")
+USER_PATTERN = re.compile(r"(?<![\w.<])@([\w.-]+)")
+JIRA_KEY_PATTERN = re.compile(r"\b([A-Z][A-Z0-9]{1,9}-\d+)\b")
+
+ISO_DATE = r"(\d{4}-\d{2}-\d{2})"
+ISO_RANGE_PATTERN = re.compile(rf"\b(?:from|between)\s+{ISO_DATE}\s+(?:to|and|until)\s+{ISO_DATE}\b", re.IGNORECASE)
+SINCE_PATTERN = re.compile(rf"\b(?:since|after)\s+{ISO_DATE}\b", re.IGNORECASE)
+ISO_DAY_PATTERN = re.compile(rf"\b{ISO_DATE}\b")
+RELATIVE_DAY_PATTERN = re.compile(r"\b(today|yesterday)\b", re.IGNORECASE)
+RELATIVE_PERIOD_PATTERN = re.compile(r"\b(this|last|previous)\s+(week|month|quarter)\b", re.IGNORECASE)
+TRAILING_PATTERN = re.compile(r"\b(?:past|last|previous)\s+(\d{1,3})\s+(day|week|month)s?\b", re.IGNORECASE)
+MONTH_PATTERN = re.compile(rf"\b(?:in\s+)?({'|'.join(MONTHS)})(?:\s+(\d{{4}}))?\b", re.IGNORECASE)
+
+
+@dataclass
+class QueryFilters:
+    """Metadata scope extracted from a question"""
+    filters: Dict[str, Any] = field(default_factory=dict)
+    time_range: Optional[Tuple[datetime, datetime]] = None
+    jira_keys: List[str] = field(default_factory=list)
+
+    def __bool__(self) -> bool:
+        return bool(self.filters or self.time_range or self.jira_keys)
+
+
+def _day_start(when: datetime) -> datetime:
+    return when.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _month_start(year: int, month: int) -> datetime:
+    return datetime(year + (month - 1) // 12, (month - 1) % 12 + 1, 1)
+
+
+def _closed(start: datetime, end_exclusive: datetime, now: datetime) -> Tuple[datetime, datetime]:
+    """[start, end) as an inclusive range that does not run past now"""
+    return start, min(end_exclusive - timedelta(microseconds=1), now)
+
+
+def extract_time_range(text: str, now: Optional[datetime] = None) -> Optional[Tuple[datetime, datetime]]:
+    """
+    Time range named by a date phrase in `text`.
+
+    Args:
+        text: Question text
+        now: Reference time (default: now)
+
+    Returns:
+        Inclusive (start, end), or None if the text names no period
+    """
+    now = (now or datetime.now()).replace(tzinfo=None)
+    today = _day_start(now)
+
+    try:
+        match = ISO_RANGE_PATTERN.search(text)
+        if match:
+            start, end = sorted(datetime.fromisoformat(value) for value in match.groups())
+            return start, end + timedelta(days=1) - timedelta(microseconds=1)
+
+        match = SINCE_PATTERN.search(text)
+        if match:
+            return datetime.fromisoformat(match.group(1)), now
+
+        match = ISO_DAY_PATTERN.search(text)
+        if match:
+            day = datetime.fromisoformat(match.group(1))
+            return _closed(day, day + timedelta(days=1), now) if day <= now else None
+    except ValueError:
+        return None
+
+    match = RELATIVE_DAY_PATTERN.search(text)
+    if match:
+        day = today if match.group(1).lower() == "today" else today - timedelta(days=1)
+        return _closed(day, day + timedelta(days=1), now)
+
+    match = TRAILING_PATTERN.search(text)
+    if match:
+        count, unit = int(match.group(1)), match.group(2).lower()
+        if unit == "month":
+            return _month_start(now.year, now.month - count).replace(day=min(now.day, 28)), now
+        return today - timedelta(days=count * (7 if unit == "week" else 1)), now
+
+    match = RELATIVE_PERIOD_PATTERN.search(text)
+    if match:
+        back = 0 if match.group(1).lower() == "this" else 1
+        unit = match.group(2).lower()
+        if unit == "week":
+            start = today - timedelta(days=today.weekday() + 7 * back)
+            return _closed(start, start + timedelta(days=7), now)
+        months = 1 if unit == "month" else 3
+        first = now.month if unit == "month" else (now.month - 1) // 3 * 3 + 1
+        start = _month_start(now.year, first - months * back)
+        return _closed(start, _month_start(start.year, start.month + months), now)
+
+    for match in MONTH_PATTERN.finditer(text):
+        if not (match.group(2) or match.group(0).lower().startswith("in")):
+            continue  # A bare month name ("may") needs "in" or a year to count as a date
+        month = MONTHS.index(match.group(1).lower()) + 1
+        year = int(match.group(2)) if match.group(2) else now.year - (month > now.month)
+        start = datetime(year, month, 1)
+        if start <= now:
+            return _closed(start, _month_start(year, month + 1), now)
+        break
+
+    return None
+
+
+def date_filter(time_range: Tuple[datetime, datetime]) -> Optional[Dict[str, Any]]:
+    """`date` $in condition covering a range, or None if the range is too long to list"""
+    start, end = (_day_start(when) for when in time_range)
+    days = (end - start).days + 1
+    if days <= 0 or days > MAX_DATE_FILTER_DAYS:
+        return None
+    return {"$in": [(start + timedelta(days=offset)).date().isoformat() for offset in range(days)]}
+
+
+def _user_names(user: Dict[str, Any]) -> Iterable[str]:
+    profile = user.get("profile", {})
+    for name in (user.get("name"), user.get("real_name"), profile.get("real_name"),
+                 profile.get("display_name"), profile.get("first_name")):
+        if name:
+            yield name.lower()
+            yield (name.split() or [name])[0].lower()
+
+
+def resolve_user_mention(name: str, users: Dict[str, Dict[str, Any]]) -> List[str]:
+    """Ids of the (human) workspace users an `@name` can refer to"""
+    name = name.rstrip(".-").lower()
+    return sorted(
+        user_id for user_id, user in users.items()
+        if not user.get("is_bot") and not user.get("deleted") and name in set(_user_names(user))
+    )
+
+
+def extract_query_filters(
+    text: str,
+    now: Optional[datetime] = None,
+    users: Optional[Dict[str, Dict[str, Any]]] = None
+) -> QueryFilters:
+    """
+    Turn the channels, people, dates and Jira keys a question names into search scope.
+
+    Args:
+        text: Question text, raw or as cleaned by the Slack gateway
+        now: Reference time for relative dates (default: now)
+        users: Slack user records by id (default: the workspace directory)
+
+    Returns:
+        QueryFilters; an empty one when the question names nothing filterable
+    """
+    if users is None:
+        from services.external_apis.slack_directory import slack_directory
+        users = slack_directory.users
+
+    filters: Dict[str, Any] = {}
+
+    channel_ids = set()
+    channel_names = {name.lower() for name in CHANNEL_PATTERN.findall(CHANNEL_LINK_PATTERN.sub(" ", text))}
+    for channel_id, name in CHANNEL_LINK_PATTERN.findall(text):
+        if name:
+            channel_names.add(name.lower())
+        else:
+            channel_ids.add(channel_id)
+    if channel_names:
+        filters["channel_name"] = {"$in": sorted(channel_names)}
+    if channel_ids:
+        filters["channel_id"] = {"$in": sorted(channel_ids)}
+
+    user_ids = set(USER_LINK_PATTERN.findall(text))
+    for name in USER_PATTERN.findall(text):
+        matches = resolve_user_mention(name, users)
+        if 0 < len(matches) <= MAX_USERS_PER_MENTION:
+            user_ids.update(matches)
+        else:
+            logger.debug(f"Not filtering on @{name}: {len(matches)} matching users")
+    if user_ids:
+        filters["user_id"] = {"$in": sorted(user_ids)}
+
+    time_range = extract_time_range(text, now)
+    if time_range:
+        dates = date_filter(time_range)
+        if dates:
+            filters["date"] = dates
+
+    jira_keys = list(dict.fromkeys(JIRA_KEY_PATTERN.findall(text)))
+    return QueryFilters(filters=filters, time_range=time_range, jira_keys=jira_keys)
+
+
+def prefer_mentions(results: List[Dict[str, Any]], terms: List[str], top_k: int) -> List[Dict[str, Any]]:
+    """Best top_k results, those whose content mentions any of `terms` first"""
+    if not terms:
+        return results[:top_k]
+    terms = [term.lower() for term in terms]
+
+    def mentions(result: Dict[str, Any]) -> bool:
+        content = (result.get("content") or result.get("metadata", {}).get("text") or "").lower()
+        return any(term in content for term in terms)
+
+    return sorted(results, key=lambda result: not mentions(result))[:top_k]
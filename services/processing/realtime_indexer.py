@@ -0,0 +1,429 @@
+"""
+Realtime Indexer - Incremental indexing from Slack message events.
+
+Messages posted in monitored channels used to wait for the hourly poll
+(hourly_embedding_check) before they were searchable. /slack/events now hands
+every message event to the indexer, which embeds them in micro-batches within
+seconds:
+
+- new messages (plain, thread replies, broadcasts, file shares) are processed
+  by DataProcessor, so they get the same deterministic vector ids as polling
+- message_changed re-indexes the new text and deletes vectors of the previous
+  version that the new one does not overwrite (edits that leave the text alone,
+  such as unfurls and reply-count updates, are skipped)
+- message_deleted deletes every vector id the message may have been stored under
+
+Events for the same message are coalesced while queued, so an edit burst is
+embedded once. Indexed timestamps are remembered per channel in Redis
+(`realtime_index:{channel}` sorted set scored by indexing time; per-process
+fallback without Redis) so the hourly poll can skip windows the events
+already covered and only fill gaps (missed events, restarts, dropped batches).
+"""
+
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from config import settings
+from services.processing.ingestion_scheduler import ingestion_budget
+
+logger = logging.getLogger(__name__)
+
+INDEX_KEY_PREFIX = "realtime_index"
+INDEXED_SUBTYPES = {None, "thread_broadcast", "file_share", "me_message"}
+MAX_CHUNK_IDS = 50  # Chunk ids tried when deleting; DataProcessor chunks ~1000 chars each
+MAX_ATTEMPTS = 3  # Flush attempts before a message is left to the hourly poll
+
+
+def message_vector_ids(message: Dict[str, Any], channel_id: str) -> List[str]:
+    """
+    Every vector id the ingestion paths may have stored a Slack message under.
+
+    DataProcessor ids hash channel, ts, user and thread_ts, and a parent's
+    thread_ts depends on whether it had replies when it was ingested, so both
+    variants are covered, with their chunk ids. Bulk ingestion stores
+    `{channel}_{ts}`. Thread reply ids of EnhancedDataProcessor include the
+    reply position, which is not known here; those are replaced by the next
+    smart hourly run instead.
+
+    Args:
+        message: Raw Slack message (at least `ts`)
+        channel_id: Channel the message was posted in
+
+    Returns:
+        Candidate vector ids
+    """
+    ts = message.get("ts", "")
+    user_id = message.get("user") or "unknown"
+    thread_variants = {None, ts, message.get("thread_ts")}
+
+    ids = [f"{channel_id}_{ts}"]
+    for thread_ts in thread_variants:
+        components = [channel_id, ts, user_id] + ([thread_ts] if thread_ts else [])
+        base_id = f"slack_{hashlib.md5('_'.join(components).encode()).hexdigest()[:12]}"
+        ids.append(base_id)
+        ids.extend(f"{base_id}_chunk_{i}" for i in range(MAX_CHUNK_IDS))
+    return ids
+
+
+@dataclass
+class _IndexOp:
+    """Queued work for one message, coalesced by (channel, ts)"""
+    channel_id: str
+    ts: str
+    action: str  # "upsert" or "delete"
+    message: Optional[Dict[str, Any]] = None  # Current version, for upserts
+    previous: List[Dict[str, Any]] = field(default_factory=list)  # Earlier versions whose vectors go
+    received_at: float = field(default_factory=time.time)
+    attempts: int = 0
+
+
+class RealtimeIndexer:
+    """
+    Process-wide micro-batching indexer fed by Slack message events.
+
+    The worker task starts on the first submitted event, on the running loop.
+    """
+
+    def __init__(
+        self,
+        channels: Optional[Iterable[str]] = None,
+        batch_size: Optional[int] = None,
+        flush_seconds: Optional[float] = None,
+        max_pending: Optional[int] = None,
+        enabled: Optional[bool] = None,
+        connector=None,
+        data_processor=None,
+        embedding_service=None,
+        budget=None
+    ):
+        """
+        Args:
+            channels: Channel ids to index (defaults to SLACK_CHANNELS_TO_MONITOR)
+            batch_size: Messages per micro-batch
+            flush_seconds: Longest a queued message waits for its batch to fill
+            max_pending: Queued messages beyond which new events are dropped
+            enabled: Overrides REALTIME_INDEXING_ENABLED
+            connector, data_processor, embedding_service: Services to use (created on first flush)
+            budget: IngestionBudget charged for embeddings and Pinecone calls
+        """
+        self._channels = set(channels) if channels is not None else None
+        self.batch_size = max(1, batch_size or settings.REALTIME_INDEX_BATCH_SIZE)
+        self.flush_seconds = settings.REALTIME_INDEX_FLUSH_SECONDS if flush_seconds is None else flush_seconds
+        self.max_pending = max_pending or settings.REALTIME_INDEX_MAX_PENDING
+        self.enabled = settings.REALTIME_INDEXING_ENABLED if enabled is None else enabled
+        self.retention_seconds = settings.REALTIME_INDEX_RETENTION_HOURS * 3600
+        self.budget = budget or ingestion_budget
+
+        self._connector = connector
+        self._data_processor = data_processor
+        self._embedding_service = embedding_service
+        self._memory_service = None
+
+        self._pending: "OrderedDict[Tuple[str, str], _IndexOp]" = OrderedDict()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._local_index: Dict[str, Dict[str, float]] = {}  # channel -> {ts: indexed_at}, without Redis
+        self._lock = threading.Lock()
+
+        self.stats = {
+            "events_submitted": 0, "events_coalesced": 0, "events_skipped_unchanged": 0,
+            "events_dropped": 0, "flushes": 0, "messages_indexed": 0, "messages_deleted": 0,
+            "vectors_upserted": 0, "vectors_deleted": 0, "retries": 0, "failed": 0, "errors": 0,
+            "last_flush_lag_seconds": 0.0
+        }
+
+    @property
+    def channels(self) -> Set[str]:
+        if self._channels is None:
+            return set(settings.get_monitored_channels())
+        return self._channels
+
+    # Intake
+
+    def submit(self, event: Dict[str, Any]) -> bool:
+        """
+        Queue a Slack event for indexing without waiting. Must be called on the event loop.
+
+        Args:
+            event: The `event` payload of an event_callback
+
+        Returns:
+            True if the event was queued
+        """
+        try:
+            op = self._op_from_event(event)
+            if op is None:
+                return False
+
+            key = (op.channel_id, op.ts)
+            queued = self._pending.pop(key, None)
+            if queued is not None:
+                # Last event wins; versions superseded while queued still need their vectors removed
+                op.previous = queued.previous + op.previous
+                op.received_at = queued.received_at
+                self.stats["events_coalesced"] += 1
+            elif len(self._pending) >= self.max_pending:
+                self.stats["events_dropped"] += 1
+                logger.warning(f"Realtime indexer queue full, leaving {op.channel_id}/{op.ts} to the hourly poll")
+                return False
+
+            self._pending[key] = op
+            self.stats["events_submitted"] += 1
+            self._ensure_worker()
+            self._wakeup.set()
+            return True
+
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.error(f"Realtime indexer could not queue event: {e}")
+            return False
+
+    def _op_from_event(self, event: Dict[str, Any]) -> Optional[_IndexOp]:
+        if not self.enabled or event.get("type") != "message":
+            return None
+        channel_id = event.get("channel")
+        if not channel_id or channel_id not in self.channels:
+            return None
+
+        subtype = event.get("subtype")
+        if subtype == "message_changed":
+            message = event.get("message") or {}
+            previous = event.get("previous_message")
+            if not message.get("ts"):
+                return None
+            if previous and previous.get("text") == message.get("text"):
+                self.stats["events_skipped_unchanged"] += 1
+                return None
+            return _IndexOp(channel_id, message["ts"], "upsert", message=message,
+                            previous=[previous] if previous else [])
+
+        if subtype == "message_deleted":
+            previous = event.get("previous_message") or {"ts": event.get("deleted_ts")}
+            if not previous.get("ts"):
+                return None
+            return _IndexOp(channel_id, previous["ts"], "delete", previous=[previous])
+
+        if subtype in INDEXED_SUBTYPES and event.get("ts"):
+            return _IndexOp(channel_id, event["ts"], "upsert", message=dict(event))
+        return None
+
+    def _ensure_worker(self) -> None:
+        if self._worker is None or self._worker.done():
+            self._wakeup = asyncio.Event()
+            self._worker = asyncio.get_running_loop().create_task(self._run(), name="realtime-indexer")
+
+    # Micro-batching
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._wakeup.wait()
+
+            # Give the batch up to flush_seconds to fill
+            deadline = loop.time() + self.flush_seconds
+            while len(self._pending) < self.batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), remaining)
+                except asyncio.TimeoutError:
+                    break
+
+            batch = self._take_batch()
+            if not self._pending:
+                self._wakeup.clear()
+            if batch:
+                await self._flush_batch(batch)
+
+    def _take_batch(self) -> List[_IndexOp]:
+        batch = []
+        while self._pending and len(batch) < self.batch_size:
+            batch.append(self._pending.popitem(last=False)[1])
+        return batch
+
+    async def drain(self) -> None:
+        """Index everything queued now, without waiting for the worker"""
+        while self._pending:
+            await self._flush_batch(self._take_batch())
+
+    async def _flush_batch(self, batch: List[_IndexOp]) -> None:
+        self.stats["flushes"] += 1
+        try:
+            await self._flush(batch)
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.error(f"Realtime indexer failed to index {len(batch)} messages: {e}")
+            self._retry(batch)
+            return
+
+        now = time.time()
+        self.stats["last_flush_lag_seconds"] = round(max(now - op.received_at for op in batch), 3)
+        await self._record(batch)
+
+    def _retry(self, batch: List[_IndexOp]) -> None:
+        for op in batch:
+            op.attempts += 1
+            key = (op.channel_id, op.ts)
+            if key in self._pending:
+                # A newer event arrived meanwhile; keep it, plus the versions to remove
+                self._pending[key].previous = op.previous + self._pending[key].previous
+            elif op.attempts < MAX_ATTEMPTS:
+                self._pending[key] = op
+                self.stats["retries"] += 1
+            else:
+                self.stats["failed"] += 1
+                logger.warning(f"Realtime indexer gave up on {op.channel_id}/{op.ts}, leaving it to the hourly poll")
+        if self._pending and self._wakeup:
+            self._wakeup.set()
+
+    async def _flush(self, batch: List[_IndexOp]) -> None:
+        connector, data_processor, embedding_service = self._services()
+
+        messages = []
+        for op in batch:
+            if op.action == "upsert":
+                message = await connector.message_from_event(op.message, op.channel_id)
+                if message:
+                    messages.append(message.to_dict())
+        processed = await data_processor.process_messages(messages) if messages else []
+
+        # Remove earlier versions first, except ids the new versions overwrite anyway
+        new_ids = {message["id"] for message in processed}
+        stale_ids = sorted({
+            vector_id
+            for op in batch
+            for previous in op.previous
+            for vector_id in message_vector_ids(previous, op.channel_id)
+        } - new_ids)
+        if stale_ids:
+            # Charged per delete call, across every namespace and time partition
+            if not await embedding_service.delete_vectors(stale_ids, budget=self.budget):
+                raise RuntimeError(f"deleting {len(stale_ids)} stale vector ids failed")
+            self.stats["vectors_deleted"] += len(stale_ids)
+
+        if processed:
+            vectors = await embedding_service.embed_messages(processed, budget=self.budget)
+            if len(vectors) < len(processed):
+                raise RuntimeError(f"{len(processed) - len(vectors)} of {len(processed)} embeddings failed")
+            stored = await embedding_service.upsert_vectors(vectors, budget=self.budget)
+            if stored < len(vectors):
+                raise RuntimeError(f"upserted {stored} of {len(vectors)} vectors")
+            self.stats["vectors_upserted"] += stored
+
+        self.stats["messages_indexed"] += sum(1 for op in batch if op.action == "upsert")
+        self.stats["messages_deleted"] += sum(1 for op in batch if op.action == "delete")
+
+    def _services(self):
+        if self._connector is None:
+            from services.external_apis.enhanced_slack_connector import EnhancedSlackConnector
+            self._connector = EnhancedSlackConnector()
+        if self._data_processor is None:
+            from services.processing.data_processor import DataProcessor
+            self._data_processor = DataProcessor()
+        if self._embedding_service is None:
+            from services.data.embedding_service import EmbeddingService
+            self._embedding_service = EmbeddingService()
+        return self._connector, self._data_processor, self._embedding_service
+
+    # Coverage bookkeeping
+
+    def _redis_client(self):
+        if self._memory_service is None:
+            from services.core.memory_service import MemoryService
+            self._memory_service = MemoryService()
+        if self._memory_service.redis_available:
+            return self._memory_service.redis_client
+        return None
+
+    async def _record(self, batch: List[_IndexOp]) -> None:
+        """Remember which message timestamps the events have covered"""
+        now = time.time()
+        cutoff = now - self.retention_seconds
+        indexed: Dict[str, Dict[str, float]] = {}
+        removed: Dict[str, List[str]] = {}
+        for op in batch:
+            if op.action == "upsert":
+                indexed.setdefault(op.channel_id, {})[op.ts] = now
+            else:
+                removed.setdefault(op.channel_id, []).append(op.ts)
+
+        redis_client = self._redis_client()
+        if redis_client:
+            try:
+                pipeline = redis_client.pipeline()
+                for channel_id in set(indexed) | set(removed):
+                    key = f"{INDEX_KEY_PREFIX}:{channel_id}"
+                    if channel_id in indexed:
+                        pipeline.zadd(key, indexed[channel_id])
+                    if channel_id in removed:
+                        pipeline.zrem(key, *removed[channel_id])
+                    pipeline.zremrangebyscore(key, "-inf", cutoff)
+                    pipeline.expire(key, self.retention_seconds)
+                await pipeline.execute()
+                return
+            except Exception as e:
+                logger.warning(f"Failed to record realtime-indexed messages: {e}")
+
+        with self._lock:
+            for channel_id, timestamps in indexed.items():
+                self._local_index.setdefault(channel_id, {}).update(timestamps)
+            for channel_id, timestamps in removed.items():
+                for ts in timestamps:
+                    self._local_index.get(channel_id, {}).pop(ts, None)
+            for channel_id, timestamps in self._local_index.items():
+                self._local_index[channel_id] = {ts: score for ts, score in timestamps.items() if score >= cutoff}
+
+    async def indexed_timestamps(self, channel_id: str, timestamps: Iterable[str]) -> Set[str]:
+        """
+        Which of the given message timestamps were indexed from events.
+
+        Args:
+            channel_id: Channel the messages belong to
+            timestamps: Message ts values
+
+        Returns:
+            The subset already indexed (empty when indexing is disabled or the lookup fails)
+        """
+        timestamps = list(dict.fromkeys(timestamps))
+        if not self.enabled or not timestamps:
+            return set()
+
+        redis_client = self._redis_client()
+        if redis_client:
+            try:
+                pipeline = redis_client.pipeline()
+                for ts in timestamps:
+                    pipeline.zscore(f"{INDEX_KEY_PREFIX}:{channel_id}", ts)
+                scores = await pipeline.execute()
+                return {ts for ts, score in zip(timestamps, scores) if score is not None}
+            except Exception as e:
+                logger.warning(f"Realtime index lookup failed for {channel_id}: {e}")
+                return set()
+
+        with self._lock:
+            local = self._local_index.get(channel_id, {})
+            return {ts for ts in timestamps if ts in local}
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Indexer statistics"""
+        return {
+            "enabled": self.enabled,
+            "channels": sorted(self.channels),
+            "worker_running": bool(self._worker and not self._worker.done()),
+            "pending": len(self._pending),
+            "batch_size": self.batch_size,
+            "flush_seconds": self.flush_seconds,
+            **self.stats
+        }
+
+
+# Global indexer fed by /slack/events
+realtime_indexer = RealtimeIndexer()
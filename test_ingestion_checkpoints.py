@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Test the ingestion checkpoint store's handling of unfinished runs:
+1. An interrupted run resumes below its last committed page
+2. A later run with a new window widens the unfinished run to cover it
+3. A run that keeps failing is abandoned after the resume limit
+"""
+
+import os
+import tempfile
+
+from services.processing.ingestion_checkpoints import CheckpointStore, PagePosition
+
+
+def make_store(directory: str, max_resume_attempts: int = 3) -> CheckpointStore:
+    return CheckpointStore(os.path.join(directory, "checkpoints.db"), import_legacy=False,
+                           max_resume_attempts=max_resume_attempts)
+
+
+def test_resume_same_window():
+    """An interrupted run picks up below its last committed page"""
+    with tempfile.TemporaryDirectory() as directory:
+        store = make_store(directory)
+        run = store.begin("daily", "C1", "1000", "2000")
+        store.commit_page(run, PagePosition(1, oldest_ts="1500", newest_ts="1990"), 10)
+
+        resumed = store.begin("daily", "C1", "1000", "2000")
+        assert resumed.resumed
+        assert resumed.run_id == run.run_id
+        assert resumed.resume_latest_ts == "1500"
+        assert resumed.attempts == 1
+
+
+def test_interrupted_run_then_new_window():
+    """A later run's window is covered instead of re-ingesting the stale one"""
+    with tempfile.TemporaryDirectory() as directory:
+        store = make_store(directory)
+        run = store.begin("daily", "C1", "1000", "2000")
+        store.commit_page(run, PagePosition(1, oldest_ts="1500", newest_ts="1990"), 10)
+
+        # Next day: the window moved forward, so the page walk restarts over the union
+        widened = store.begin("daily", "C1", "1900", "3000")
+        assert not widened.resumed
+        assert widened.run_id != run.run_id
+        assert (widened.window_oldest_ts, widened.window_latest_ts) == ("1000", "3000")
+        assert widened.resume_latest_ts == "3000"
+        assert widened.attempts == 1
+
+        store.commit_page(widened, PagePosition(1, oldest_ts="1001", newest_ts="2999", final=True), 30)
+        store.complete(widened)
+        done = store.get("daily", "C1")
+        assert done.status == "completed"
+        assert done.window_latest_ts == "3000"
+        assert done.last_embedded_ts == "2999"
+
+        # A wider start alone keeps the committed pages
+        run = store.begin("daily", "C1", "3000", "4000")
+        store.commit_page(run, PagePosition(1, oldest_ts="3500", newest_ts="3990"), 10)
+        resumed = store.begin("daily", "C1", "2500", "3900")
+        assert resumed.resumed
+        assert (resumed.window_oldest_ts, resumed.window_latest_ts) == ("2500", "4000")
+        assert resumed.resume_latest_ts == "3500"
+
+
+def test_failing_run_is_abandoned():
+    """A run that never finishes stops pinning the channel after the resume limit"""
+    with tempfile.TemporaryDirectory() as directory:
+        store = make_store(directory, max_resume_attempts=2)
+        run = store.begin("manual", "C1", "1000", "2000")
+        for _ in range(2):
+            assert store.begin("manual", "C1", "1000", "2000").resumed
+
+        fresh = store.begin("manual", "C1", "5000", "6000")
+        assert not fresh.resumed
+        assert fresh.run_id != run.run_id
+        assert (fresh.window_oldest_ts, fresh.window_latest_ts) == ("5000", "6000")
+        assert fresh.attempts == 0
+        assert fresh.details["last_abandoned_run"]["run_id"] == run.run_id
+
+
+if __name__ == "__main__":
+    for test in (test_resume_same_window, test_interrupted_run_then_new_window, test_failing_run_is_abandoned):
+        test()
+        print(f"✅ {test.__name__}")
@@ -3,11 +3,16 @@ Vector Search Tool - Pinecone-based vector search for Slack knowledge base.
 Uses Pinecone for storing and searching conversation embeddings.
 """
 
+import asyncio
 import logging
 import time
-from typing import List, Dict, Any, Optional
+from datetime import datetime, timedelta
+from typing import List, Dict, Any, Optional, Tuple
 from config import settings
 from services.core.trace_manager import trace_manager
+from services.data.local_vector_index import local_vector_index
+from services.data.vector_namespaces import vector_namespaces
+from services.data.vector_partitions import vector_partitions
 
 logger = logging.getLogger(__name__)
 
@@ -42,7 +47,8 @@ class VectorSearchTool:
         query: str, 
         top_k: int = 10, 
         filters: Optional[Dict[str, Any]] = None,
-        include_metadata: bool = True
+        include_metadata: bool = True,
+        time_range: Optional[Tuple[datetime, datetime]] = None
     ) -> List[Dict[str, Any]]:
         """
         Search for similar content in the Pinecone vector database.
@@ -52,11 +58,13 @@ class VectorSearchTool:
             top_k: Number of results to return
             filters: Optional metadata filters
             include_metadata: Whether to include metadata in results
+            time_range: (start, end) the question is about; with time-partitioned
+                namespaces only the partitions it overlaps are queried
             
         Returns:
             List of search results with content and metadata
         """
-        if not self.pinecone_available:
+        if not self.pinecone_available and not local_vector_index.get_stats()["vectors"]:
             logger.info(f"Vector search called with query: '{query[:50]}...' (placeholder mode)")
             return []
         
@@ -73,26 +81,37 @@ class VectorSearchTool:
                 logger.warning(f"Failed to generate embedding for query: '{query[:50]}...'")
                 return []
             
-            # Query Pinecone with the generated embedding
-            query_response = self.index.query(
-                vector=query_embedding,
-                top_k=top_k,
-                include_metadata=include_metadata,
-                filter=filters or {}
-            )
+            namespace = await vector_namespaces.get_active()
+            now = datetime.now()
+            mirror_window = (now - timedelta(seconds=local_vector_index.window_seconds), now)
             
-            search_duration_ms = (time.time() - start_time) * 1000
+            if not self.pinecone_available:
+                # Offline (tests, benchmarks): the local index is the only source
+                results = local_vector_index.search(query_embedding, top_k, filters)
+            elif time_range is None or time_range[0].replace(tzinfo=None) >= mirror_window[0]:
+                # Recent-window mirror answers confident searches without a round trip
+                mirror_sources = await vector_partitions.partitions_between(self.index, namespace, mirror_window)
+                local_vector_index.ensure_seeded(self.index, namespace, mirror_sources)
+                results = local_vector_index.query(query_embedding, top_k, filters, namespace)
+            else:
+                results = None
             
-            results = []
-            if query_response and hasattr(query_response, 'matches'):
-                for match in query_response.matches:
-                    result = {
-                        "id": match.id,
-                        "score": match.score,
-                        "content": match.metadata.get("content", "") if match.metadata else "",
-                        "metadata": match.metadata or {}
-                    }
-                    results.append(result)
+            if results is None:
+                # Query Pinecone in the namespace the alias points at, or in the
+                # time partitions of it that the question's time range overlaps
+                partitions = await vector_partitions.query_partitions(self.index, namespace, time_range)
+                results = await self._query_namespaces(query_embedding, top_k, filters, include_metadata, partitions)
+                
+                if time_range is None and vector_partitions.enabled and len(results) < top_k:
+                    # The default recency window came up short; try the older partitions too
+                    older = [name for name in await vector_partitions.partitions(self.index, namespace)
+                             if name not in partitions]
+                    if older:
+                        results = await self._query_namespaces(
+                            query_embedding, top_k, filters, include_metadata, older, results
+                        )
+            
+            search_duration_ms = (time.time() - start_time) * 1000
             
             # Log vector search trace
             await trace_manager.log_vector_search(
@@ -108,6 +127,42 @@ class VectorSearchTool:
             logger.error(f"Vector search error: {e}")
             return []
     
+    async def _query_namespaces(
+        self,
+        query_embedding: List[float],
+        top_k: int,
+        filters: Optional[Dict[str, Any]],
+        include_metadata: bool,
+        namespaces: List[str],
+        results: Optional[List[Dict[str, Any]]] = None
+    ) -> List[Dict[str, Any]]:
+        """Query namespaces concurrently and merge their matches (with `results`) into the best top_k"""
+        responses = await asyncio.gather(*(
+            asyncio.to_thread(
+                self.index.query,
+                vector=query_embedding,
+                top_k=top_k,
+                include_metadata=include_metadata,
+                filter=filters or {},
+                namespace=namespace
+            )
+            for namespace in namespaces
+        ))
+        
+        results = list(results or [])
+        for query_response in responses:
+            if query_response and hasattr(query_response, 'matches'):
+                for match in query_response.matches:
+                    results.append({
+                        "id": match.id,
+                        "score": match.score,
+                        "content": match.metadata.get("content", "") if match.metadata else "",
+                        "metadata": match.metadata or {}
+                    })
+        
+        results.sort(key=lambda result: result["score"], reverse=True)
+        return results[:top_k]
+    
     async def search_with_multiple_queries(
         self, 
         queries: List[str], 
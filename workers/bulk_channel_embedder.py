@@ -7,7 +7,7 @@ import asyncio
 import logging
 import time
 from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, AsyncIterator
 import json
 from dataclasses import dataclass
 
@@ -16,10 +16,13 @@ from slack_sdk.errors import SlackApiError
 from celery import Task
 
 from config import settings
-from services.data.embedding_service import EmbeddingService
-from services.processing.data_processor import DataProcessor
+from services.processing.ingestion_checkpoints import ChannelCheckpoint, CheckpointPage, PagePosition, checkpoint_store
+from services.processing.ingestion_pipeline import run_ingestion_pipeline
+from services.processing.ingestion_scheduler import ChannelJob, run_channel_jobs
 from models.schemas import ProcessedMessage
 from celery_app import celery_app
+from workers.worker_runtime import run_async, get_service
+from services.external_apis.slack_rate_limiter import slack_rate_limiter
 
 logger = logging.getLogger(__name__)
 
@@ -38,13 +41,17 @@ class ProcessingStats:
     channels_processed: int = 0
     total_messages_extracted: int = 0
     total_messages_embedded: int = 0
+    total_cache_hits: int = 0  # Embeddings served from the embedding cache
     errors: List[str] = None
     start_time: datetime = None
     end_time: datetime = None
+    pipeline_stages: Dict[str, Dict[str, Any]] = None  # channel name -> per-stage throughput
     
     def __post_init__(self):
         if self.errors is None:
             self.errors = []
+        if self.pipeline_stages is None:
+            self.pipeline_stages = {}
         if self.start_time is None:
             self.start_time = datetime.now()
 
@@ -53,19 +60,18 @@ class BulkChannelEmbedder:
     Handles bulk embedding of channel messages with intelligent rate limiting.
     """
     
-    def __init__(self):
+    def __init__(self, channels: Optional[List[ChannelConfig]] = None):
         self.client = WebClient(token=settings.SLACK_BOT_TOKEN)
-        self.embedding_service = EmbeddingService()
-        self.data_processor = DataProcessor()
+        self.embedding_service = get_service("embedding_service")
+        self.data_processor = get_service("data_processor")
         
-        # Rate limiting configuration
-        self.base_delay = 2.0  # Base delay between API calls
-        self.max_delay = 30.0  # Maximum delay on rate limit
+        # Slack calls are paced by the process-wide per-tier limiter
+        self.rate_limiter = slack_rate_limiter
         self.batch_size = 100  # Messages per API call
         self.embedding_batch_size = 20  # Messages per embedding batch
         
-        # Channels to process
-        self.channels = [
+        # Channels to process (callers with saved state pass their own configs)
+        self.channels = channels or [
             ChannelConfig(
                 id="C087QKECFKQ",
                 name="autopilot-design-patterns",
@@ -78,24 +84,12 @@ class BulkChannelEmbedder:
             )
         ]
     
-    async def smart_rate_limit_delay(self, api_call_count: int = 0, last_error: Optional[str] = None):
-        """
-        Intelligent rate limiting based on API usage patterns.
-        """
-        if last_error and "ratelimited" in last_error.lower():
-            delay = min(self.max_delay, self.base_delay * (2 ** min(api_call_count, 4)))
-            logger.warning(f"Rate limited, waiting {delay:.1f}s")
-            await asyncio.sleep(delay)
-        else:
-            # Standard delay to stay under limits
-            delay = self.base_delay + (api_call_count * 0.1)
-            await asyncio.sleep(min(delay, 5.0))
-    
     async def get_channel_history_batch(
         self, 
         channel_id: str, 
         cursor: Optional[str] = None,
-        oldest: Optional[str] = None
+        oldest: Optional[str] = None,
+        latest: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Get a batch of channel history with error handling.
@@ -111,8 +105,10 @@ class BulkChannelEmbedder:
                 params["cursor"] = cursor
             if oldest:
                 params["oldest"] = oldest
+            if latest:
+                params["latest"] = latest
             
-            response = self.client.conversations_history(**params)
+            response = await self.rate_limiter.call(self.client, "conversations_history", **params)
             
             if response["ok"]:
                 return {
@@ -156,25 +152,48 @@ class BulkChannelEmbedder:
         """
         Extract ALL messages from a channel with pagination and rate limiting.
         """
+        all_messages = []
+        async for page in self.iter_channel_pages(channel_config, max_messages):
+            all_messages.extend(page)
+        return all_messages
+    
+    async def iter_channel_pages(
+        self, 
+        channel_config: ChannelConfig,
+        max_messages: Optional[int] = None,
+        checkpoint: Optional[ChannelCheckpoint] = None
+    ) -> AsyncIterator[CheckpointPage]:
+        """
+        Yield a channel's new messages one history page at a time.
+        
+        With a checkpoint, the run's window is used and iteration continues
+        below the oldest page it has committed. Pages carry their PagePosition.
+        """
         logger.info(f"Starting full extraction for {channel_config.name} ({channel_config.id})")
         
-        all_messages = []
+        total_messages = 0
         cursor = None
         api_call_count = 0
         last_error = None
         
         # Start from last embedded message if available
         oldest_ts = channel_config.last_embedded_ts
+        latest_ts = None
+        page_number = 0
+        if checkpoint:
+            oldest_ts = checkpoint.window_oldest_ts
+            latest_ts = checkpoint.resume_latest_ts
+            page_number = checkpoint.page
+            if checkpoint.resumed:
+                logger.info(f"Resuming {channel_config.name} after page {page_number}")
         
         while True:
-            # Rate limiting delay
-            await self.smart_rate_limit_delay(api_call_count, last_error)
-            
             # Get batch
             batch_result = await self.get_channel_history_batch(
                 channel_config.id, 
                 cursor=cursor,
-                oldest=oldest_ts
+                oldest=oldest_ts,
+                latest=latest_ts
             )
             
             api_call_count += 1
@@ -184,6 +203,7 @@ class BulkChannelEmbedder:
                 last_error = batch_result["error"]
                 
                 if "ratelimited" in last_error.lower():
+                    # The limiter has paused the tier for Retry-After; the next call waits it out
                     logger.warning(f"Rate limited on {channel_config.name}, backing off...")
                     continue
                 elif "not_in_channel" in last_error.lower():
@@ -198,23 +218,39 @@ class BulkChannelEmbedder:
             
             if not messages:
                 logger.info(f"No more messages in {channel_config.name}")
+                yield CheckpointPage([], PagePosition(page_number + 1, cursor=cursor, final=True))
                 break
             
-            # Filter out already processed messages
+            # Filter out already processed messages (the request bounds are inclusive)
             new_messages = []
             for msg in messages:
-                if oldest_ts and msg.get("ts", "0") <= oldest_ts:
+                if oldest_ts and float(msg.get("ts", "0")) <= float(oldest_ts):
+                    continue
+                if latest_ts and float(msg.get("ts", "0")) >= float(latest_ts):
                     continue
                 new_messages.append(msg)
             
-            all_messages.extend(new_messages)
+            # Check limits
+            reached_limit = bool(max_messages and total_messages + len(new_messages) >= max_messages)
+            if reached_limit:
+                # Pages are newest first; the rest of this page is picked up on resume
+                new_messages = new_messages[:max_messages - total_messages]
             
-            logger.info(f"Extracted batch of {len(new_messages)} messages from {channel_config.name} (total: {len(all_messages)})")
+            total_messages += len(new_messages)
+            logger.info(f"Extracted batch of {len(new_messages)} messages from {channel_config.name} (total: {total_messages})")
             
-            # Check limits
-            if max_messages and len(all_messages) >= max_messages:
+            page_number += 1
+            next_cursor = batch_result["next_cursor"]
+            final = not reached_limit and (not batch_result["has_more"] or not next_cursor)
+            position = PagePosition.for_messages(
+                page_number, [msg["ts"] for msg in (new_messages if reached_limit else messages) if msg.get("ts")],
+                cursor=cursor, next_cursor=cursor if reached_limit else next_cursor, final=final
+            )
+            if new_messages or final:
+                yield CheckpointPage(new_messages, position)
+            
+            if reached_limit:
                 logger.info(f"Reached max message limit ({max_messages}) for {channel_config.name}")
-                all_messages = all_messages[:max_messages]
                 break
             
             # Check if more pages available
@@ -222,30 +258,23 @@ class BulkChannelEmbedder:
                 logger.info(f"Reached end of {channel_config.name} history")
                 break
             
-            cursor = batch_result["next_cursor"]
+            cursor = next_cursor
             
             # Safety check - prevent infinite loops
             if api_call_count > 1000:  # Reasonable limit for very large channels
                 logger.warning(f"Hit API call limit for {channel_config.name}")
                 break
         
-        logger.info(f"Completed extraction for {channel_config.name}: {len(all_messages)} total messages")
-        return all_messages
+        logger.info(f"Completed extraction for {channel_config.name}: {total_messages} total messages")
     
-    async def process_and_embed_messages(
+    def to_processed_messages(
         self, 
         messages: List[Dict[str, Any]], 
         channel_config: ChannelConfig
-    ) -> int:
+    ) -> List[Dict[str, Any]]:
         """
-        Process and embed messages in batches.
+        Convert raw Slack messages to embeddable message dicts.
         """
-        if not messages:
-            return 0
-        
-        logger.info(f"Processing {len(messages)} messages for {channel_config.name}")
-        
-        # Convert to ProcessedMessage format
         processed_messages = []
         
         for msg in messages:
@@ -267,46 +296,75 @@ class BulkChannelEmbedder:
                     thread_ts=msg.get("thread_ts"),
                     is_dm=False
                 )
-                processed_messages.append(processed_msg)
+                # Vector ids follow the connector's "<channel>_<ts>" message ids
+                processed_messages.append({"id": f"{channel_config.id}_{msg['ts']}", **processed_msg.dict()})
                 
             except Exception as e:
                 logger.warning(f"Error processing message in {channel_config.name}: {e}")
                 continue
         
-        if not processed_messages:
-            logger.warning(f"No valid messages to embed for {channel_config.name}")
+        return processed_messages
+    
+    async def process_and_embed_messages(
+        self, 
+        messages: List[Dict[str, Any]], 
+        channel_config: ChannelConfig
+    ) -> int:
+        """
+        Process and embed already extracted messages through the streaming pipeline.
+        """
+        if not messages:
             return 0
         
-        logger.info(f"Embedding {len(processed_messages)} valid messages for {channel_config.name}")
+        async def single_batch():
+            yield messages
         
-        # Embed in batches to manage memory and API limits
-        total_embedded = 0
+        result = await self.run_channel_pipeline(channel_config, single_batch())
+        return result.upserted
+    
+    async def run_channel_pipeline(
+        self,
+        channel_config: ChannelConfig,
+        pages: AsyncIterator[List[Dict[str, Any]]],
+        checkpoint: Optional[ChannelCheckpoint] = None
+    ):
+        """
+        Stream pages through process -> embed -> upsert and update the channel's progress.
         
-        for i in range(0, len(processed_messages), self.embedding_batch_size):
-            batch = processed_messages[i:i + self.embedding_batch_size]
-            
-            try:
-                # Add delay between embedding batches
-                if i > 0:
-                    await asyncio.sleep(3.0)
-                
-                embedded_count = await self.embedding_service.embed_and_store_messages(batch)
-                total_embedded += embedded_count
-                
-                logger.info(f"Embedded batch {i//self.embedding_batch_size + 1}: {embedded_count}/{len(batch)} messages")
-                
-            except Exception as e:
-                logger.error(f"Error embedding batch for {channel_config.name}: {e}")
-                continue
+        With a checkpoint, last_embedded_ts only advances once the run completes;
+        an interrupted run resumes from its checkpoint instead.
+        
+        Returns:
+            PipelineResult for the channel
+        """
+        latest_ts = [channel_config.last_embedded_ts]
+        
+        async def process_page(page):
+            processed = self.to_processed_messages(page, channel_config)
+            if processed:
+                page_latest = max(msg["message_ts"] for msg in processed)
+                if not latest_ts[0] or page_latest > latest_ts[0]:
+                    latest_ts[0] = page_latest
+            return processed
+        
+        result = await run_ingestion_pipeline(
+            channel_config.name,
+            pages,
+            process_page,
+            self.embedding_service,
+            embed_batch_size=self.embedding_batch_size,
+            checkpoint=checkpoint
+        )
         
         # Update channel config
-        if processed_messages:
-            latest_ts = max(msg.message_ts for msg in processed_messages)
-            channel_config.last_embedded_ts = latest_ts
-            channel_config.total_messages_embedded += total_embedded
+        if checkpoint is None:
+            channel_config.last_embedded_ts = latest_ts[0]
+        elif result.checkpoint_completed:
+            channel_config.last_embedded_ts = checkpoint.last_embedded_ts
+        channel_config.total_messages_embedded += result.upserted
         
-        logger.info(f"Completed embedding for {channel_config.name}: {total_embedded} messages embedded")
-        return total_embedded
+        logger.info(f"Completed embedding for {channel_config.name}: {result.upserted} messages embedded")
+        return result
     
     async def process_all_channels(self, max_messages_per_channel: Optional[int] = None) -> ProcessingStats:
         """
@@ -316,37 +374,53 @@ class BulkChannelEmbedder:
         
         logger.info(f"Starting bulk channel embedding for {len(self.channels)} channels")
         
-        for channel_config in self.channels:
-            try:
-                logger.info(f"Processing channel: {channel_config.name}")
-                
-                # Extract messages
-                messages = await self.extract_all_channel_messages(
-                    channel_config, 
-                    max_messages=max_messages_per_channel
+        def channel_job(channel_config: ChannelConfig) -> ChannelJob:
+            # Embedding starts with the first page; only a few pages are held at once
+            async def run():
+                # An interrupted run of this channel is resumed rather than restarted
+                checkpoint = checkpoint_store.begin(
+                    "bulk", channel_config.id,
+                    oldest_ts=channel_config.last_embedded_ts,
+                    latest_ts=str(time.time()),
+                    channel_name=channel_config.name
                 )
-                
-                stats.total_messages_extracted += len(messages)
-                
-                if messages:
-                    # Process and embed
-                    embedded_count = await self.process_and_embed_messages(messages, channel_config)
-                    stats.total_messages_embedded += embedded_count
-                    
-                    logger.info(f"Channel {channel_config.name} complete: {embedded_count} embedded")
-                else:
-                    logger.warning(f"No messages extracted from {channel_config.name}")
-                
-                stats.channels_processed += 1
-                
-                # Delay between channels
-                await asyncio.sleep(5.0)
-                
-            except Exception as e:
-                error_msg = f"Error processing {channel_config.name}: {str(e)}"
+                return await self.run_channel_pipeline(
+                    channel_config,
+                    self.iter_channel_pages(channel_config, max_messages=max_messages_per_channel, checkpoint=checkpoint),
+                    checkpoint
+                )
+            
+            return ChannelJob(
+                channel_id=channel_config.id,
+                name=channel_config.name,
+                run=run,
+                last_ingested_at=float(channel_config.last_embedded_ts) if channel_config.last_embedded_ts else None,
+                activity=channel_config.total_messages_embedded
+            )
+        
+        # Channels run in parallel under the shared Slack/Gemini/Pinecone budget
+        outcomes = await run_channel_jobs("bulk embedding", [channel_job(channel) for channel in self.channels])
+        
+        for outcome in outcomes:
+            if outcome.status != "completed":
+                error_msg = f"Error processing {outcome.name}: {outcome.error or outcome.status}"
                 logger.error(error_msg)
                 stats.errors.append(error_msg)
                 continue
+            
+            result = outcome.result
+            stats.total_messages_extracted += result.extracted
+            stats.total_messages_embedded += result.upserted
+            stats.total_cache_hits += result.cache_hits
+            stats.pipeline_stages[outcome.name] = result.stages
+            stats.errors.extend(f"{outcome.name}: {error}" for error in result.errors)
+            
+            if result.extracted:
+                logger.info(f"Channel {outcome.name} complete: {result.upserted} embedded")
+            else:
+                logger.warning(f"No messages extracted from {outcome.name}")
+            
+            stats.channels_processed += 1
         
         stats.end_time = datetime.now()
         duration = stats.end_time - stats.start_time
@@ -354,7 +428,7 @@ class BulkChannelEmbedder:
         logger.info(f"Bulk embedding complete in {duration.total_seconds():.1f}s")
         logger.info(f"Channels processed: {stats.channels_processed}")
         logger.info(f"Messages extracted: {stats.total_messages_extracted}")
-        logger.info(f"Messages embedded: {stats.total_messages_embedded}")
+        logger.info(f"Messages embedded: {stats.total_messages_embedded} ({stats.total_cache_hits} from embedding cache)")
         
         if stats.errors:
             logger.warning(f"Errors encountered: {len(stats.errors)}")
@@ -373,15 +447,17 @@ def bulk_embed_channels_task(self, max_messages_per_channel: Optional[int] = Non
         return await embedder.process_all_channels(max_messages_per_channel)
     
     try:
-        # Run the async function
-        stats = asyncio.run(run_embedding())
+        # Run on the persistent worker event loop
+        stats = run_async(run_embedding())
         
         return {
             "status": "success",
             "channels_processed": stats.channels_processed,
             "total_messages_extracted": stats.total_messages_extracted,
             "total_messages_embedded": stats.total_messages_embedded,
+            "embedding_cache_hits": stats.total_cache_hits,
             "duration_seconds": (stats.end_time - stats.start_time).total_seconds(),
+            "pipeline_stages": stats.pipeline_stages,
             "errors": stats.errors
         }
         
@@ -396,11 +472,16 @@ def bulk_embed_channels_task(self, max_messages_per_channel: Optional[int] = Non
         }
 
 # Standalone function for direct execution
-async def run_bulk_embedding(max_messages_per_channel: Optional[int] = None):
+async def run_bulk_embedding(
+    max_messages_per_channel: Optional[int] = None,
+    channels: Optional[List[ChannelConfig]] = None
+):
     """
     Run bulk embedding directly (not as Celery task).
+    
+    Passed channel configs are updated in place (last_embedded_ts, totals).
     """
-    embedder = BulkChannelEmbedder()
+    embedder = BulkChannelEmbedder(channels)
     return await embedder.process_all_channels(max_messages_per_channel)
 
 if __name__ == "__main__":
@@ -423,6 +504,7 @@ if __name__ == "__main__":
     print(f"Channels processed: {stats.channels_processed}")
     print(f"Messages extracted: {stats.total_messages_extracted}")
     print(f"Messages embedded: {stats.total_messages_embedded}")
+    print(f"Embedding cache hits: {stats.total_cache_hits}")
     print(f"Duration: {(stats.end_time - stats.start_time).total_seconds():.1f}s")
     
     if stats.errors:
@@ -5,14 +5,14 @@ Creates dense, narrative summaries of conversation history using LLM intelligenc
 
 import logging
 import json
-import asyncio
 from typing import Dict, Any, List, Optional
 from datetime import datetime
 
 from celery import Task
 from celery_app import celery_app
 from config import settings
-from services.core.memory_service import MemoryService
+from services.data.summary_coordinator import SummaryCoordinator
+from workers.worker_runtime import run_async, get_service
 
 # Import Gemini for summarization
 try:
@@ -29,6 +29,7 @@ class ConversationSummarizerTask(Task):
     
     def __init__(self):
         self.memory_service = None
+        self.summary_coordinator = None
         self.gemini_client = None
         self._initialized = False
     
@@ -39,7 +40,8 @@ class ConversationSummarizerTask(Task):
         
         try:
             # Initialize memory service
-            self.memory_service = MemoryService()
+            self.memory_service = get_service("memory_service")
+            self.summary_coordinator = SummaryCoordinator(self.memory_service)
             
             # Initialize Gemini client
             if GEMINI_AVAILABLE and settings.GEMINI_API_KEY:
@@ -58,7 +60,8 @@ class ConversationSummarizerTask(Task):
 
 @celery_app.task(base=ConversationSummarizerTask, bind=True)
 def summarize_conversation_chunk(self, conversation_key: str, messages_to_summarize: List[Dict[str, Any]], 
-                               existing_summary: str = "") -> Dict[str, Any]:
+                               existing_summary: str = "", summary_key: Optional[str] = None,
+                               watermark_ts: Optional[float] = None) -> Dict[str, Any]:
     """
     Celery task to create abstractive summary of conversation messages.
     
@@ -66,6 +69,8 @@ def summarize_conversation_chunk(self, conversation_key: str, messages_to_summar
         conversation_key: Unique conversation identifier
         messages_to_summarize: List of message dictionaries to summarize
         existing_summary: Previous summary to build upon
+        summary_key: Key of the stored long-term summary
+        watermark_ts: Newest message position covered by this chunk
         
     Returns:
         Dictionary with new summary and metadata
@@ -74,6 +79,22 @@ def summarize_conversation_chunk(self, conversation_key: str, messages_to_summar
     # Initialize services if needed
     self._initialize_services()
     
+    summary_key = summary_key or f"{conversation_key}:long_term_summary"
+    
+    # Re-check against the committed watermark: a task for an overlapping range
+    # may have finished while this one was queued
+    stored_summary = run_async(self.memory_service.get_conversation_context(summary_key)) or {}
+    committed_watermark = self.summary_coordinator.get_watermark(stored_summary)
+    messages_to_summarize = self.summary_coordinator.filter_unsummarized(messages_to_summarize, committed_watermark)
+    if not messages_to_summarize:
+        run_async(self.summary_coordinator.record_worker_skip("skipped_already_summarized"))
+        logger.info(f"Skipping summarization for {conversation_key}: already covered by stored summary")
+        return {"success": True, "skipped": True, "reason": "already_summarized"}
+    
+    # The stored summary is fresher than the one captured when the task was queued
+    existing_summary = stored_summary.get("summary") or existing_summary
+    previous_count = stored_summary.get("message_count", 0)
+    
     if not self.gemini_client:
         logger.error("Gemini client not available for summarization")
         return {
@@ -105,10 +126,11 @@ def summarize_conversation_chunk(self, conversation_key: str, messages_to_summar
             
             # Queue update task with the new summary
             update_result = update_conversation_summary.delay(
-                conversation_key=conversation_key.split(":")[0],  # Remove potential suffix
-                summary_key=f"{conversation_key.split(':')[0]}:long_term_summary",
+                conversation_key=conversation_key,
+                summary_key=summary_key,
                 new_summary=new_summary,
-                message_count=len(messages_to_summarize)
+                message_count=previous_count + len(messages_to_summarize),
+                watermark_ts=watermark_ts
             )
             
             return {
@@ -236,7 +258,8 @@ def _create_fallback_summary(messages_to_summarize: List[Dict[str, Any]],
 
 @celery_app.task(base=ConversationSummarizerTask, bind=True)
 def update_conversation_summary(self, conversation_key: str, summary_key: str, 
-                              new_summary: str, message_count: int) -> Dict[str, Any]:
+                              new_summary: str, message_count: int,
+                              watermark_ts: Optional[float] = None) -> Dict[str, Any]:
     """
     Celery task to update the conversation summary in Redis/memory.
     
@@ -245,6 +268,7 @@ def update_conversation_summary(self, conversation_key: str, summary_key: str,
         summary_key: Redis key for the summary
         new_summary: New abstractive summary
         message_count: Number of messages in the summary
+        watermark_ts: Newest message position the summary covers
         
     Returns:
         Dictionary with update results
@@ -258,17 +282,25 @@ def update_conversation_summary(self, conversation_key: str, summary_key: str,
         return {"success": False, "error": "Memory service not available"}
     
     try:
+        # Never let an older chunk overwrite a summary that already covers newer messages
+        stored_summary = run_async(self.memory_service.get_conversation_context(summary_key))
+        committed_watermark = self.summary_coordinator.get_watermark(stored_summary)
+        if watermark_ts and committed_watermark >= watermark_ts:
+            run_async(self.summary_coordinator.record_worker_skip("skipped_stale_update"))
+            logger.info(f"Skipping stale summary update for {conversation_key}")
+            return {"success": True, "skipped": True, "reason": "stale_update"}
+        
         # Prepare summary data
         summary_data = {
             "summary": new_summary,
             "message_count": message_count,
+            "watermark_ts": max(watermark_ts or 0.0, committed_watermark),
             "last_updated": datetime.now().isoformat(),
             "method": "abstractive_summarization"
         }
         
-        # Store in memory service (async operation needs to be handled)
-        # Use asyncio.run to handle the async memory service call
-        success = asyncio.run(
+        # Store in memory service on the worker runtime loop
+        success = run_async(
             self.memory_service.store_conversation_context(
                 summary_key,
                 summary_data,
@@ -5,7 +5,8 @@ Analyzes user queries and bot responses to extract and store structured entities
 
 import logging
 import json
-import asyncio
+import time
+import uuid
 from typing import Dict, Any, List, Optional
 from datetime import datetime
 
@@ -13,7 +14,8 @@ from celery import Task
 from celery_app import celery_app
 from config import settings
 from services.core.memory_service import MemoryService
-from services.data.entity_store import EntityStore, Entity
+from services.data.entity_store import Entity
+from workers.worker_runtime import run_async, get_service
 
 # Import Gemini for enhanced entity extraction
 try:
@@ -25,6 +27,11 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+BATCH_BUFFER_KEY = "entity_extraction:batch_buffer"
+FLUSH_SCHEDULED_KEY = "entity_extraction:flush_scheduled"
+MAX_BATCHES_PER_FLUSH = 10
+MAX_EXCHANGE_ATTEMPTS = 2
+
 class EntityExtractionTask(Task):
     """Base task class for entity extraction with service initialization"""
     
@@ -33,6 +40,13 @@ class EntityExtractionTask(Task):
         self.entity_store = None
         self.gemini_client = None
         self._initialized = False
+        self.batch_stats = {
+            "exchanges": 0,
+            "batches": 0,
+            "llm_calls": 0,
+            "fallback_calls": 0,
+            "failed_exchanges": 0
+        }
     
     def _initialize_services(self):
         """Initialize services if not already initialized"""
@@ -40,11 +54,9 @@ class EntityExtractionTask(Task):
             return
         
         try:
-            # Initialize memory service
-            self.memory_service = MemoryService()
-            
-            # Initialize entity store
-            self.entity_store = EntityStore(self.memory_service)
+            # Shared per-process services from the worker runtime
+            self.memory_service = get_service("memory_service")
+            self.entity_store = get_service("entity_store")
             
             # Initialize Gemini client for enhanced extraction
             if GEMINI_AVAILABLE and settings.GEMINI_API_KEY:
@@ -139,6 +151,177 @@ class EntityExtractionTask(Task):
             logger.error(f"Error in Gemini entity extraction: {e}")
             return []
 
+    def _extract_entities_with_gemini_batch(self, exchanges: List[Dict[str, Any]]) -> Dict[str, List[Entity]]:
+        """
+        Extract entities for several conversation exchanges with one structured-output call.
+        
+        Exchanges missing from the batch response (or all of them, if the call or
+        parsing fails) fall back to the single-exchange extraction, so one bad item
+        never loses the others.
+        
+        Args:
+            exchanges: Buffered exchanges (id, conversation_key, user_query, bot_response, user_name)
+            
+        Returns:
+            Mapping of exchange id to its AI-extracted entities
+        """
+        results: Dict[str, List[Entity]] = {}
+        
+        if len(exchanges) > 1:
+            exchanges_text = "\n\n".join(
+                f"[EXCHANGE {exchange['id']}]\n"
+                f"User ({exchange.get('user_name', 'user')}): {exchange.get('user_query', '')}\n\n"
+                f"Bot Response: {exchange.get('bot_response', '')}"
+                for exchange in exchanges
+            )
+            prompt = f"""
+    Analyze each of the following independent conversation exchanges and extract important entities that should be remembered for future reference. Never mix entities between exchanges.
+
+    {exchanges_text}
+
+    Extract entities in the following categories:
+    1. JIRA tickets (format: PROJ-123)
+    2. Project names and initiatives
+    3. People mentioned (names, roles, assignments)
+    4. Deadlines and dates
+    5. Important documents or templates
+    6. Metrics, numbers, and measurements
+    7. URLs and links
+    8. Technical terms or product names
+
+    For each entity, provide:
+    - "type": entity category
+    - "value": the actual entity value
+    - "context": brief context where it was mentioned
+    - "importance": score from 1-10 for how important this entity is to remember
+
+    Only extract entities that are factual and specific. Avoid generic terms.
+
+    Respond with a JSON object containing one result per exchange id (use an empty list when an exchange has no entities):
+    {{"results": [
+      {{"id": "<exchange id>", "entities": [{{"type": "jira_ticket", "value": "PROJ-123", "context": "user asked about status", "importance": 8}}]}}
+    ]}}
+    """
+            try:
+                self.batch_stats["llm_calls"] += 1
+                response = self.gemini_client.generate_content(
+                    prompt,
+                    generation_config=genai.GenerationConfig(
+                        temperature=0.1,  # Very low temperature for factual extraction
+                        max_output_tokens=min(1000 * len(exchanges), 8192),
+                        top_p=0.8,
+                        top_k=20,
+                        response_mime_type="application/json"
+                    )
+                )
+                
+                batch_data = json.loads(response.text) if response and response.text else {}
+                exchanges_by_id = {exchange["id"]: exchange for exchange in exchanges}
+                for result in batch_data.get("results", []) if isinstance(batch_data, dict) else []:
+                    exchange = exchanges_by_id.get(str(result.get("id", ""))) if isinstance(result, dict) else None
+                    if exchange is None or exchange["id"] in results:
+                        continue
+                    try:
+                        results[exchange["id"]] = self._entities_from_data(
+                            result.get("entities", []), exchange["conversation_key"], exchange.get("user_name", "user"))
+                    except Exception as e:
+                        logger.warning(f"Failed to convert batched entities for {exchange['conversation_key']}: {e}")
+                
+            except Exception as e:
+                logger.error(f"Batched Gemini entity extraction failed for {len(exchanges)} exchanges: {e}")
+        
+        # Single-call fallback for anything the batch did not cover
+        for exchange in exchanges:
+            if exchange["id"] in results:
+                continue
+            if len(exchanges) > 1:
+                self.batch_stats["fallback_calls"] += 1
+            self.batch_stats["llm_calls"] += 1
+            results[exchange["id"]] = self._extract_entities_with_gemini(
+                exchange.get("user_query", ""), exchange.get("bot_response", ""),
+                exchange["conversation_key"], exchange.get("user_name", "user")
+            )
+        
+        logger.info(f"Gemini extracted entities for {len(exchanges)} exchanges "
+                    f"({sum(len(entities) for entities in results.values())} entities)")
+        return results
+
+    def _process_exchange(self, exchange: Dict[str, Any], ai_entities: List[Entity]) -> Dict[str, Any]:
+        """
+        Run pattern extraction for one exchange, merge with AI entities and store them.
+        
+        Args:
+            exchange: Conversation exchange
+            ai_entities: Entities extracted by Gemini for this exchange
+            
+        Returns:
+            Dictionary with extraction results
+        """
+        conversation_key = exchange["conversation_key"]
+        user_name = exchange.get("user_name", "user")
+        
+        # Extract entities from both user query and bot response
+        all_entities = []
+        
+        # Extract from user query
+        user_entities = run_async(
+            self.entity_store.extract_entities_from_text(
+                text=exchange.get("user_query", ""),
+                conversation_key=conversation_key,
+                context=f"User query by {user_name}"
+            )
+        )
+        all_entities.extend(user_entities)
+        
+        # Extract from bot response
+        bot_entities = run_async(
+            self.entity_store.extract_entities_from_text(
+                text=exchange.get("bot_response", ""),
+                conversation_key=conversation_key,
+                context="Bot response with factual information"
+            )
+        )
+        all_entities.extend(bot_entities)
+        all_entities.extend(ai_entities)
+        
+        # Deduplicate between regex and AI extraction before storage
+        all_entities = self._deduplicate_extraction_results(all_entities)
+        
+        # Store extracted entities
+        if all_entities:
+            success = run_async(
+                self.entity_store.store_entities(all_entities, conversation_key)
+            )
+            
+            if success:
+                logger.info(f"Successfully extracted and stored {len(all_entities)} entities for conversation: {conversation_key}")
+                
+                # Queue entity relationship analysis
+                analyze_entity_relationships.delay(
+                    conversation_key=conversation_key,
+                    new_entities=[entity.key for entity in all_entities]
+                )
+                
+                return {
+                    "success": True,
+                    "entities_extracted": len(all_entities),
+                    "entity_types": list(set(e.type for e in all_entities)),
+                    "entity_keys": [e.key for e in all_entities],
+                    "conversation_key": conversation_key
+                }
+            else:
+                return {
+                    "success": False,
+                    "error": "Failed to store entities",
+                    "entities_extracted": len(all_entities)
+                }
+        else:
+            return {
+                "success": True,
+                "entities_extracted": 0,
+                "message": "No entities found in conversation"
+            }
+
     def _parse_gemini_response_with_retry(self, response_text: str, conversation_key: str, 
                                         user_name: str, max_retries: int = 2) -> List[Entity]:
         """
@@ -170,41 +353,7 @@ class EntityExtractionTask(Task):
                 entities_data = json.loads(cleaned_text)
                 
                 # Convert to Entity objects
-                ai_entities = []
-                for entity_data in entities_data:
-                    if not isinstance(entity_data, dict):
-                        continue
-                    
-                    entity_type = entity_data.get("type", "unknown")
-                    entity_value = entity_data.get("value", "")
-                    entity_context = entity_data.get("context", "")
-                    importance = entity_data.get("importance", 5)
-                    
-                    if not entity_value:
-                        continue
-                    
-                    # Generate entity key
-                    entity_key = self.entity_store._generate_entity_key(entity_type, entity_value)
-                    
-                    # Convert importance to relevance score
-                    relevance_score = min(importance / 5.0, 2.0)  # Scale 1-10 to 0.2-2.0
-                    
-                    entity = self.entity_store.create_entity(
-                        key=entity_key,
-                        entity_type=entity_type,
-                        value=entity_value,
-                        context=entity_context,
-                        conversation_key=conversation_key,
-                        relevance_score=relevance_score,
-                        aliases=self.entity_store._generate_aliases(entity_type, entity_value),
-                        metadata={
-                            "extraction_method": "gemini_ai",
-                            "importance_score": importance,
-                            "user_name": user_name
-                        }
-                    )
-                    
-                    ai_entities.append(entity)
+                ai_entities = self._entities_from_data(entities_data, conversation_key, user_name)
                 
                 if attempt > 0:
                     logger.info(f"Gemini JSON parsing succeeded on retry attempt {attempt}")
@@ -239,9 +388,12 @@ Provide only the JSON array, no markdown formatting, no explanations."""
                     
                     try:
                         # Send correction prompt to Gemini
-                        correction_response = self.model.generate_content(
+                        correction_response = self.gemini_client.generate_content(
                             correction_prompt,
-                            generation_config=self.model_config
+                            generation_config=genai.GenerationConfig(
+                                temperature=0.1,
+                                max_output_tokens=1000
+                            )
                         )
                         
                         if correction_response and correction_response.text:
@@ -265,6 +417,59 @@ Provide only the JSON array, no markdown formatting, no explanations."""
         logger.warning("All JSON parsing attempts failed, returning empty entity list")
         return []
 
+    def _entities_from_data(self, entities_data: Any, conversation_key: str, user_name: str) -> List[Entity]:
+        """
+        Convert Gemini entity dicts into Entity objects.
+        
+        Args:
+            entities_data: Parsed JSON array of entity dicts
+            conversation_key: Conversation the entities belong to
+            user_name: Name of the user in the conversation
+            
+        Returns:
+            List of Entity objects
+        """
+        ai_entities = []
+        if not isinstance(entities_data, list):
+            return ai_entities
+        
+        for entity_data in entities_data:
+            if not isinstance(entity_data, dict):
+                continue
+            
+            entity_type = entity_data.get("type", "unknown")
+            entity_value = entity_data.get("value", "")
+            entity_context = entity_data.get("context", "")
+            importance = entity_data.get("importance", 5)
+            
+            if not entity_value:
+                continue
+            
+            # Generate entity key
+            entity_key = self.entity_store._generate_entity_key(entity_type, entity_value)
+            
+            # Convert importance to relevance score
+            relevance_score = min(importance / 5.0, 2.0)  # Scale 1-10 to 0.2-2.0
+            
+            entity = self.entity_store.create_entity(
+                key=entity_key,
+                entity_type=entity_type,
+                value=entity_value,
+                context=entity_context,
+                conversation_key=conversation_key,
+                relevance_score=relevance_score,
+                aliases=self.entity_store._generate_aliases(entity_type, entity_value),
+                metadata={
+                    "extraction_method": "gemini_ai",
+                    "importance_score": importance,
+                    "user_name": user_name
+                }
+            )
+            
+            ai_entities.append(entity)
+        
+        return ai_entities
+
     def _deduplicate_extraction_results(self, entities: List[Entity]) -> List[Entity]:
         """
         Deduplicate entities between regex and AI extraction before storage.
@@ -386,17 +591,23 @@ def extract_entities_from_conversation(
     user_query: str, 
     bot_response: str,
     user_name: str = "user",
-    additional_context: Dict[str, Any] = None
+    additional_context: Dict[str, Any] = None,
+    batch: bool = True
 ) -> Dict[str, Any]:
     """
     Celery task to extract entities from a conversation exchange.
     
+    When Gemini and Redis are available the exchange is buffered and extracted together with
+    other exchanges by flush_entity_extraction_batch (up to
+    ENTITY_EXTRACTION_BATCH_SIZE exchanges or ENTITY_EXTRACTION_BATCH_WINDOW seconds).
+    
     Args:
         conversation_key: Unique conversation identifier
         user_query: User's query text
         bot_response: Bot's response text
         user_name: Name of the user
         additional_context: Additional context data
+        batch: Buffer for micro-batched extraction (False extracts immediately)
         
     Returns:
         Dictionary with extraction results
@@ -414,75 +625,38 @@ def extract_entities_from_conversation(
         }
     
     try:
-        additional_context = additional_context or {}
-        
-        # Extract entities from both user query and bot response
-        all_entities = []
-        
-        # Extract from user query
-        user_entities = asyncio.run(
-            self.entity_store.extract_entities_from_text(
-                text=user_query,
-                conversation_key=conversation_key,
-                context=f"User query by {user_name}"
-            )
-        )
-        all_entities.extend(user_entities)
-        
-        # Extract from bot response
-        bot_entities = asyncio.run(
-            self.entity_store.extract_entities_from_text(
-                text=bot_response,
-                conversation_key=conversation_key,
-                context="Bot response with factual information"
-            )
-        )
-        all_entities.extend(bot_entities)
-        
-        # Enhanced extraction using Gemini if available
-        if self.gemini_client:
-            enhanced_entities = self._extract_entities_with_gemini(
-                user_query, bot_response, conversation_key, user_name
-            )
-            all_entities.extend(enhanced_entities)
-        
-        # Deduplicate between regex and AI extraction before storage
-        all_entities = self._deduplicate_extraction_results(all_entities)
+        exchange = {
+            "id": uuid.uuid4().hex[:12],
+            "conversation_key": conversation_key,
+            "user_query": user_query,
+            "bot_response": bot_response,
+            "user_name": user_name,
+            "additional_context": additional_context or {},
+            "queued_at": time.time(),
+            "attempts": 0
+        }
         
-        # Store extracted entities
-        if all_entities:
-            success = asyncio.run(
-                self.entity_store.store_entities(all_entities, conversation_key)
-            )
-            
-            if success:
-                logger.info(f"Successfully extracted and stored {len(all_entities)} entities for conversation: {conversation_key}")
-                
-                # Queue entity relationship analysis
-                analyze_entity_relationships.delay(
-                    conversation_key=conversation_key,
-                    new_entities=[entity.key for entity in all_entities]
-                )
-                
+        # The buffer must be shared with whichever worker runs the flush, which
+        # only holds with Redis; the in-memory fallback is private to this process
+        shared_buffer = self.memory_service.redis_available and self.memory_service.redis_client
+        if batch and shared_buffer and self.gemini_client and settings.ENTITY_EXTRACTION_BATCH_SIZE > 1:
+            buffered = run_async(self.memory_service.enqueue_batch_item(BATCH_BUFFER_KEY, exchange))
+            if buffered:
+                _schedule_batch_flush(self.memory_service, buffered)
                 return {
                     "success": True,
-                    "entities_extracted": len(all_entities),
-                    "entity_types": list(set(e.type for e in all_entities)),
-                    "entity_keys": [e.key for e in all_entities],
+                    "batched": True,
+                    "buffered_exchanges": buffered,
+                    "entities_extracted": 0,
                     "conversation_key": conversation_key
                 }
-            else:
-                return {
-                    "success": False,
-                    "error": "Failed to store entities",
-                    "entities_extracted": len(all_entities)
-                }
-        else:
-            return {
-                "success": True,
-                "entities_extracted": 0,
-                "message": "No entities found in conversation"
-            }
+            logger.warning("Entity extraction buffer unavailable, extracting immediately")
+        
+        # Immediate extraction (batching disabled, no Gemini, no Redis, or buffer failure)
+        ai_entities = []
+        if self.gemini_client:
+            ai_entities = self._extract_entities_with_gemini_batch([exchange])[exchange["id"]]
+        return self._process_exchange(exchange, ai_entities)
             
     except Exception as e:
         logger.error(f"Error extracting entities from conversation: {e}")
@@ -492,7 +666,82 @@ def extract_entities_from_conversation(
             "entities_extracted": 0
         }
 
+@celery_app.task(base=EntityExtractionTask, bind=True)
+def flush_entity_extraction_batch(self) -> Dict[str, Any]:
+    """
+    Drain the exchange buffer in batches, one Gemini call per batch.
+    
+    Returns:
+        Dictionary with per-conversation results and LLM call counts
+    """
+    
+    # Initialize services if needed
+    self._initialize_services()
+    
+    # Clear the flag first so exchanges arriving during this flush schedule the next one
+    run_async(self.memory_service.delete_temp_data(FLUSH_SCHEDULED_KEY))
+    
+    llm_calls_before = self.batch_stats["llm_calls"]
+    results = []
+    
+    drained = False
+    for _ in range(MAX_BATCHES_PER_FLUSH):
+        exchanges = run_async(self.memory_service.dequeue_batch_items(BATCH_BUFFER_KEY, settings.ENTITY_EXTRACTION_BATCH_SIZE))
+        if not exchanges:
+            drained = True
+            break
+        
+        self.batch_stats["batches"] += 1
+        self.batch_stats["exchanges"] += len(exchanges)
+        
+        ai_results: Dict[str, List[Entity]] = {}
+        if self.gemini_client:
+            ai_results = self._extract_entities_with_gemini_batch(exchanges)
+        
+        # Each exchange is stored independently so one failure cannot drop the rest
+        for exchange in exchanges:
+            try:
+                result = self._process_exchange(exchange, ai_results.get(exchange["id"], []))
+            except Exception as e:
+                logger.error(f"Entity extraction failed for {exchange.get('conversation_key')}: {e}")
+                result = {"success": False, "error": str(e), "entities_extracted": 0}
+            
+            if not result.get("success"):
+                self.batch_stats["failed_exchanges"] += 1
+                if exchange.get("attempts", 0) + 1 < MAX_EXCHANGE_ATTEMPTS:
+                    exchange["attempts"] = exchange.get("attempts", 0) + 1
+                    run_async(self.memory_service.enqueue_batch_item(BATCH_BUFFER_KEY, exchange))
+                    result["requeued"] = True
+            
+            result["conversation_key"] = exchange.get("conversation_key")
+            result["wait_seconds"] = round(time.time() - exchange.get("queued_at", time.time()), 2)
+            results.append(result)
+    
+    # More arrived than one flush drains - keep going without waiting for the window
+    if not drained:
+        flush_entity_extraction_batch.delay()
+    
+    llm_calls = self.batch_stats["llm_calls"] - llm_calls_before
+    if results:
+        logger.info(f"Flushed entity extraction batch: {len(results)} exchanges, {llm_calls} Gemini calls")
+    
+    return {
+        "success": True,
+        "exchanges_processed": len(results),
+        "llm_calls": llm_calls,
+        "results": results,
+        "batch_stats": dict(self.batch_stats)
+    }
 
+def _schedule_batch_flush(memory_service: MemoryService, buffered: int) -> None:
+    """Flush now when the buffer is full, otherwise once per batch window"""
+    if buffered >= settings.ENTITY_EXTRACTION_BATCH_SIZE:
+        flush_entity_extraction_batch.delay()
+        return
+    
+    window = settings.ENTITY_EXTRACTION_BATCH_WINDOW
+    if run_async(memory_service.set_if_absent(FLUSH_SCHEDULED_KEY, {"scheduled_at": time.time()}, max(int(window * 4), 10))):
+        flush_entity_extraction_batch.apply_async(countdown=window)
 
 @celery_app.task(base=EntityExtractionTask, bind=True)
 def analyze_entity_relationships(
@@ -520,7 +769,7 @@ def analyze_entity_relationships(
     
     try:
         # Get entity summary for the conversation
-        entity_summary = asyncio.run(
+        entity_summary = run_async(
             self.entity_store.get_conversation_entity_summary(conversation_key)
         )
         
@@ -571,10 +820,17 @@ def analyze_entity_relationships(
         }
 
 @celery_app.task(base=EntityExtractionTask, bind=True)
-def cleanup_old_entities(self) -> Dict[str, Any]:
+def cleanup_old_entities(self, max_conversations: Optional[int] = None) -> Dict[str, Any]:
     """
-    Clean up old entities to prevent memory bloat.
-    Removes entities older than 30 days.
+    Compact entity stores to keep Redis memory flat.
+    
+    Evicts entities not mentioned within ENTITY_RETENTION_DAYS, trims context
+    lists to ENTITY_MAX_CONTEXTS and enforces ENTITY_STORE_MAX_BYTES per
+    conversation. Each run SCANs a bounded slice of entity stores and resumes
+    where the previous run stopped.
+    
+    Args:
+        max_conversations: Entity stores to visit this run (defaults to ENTITY_COMPACTION_BATCH)
     
     Returns:
         Dictionary with cleanup results
@@ -583,22 +839,19 @@ def cleanup_old_entities(self) -> Dict[str, Any]:
     # Initialize services if needed
     self._initialize_services()
     
-    if not self.memory_service:
-        logger.error("Memory service not available for entity cleanup")
-        return {"success": False, "error": "Memory service not available"}
+    if not self.entity_store:
+        logger.error("Entity store not available for entity cleanup")
+        return {"success": False, "error": "Entity store not available"}
     
     try:
-        cleanup_count = 0
-        
-        # This is a simplified cleanup - in production you might want more sophisticated logic
-        # For now, rely on Redis TTL to handle cleanup automatically
-        
-        logger.info("Entity cleanup completed - relying on Redis TTL for automatic cleanup")
+        stats = run_async(self.entity_store.compact_entity_stores(max_conversations))
+        cleanup_count = stats.get("evicted_stale", 0) + stats.get("evicted_budget", 0) + stats.get("evicted_unreadable", 0)
         
         return {
             "success": True,
             "entities_cleaned": cleanup_count,
-            "cleanup_method": "redis_ttl"
+            "cleanup_method": "retention_index_compaction",
+            "stats": stats
         }
         
     except Exception as e:
@@ -612,6 +865,7 @@ def cleanup_old_entities(self) -> Dict[str, Any]:
 # Add tasks to Celery app configuration
 celery_app.conf.task_routes.update({
     'workers.entity_extractor.extract_entities_from_conversation': {'queue': 'entity_extraction'},
+    'workers.entity_extractor.flush_entity_extraction_batch': {'queue': 'entity_extraction'},
     'workers.entity_extractor.analyze_entity_relationships': {'queue': 'entity_extraction'},
     'workers.entity_extractor.cleanup_old_entities': {'queue': 'entity_extraction'},
 })
@@ -621,6 +875,6 @@ from celery.schedules import crontab
 celery_app.conf.beat_schedule.update({
     'cleanup-old-entities': {
         'task': 'workers.entity_extractor.cleanup_old_entities',
-        'schedule': crontab(hour=2, minute=0),  # Run daily at 2 AM
+        'schedule': crontab(minute=15),  # Hourly; each run compacts one SCAN slice
     },
 })
\ No newline at end of file
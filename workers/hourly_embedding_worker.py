@@ -1,6 +1,7 @@
 """
 Hourly embedding worker for incremental message processing.
-Checks for new messages every hour and embeds only if new content is found.
+Checks for new messages every hour and embeds only if new content is found
+that real-time indexing from Slack events has not already covered.
 """
 
 import asyncio
@@ -14,12 +15,16 @@ from slack_sdk import WebClient
 from slack_sdk.errors import SlackApiError
 
 from config import settings
-from services.data.embedding_service import EmbeddingService
-from services.external_apis.enhanced_slack_connector import EnhancedSlackConnector
-from services.processing.data_processor import DataProcessor
+from services.data.vector_partitions import vector_partitions
+from services.external_apis.slack_rate_limiter import slack_rate_limiter
+from services.processing.ingestion_checkpoints import checkpoint_store
+from services.processing.ingestion_pipeline import run_ingestion_pipeline
+from services.processing.ingestion_scheduler import ChannelJob, run_channel_jobs
+from services.processing.realtime_indexer import realtime_indexer
 from services.external_apis.notion_service import NotionService
 from models.schemas import ProcessedMessage
 from celery_app import celery_app
+from workers.worker_runtime import run_async, get_service
 
 logger = logging.getLogger(__name__)
 
@@ -27,7 +32,7 @@ class HourlyEmbeddingTask(Task):
     """Celery task for hourly embedding checks with smart new message detection."""
     
     def __init__(self):
-        self.state_file = "hourly_embedding_state.json"
+        self.checkpoints = checkpoint_store  # Durable per-channel progress (replaces hourly_embedding_state.json)
         self.channels = [
             {
                 "id": "C087QKECFKQ",
@@ -42,21 +47,33 @@ class HourlyEmbeddingTask(Task):
         ]
     
     def load_state(self) -> Dict[str, Any]:
-        """Load last check timestamps from state file."""
+        """Load last check timestamps from the checkpoint store."""
         try:
-            with open(self.state_file, 'r') as f:
-                return json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            logger.info("No existing state file, starting fresh")
+            return {
+                checkpoint.channel_id: {
+                    **checkpoint.details,
+                    "last_check_ts": checkpoint.last_embedded_ts,
+                    "total_messages_embedded": checkpoint.total_messages,
+                    "resume_pending": checkpoint.in_progress
+                }
+                for checkpoint in self.checkpoints.list_checkpoints("hourly")
+            }
+        except Exception as e:
+            logger.error(f"Failed to load state, starting fresh: {e}")
             return {}
     
     def save_state(self, state: Dict[str, Any]):
-        """Save current state to file."""
-        try:
-            with open(self.state_file, 'w') as f:
-                json.dump(state, f, indent=2)
-        except Exception as e:
-            logger.error(f"Failed to save state: {e}")
+        """Save per-channel check bookkeeping (message totals are committed with each page)."""
+        for channel_id, channel_state in state.items():
+            try:
+                self.checkpoints.update(
+                    "hourly", channel_id,
+                    last_embedded_ts=channel_state.get("last_check_ts"),
+                    details={key: value for key, value in channel_state.items()
+                             if key not in ("last_check_ts", "total_messages_embedded", "resume_pending")}
+                )
+            except Exception as e:
+                logger.error(f"Failed to save state for {channel_id}: {e}")
     
     async def check_for_new_messages(self, channel_id: str, channel_name: str, last_check_ts: Optional[str]) -> Dict[str, Any]:
         """Check if there are new messages in a channel since last check."""
@@ -73,7 +90,9 @@ class HourlyEmbeddingTask(Task):
                 oldest_ts = str((now - timedelta(hours=2)).timestamp())
             
             # Get messages in time window
-            response = slack_client.conversations_history(
+            response = await slack_rate_limiter.call(
+                slack_client,
+                "conversations_history",
                 channel=channel_id,
                 oldest=oldest_ts,
                 limit=100,  # Should be enough for 1 hour of activity
@@ -94,6 +113,8 @@ class HourlyEmbeddingTask(Task):
                 "total_messages": len(messages),
                 "human_messages": len(human_messages),
                 "new_messages_found": len(human_messages) > 0,
+                "message_ts": [msg["ts"] for msg in human_messages],
+                "has_more": response.get("has_more", False),
                 "latest_ts": messages[0]["ts"] if messages else last_check_ts,
                 "check_window_start": oldest_ts,
                 "check_window_end": str(now.timestamp())
@@ -119,53 +140,77 @@ class HourlyEmbeddingTask(Task):
             logger.error(f"Error checking {channel_name}: {e}")
             raise
     
+    async def covered_by_realtime(self, check_result: Dict[str, Any]) -> bool:
+        """Whether every new message in the check window was already indexed from Slack events."""
+        if check_result.get("has_more") or not check_result.get("message_ts"):
+            return False
+        timestamps = set(check_result["message_ts"])
+        indexed = await realtime_indexer.indexed_timestamps(check_result["channel_id"], timestamps)
+        return indexed == timestamps
+    
     async def process_new_messages(self, channel_id: str, channel_name: str, since_ts: str) -> Dict[str, Any]:
         """Process and embed new messages found in channel."""
         try:
-            # Initialize services
-            slack_connector = EnhancedSlackConnector()
-            data_processor = DataProcessor()
-            embedding_service = EmbeddingService()
+            # Shared per-process services from the worker runtime
+            slack_connector = get_service("slack_connector")
+            data_processor = get_service("data_processor")
+            embedding_service = get_service("embedding_service")
             
-            # Extract messages since last check
+            # Extract messages since last check; an interrupted run resumes its own window
             end_time = datetime.now()
             start_time = datetime.fromtimestamp(float(since_ts))
+            checkpoint = self.checkpoints.begin(
+                "hourly", channel_id,
+                oldest_ts=since_ts,
+                latest_ts=str(end_time.timestamp()),
+                channel_name=channel_name
+            )
+            
+            logger.info(f"Streaming messages from {channel_name} since {start_time}")
             
-            logger.info(f"Extracting messages from {channel_name} since {start_time}")
+            async def process_page(page):
+                return await data_processor.process_messages([msg.to_dict() for msg in page])
             
-            raw_messages = await slack_connector.extract_channel_messages(
-                channel_id=channel_id,
-                start_time=start_time,
-                end_time=end_time,
-                batch_size=50
+            # Extract, process, embed and upsert page by page
+            pipeline_result = await run_ingestion_pipeline(
+                channel_name,
+                slack_connector.iter_channel_messages(
+                    channel_id=channel_id,
+                    start_time=start_time,
+                    end_time=end_time,
+                    page_size=50,
+                    checkpoint=checkpoint
+                ),
+                process_page,
+                embedding_service,
+                checkpoint=checkpoint
             )
+            # Channel history up to the window end is covered only once the run completes
+            covered_until_ts = checkpoint.window_latest_ts if pipeline_result.checkpoint_completed else None
             
-            if not raw_messages:
+            if not pipeline_result.extracted:
                 logger.info(f"No messages extracted from {channel_name}")
                 return {
                     "channel_name": channel_name,
                     "messages_extracted": 0,
                     "messages_embedded": 0,
+                    "covered_until_ts": covered_until_ts,
                     "status": "no_messages"
                 }
             
-            # Process messages
-            logger.info(f"Processing {len(raw_messages)} messages from {channel_name}")
-            processed_messages = await data_processor.process_messages(raw_messages)
-            
-            # Embed and store
-            logger.info(f"Embedding {len(processed_messages)} processed messages")
-            embedded_count = await embedding_service.embed_and_store_messages(processed_messages)
-            
             result = {
                 "channel_name": channel_name,
-                "messages_extracted": len(raw_messages),
-                "messages_processed": len(processed_messages),
-                "messages_embedded": embedded_count,
-                "status": "success"
+                "messages_extracted": pipeline_result.extracted,
+                "messages_processed": pipeline_result.processed,
+                "messages_embedded": pipeline_result.upserted,
+                "embedding_cache_hits": pipeline_result.cache_hits,
+                "pipeline_stages": pipeline_result.stages,
+                "pages_committed": pipeline_result.pages_committed,
+                "covered_until_ts": covered_until_ts,
+                "status": "success" if covered_until_ts else "partial"
             }
             
-            logger.info(f"Successfully embedded {embedded_count} new messages from {channel_name}")
+            logger.info(f"Successfully embedded {pipeline_result.upserted} new messages from {channel_name}")
             return result
             
         except Exception as e:
@@ -185,7 +230,8 @@ def hourly_embedding_check(self):
     
     This task:
     1. Checks each configured channel for new messages since last run
-    2. If new messages found, processes and embeds them
+    2. If new messages found, processes and embeds them, unless real-time
+       indexing of Slack events already covered all of them (gap filling)
     3. If no new messages, does nothing (efficient)
     4. Updates state file with latest timestamps
     """
@@ -201,84 +247,111 @@ def hourly_embedding_check(self):
             "check_time": start_time.isoformat(),
             "channels_checked": 0,
             "channels_with_new_messages": 0,
+            "channels_covered_by_realtime": 0,
             "total_messages_embedded": 0,
             "channel_results": [],
             "errors": []
         }
         
-        for channel_config in self.channels:
-            channel_id = channel_config["id"]
-            channel_name = channel_config["name"]
+        async def check_channel(channel_id: str, channel_name: str) -> Dict[str, Any]:
+            # Get last check timestamp for this channel
+            last_check_ts = state.get(channel_id, {}).get("last_check_ts")
             
-            try:
-                # Get last check timestamp for this channel
-                last_check_ts = state.get(channel_id, {}).get("last_check_ts")
+            # Check for new messages
+            check_result = await self.check_for_new_messages(
+                channel_id, channel_name, last_check_ts
+            )
+            
+            results["channels_checked"] += 1
+            
+            if check_result.get("error"):
+                # Channel access error, skip but don't fail
+                logger.warning(f"Skipping {channel_name}: {check_result['error']}")
+                check_result["action"] = "skipped"
+                results["channel_results"].append(check_result)
+                return check_result
+            
+            resume_pending = state.get(channel_id, {}).get("resume_pending")
+            if check_result["new_messages_found"] and not resume_pending and await self.covered_by_realtime(check_result):
+                # Real-time indexing already embedded the window; the poll only fills gaps
+                logger.info(f"{check_result['human_messages']} new messages in {channel_name} already indexed from events")
+                check_result["action"] = "covered_by_realtime"
+                results["channels_covered_by_realtime"] += 1
                 
-                # Check for new messages
-                check_result = await self.check_for_new_messages(
-                    channel_id, channel_name, last_check_ts
+                if channel_id not in state:
+                    state[channel_id] = {}
+                state[channel_id]["last_check_ts"] = check_result["latest_ts"]
+                state[channel_id]["last_check_time"] = start_time.isoformat()
+                state[channel_id]["last_run_messages"] = check_result["human_messages"]
+            
+            elif check_result["new_messages_found"] or resume_pending:
+                # Process the new messages (or finish an interrupted window)
+                logger.info(f"Processing {check_result['human_messages']} new messages from {channel_name}")
+                
+                process_result = await self.process_new_messages(
+                    channel_id, channel_name, last_check_ts or check_result["check_window_start"]
                 )
                 
-                results["channels_checked"] += 1
+                # Combine results
+                check_result.update(process_result)
+                check_result["action"] = "processed"
                 
-                if check_result.get("error"):
-                    # Channel access error, skip but don't fail
-                    logger.warning(f"Skipping {channel_name}: {check_result['error']}")
-                    check_result["action"] = "skipped"
-                    results["channel_results"].append(check_result)
-                    continue
+                results["channels_with_new_messages"] += 1
+                results["total_messages_embedded"] += process_result.get("messages_embedded", 0)
                 
-                if check_result["new_messages_found"]:
-                    # Process the new messages
-                    logger.info(f"Processing {check_result['human_messages']} new messages from {channel_name}")
-                    
-                    process_result = await self.process_new_messages(
-                        channel_id, channel_name, last_check_ts or check_result["check_window_start"]
-                    )
-                    
-                    # Combine results
-                    check_result.update(process_result)
-                    check_result["action"] = "processed"
-                    
-                    results["channels_with_new_messages"] += 1
-                    results["total_messages_embedded"] += process_result.get("messages_embedded", 0)
-                    
-                    # Update state with new timestamp
-                    if channel_id not in state:
-                        state[channel_id] = {}
-                    state[channel_id]["last_check_ts"] = check_result["latest_ts"]
+                # Advance past the window only once it is fully embedded; otherwise the
+                # checkpoint resumes the same window next hour
+                if channel_id not in state:
+                    state[channel_id] = {}
+                if process_result.get("covered_until_ts"):
+                    state[channel_id]["last_check_ts"] = process_result["covered_until_ts"]
                     state[channel_id]["last_successful_check"] = start_time.isoformat()
-                    state[channel_id]["total_messages_embedded"] = state[channel_id].get("total_messages_embedded", 0) + process_result.get("messages_embedded", 0)
-                
-                else:
-                    # No new messages
-                    logger.info(f"No new messages in {channel_name}")
-                    check_result["action"] = "no_new_messages"
-                    
-                    # Still update last check time even if no messages
-                    if channel_id not in state:
-                        state[channel_id] = {}
-                    state[channel_id]["last_check_ts"] = check_result["latest_ts"]
-                    state[channel_id]["last_check_time"] = start_time.isoformat()
-                
-                results["channel_results"].append(check_result)
-                
-                # Small delay between channels
-                await asyncio.sleep(1.0)
-                
-            except Exception as e:
-                error_msg = f"Error processing {channel_name}: {str(e)}"
-                logger.error(error_msg)
-                results["errors"].append(error_msg)
+                state[channel_id]["last_run_messages"] = process_result.get("messages_extracted", 0)
+            
+            else:
+                # No new messages
+                logger.info(f"No new messages in {channel_name}")
+                check_result["action"] = "no_new_messages"
                 
-                results["channel_results"].append({
-                    "channel_name": channel_name,
-                    "action": "error",
-                    "error": str(e)
-                })
+                # Still update last check time even if no messages
+                if channel_id not in state:
+                    state[channel_id] = {}
+                state[channel_id]["last_check_ts"] = check_result["latest_ts"]
+                state[channel_id]["last_check_time"] = start_time.isoformat()
+                state[channel_id]["last_run_messages"] = 0
+            
+            results["channel_results"].append(check_result)
+            return check_result
+        
+        def channel_job(channel_config: Dict[str, Any]) -> ChannelJob:
+            channel_state = state.get(channel_config["id"], {})
+            last_check_ts = channel_state.get("last_check_ts")
+            return ChannelJob(
+                channel_id=channel_config["id"],
+                name=channel_config["name"],
+                run=lambda: check_channel(channel_config["id"], channel_config["name"]),
+                last_ingested_at=float(last_check_ts) if last_check_ts else None,
+                activity=channel_state.get("last_run_messages", 0),
+                estimated_messages=channel_state.get("last_run_messages")
+            )
+        
+        # Channels are checked and embedded in parallel under the shared API budget
+        outcomes = await run_channel_jobs("hourly embedding", [channel_job(channel) for channel in self.channels])
+        
+        for outcome in outcomes:
+            if outcome.status == "completed":
+                continue
+            error_msg = f"Error processing {outcome.name}: {outcome.error or outcome.status}"
+            results["errors"].append(error_msg)
+            results["channel_results"].append({
+                "channel_name": outcome.name,
+                "action": "error",
+                "error": outcome.error or outcome.status
+            })
         
         # Save updated state
         self.save_state(state)
+        await drop_expired_partitions(results)
         
         # Final summary
         end_time = datetime.now()
@@ -332,8 +405,8 @@ def hourly_embedding_check(self):
         return results
     
     try:
-        # Run the async function
-        return asyncio.run(run_hourly_check())
+        # Run on the persistent worker event loop
+        return run_async(run_hourly_check())
         
     except Exception as e:
         logger.error(f"Hourly embedding check failed: {e}")
@@ -343,6 +416,17 @@ def hourly_embedding_check(self):
             "check_time": datetime.now().isoformat()
         }
 
+async def drop_expired_partitions(results: Dict[str, Any]) -> None:
+    """Retention: drop time partitions older than VECTOR_PARTITION_RETENTION_MONTHS, whole"""
+    if not vector_partitions.enabled or not vector_partitions.retention_months:
+        return
+    try:
+        results["partitions_dropped"] = await vector_partitions.drop_expired(get_service("embedding_service").index)
+    except Exception as e:
+        error_msg = f"Error dropping expired vector partitions: {e}"
+        logger.error(error_msg)
+        results["errors"].append(error_msg)
+
 # Convenience function for manual execution
 async def run_hourly_embedding_check():
     """Run hourly embedding check directly (not as Celery task)."""
@@ -358,6 +442,7 @@ async def run_hourly_embedding_check():
             "check_time": start_time.isoformat(),
             "channels_checked": 0,
             "channels_with_new_messages": 0,
+            "channels_covered_by_realtime": 0,
             "total_messages_embedded": 0,
             "channel_results": [],
             "errors": []
@@ -385,8 +470,20 @@ async def run_hourly_embedding_check():
                     results["channel_results"].append(check_result)
                     continue
                 
-                if check_result["new_messages_found"]:
-                    # Process the new messages
+                resume_pending = state.get(channel_id, {}).get("resume_pending")
+                if check_result["new_messages_found"] and not resume_pending and await task.covered_by_realtime(check_result):
+                    # Real-time indexing already embedded the window
+                    logger.info(f"{check_result['human_messages']} new messages in {channel_name} already indexed from events")
+                    check_result["action"] = "covered_by_realtime"
+                    results["channels_covered_by_realtime"] += 1
+                    
+                    if channel_id not in state:
+                        state[channel_id] = {}
+                    state[channel_id]["last_check_ts"] = check_result["latest_ts"]
+                    state[channel_id]["last_check_time"] = start_time.isoformat()
+                
+                elif check_result["new_messages_found"] or resume_pending:
+                    # Process the new messages (or finish an interrupted window)
                     logger.info(f"Processing {check_result['human_messages']} new messages from {channel_name}")
                     
                     process_result = await task.process_new_messages(
@@ -400,12 +497,12 @@ async def run_hourly_embedding_check():
                     results["channels_with_new_messages"] += 1
                     results["total_messages_embedded"] += process_result.get("messages_embedded", 0)
                     
-                    # Update state with new timestamp
+                    # Advance past the window only once it is fully embedded
                     if channel_id not in state:
                         state[channel_id] = {}
-                    state[channel_id]["last_check_ts"] = check_result["latest_ts"]
-                    state[channel_id]["last_successful_check"] = start_time.isoformat()
-                    state[channel_id]["total_messages_embedded"] = state[channel_id].get("total_messages_embedded", 0) + process_result.get("messages_embedded", 0)
+                    if process_result.get("covered_until_ts"):
+                        state[channel_id]["last_check_ts"] = process_result["covered_until_ts"]
+                        state[channel_id]["last_successful_check"] = start_time.isoformat()
                 
                 else:
                     # No new messages
@@ -420,9 +517,6 @@ async def run_hourly_embedding_check():
                 
                 results["channel_results"].append(check_result)
                 
-                # Small delay between channels
-                await asyncio.sleep(1.0)
-                
             except Exception as e:
                 error_msg = f"Error processing {channel_name}: {str(e)}"
                 logger.error(error_msg)
@@ -436,6 +530,7 @@ async def run_hourly_embedding_check():
         
         # Save updated state
         task.save_state(state)
+        await drop_expired_partitions(results)
         
         # Final summary
         end_time = datetime.now()
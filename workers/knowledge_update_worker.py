@@ -6,17 +6,16 @@ Runs as Celery tasks for background processing.
 import logging
 from datetime import datetime, timedelta
 from typing import List, Dict, Any, Optional
-import asyncio
 
 from celery import Celery
 from celery.schedules import crontab
 
 from config import settings
-from services.external_apis.enhanced_slack_connector import EnhancedSlackConnector
-from services.processing.data_processor import DataProcessor
-from services.data.embedding_service import EmbeddingService
-from services.core.memory_service import MemoryService
+from services.processing.ingestion_checkpoints import checkpoint_store
+from services.processing.ingestion_pipeline import run_ingestion_pipeline
+from services.processing.ingestion_scheduler import ChannelJob, run_channel_jobs
 from celery_app import celery_app
+from workers.worker_runtime import run_async, get_service
 
 logger = logging.getLogger(__name__)
 
@@ -30,15 +29,9 @@ def daily_ingestion(self):
         logger.info("Starting daily Slack data ingestion...")
         
         # Run the async ingestion process
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        
-        try:
-            result = loop.run_until_complete(_perform_daily_ingestion())
-            logger.info(f"Daily ingestion completed: {result}")
-            return result
-        finally:
-            loop.close()
+        result = run_async(_perform_daily_ingestion())
+        logger.info(f"Daily ingestion completed: {result}")
+        return result
             
     except Exception as e:
         logger.error(f"Error in daily ingestion: {e}")
@@ -61,15 +54,9 @@ def manual_ingestion(self):
     try:
         logger.info("Starting manual Slack data ingestion...")
         
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        
-        try:
-            result = loop.run_until_complete(_perform_manual_ingestion())
-            logger.info(f"Manual ingestion completed: {result}")
-            return result
-        finally:
-            loop.close()
+        result = run_async(_perform_manual_ingestion())
+        logger.info(f"Manual ingestion completed: {result}")
+        return result
             
     except Exception as e:
         logger.error(f"Error in manual ingestion: {e}")
@@ -84,15 +71,9 @@ def process_knowledge_queue():
     try:
         logger.info("Processing knowledge update queue...")
         
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        
-        try:
-            result = loop.run_until_complete(_process_knowledge_queue())
-            logger.info(f"Knowledge queue processing completed: {result}")
-            return result
-        finally:
-            loop.close()
+        result = run_async(_process_knowledge_queue())
+        logger.info(f"Knowledge queue processing completed: {result}")
+        return result
             
     except Exception as e:
         logger.error(f"Error processing knowledge queue: {e}")
@@ -106,11 +87,11 @@ async def _perform_daily_ingestion() -> Dict[str, Any]:
         Dictionary containing ingestion results
     """
     try:
-        # Initialize services
-        slack_connector = EnhancedSlackConnector()
-        data_processor = DataProcessor()
-        embedding_service = EmbeddingService()
-        memory_service = MemoryService()
+        # Shared per-process services from the worker runtime
+        slack_connector = get_service("slack_connector")
+        data_processor = get_service("data_processor")
+        embedding_service = get_service("embedding_service")
+        memory_service = get_service("memory_service")
         
         # Get channels to monitor
         channels = settings.get_monitored_channels()
@@ -124,39 +105,75 @@ async def _perform_daily_ingestion() -> Dict[str, Any]:
         
         total_processed = 0
         total_embedded = 0
+        total_cache_hits = 0
         errors = []
+        pipeline_stages = {}
+        
+        # Per-channel volume and freshness from the previous run drive scheduling priority
+        previous = await memory_service.get_latest_ingestion_metadata("daily_ingestion") or {}
+        channel_messages = dict(previous.get("channel_messages", {}))
+        channel_ingested_at = dict(previous.get("channel_ingested_at", {}))
+        
+        # A channel interrupted by a previous attempt resumes its own window from the last committed page
+        checkpoints = {
+            channel: checkpoint_store.begin(
+                "daily", channel, oldest_ts=str(start_time.timestamp()), latest_ts=str(end_time.timestamp())
+            )
+            for channel in channels
+        }
         
-        for channel in channels:
-            try:
+        def channel_job(channel: str) -> ChannelJob:
+            # Stream pages through extract -> process -> embed -> upsert
+            async def run():
                 logger.info(f"Processing channel: {channel}")
-                
-                # Extract messages from channel
-                messages = await slack_connector.extract_channel_messages(
-                    channel_id=channel,
-                    start_time=start_time,
-                    end_time=end_time
+                return await run_ingestion_pipeline(
+                    channel,
+                    slack_connector.iter_channel_messages(
+                        channel_id=channel,
+                        start_time=start_time,
+                        end_time=end_time,
+                        checkpoint=checkpoints[channel]
+                    ),
+                    _process_slack_page(data_processor),
+                    embedding_service,
+                    checkpoint=checkpoints[channel]
                 )
-                
-                if not messages:
-                    logger.info(f"No new messages found in channel {channel}")
-                    continue
-                
-                # Process and clean messages
-                processed_messages = await data_processor.process_messages(messages)
-                
-                # Generate embeddings and store
-                embedded_count = await embedding_service.embed_and_store_messages(processed_messages)
-                
-                total_processed += len(processed_messages)
-                total_embedded += embedded_count
-                
-                logger.info(f"Channel {channel}: processed {len(processed_messages)}, embedded {embedded_count}")
-                
-            except Exception as e:
-                error_msg = f"Error processing channel {channel}: {e}"
+            
+            return ChannelJob(
+                channel_id=channel,
+                name=channel,
+                run=run,
+                last_ingested_at=channel_ingested_at.get(channel),
+                activity=channel_messages.get(channel, 0),
+                estimated_messages=channel_messages.get(channel)
+            )
+        
+        outcomes = await run_channel_jobs("daily ingestion", [channel_job(channel) for channel in channels])
+        
+        for outcome in outcomes:
+            channel = outcome.channel_id
+            if outcome.status != "completed":
+                error_msg = f"Error processing channel {channel}: {outcome.error or outcome.status}"
                 logger.error(error_msg)
                 errors.append(error_msg)
                 continue
+            
+            pipeline_result = outcome.result
+            pipeline_stages[channel] = pipeline_result.stages
+            errors.extend(f"Channel {channel}: {error}" for error in pipeline_result.errors)
+            channel_messages[channel] = pipeline_result.extracted
+            if pipeline_result.checkpoint_completed:
+                channel_ingested_at[channel] = float(checkpoints[channel].window_latest_ts)
+            total_cache_hits += pipeline_result.cache_hits
+            
+            if not pipeline_result.extracted:
+                logger.info(f"No new messages found in channel {channel}")
+                continue
+            
+            total_processed += pipeline_result.processed
+            total_embedded += pipeline_result.upserted
+            
+            logger.info(f"Channel {channel}: processed {pipeline_result.processed}, embedded {pipeline_result.upserted}")
         
         # Update ingestion metadata
         ingestion_metadata = {
@@ -164,7 +181,11 @@ async def _perform_daily_ingestion() -> Dict[str, Any]:
             "channels_processed": len(channels),
             "total_messages_processed": total_processed,
             "total_messages_embedded": total_embedded,
+            "embedding_cache_hits": total_cache_hits,
             "errors": errors,
+            "pipeline_stages": pipeline_stages,
+            "channel_messages": channel_messages,
+            "channel_ingested_at": channel_ingested_at,
             "time_range": {
                 "start": start_time.isoformat(),
                 "end": end_time.isoformat()
@@ -177,6 +198,7 @@ async def _perform_daily_ingestion() -> Dict[str, Any]:
             "status": "completed",
             "processed": total_processed,
             "embedded": total_embedded,
+            "embedding_cache_hits": total_cache_hits,
             "errors": len(errors),
             "channels": len(channels)
         }
@@ -188,6 +210,12 @@ async def _perform_daily_ingestion() -> Dict[str, Any]:
         logger.error(f"Fatal error in daily ingestion: {e}")
         return {"status": "failed", "error": str(e)}
 
+def _process_slack_page(data_processor):
+    """Pipeline process step: SlackMessage page -> DataProcessor output"""
+    async def process_page(page):
+        return await data_processor.process_messages([msg.to_dict() for msg in page])
+    return process_page
+
 async def _perform_manual_ingestion() -> Dict[str, Any]:
     """
     Perform manual ingestion with broader time range.
@@ -196,11 +224,11 @@ async def _perform_manual_ingestion() -> Dict[str, Any]:
         Dictionary containing ingestion results
     """
     try:
-        # Initialize services
-        slack_connector = EnhancedSlackConnector()
-        data_processor = DataProcessor()
-        embedding_service = EmbeddingService()
-        memory_service = MemoryService()
+        # Shared per-process services from the worker runtime
+        slack_connector = get_service("slack_connector")
+        data_processor = get_service("data_processor")
+        embedding_service = get_service("embedding_service")
+        memory_service = get_service("memory_service")
         
         # Get channels to monitor
         channels = settings.get_monitored_channels()
@@ -213,35 +241,38 @@ async def _perform_manual_ingestion() -> Dict[str, Any]:
         
         total_processed = 0
         total_embedded = 0
+        total_cache_hits = 0
         errors = []
         
         for channel in channels:
             try:
                 logger.info(f"Manual processing channel: {channel}")
                 
-                # Extract messages with larger batch size for manual ingestion
-                messages = await slack_connector.extract_channel_messages(
-                    channel_id=channel,
-                    start_time=start_time,
-                    end_time=end_time,
-                    batch_size=200
+                # Stream larger pages; batches stay bounded however long the range is
+                checkpoint = checkpoint_store.begin(
+                    "manual", channel, oldest_ts=str(start_time.timestamp()), latest_ts=str(end_time.timestamp())
+                )
+                pipeline_result = await run_ingestion_pipeline(
+                    channel,
+                    slack_connector.iter_channel_messages(
+                        channel_id=channel,
+                        start_time=start_time,
+                        end_time=end_time,
+                        page_size=200,
+                        checkpoint=checkpoint
+                    ),
+                    _process_slack_page(data_processor),
+                    embedding_service,
+                    embed_batch_size=50,
+                    checkpoint=checkpoint
                 )
+                errors.extend(f"Channel {channel}: {error}" for error in pipeline_result.errors)
                 
-                if not messages:
-                    continue
+                total_processed += pipeline_result.processed
+                total_embedded += pipeline_result.upserted
+                total_cache_hits += pipeline_result.cache_hits
                 
-                # Process in batches to avoid memory issues
-                batch_size = 50
-                for i in range(0, len(messages), batch_size):
-                    batch = messages[i:i + batch_size]
-                    
-                    processed_batch = await data_processor.process_messages(batch)
-                    embedded_count = await embedding_service.embed_and_store_messages(processed_batch)
-                    
-                    total_processed += len(processed_batch)
-                    total_embedded += embedded_count
-                    
-                    logger.info(f"Processed batch {i//batch_size + 1} for channel {channel}")
+                logger.info(f"Channel {channel}: processed {pipeline_result.processed}, embedded {pipeline_result.upserted}")
                 
             except Exception as e:
                 error_msg = f"Error in manual processing of channel {channel}: {e}"
@@ -256,6 +287,7 @@ async def _perform_manual_ingestion() -> Dict[str, Any]:
             "channels_processed": len(channels),
             "total_messages_processed": total_processed,
             "total_messages_embedded": total_embedded,
+            "embedding_cache_hits": total_cache_hits,
             "errors": errors,
             "time_range": {
                 "start": start_time.isoformat(),
@@ -269,6 +301,7 @@ async def _perform_manual_ingestion() -> Dict[str, Any]:
             "status": "completed",
             "processed": total_processed,
             "embedded": total_embedded,
+            "embedding_cache_hits": total_cache_hits,
             "errors": len(errors),
             "channels": len(channels),
             "days_covered": 7
@@ -289,7 +322,7 @@ async def _process_knowledge_queue() -> Dict[str, Any]:
         Dictionary containing processing results
     """
     try:
-        memory_service = MemoryService()
+        memory_service = get_service("memory_service")
         
         # Get today's knowledge queue
         queue_key = f"knowledge_queue:{datetime.now().strftime('%Y%m%d')}"
@@ -0,0 +1,250 @@
+"""
+Worker Runtime - Persistent event loop and shared services for Celery workers.
+
+Celery tasks are synchronous, so they used to wrap each coroutine in
+`asyncio.run()` (or a fresh `new_event_loop()`), creating and tearing down an
+event loop - and the Redis pool bound to it - several times per task, and
+rebuilding EmbeddingService / EnhancedSlackConnector / DataProcessor /
+MemoryService on every invocation.
+
+The runtime keeps one long-lived event loop per worker process on a daemon
+thread. Tasks submit coroutines to it with `run_async()`, which works from any
+pool type (prefork, threads, solo) and even from inside a running loop (eager
+tasks). Services are created once per process, on `worker_process_init` when
+running under Celery, or lazily on first use otherwise.
+"""
+
+import asyncio
+import concurrent.futures
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Coroutine, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def _create_memory_service():
+    from services.core.memory_service import MemoryService
+    return MemoryService()
+
+
+def _create_entity_store():
+    from services.data.entity_store import EntityStore
+    return EntityStore(worker_runtime.get_service("memory_service"))
+
+
+def _create_embedding_service():
+    from services.data.embedding_service import EmbeddingService
+    return EmbeddingService()
+
+
+def _create_slack_connector():
+    from services.external_apis.enhanced_slack_connector import EnhancedSlackConnector
+    return EnhancedSlackConnector()
+
+
+def _create_data_processor():
+    from services.processing.data_processor import DataProcessor
+    return DataProcessor()
+
+
+SERVICE_FACTORIES: Dict[str, Callable[[], Any]] = {
+    "memory_service": _create_memory_service,
+    "entity_store": _create_entity_store,
+    "embedding_service": _create_embedding_service,
+    "slack_connector": _create_slack_connector,
+    "data_processor": _create_data_processor,
+}
+
+
+class WorkerRuntime:
+    """
+    One event loop thread and one set of services per worker process.
+    """
+
+    def __init__(self, default_timeout: Optional[float] = None):
+        self.default_timeout = default_timeout
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.RLock()
+        self._services: Dict[str, Any] = {}
+
+        self.stats = {
+            "loops_started": 0,
+            "coroutines_run": 0,
+            "coroutine_time": 0.0,
+            "dispatch_overhead": 0.0,  # Submit + wake-up + result hand-off, excluding the coroutine itself
+            "services_created": 0,
+            "service_init_time": 0.0
+        }
+
+    # Event loop
+
+    def start(self) -> asyncio.AbstractEventLoop:
+        """Start the runtime loop for this process (idempotent, fork-aware)"""
+        with self._lock:
+            if self._pid != os.getpid():
+                # A loop thread inherited through fork is not running in this process
+                self._loop = None
+                self._thread = None
+                self._services = {}
+                self._pid = os.getpid()
+
+            if self._loop is not None and self._thread is not None and self._thread.is_alive():
+                return self._loop
+
+            loop = asyncio.new_event_loop()
+            ready = threading.Event()
+
+            def run_loop():
+                asyncio.set_event_loop(loop)
+                loop.call_soon(ready.set)
+                loop.run_forever()
+
+            thread = threading.Thread(target=run_loop, name="worker-runtime-loop", daemon=True)
+            thread.start()
+            ready.wait()
+
+            self._loop = loop
+            self._thread = thread
+            self.stats["loops_started"] += 1
+            logger.info(f"Worker runtime event loop started (pid {self._pid})")
+            return loop
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        return self.start()
+
+    def run_async(self, coro: Coroutine, timeout: Optional[float] = None) -> Any:
+        """
+        Run a coroutine on the runtime loop and wait for its result.
+
+        Args:
+            coro: Coroutine to execute
+            timeout: Seconds to wait (defaults to the runtime default, None = no limit)
+
+        Returns:
+            The coroutine's result (exceptions are re-raised in the caller)
+        """
+        loop = self.start()
+        if threading.current_thread() is self._thread:
+            coro.close()
+            raise RuntimeError("run_async() cannot be called from the worker runtime loop; await the coroutine instead")
+
+        async def timed():
+            started = time.perf_counter()
+            try:
+                return await coro
+            finally:
+                elapsed[0] = time.perf_counter() - started
+
+        elapsed = [0.0]
+        submitted = time.perf_counter()
+        future = asyncio.run_coroutine_threadsafe(timed(), loop)
+        try:
+            return future.result(timeout if timeout is not None else self.default_timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise
+        finally:
+            total = time.perf_counter() - submitted
+            self.stats["coroutines_run"] += 1
+            self.stats["coroutine_time"] += elapsed[0]
+            self.stats["dispatch_overhead"] += max(0.0, total - elapsed[0])
+
+    # Services
+
+    def get_service(self, name: str) -> Any:
+        """
+        Get a process-wide service instance, creating it on first use.
+
+        Args:
+            name: Service name from SERVICE_FACTORIES
+
+        Returns:
+            Shared service instance
+        """
+        with self._lock:
+            if self._pid != os.getpid():
+                self.start()
+            service = self._services.get(name)
+            if service is None:
+                started = time.perf_counter()
+                service = SERVICE_FACTORIES[name]()
+                self.stats["service_init_time"] += time.perf_counter() - started
+                self.stats["services_created"] += 1
+                self._services[name] = service
+            return service
+
+    def initialize_services(self, names: Optional[list] = None) -> Dict[str, bool]:
+        """
+        Eagerly create services (called on worker_process_init).
+
+        Args:
+            names: Services to create (defaults to all)
+
+        Returns:
+            Mapping of service name to whether it initialized
+        """
+        results = {}
+        for name in names or SERVICE_FACTORIES:
+            try:
+                self.get_service(name)
+                results[name] = True
+            except Exception as e:
+                logger.error(f"Failed to initialize worker service {name}: {e}")
+                results[name] = False
+        return results
+
+    # Lifecycle
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        """Close pooled Redis connections and stop the loop (worker_process_shutdown)"""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            if loop is None or thread is None or not thread.is_alive() or self._pid != os.getpid():
+                return
+
+            from services.core.redis_pool import redis_pool_registry
+            try:
+                asyncio.run_coroutine_threadsafe(redis_pool_registry.close_current_loop(), loop).result(timeout)
+            except Exception as e:
+                logger.debug(f"Error closing Redis pools on worker shutdown: {e}")
+
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join(timeout)
+            loop.close()
+            self._loop = None
+            self._thread = None
+            self._services = {}
+            logger.info("Worker runtime stopped")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get runtime statistics"""
+        runs = self.stats["coroutines_run"]
+        return {
+            "pid": self._pid,
+            "loop_running": bool(self._thread and self._thread.is_alive()),
+            "services": sorted(self._services),
+            "avg_coroutine_ms": round(self.stats["coroutine_time"] / runs * 1000, 3) if runs else 0.0,
+            "avg_dispatch_overhead_ms": round(self.stats["dispatch_overhead"] / runs * 1000, 3) if runs else 0.0,
+            **self.stats
+        }
+
+
+# Global runtime instance (one per process)
+worker_runtime = WorkerRuntime()
+
+
+def run_async(coro: Coroutine, timeout: Optional[float] = None) -> Any:
+    """Run a coroutine on the worker runtime loop"""
+    return worker_runtime.run_async(coro, timeout)
+
+
+def get_service(name: str) -> Any:
+    """Get a shared worker service"""
+    return worker_runtime.get_service(name)